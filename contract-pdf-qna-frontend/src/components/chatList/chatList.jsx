@@ -66,6 +66,7 @@ const ChatList = ({ chats, setChats, conversationId, isCallsMode = false, server
                         chats={chats}
                         setChats={setChats}
                         relevantChunks={chat.relevantChunks || chat.relevant_chunks || []}
+                        relevantChunkCount={chat.relevantChunkCount || 0}
                         headerLabel="AI Draft Answer"
                         tone="blue"
                         isError={chat.isError}
@@ -99,6 +100,7 @@ const ChatList = ({ chats, setChats, conversationId, isCallsMode = false, server
                     chats={chats}
                     setChats={setChats}
                     relevantChunks={chat.relevantChunks || chat.relevant_chunks || []}
+                    relevantChunkCount={chat.relevantChunkCount || 0}
                     headerLabel="Assistant (Case Context)"
                     isError={chat.isError}
                     onRetry={chat.isError && onRetryChat ? onRetryChat : null}
@@ -119,6 +121,7 @@ const ChatList = ({ chats, setChats, conversationId, isCallsMode = false, server
               chats={chats}
               setChats={setChats}
               relevantChunks={finalAnswer.relevantChunks || finalAnswer.relevant_chunks || []}
+              relevantChunkCount={finalAnswer.relevantChunkCount || 0}
               variant="finalAnswer"
               headerLabel="Final Authorized Answer"
               tone="blue"
@@ -156,6 +159,7 @@ const ChatList = ({ chats, setChats, conversationId, isCallsMode = false, server
               chats={chats}
               setChats={setChats}
               relevantChunks={chat.relevantChunks || chat.relevant_chunks || []}
+              relevantChunkCount={chat.relevantChunkCount || 0}
               variant={isCallsMode && isFinalAnswerChat(chat) ? "finalAnswer" : "default"}
               isError={chat.isError}
               onRetry={chat.isError && onRetryChat ? onRetryChat : null}
@@ -1,5 +1,7 @@
 import React, { useState, useRef, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
+import axios from "axios";
+import { API_BASE_URL } from "../../../config";
 import responseIcon from "../../../assets/response.svg";
 import responseBlueIcon from "../../../assets/response_blue.svg";
 import documentsIcon from "../../../assets/documents.svg";
@@ -111,6 +113,7 @@ const Response = ({
   chats,
   setChats,
   relevantChunks = [],
+  relevantChunkCount = 0,
   variant = "default",
   headerLabel,
   tone = "default", // default | blue
@@ -124,6 +127,36 @@ const Response = ({
   const [showFeedbackPopup, setShowFeedbackPopup] = useState(false);
   const [feedbackResponse, setFeedbackResponse] = useState("");
   const [copiedToClipboard, setCopiedToClipboard] = useState(false);
+  // /history omits chunk bodies; they are fetched per chat on demand.
+  const [loadedChunks, setLoadedChunks] = useState(null);
+  const [isLoadingChunks, setIsLoadingChunks] = useState(false);
+  const [chunksError, setChunksError] = useState(false);
+  const chunks =
+    Array.isArray(relevantChunks) && relevantChunks.length > 0
+      ? relevantChunks
+      : loadedChunks || [];
+  const pendingChunkCount = chunks.length === 0 ? relevantChunkCount || 0 : 0;
+
+  const loadChunks = () => {
+    if (!conversationId || !chatId || isLoadingChunks) return;
+    setIsLoadingChunks(true);
+    setChunksError(false);
+    axios
+      .get(`${API_BASE_URL}/history/chat`, {
+        params: { "conversation-id": conversationId, "chat-id": chatId },
+      })
+      .then((res) => {
+        const data = res?.data?.relevantChunks;
+        setLoadedChunks(Array.isArray(data) ? data : []);
+      })
+      .catch((error) => {
+        console.error("Error:", error);
+        setChunksError(true);
+      })
+      .finally(() => {
+        setIsLoadingChunks(false);
+      });
+  };
 
   const isLoading = response === "Loading Response";
   const isErrorState = isError || (response && response.includes("Please try again"));
@@ -236,11 +269,11 @@ const Response = ({
             </div>
           )}
 
-          {Array.isArray(relevantChunks) && relevantChunks.length > 0 ? (
+          {chunks.length > 0 ? (
             <div className="chunks_wrapper">
               <div className="chunks_title">Contract clauses (referred info)</div>
               <div className="chunks_list">
-                {relevantChunks.map((chunk, index) => {
+                {chunks.map((chunk, index) => {
                   const score =
                     chunk && typeof chunk === "object" ? chunk.score : undefined;
                   const titleSuffix =
@@ -298,6 +331,22 @@ const Response = ({
                 })}
               </div>
             </div>
+          ) : pendingChunkCount > 0 ? (
+            <div className="chunks_wrapper">
+              <div className="chunks_title">Contract clauses (referred info)</div>
+              <button
+                type="button"
+                className="chunks_load"
+                disabled={isLoadingChunks}
+                onClick={loadChunks}
+              >
+                {isLoadingChunks
+                  ? "Loading clauses…"
+                  : chunksError
+                  ? "Failed to load clauses. Try again"
+                  : `Show ${pendingChunkCount} clause${pendingChunkCount === 1 ? "" : "s"}`}
+              </button>
+            </div>
           ) : null}
 
           {/* Action Icons - Reference, Feedback, Share */}
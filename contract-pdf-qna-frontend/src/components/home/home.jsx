@@ -798,7 +798,10 @@ const Home = ({ bearerToken, setBearerToken }) => {
         id: c?.chat_id || c?.questionId,
         question: c?.entered_query || "",
         answer: c?.response || "",
-        evidenceCount: Array.isArray(evidence) ? evidence.length : 0,
+        evidenceCount:
+          Array.isArray(evidence) && evidence.length > 0
+            ? evidence.length
+            : c?.relevantChunkCount || 0,
       };
     });
 
@@ -32,6 +32,8 @@ const SideBar = (props) => {
   const [userName, setUserName] = useState("");
   const [isActive, setIsActive] = useState(null);
   const [sidebarError, setSidebarError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const location = useLocation();
   const cleanedAuthUrlRef = useRef(false);
 
@@ -45,7 +47,7 @@ const SideBar = (props) => {
     navigate(path);
   };
 
-  const getSidebarHistory = (token, mode = "Search") => {
+  const getSidebarHistory = (token, mode = "Search", before = null) => {
     const apiUrl = `${API_BASE_URL}/sidebar`;
     const config = {
       headers: {
@@ -54,16 +56,23 @@ const SideBar = (props) => {
       },
       params: {
         mode: mode || "Search",
+        ...(before ? { before } : {}),
       },
     };
-    setIsLoadingHistory(true);
+    if (before) {
+      setIsLoadingMore(true);
+    } else {
+      setIsLoadingHistory(true);
+    }
     axios
       .get(apiUrl, config)
       .then((response) => {
         setSidebarError(null);
-        // Backend returns an array; keep this resilient.
+        // Backend returns an array (one page, newest first); keep this resilient.
         const data = response?.data;
-        setSidebarHistory(Array.isArray(data) ? data : []);
+        const page = Array.isArray(data) ? data : [];
+        setSidebarHistory((prev) => (before ? [...prev, ...page] : page));
+        setNextCursor(response?.headers?.["x-next-cursor"] || null);
       })
       .catch((error) => {
         // Handle errors
@@ -71,14 +80,16 @@ const SideBar = (props) => {
         const status = error?.response?.status;
         if (status === 500) {
           setSidebarError({
-            retryFn: () => getSidebarHistory(token, mode),
+            retryFn: () => getSidebarHistory(token, mode, before),
           });
-        } else {
+        } else if (!before) {
           setSidebarHistory([]);
+          setNextCursor(null);
         }
       })
       .finally(() => {
         setIsLoadingHistory(false);
+        setIsLoadingMore(false);
       });
   };
 
@@ -104,6 +115,7 @@ const SideBar = (props) => {
     props.setError("");
     props.setUserImage("");
     setSidebarHistory([]);
+    setNextCursor(null);
     setUserName("");
     clearAuthTokens();
 
@@ -398,6 +410,22 @@ const SideBar = (props) => {
               />
             ))
           )}
+          {!isLoadingHistory && !sidebarError && nextCursor ? (
+            <button
+              type="button"
+              className="load_more"
+              disabled={isLoadingMore}
+              onClick={() =>
+                getSidebarHistory(
+                  getIdToken(),
+                  props.selectedModel || "Search",
+                  nextCursor
+                )
+              }
+            >
+              {isLoadingMore ? "Loading…" : "Load more"}
+            </button>
+          ) : null}
         </div>
         <div className="gredient"></div>
       </div>
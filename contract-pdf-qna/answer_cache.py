@@ -0,0 +1,279 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from time import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# -------------------------------------------------------------------
+# Cross-session answer cache for Live Copilot RAG
+#
+# Calls on the same plan keep asking the same things, and each ask used to run the full Infer
+# agent (seconds). Answers are cached per Milvus collection (= contract type / plan / state):
+#
+#   - exact: key = collection + normalized question text (case, punctuation, fillers)
+#   - similar (COPILOT_ANSWER_CACHE_SIMILARITY > 0): cosine over question embeddings of the
+#     same collection, one matrix product per lookup
+#   - shared (COPILOT_ANSWER_CACHE_SHARED=1): exact entries also go to the session-state backend
+#     (COPILOT_STATE_BACKEND redis/mongo), so other workers reuse them
+#   - single flight: a question already being answered is awaited, not asked again
+#   - TTL (COPILOT_ANSWER_CACHE_TTL_S) and an LRU cap (COPILOT_ANSWER_CACHE_MAX) per process
+# -------------------------------------------------------------------
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        raw = (os.getenv(name) or "").strip()
+        if not raw:
+            return default
+        v = int(raw)
+        return v if v >= 0 else default
+    except Exception:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        raw = (os.getenv(name) or "").strip()
+        return float(raw) if raw else default
+    except Exception:
+        return default
+
+
+COPILOT_ANSWER_CACHE_TTL_S = _env_int("COPILOT_ANSWER_CACHE_TTL_S", 6 * 3600)  # 0 = cache off
+COPILOT_ANSWER_CACHE_MAX = _env_int("COPILOT_ANSWER_CACHE_MAX", 5000) or 5000
+COPILOT_ANSWER_CACHE_SIMILARITY = _env_float("COPILOT_ANSWER_CACHE_SIMILARITY", 0.0)  # e.g. 0.95; 0 = exact only
+COPILOT_ANSWER_CACHE_SHARED = (os.getenv("COPILOT_ANSWER_CACHE_SHARED") or "").strip().lower() in ("1", "true", "yes", "y", "on")
+
+_FILLERS = {"um", "uh", "so", "like", "okay", "ok", "well", "hi", "hello", "please", "just", "actually", "basically"}
+
+
+def normalize_question(question: str) -> str:
+    words = re.sub(r"[^a-z0-9$ ]+", " ", str(question or "").lower()).split()
+    while words and words[0] in _FILLERS:
+        words.pop(0)
+    return " ".join(w for w in words if w not in ("um", "uh"))
+
+
+class _Entry:
+    __slots__ = ("collection", "question", "value", "created_at", "vector")
+
+    def __init__(self, collection: str, question: str, value: Dict[str, Any], created_at: float, vector: Any = None):
+        self.collection = collection
+        self.question = question
+        self.value = value
+        self.created_at = created_at
+        self.vector = vector
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        ttl_s: int = COPILOT_ANSWER_CACHE_TTL_S,
+        max_entries: int = COPILOT_ANSWER_CACHE_MAX,
+        similarity: float = COPILOT_ANSWER_CACHE_SIMILARITY,
+        embed: Optional[Callable[[str], List[float]]] = None,
+        shared: Any = None,
+        clock: Callable[[], float] = time,
+    ):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.similarity = similarity if embed is not None else 0.0
+        self._embed = embed
+        self.shared = shared  # copilot_sessions.SessionBackend, or None
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._matrices: Dict[str, Tuple[List[Tuple[str, str]], Any]] = {}  # collection -> (keys, normalized vectors)
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self.hits = {"exact": 0, "similar": 0, "shared": 0, "inflight": 0}
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_s > 0
+
+    @staticmethod
+    def _shared_id(key: Tuple[str, str]) -> str:
+        return hashlib.sha1(f"{key[0]}|{key[1]}".encode("utf-8")).hexdigest()
+
+    def _fresh(self, entry: _Entry, now: float) -> bool:
+        return now - entry.created_at < self.ttl_s
+
+    def _hit(self, entry: _Entry, kind: str, score: float = 1.0) -> Dict[str, Any]:
+        self.hits[kind] += 1
+        value = dict(entry.value)
+        value["source"] = f"cache:{value.get('source') or 'rag'}"
+        value["cache"] = {
+            "match": kind,
+            "score": round(float(score), 3),
+            "question": entry.question,
+            "ageS": round(self._clock() - entry.created_at, 1),
+        }
+        return value
+
+    def _lookup_local(self, key: Tuple[str, str], now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not self._fresh(entry, now):
+                self._remove_locked(key)
+                return None
+            self._entries.move_to_end(key)
+        return self._hit(entry, "exact")
+
+    def _lookup_similar(self, collection: str, vector: Any, now: float) -> Optional[Dict[str, Any]]:
+        import numpy as np
+
+        with self._lock:
+            keys, matrix = self._matrix_locked(collection)
+        if not keys:
+            return None
+        q = np.asarray(vector, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        scores = matrix @ q
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None
+        with self._lock:
+            entry = self._entries.get(keys[best])
+            if entry is None or not self._fresh(entry, now):
+                return None
+            self._entries.move_to_end(keys[best])
+        return self._hit(entry, "similar", scores[best])
+
+    def _matrix_locked(self, collection: str) -> Tuple[List[Tuple[str, str]], Any]:
+        import numpy as np
+
+        cached = self._matrices.get(collection)
+        if cached is not None:
+            return cached
+        keys = [k for k, e in self._entries.items() if k[0] == collection and e.vector is not None]
+        if not keys:
+            built = ([], None)
+        else:
+            matrix = np.asarray([self._entries[k].vector for k in keys], dtype=np.float32)
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-9)
+            built = (keys, matrix)
+        self._matrices[collection] = built
+        return built
+
+    def _lookup_shared(self, key: Tuple[str, str], now: float) -> Optional[Dict[str, Any]]:
+        if self.shared is None:
+            return None
+        try:
+            doc, _ = self.shared.get(self._shared_id(key))
+        except Exception as e:
+            self.errors += 1
+            print(f"[ANSWER_CACHE] shared lookup failed (ignored): {e}")
+            return None
+        if not doc or now - float(doc.get("createdAt") or 0) >= self.ttl_s:
+            return None
+        entry = _Entry(key[0], doc.get("question", ""), doc.get("value") or {}, float(doc["createdAt"]))
+        self._store_local(key, entry)
+        return self._hit(entry, "shared")
+
+    def _remove_locked(self, key: Tuple[str, str]) -> None:
+        if self._entries.pop(key, None) is not None:
+            self._matrices.pop(key[0], None)
+
+    def _store_local(self, key: Tuple[str, str], entry: _Entry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._matrices.pop(key[0], None)
+            while len(self._entries) > self.max_entries:
+                old_key = next(iter(self._entries))
+                self._remove_locked(old_key)
+                self.evicted += 1
+
+    def get_or_compute(
+        self,
+        collection: str,
+        question: str,
+        compute: Callable[[], Dict[str, Any]],
+        cacheable: Callable[[Dict[str, Any]], bool] = lambda v: bool(v) and not v.get("error"),
+    ) -> Dict[str, Any]:
+        """Cached answer (marked in `source` / `cache`), else compute() once across concurrent askers."""
+        qnorm = normalize_question(question)
+        if not self.enabled or not collection or not qnorm:
+            return compute()
+        key = (collection, qnorm)
+        now = self._clock()
+        hit = self._lookup_local(key, now) or self._lookup_shared(key, now)
+        if hit is not None:
+            return hit
+
+        vector = None
+        if self.similarity > 0:
+            try:
+                vector = self._embed(question)
+                hit = self._lookup_similar(collection, vector, now)
+                if hit is not None:
+                    return hit
+            except Exception as e:
+                self.errors += 1
+                print(f"[ANSWER_CACHE] similarity lookup failed (ignored): {e}")
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = Future()
+                self._inflight[key] = pending
+        if not owner:
+            self.hits["inflight"] += 1
+            value = dict(pending.result())
+            value["cache"] = {"match": "inflight", "score": 1.0, "question": question, "ageS": 0.0}
+            return value
+
+        self.misses += 1
+        try:
+            value = compute()
+            pending.set_result(value)
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+        if cacheable(value):
+            created = self._clock()
+            self._store_local(key, _Entry(collection, question, value, created, vector))
+            self.stored += 1
+            if self.shared is not None:
+                try:
+                    self.shared.put(self._shared_id(key), {"question": question, "value": value, "createdAt": created})
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[ANSWER_CACHE] shared store failed (ignored): {e}")
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+            collections = len({k[0] for k in self._entries})
+        lookups = sum(self.hits.values()) + self.misses
+        return {
+            "enabled": self.enabled,
+            "ttlS": self.ttl_s,
+            "entries": entries,
+            "maxEntries": self.max_entries,
+            "collections": collections,
+            "similarity": self.similarity,
+            "shared": self.shared.kind if self.shared is not None else None,
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hitRate": round(sum(self.hits.values()) / lookups, 3) if lookups else None,
+            "stored": self.stored,
+            "evicted": self.evicted,
+            "errors": self.errors,
+        }
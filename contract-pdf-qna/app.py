@@ -4,8 +4,9 @@ import os
 import asyncio
 from dotenv import load_dotenv
 from flask import Flask, request, jsonify, make_response, Response, stream_with_context, session
-from flask_socketio import SocketIO, emit, join_room, disconnect
-from pymongo import MongoClient, ReturnDocument
+from flask_socketio import SocketIO, emit, join_room, leave_room, disconnect
+from pymongo import ReturnDocument, InsertOne, UpdateOne
+from pymongo.results import InsertOneResult
 from datetime import datetime
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_community.vectorstores import Milvus
@@ -27,12 +28,26 @@ from langchain.memory import ConversationBufferMemory
 # Add imports for transcript processing
 import json
 import re
-from typing import List, Dict
+import hashlib
+import base64
+import sys
+import signal
+from typing import List, Dict, Optional
 from pathlib import Path
 
 # Live Copilot for real-time AI suggestions during calls
 try:
-    from live_copilot import handle_transcript_event
+    from live_copilot import (
+        answer_cache_stats,
+        end_session,
+        handle_transcript_event,
+        intent_stats,
+        note_transcript_event,
+        observe_partial,
+        reasoning_stats,
+        session_stats,
+        speculation_stats,
+    )
     LIVE_COPILOT_AVAILABLE = True
 except ImportError:
     LIVE_COPILOT_AVAILABLE = False
@@ -95,7 +110,20 @@ from monitoring_module import q_monitor, tracer, llm_trace_to_jaeger
 #         pass
 
 from token_module import token_calculator, CallbackHandler
+from transcript_cache import TranscriptObjectCache, object_version
+from transcript_search import TranscriptSearchIndex, FACET_FIELDS
+from write_behind import create_write_behind
+from chunk_store import ChunkStore, TEXT_CHUNK_SEPARATOR, format_referred_documents
+from data_access import get_data_access
+from call_transcript_store import CallTranscriptStore, bucket_indexes, compact_indexes
+from copilot_dispatcher import CopilotDispatcher, COPILOT_WORKERS
+from copilot_sessions import open_session_backend
+from copilot_speculation import COPILOT_SPECULATE
+from socket_emitter import SOCKET_SUPERVISOR_EMAILS, RoomEmitter
+from conversation_store import ConversationStore, for_insert, for_update
+from mongo_indexes import IndexManager, CONVERSATIONS_INDEXES, FEEDBACK_INDEXES, USERS_INDEXES, MONGO_SLOW_QUERY_MS, enable_slow_query_profiler
 import threading
+import queue
 
 # Using new LangChain memory API - InMemoryChatMessageHistory
 # Note: This is only used to store previous Q&A for standalone prompt, not used in chains
@@ -139,11 +167,6 @@ MONGO_URI = (
 #   2) Analyze Live tab explicitly enables the session via Socket.IO (copilot_enable)
 #
 # This ensures existing /webhook + transcript_update behavior remains unchanged.
-_copilot_enabled_sessions = {}  # sessionId -> expires_at_epoch_seconds
-# Persist per-session plan context for Live Copilot (Analyze Live).
-# Filled by `copilot_enable` from the UI and attached to webhook payloads.
-_copilot_session_context = {}  # sessionId -> {"contractType": "...", "selectedPlan": "...", "selectedState": "..."}
-_copilot_sessions_lock = threading.Lock()
 
 
 def _flag_enabled(var_name: str, default: str = "0") -> bool:
@@ -160,21 +183,27 @@ def _copilot_session_ttl_seconds() -> int:
         return 1800
 
 
+# sessionId -> {"expiresAt": epoch_seconds, "context": {"contractType", "selectedPlan", "selectedState"}}
+# Filled by `copilot_enable`; expires so calls that end without `copilot_disable` are reclaimed.
+# COPILOT_STATE_BACKEND=redis|mongo shares it across worker processes (the webhook for a call
+# may land on a worker that never saw its copilot_enable).
+_copilot_sessions = open_session_backend("copilot_enabled", _copilot_session_ttl_seconds())
+
+
 def _copilot_session_is_enabled(session_id: str) -> bool:
     if not session_id:
         return False
-    now = time()
-    with _copilot_sessions_lock:
-        exp = _copilot_enabled_sessions.get(session_id)
-        if exp is None:
-            return False
-        if exp <= now:
-            try:
-                del _copilot_enabled_sessions[session_id]
-            except Exception:
-                pass
-            return False
-        return True
+    try:
+        entry, _ = _copilot_sessions.get(session_id)
+    except Exception as e:
+        print(f"⚠️ Copilot session lookup failed (treated as disabled): {e}")
+        return False
+    if entry is None:
+        return False
+    if entry["expiresAt"] <= time():
+        _copilot_sessions.delete(session_id)
+        return False
+    return True
 
 def _optional_positive_int_env(var_name: str):
     """Return a positive int from env var, otherwise None (unset/invalid/<=0)."""
@@ -280,12 +309,101 @@ def normalize_state_for_milvus(selected_state: str) -> str:
 
     return raw
 
-CORS(app, resources={r"/*": {"origins": "*"}})
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["X-Next-Cursor"])
+
+# One pooled client for the process (shared with live_copilot); see data_access.py
+data_access = get_data_access()
+mongo_client = data_access.client
+db = data_access.front_door
+db2 = data_access.transcripts_db
+transcripts_collection = db2.call_transcripts  # legacy one-doc-per-event layout (no longer written)
+# Live call transcripts: per-session time buckets + compacted transcripts (call_transcript_store.py)
+call_transcripts = CallTranscriptStore(db2)
+
+# Indexes for per-user chats_/feedbacks_ collections (lazy, on first use) and shared collections (startup)
+index_manager = IndexManager()
+users_collection = data_access.users
+# Conversations / feedback: shared collections keyed by user_email (CONVERSATIONS_STORE mode)
+conversation_store = ConversationStore(db, index_manager)
+print(f"[CONVERSATIONS] store mode: {conversation_store.mode}")
+enable_slow_query_profiler(db)
+index_manager.ensure_startup_async(
+    db,
+    shared=[
+        (users_collection, USERS_INDEXES),
+        (conversation_store.conversations, CONVERSATIONS_INDEXES),
+        (conversation_store.feedback, FEEDBACK_INDEXES),
+        (call_transcripts.buckets, bucket_indexes()),
+        (call_transcripts.compact, compact_indexes()),
+        *_copilot_sessions.index_specs(),
+    ],
+)
+
+
+# Write-behind: chat/feedback writes are queued and flushed in bulk off the request thread
+WRITE_BEHIND_ENABLED = _flag_enabled("WRITE_BEHIND_ENABLED", "1")
+# Listing reads are pinned to the primary once a queued write has landed (not when it was queued)
+write_behind = create_write_behind(WRITE_BEHIND_ENABLED, on_written=data_access.note_write)
+
+
+def _persist(collection, op):
+    """Queue a write model (InsertOne/UpdateOne) when write-behind is on, else apply it now."""
+    if write_behind is not None:
+        write_behind.submit(collection, op)  # note_write runs once the flusher has written it
+    else:
+        collection.bulk_write([op])
+        data_access.note_write(collection)
+
+
+def _routed(collection, listing: bool):
+    """
+    Listing reads may go to a secondary (data_access.reader); any other access is assumed to
+    write, which pins this collection's listing reads to the primary for a few seconds. Callers
+    have passed _barrier already, so queued writes are on the primary by now.
+    """
+    if listing:
+        return data_access.reader(collection)
+    data_access.note_write(collection)
+    return collection
+
+
+def _barrier(collection):
+    """Wait for queued writes on every collection behind a conversation-store handle."""
+    if write_behind is not None:
+        for part in getattr(collection, "parts", (collection,)):
+            write_behind.barrier(part)
+
 
-mongo_client = MongoClient(MONGO_URI, unicode_decode_error_handler='ignore')
-db = mongo_client["FrontDoorDB"]
-db2 = mongo_client[os.getenv("MONGO_DB_NAME")]
-transcripts_collection = db2.call_transcripts
+def _chats_collection(user_email: str, listing: bool = False):
+    """
+    This user's conversations (see conversation_store.py for the per-user / dual / unified modes).
+    Waits for this user's queued writes first, so direct reads/writes see them (read-your-writes).
+    listing=True: read-only history/sidebar access, routed per MONGO_LISTING_READ_PREFERENCE.
+    """
+    collection = conversation_store.chats(user_email)
+    _barrier(collection)
+    return _routed(collection, listing)
+
+
+def _feedbacks_collection(user_email: str, listing: bool = False):
+    """This user's feedback (queued writes applied first)."""
+    collection = conversation_store.feedbacks(user_email)
+    _barrier(collection)
+    return _routed(collection, listing)
+
+
+# Retrieved contract chunks, stored once (content-addressed) and referenced from chats by id
+CHUNK_STORE_ENABLED = _flag_enabled("CHUNK_STORE_ENABLED", "1")
+chunk_store = ChunkStore(db["chunks"])
+
+# Persisted /transcripts/dialogue segmentations, keyed by file + object generation + method
+transcript_dialogues_collection = db["transcript_dialogues"]
+TRANSCRIPT_DIALOGUE_CACHE_ENABLED = _flag_enabled("TRANSCRIPT_DIALOGUE_CACHE_ENABLED", "1")
+PRECOMPUTE_TRANSCRIPT_DIALOGUE = _flag_enabled("PRECOMPUTE_TRANSCRIPT_DIALOGUE", "0")
+# Artifacts precomputed on bucket object-change notifications (metadata, questions), keyed by file + generation
+transcript_artifacts_collection = db["transcript_artifacts"]
+TRANSCRIPT_ARTIFACTS_ENABLED = _flag_enabled("TRANSCRIPT_ARTIFACTS_ENABLED", "1")
+TRANSCRIPT_INGEST_QUEUE_MAX = int(os.getenv("TRANSCRIPT_INGEST_QUEUE_MAX", "1000"))
 
 model_name = "text-embedding-ada-002"
 embed = OpenAIEmbeddings(model=model_name, openai_api_key=OPENAI_API_KEY)
@@ -370,6 +488,17 @@ if GCP_STORAGE_AVAILABLE:
         print("  Make sure fsspec and gcsfs are installed: pip install fsspec gcsfs")
         gcs_fs = None
 
+# Name -> path map + on-disk content cache (keyed by object generation) for transcript reads
+transcript_store = TranscriptObjectCache(gcs_fs, GCP_BUCKET_NAME)
+
+# Full-text + facet index over transcript contents, built in the background as the bucket is listed
+TRANSCRIPT_SEARCH_INDEX_ENABLED = _flag_enabled("TRANSCRIPT_SEARCH_INDEX_ENABLED", "1")
+transcript_search_index = TranscriptSearchIndex()
+_transcript_index_queue = queue.Queue()
+_transcript_index_pending = set()
+_transcript_index_lock = threading.Lock()
+_transcript_index_thread = None
+
 
 class AgentAction:
     def __init__(self, tool: str, tool_input: str, log: str = None):
@@ -480,12 +609,8 @@ def fetch_user_by_mobile(mobile_number: str) -> str:
         A string containing user details in JSON format, or an error message
     """
     try:
-        # Access the 'ahs' database and 'Users' collection
-        ahs_db = mongo_client["AHS"]
-        users_collection = ahs_db["Users"]
-        
-        # Search for user by mobile number
-        user = users_collection.find_one({"mobile": mobile_number})
+        # Search AHS.Users by mobile number
+        user = data_access.find_user_by_mobile(mobile_number)
         
         if user:
             # Convert ObjectId to string for JSON serialization
@@ -567,10 +692,11 @@ def input_prompt(entered_query, qa, llm):
 
 
 # Function to get relevant documents
-def relevant_docs(entered_query, retriever):
+def relevant_docs(entered_query, retriever, collected=None):
     """
     Wrapper around retriever.get_relevant_documents with detailed logging.
     Returns the original stringified format used by the rest of the app.
+    When `collected` is a list, the retrieved Documents are appended to it (one group per call).
     """
     try:
         # Log the incoming query
@@ -598,6 +724,9 @@ def relevant_docs(entered_query, retriever):
         else:
             print("[CHUNKS] relevant_docs: docs list is EMPTY")
 
+        if collected is not None:
+            collected.append(docs)
+
         # Preserve existing behavior (stringified docs)
         relevant_document = "Referred Documents: " + str(docs)
 
@@ -818,7 +947,120 @@ def extract_transcript_metadata(transcript_content: str, file_name: str) -> Dict
     return metadata
 
 
-def list_transcript_files_gcp(limit: int = None, offset: int = 0, search: str = None) -> tuple:
+# Plan display names for transcript facets (normalize_plan_for_milvus returns collection keys,
+# where ShieldComplete / ShieldPlatinum both become "default")
+_PLAN_DISPLAY_NAMES = {
+    "shieldessential": "ShieldEssential",
+    "essential": "ShieldEssential",
+    "shieldplus": "ShieldPlus",
+    "plus": "ShieldPlus",
+    "shieldcomplete": "ShieldComplete",
+    "complete": "ShieldComplete",
+    "shieldsilver": "ShieldSilver",
+    "silver": "ShieldSilver",
+    "shieldgold": "ShieldGold",
+    "gold": "ShieldGold",
+    "shieldplatinum": "ShieldPlatinum",
+    "platinum": "ShieldPlatinum",
+}
+
+
+def canonical_plan_name(plan: str) -> str:
+    """"SHIELD PLUS" / "shield_plus" / "Plus" -> "ShieldPlus"; unknown plans are returned trimmed."""
+    raw = str(plan or "").strip()
+    compact = re.sub(r"[^a-z0-9]+", "", raw.lower())
+    compact = re.sub(r"plan$", "", compact) or compact
+    return _PLAN_DISPLAY_NAMES.get(compact, raw)
+
+
+def _canonical_transcript_facets(values: Dict) -> Dict:
+    """Map contractType/planType/state values onto one display spelling so facets match across files."""
+    out = {}
+    contract_type = values.get("contractType")
+    if contract_type:
+        out["contractType"] = normalize_contract_type(contract_type)
+    if values.get("planType"):
+        out["planType"] = canonical_plan_name(values.get("planType"))
+    if values.get("state"):
+        out["state"] = normalize_state_for_milvus(values.get("state"))
+    return out
+
+
+def _index_transcript_file(file_info: Dict, transcript_metadata: Optional[Dict] = None) -> None:
+    """
+    Read one transcript (through the local content cache) and add it to the search index.
+    Callers that already extracted the metadata for this generation pass it in.
+    """
+    file_name = file_info["fileName"]
+    content, entry = transcript_store.read_text(file_name)
+
+    cache_key = f"{TRANSCRIPT_METADATA_CACHE_VERSION}_{file_info['filePath']}_{file_info['timeCreated']}"
+    if transcript_metadata is None:
+        transcript_metadata = transcript_metadata_cache.get(cache_key)
+    if transcript_metadata is None:
+        transcript_metadata = extract_transcript_metadata(content, file_name)
+    transcript_metadata_cache[cache_key] = transcript_metadata
+
+    text = ""
+    try:
+        text = _extract_text_from_transcript_json(json.loads(content))
+    except Exception:
+        pass
+    if not text:
+        text = content
+
+    facet_values = dict(transcript_metadata)
+    facet_values.update(_canonical_transcript_facets(transcript_metadata))
+    transcript_search_index.add(file_name, text, facet_values, version=entry.get("version"))
+
+    # New transcript generation: segment it now so the first /transcripts/dialogue open is instant
+    if PRECOMPUTE_TRANSCRIPT_DIALOGUE:
+        build_transcript_dialogue(file_name)
+
+
+def _transcript_index_worker_loop():
+    while True:
+        file_info = _transcript_index_queue.get()
+        try:
+            _index_transcript_file(file_info)
+        except Exception as e:
+            print(f"Warning: failed to index transcript {file_info.get('fileName')}: {e}")
+        finally:
+            with _transcript_index_lock:
+                _transcript_index_pending.discard(file_info.get("fileName"))
+            _transcript_index_queue.task_done()
+
+
+def _schedule_transcript_indexing(all_file_info: List[Dict]) -> None:
+    """
+    Queue transcripts that are new (or changed generation) since the last listing for indexing,
+    and drop index entries for files that disappeared. Runs off the request path.
+    """
+    global _transcript_index_thread
+    if not TRANSCRIPT_SEARCH_INDEX_ENABLED:
+        return
+    transcript_search_index.retain(f["fileName"] for f in all_file_info)
+    queued = 0
+    with _transcript_index_lock:
+        for file_info in all_file_info:
+            name = file_info["fileName"]
+            if name in _transcript_index_pending:
+                continue
+            if not transcript_search_index.needs_indexing(name, file_info.get("version")):
+                continue
+            _transcript_index_pending.add(name)
+            _transcript_index_queue.put(file_info)
+            queued += 1
+        if queued and (_transcript_index_thread is None or not _transcript_index_thread.is_alive()):
+            _transcript_index_thread = threading.Thread(
+                target=_transcript_index_worker_loop, name="transcript-indexer", daemon=True
+            )
+            _transcript_index_thread.start()
+    if queued:
+        print(f"[TRANSCRIPT_INDEX] queued {queued} transcript(s) for indexing ({len(transcript_search_index)} indexed)")
+
+
+def list_transcript_files_gcp(limit: int = None, offset: int = 0, search: str = None, facets: Dict = None) -> tuple:
     """
     List transcript files from GCP bucket using fsspec with pagination and search support
     
@@ -831,6 +1073,10 @@ def list_transcript_files_gcp(limit: int = None, offset: int = 0, search: str =
     - Then applies pagination to the filtered results
     - If limit is None, returns all transcripts (for backward compatibility)
     - If limit is set, only reads file contents for the paginated subset (much faster)
+    
+    Content search: once transcripts are in `transcript_search_index`, `search` also matches what was
+    said in the call (ranked, quoted phrases supported) and `facets` (contractType/planType/state)
+    filter on extracted metadata. Results then carry `score` and a `snippet` around the first hit.
     """
     all_file_info = []  # Store basic file info without reading content
     try:
@@ -892,6 +1138,8 @@ def list_transcript_files_gcp(limit: int = None, offset: int = 0, search: str =
                     if file_name in seen_files:
                         continue
                     seen_files.add(file_name)
+                    if isinstance(file_info, dict):
+                        transcript_store.remember(file_name, file_path, file_info)
                     
                     # Convert timeCreated to ISO format if available
                     upload_date = None
@@ -908,7 +1156,8 @@ def list_transcript_files_gcp(limit: int = None, offset: int = 0, search: str =
                         "filePath": file_path,
                         "uploadDate": upload_date,
                         "fileSize": file_size if file_size else 0,
-                        "timeCreated": time_created
+                        "timeCreated": time_created,
+                        "version": object_version(file_info) if isinstance(file_info, dict) else None
                     })
             except Exception as e:
                 # Log the error for debugging
@@ -938,9 +1187,35 @@ def list_transcript_files_gcp(limit: int = None, offset: int = 0, search: str =
             sample_file_names = [f.get("fileName", "") for f in all_file_info[:10]]
             print(f"DEBUG: Sample file names from GCS (first 10): {sample_file_names}")
         
+        # Index new/changed transcripts in the background for content + facet search
+        _schedule_transcript_indexing(all_file_info)
+        
+        active_facets = _canonical_transcript_facets(facets or {})
+        use_index = TRANSCRIPT_SEARCH_INDEX_ENABLED and (
+            bool(active_facets) or (search and search.strip() and len(transcript_search_index) > 0)
+        )
+        
+        if use_index:
+            ranked = transcript_search_index.search(search, active_facets)
+            by_name = {f["fileName"]: f for f in all_file_info}
+            matching_files = []
+            for name, score in ranked:
+                if name in by_name:
+                    matching_files.append(dict(by_name[name], score=score))
+            # Files not indexed yet can still match by file name (their facets are unknown until indexed)
+            if search and search.strip() and not active_facets:
+                search_term = search.strip().lower()
+                ranked_names = {name for name, _ in ranked}
+                for file_info in all_file_info:
+                    if file_info["fileName"] not in ranked_names and search_term in file_info["fileName"].lower():
+                        matching_files.append(file_info)
+            all_file_info = matching_files
+            print(f"DEBUG: Index search '{search}' facets={active_facets} - {len(all_file_info)} matches "
+                  f"({len(transcript_search_index)} of {total_files_from_gcs} files indexed)")
+        
         # Apply search filter if provided (case-insensitive partial match on file name)
         # This searches through ALL files from GCS (all 147 files)
-        if search and search.strip():
+        elif search and search.strip():
             search_term = search.strip().lower()
             print(f"DEBUG: Searching through ALL {total_files_from_gcs} files from GCS for: '{search_term}'")
             print(f"DEBUG: Search will match any file name containing '{search_term}' (case-insensitive)")
@@ -996,8 +1271,7 @@ def list_transcript_files_gcp(limit: int = None, offset: int = 0, search: str =
                     try:
                         file_size = file_info.get('fileSize', 0)
                         if file_size and file_size < 50000:  # Only read files < 50KB for metadata extraction
-                            with gcs_fs.open(file_info['filePath'], 'r') as f:
-                                content = f.read()
+                            content, _ = transcript_store.read_text(file_info['fileName'])
                             transcript_metadata = extract_transcript_metadata(content, file_info['fileName'])
                             # Cache the result
                             transcript_metadata_cache[cache_key] = transcript_metadata
@@ -1016,6 +1290,9 @@ def list_transcript_files_gcp(limit: int = None, offset: int = 0, search: str =
                     "planType": transcript_metadata.get("planType"),
                     "state": transcript_metadata.get("state")
                 })
+                if "score" in file_info:
+                    transcripts[-1]["score"] = file_info["score"]
+                    transcripts[-1]["snippet"] = transcript_search_index.snippet(file_info['fileName'], search)
             return transcripts
         
         # Apply pagination BEFORE reading file contents (optimization)
@@ -1042,8 +1319,7 @@ def list_transcript_files_gcp(limit: int = None, offset: int = 0, search: str =
                 try:
                     file_size = file_info.get('fileSize', 0)
                     if file_size and file_size < 50000:  # Only read files < 50KB for metadata extraction
-                        with gcs_fs.open(file_info['filePath'], 'r') as f:
-                            content = f.read()
+                        content, _ = transcript_store.read_text(file_info['fileName'])
                         transcript_metadata = extract_transcript_metadata(content, file_info['fileName'])
                         # Cache the result
                         transcript_metadata_cache[cache_key] = transcript_metadata
@@ -1062,6 +1338,9 @@ def list_transcript_files_gcp(limit: int = None, offset: int = 0, search: str =
                 "planType": transcript_metadata.get("planType"),
                 "state": transcript_metadata.get("state")
             })
+            if "score" in file_info:
+                transcripts[-1]["score"] = file_info["score"]
+                transcripts[-1]["snippet"] = transcript_search_index.snippet(file_info['fileName'], search)
         
         print(f"DEBUG: Returning {len(transcripts)} transcripts with total_count={total_count}")
         return (transcripts, total_count)
@@ -1077,49 +1356,21 @@ def read_transcript_file_gcp(file_name: str) -> tuple:
     """
     Read transcript file content from GCP bucket using fsspec
     Returns: (content, file_metadata_dict)
+
+    Path resolution comes from the name -> path map kept by `transcript_store` (filled by
+    bucket listings), content and object info are fetched in one open(), and content is
+    cached on disk by object generation so repeated opens are served locally.
     """
     try:
         if not gcs_fs:
             raise Exception("GCP Storage not available")
         
-        bucket_path = f"gs://{GCP_BUCKET_NAME}/"
-        
-        # Try different possible paths
-        possible_paths = [
-            f"{bucket_path}transcripts/{file_name}",
-            f"{bucket_path}{file_name}",
-        ]
-        
-        file_path = None
-        for path in possible_paths:
-            if gcs_fs.exists(path):
-                file_path = path
-                break
-        
-        if not file_path:
-            raise FileNotFoundError(f"Transcript file not found: {file_name}")
-        
-        # Read file content using fsspec
-        with gcs_fs.open(file_path, 'r') as f:
-            content = f.read()
-        
-        # Get file metadata
-        file_info = gcs_fs.info(file_path)
-        time_created = file_info.get('timeCreated', None)
-        
-        # Convert timeCreated to ISO format if available
-        upload_date = None
-        if time_created:
-            if isinstance(time_created, str):
-                upload_date = time_created
-            else:
-                # If it's a datetime object, convert to ISO
-                upload_date = time_created.isoformat() if hasattr(time_created, 'isoformat') else str(time_created)
+        content, entry = transcript_store.read_text(file_name)
         
         file_metadata = {
             "fileName": file_name,
-            "fileSize": file_info.get('size', 0),
-            "uploadDate": upload_date,
+            "fileSize": entry.get('size', 0),
+            "uploadDate": entry.get('uploadDate'),
             "metadata": {}  # fsspec doesn't provide custom metadata
         }
         
@@ -2047,16 +2298,16 @@ def process_live_copilot_question(
 # Feedback CRUD Operations
 # Create (Insert) operation
 def insert_feedback(data, email_id):
-    feedbacks_collection_user = f"feedbacks_{email_id}"
-    feedbacks_collection = db[feedbacks_collection_user]
-    result = feedbacks_collection.insert_one(data)
-    print(f"Document inserted with ID: {result.inserted_id}")
+    # Queued; the client-side _id makes a retried insert a no-op duplicate.
+    data.setdefault("_id", ObjectId())
+    feedbacks_collection, data = for_insert(conversation_store.feedbacks(email_id), data)
+    _persist(feedbacks_collection, InsertOne(data))
+    print(f"Document queued with ID: {data['_id']}")
 
 
 # Read operation
 def read_feedback(query, email_id):
-    feedbacks_collection_user = f"feedbacks_{email_id}"
-    feedbacks_collection = db[feedbacks_collection_user]
+    feedbacks_collection = _feedbacks_collection(email_id)
     search_query = {"entered_query": query}
     documents = (
         feedbacks_collection.find(search_query)
@@ -2069,8 +2320,7 @@ def read_feedback(query, email_id):
 
 # Update operation
 def update_feedback(query, new_data, email_id):
-    feedbacks_collection_user = f"feedbacks_{email_id}"
-    feedbacks_collection = db[feedbacks_collection_user]
+    feedbacks_collection = _feedbacks_collection(email_id)
     search_query = {"entered_query": query}
     result = feedbacks_collection.update_one(search_query, {"$set": new_data})
     print(f"Modified {result.modified_count} document(s)")
@@ -2078,21 +2328,97 @@ def update_feedback(query, new_data, email_id):
 
 # Delete operation
 def delete_feedback(query, email_id):
-    feedbacks_collection_user = f"feedbacks_{email_id}"
-    feedbacks_collection = db[feedbacks_collection_user]
+    feedbacks_collection = _feedbacks_collection(email_id)
     search_query = {"entered_query": query}
     result = feedbacks_collection.delete_one(search_query)
     print(f"Deleted {result.deleted_count} document(s)")
 
 
+# Chunk references
+def _text_chunk_fields(collection_name, chunks, details=None):
+    """
+    Chat fields for list[str] chunks: chunk_refs into the chunk store, or the legacy inline
+    relevant_chunks + relevant_docs when the store is disabled/unavailable or there are no chunks.
+    """
+    chunks = [str(c) for c in (chunks or [])]
+    inline = {
+        "relevant_chunks": chunks,
+        "relevant_docs": TEXT_CHUNK_SEPARATOR.join([c for c in chunks if c.strip()]),
+    }
+    if not CHUNK_STORE_ENABLED or not chunks:
+        return inline
+    metadata_by_content = {
+        str(d.get("content")): d.get("metadata") or {} for d in (details or []) if isinstance(d, dict)
+    }
+    try:
+        refs = chunk_store.refs(
+            collection_name, [{"content": c, "metadata": metadata_by_content.get(c, {})} for c in chunks]
+        )
+        return {"chunk_refs": refs, "chunk_format": "text"}
+    except Exception as e:
+        print(f"Warning: chunk store write failed, storing chunks inline: {e}")
+        return inline
+
+
+def _document_chunk_fields(collection_name, doc_groups, relevant_documents):
+    """Chat fields for relevant_docs() output: chunk_refs when the string can be rebuilt exactly from them."""
+    inline = {"relevant_docs": relevant_documents}
+    if not CHUNK_STORE_ENABLED or not doc_groups or not all(doc_groups):
+        return inline
+    try:
+        groups = [
+            [{"content": d.page_content, "metadata": d.metadata or {}} for d in docs] for docs in doc_groups
+        ]
+        if "".join(format_referred_documents(g) for g in groups) != relevant_documents:
+            return inline
+        refs = []
+        for group_idx, group in enumerate(groups):
+            refs.extend(chunk_store.refs(collection_name, group, group=group_idx))
+        return {"chunk_refs": refs, "chunk_format": "documents"}
+    except Exception as e:
+        print(f"Warning: chunk store write failed, storing relevant_docs inline: {e}")
+        return inline
+
+
+def _resolve_chunks(chats):
+    """Rebuild relevant_chunks / relevant_docs for chats stored with chunk_refs (one batched lookup)."""
+    try:
+        chunk_store.resolve_chats(chats)
+    except Exception as e:
+        print(f"Warning: failed to resolve chunk refs: {e}")
+
+
+def _cached_response_payload(existing_conv):
+    """
+    Stored response_payload with relevantChunks filled back in from the conversation's chats
+    (payloads are stored without chunk bodies when the chunk store is on).
+    """
+    cached = existing_conv.get("response_payload") or {}
+    questions = cached.get("questions") or []
+    if any(isinstance(q, dict) and "relevantChunks" not in q for q in questions):
+        chats = existing_conv.get("chats") or []
+        _resolve_chunks(chats)
+        chunks_by_id = {c.get("chat_id"): c.get("relevant_chunks") or [] for c in chats if isinstance(c, dict)}
+        for q in questions:
+            if isinstance(q, dict) and "relevantChunks" not in q:
+                q["relevantChunks"] = chunks_by_id.get(q.get("questionId"), [])
+    return cached
+
+
 # Questions and Answers CRUD Operations
 # Create (Insert) operation
 def insert_qna(data, email_id):
-    qna_collection_today = f"chats_{email_id}"
-    qna_collection = db[qna_collection_today]
-    result = qna_collection.insert_one(data)
-    print(f"Document inserted with ID: {result.inserted_id}")
-    return result
+    # Queued (write-behind); the _id is generated here so it can be returned right away.
+    data.setdefault("_id", ObjectId())
+    # /sidebar filters and sorts on these in Mongo
+    if not data.get("conversation_mode"):
+        chats = data.get("chats") or []
+        data["conversation_mode"] = (chats[0].get("gpt_model") if chats else None) or "Search"
+    data.setdefault("updated_at", datetime.utcnow())
+    qna_collection, data = for_insert(conversation_store.chats(email_id), data)
+    _persist(qna_collection, InsertOne(data))
+    print(f"Document queued with ID: {data['_id']}")
+    return InsertOneResult(data["_id"], acknowledged=True)
 
 
 # Anirudha Read operation
@@ -2108,8 +2434,7 @@ def insert_qna(data, email_id):
 
 
 def read_qna(email_id, conversation_id):
-    qna_collection_user = f"chats_{email_id}"
-    qna_collection = db[qna_collection_user]
+    qna_collection = _chats_collection(email_id)
     search_query = {"_id": ObjectId(conversation_id)}
     documents = qna_collection.find_one(search_query)
     return documents
@@ -2117,8 +2442,7 @@ def read_qna(email_id, conversation_id):
 
 # Update operation
 def update_qna(query, new_data, email_id):
-    qna_collection_today = f"chats_{email_id}"
-    qna_collection = db[qna_collection_today]
+    qna_collection = _chats_collection(email_id)
     search_query = {"entered_query": query}
     result = qna_collection.update_one(search_query, {"$set": new_data})
     print(f"Modified {result.modified_count} document(s)")
@@ -2126,19 +2450,22 @@ def update_qna(query, new_data, email_id):
 
 # Delete operation
 def delete_qna(query, email_id):
-    qna_collection_today = f"chats_{email_id}"
-    qna_collection = db[qna_collection_today]
+    qna_collection = _chats_collection(email_id)
     search_query = {"entered_query": query}
     result = qna_collection.delete_one(search_query)
     print(f"Deleted {result.deleted_count} document(s)")
 
 
-def update_chat(new_data, conversation_id, email_id):
-    qna_collection_user = f"chats_{email_id}"
-    qna_collection = db[qna_collection_user]
+def update_chat(new_data, conversation_id, email_id, set_fields=None):
+    # Queued (write-behind). Guarded on chat_id so a retried batch can't push the chat twice.
     search_query = {"_id": ObjectId(conversation_id)}
-    result = qna_collection.update_one(search_query, {"$push": {"chats": new_data}})
-    print(f"Modified {result.modified_count} document(s)")
+    qna_collection = for_update(conversation_store.chats(email_id), search_query)
+    if new_data.get("chat_id"):
+        search_query["chats.chat_id"] = {"$ne": new_data["chat_id"]}
+    set_fields = dict(set_fields or {})
+    set_fields.setdefault("updated_at", datetime.utcnow())
+    _persist(qna_collection, UpdateOne(search_query, {"$push": {"chats": new_data}, "$set": set_fields}))
+    print(f"Queued chat {new_data.get('chat_id')} for conversation {conversation_id}")
 
 
 def token_process(authorization_header):
@@ -2349,6 +2676,8 @@ def start():
             # Initialize variables to prevent undefined errors
             agent_resp = None
             relevant_documents = ""
+            # Retrieved Documents per relevant_docs() call, for chunk_refs
+            relevant_doc_groups = []
 
             if gpt_model == "Search":
                 with tracer.start_span('Search', child_of=parent0) as parent1:
@@ -2475,7 +2804,9 @@ def start():
                             "[CHUNKS] /start(Search): calling relevant_docs for entered_query "
                             f"'{str(entered_query)[:200]}'"
                         )
-                        relevant_documents = relevant_docs(entered_query, retriever=retriever)
+                        relevant_documents = relevant_docs(
+                            entered_query, retriever=retriever, collected=relevant_doc_groups
+                        )
                         print(
                             "[CHUNKS] /start(Search): relevant_documents built "
                             f"len={len(relevant_documents)}"
@@ -2575,7 +2906,7 @@ def start():
                                 "[CHUNKS] /start(Infer): calling relevant_docs for KB thought "
                                 f"index={idx}, input_preview='{str(action_input)[:200]}'"
                             )
-                            rd = relevant_docs(action_input, retriever)
+                            rd = relevant_docs(action_input, retriever, collected=relevant_doc_groups)
                             print(
                                 "[CHUNKS] /start(Infer): returned from relevant_docs "
                                 f"index={idx}, len={len(rd)}"
@@ -2600,7 +2931,7 @@ def start():
                     "chat_id": str(uuid.uuid4()),
                     "entered_query": entered_query,
                     "response": ai_response,
-                    "relevant_docs": relevant_documents,
+                    **_document_chunk_fields(selected_collection_name, relevant_doc_groups, relevant_documents),
                     "gpt_model": gpt_model,
                     "chat_timestamp": query_time,
                     "latency": latency,
@@ -2632,19 +2963,13 @@ def start():
                         "[CHUNKS] /start: updating EXISTING conversation "
                         f"{conversation_id} with relevant_docs_len={len(relevant_documents)}"
                     )
+                    # Keep conversation_mode updated for filtering in the sidebar (same write as the push).
                     add_chat = update_chat(
-                        new_data=chat, conversation_id=conversation_id, email_id=user_email
+                        new_data=chat,
+                        conversation_id=conversation_id,
+                        email_id=user_email,
+                        set_fields={"conversation_mode": gpt_model},
                     )
-                    # Keep conversation_mode updated for filtering in the sidebar.
-                    try:
-                        qna_collection_user = f"chats_{user_email}"
-                        qna_collection = db[qna_collection_user]
-                        qna_collection.update_one(
-                            {"_id": ObjectId(conversation_id)},
-                            {"$set": {"conversation_mode": gpt_model}},
-                        )
-                    except Exception:
-                        pass
 
                 output_json = {"aiResponse": ai_response, "conversationId": str(conversation_id), "chatId":chat.get("chat_id")}
 
@@ -2750,8 +3075,119 @@ def calls_start():
         )
 
 
+HISTORY_CHATS_PAGE_SIZE = int(os.getenv("HISTORY_CHATS_PAGE_SIZE", "100"))
+# Heavy per-chat fields left out of /history unless requested via ?fields=
+# (chunk bodies are served per chat by /history/chat and /referred-clauses).
+HISTORY_OPTIONAL_FIELDS = {
+    "relevantChunks": "relevant_chunks",
+    "relevantDocs": "relevant_docs",
+}
+
+
+def _chunk_count_expr(path):
+    return {"$cond": [{"$isArray": path}, {"$size": path}, 0]}
+
+
+def _history_pipeline(conversation_oid, chats_offset, chats_limit, include_fields):
+    """
+    One aggregation for /history: slices the chats page and strips heavy fields inside Mongo,
+    so chunk bodies never leave the server unless asked for.
+    """
+    dropped = [v for k, v in HISTORY_OPTIONAL_FIELDS.items() if k not in include_fields]
+    if not any(k in include_fields for k in HISTORY_OPTIONAL_FIELDS):
+        # chunk_refs are only needed to resolve the heavy fields
+        dropped += ["chunk_refs", "chunk_format"]
+    total = _chunk_count_expr("$chats")
+    if chats_offset is None:
+        # Default page: the most recent `chats_limit` chats
+        position = {"$max": [0, {"$subtract": [total, chats_limit]}]}
+    else:
+        position = chats_offset
+    return [
+        {"$match": {"_id": conversation_oid}},
+        {
+            "$addFields": {
+                "chats_total": total,
+                "chats_offset": position,
+                "first_chat_model": {"$arrayElemAt": ["$chats.gpt_model", 0]},
+                "chats": {
+                    "$map": {
+                        "input": {"$slice": [{"$ifNull": ["$chats", []]}, position, chats_limit]},
+                        "as": "c",
+                        "in": {
+                            "$mergeObjects": [
+                                {
+                                    "$arrayToObject": {
+                                        "$filter": {
+                                            "input": {"$objectToArray": "$$c"},
+                                            "cond": {"$not": [{"$in": ["$$this.k", dropped]}]},
+                                        }
+                                    }
+                                },
+                                {
+                                    "relevantChunkCount": {
+                                        "$cond": [
+                                            {"$isArray": "$$c.relevant_chunks"},
+                                            {"$size": "$$c.relevant_chunks"},
+                                            {
+                                                "$cond": [
+                                                    {"$eq": ["$$c.chunk_format", "text"]},
+                                                    _chunk_count_expr("$$c.chunk_refs"),
+                                                    0,
+                                                ]
+                                            },
+                                        ]
+                                    }
+                                },
+                            ]
+                        },
+                    }
+                },
+            }
+        },
+    ]
+
+
+def _read_chat(email_id, conversation_id, chat_id):
+    """Conversation header + a single chat (full, including chunks), without loading the other chats."""
+    try:
+        conversation_oid = ObjectId(conversation_id)
+    except Exception:
+        return None
+    result = list(
+        _chats_collection(email_id, listing=True).aggregate(
+            [
+                {"$match": {"_id": conversation_oid}},
+                {
+                    "$project": {
+                        "contract_type": 1,
+                        "selected_state": 1,
+                        "selected_plan": 1,
+                        "chat": {
+                            "$arrayElemAt": [
+                                {"$filter": {"input": "$chats", "as": "c", "cond": {"$eq": ["$$c.chat_id", chat_id]}}},
+                                0,
+                            ]
+                        },
+                    }
+                },
+            ]
+        )
+    )
+    return result[0] if result else None
+
+
 @app.route("/history", methods=["GET"])
 def chat_history():
+    """
+    Conversation with one page of chats (default: the latest HISTORY_CHATS_PAGE_SIZE).
+    Chunk bodies are omitted; each chat carries relevantChunkCount instead.
+
+    Query params:
+      - conversation-id (str)
+      - chatsLimit, chatsOffset (int, optional): chat page window
+      - fields (str, optional): comma list of heavy chat fields to include (relevantChunks, relevantDocs)
+    """
     with tracer.start_span('api/history'):
         authorization_header = request.headers.get("Authorization")
 
@@ -2767,16 +3203,51 @@ def chat_history():
         conversation_id = request.args.get("conversation-id")
         user_email = token_data[0]["email"]
 
-        docs = read_qna(email_id=user_email, conversation_id=conversation_id)
+        try:
+            chats_limit = int(request.args.get("chatsLimit", HISTORY_CHATS_PAGE_SIZE))
+            chats_offset = request.args.get("chatsOffset")
+            chats_offset = int(chats_offset) if chats_offset not in (None, "") else None
+        except (TypeError, ValueError):
+            return jsonify({"error": "chatsLimit and chatsOffset must be integers"}), 400
+        chats_limit = max(1, chats_limit)
+        if chats_offset is not None:
+            chats_offset = max(0, chats_offset)
+        include_fields = {f.strip() for f in (request.args.get("fields") or "").split(",") if f.strip()}
+
+        try:
+            conversation_oid = ObjectId(conversation_id)
+        except Exception:
+            conversation_oid = None
+        result = (
+            list(
+                _chats_collection(user_email, listing=True).aggregate(
+                    _history_pipeline(conversation_oid, chats_offset, chats_limit, include_fields)
+                )
+            )
+            if conversation_oid
+            else []
+        )
+        docs = result[0] if result else None
         if not docs:
             return make_response(
                 jsonify({"message": "No data found in the specified conversation"}), 404
             )
 
-        feedback_collection_user = f"feedbacks_{user_email}"
-        feedback_collection = db[feedback_collection_user]
+        chats = docs.get("chats") or []
+        chat_ids = [chat.get("chat_id") for chat in chats if chat.get("chat_id")]
+        if any(k in include_fields for k in HISTORY_OPTIONAL_FIELDS):
+            _resolve_chunks(chats)
+            for chat in chats:
+                chat.pop("chunk_refs", None)
+                chat.pop("chunk_format", None)
+                for key, field in HISTORY_OPTIONAL_FIELDS.items():
+                    if key not in include_fields:
+                        chat.pop(field, None)
+
+        feedback_collection = _feedbacks_collection(user_email, listing=True)
         feedback_reaction = feedback_collection.find(
-            {"conversation_id": str(conversation_id)}
+            {"conversation_id": str(conversation_id), "chat_id": {"$in": chat_ids}},
+            {"chat_id": 1, "reaction": 1},
         )
         feedback_dict = {}
 
@@ -2784,7 +3255,6 @@ def chat_history():
             chat_id = str(doc["chat_id"])
             feedback_dict[chat_id] = doc["reaction"]
 
-        chats = docs["chats"]
         for chat in chats:
             chat_id = chat.get("chat_id")
             if chat_id in feedback_dict:
@@ -2802,6 +3272,9 @@ def chat_history():
             "selectedState": docs.get("selected_state"),
             "status": docs.get("status", "active"),
             "chats": chats,
+            "chatsTotal": docs.get("chats_total", len(chats)),
+            "chatsOffset": docs.get("chats_offset", 0),
+            "chatsLimit": chats_limit,
             "createdAt": (
                 (docs.get("created_at").isoformat() + "Z")
                 if docs.get("created_at")
@@ -2814,7 +3287,7 @@ def chat_history():
             ),
             # For transcript conversations we store a conversation-level mode (e.g. "Calls")
             # while still keeping the underlying model per chat for backend execution.
-            "gptModel": docs.get("conversation_mode") or (chats[0].get("gpt_model") if chats else None),
+            "gptModel": docs.get("conversation_mode") or docs.get("first_chat_model"),
             "finalSummary": docs.get("final_summary"),
             "claimDecision": docs.get("claim_decision"),
             "authorizedFinalAnswer": docs.get("authorized_final_answer"),
@@ -2829,6 +3302,42 @@ def chat_history():
         return make_response(jsonify(output_json), 200)
 
 
+@app.route("/history/chat", methods=["GET"])
+def chat_history_item():
+    """Single chat with its chunk bodies (lazy load for /history). Query params: conversation-id, chat-id."""
+    with tracer.start_span('api/history/chat'):
+        authorization_header = request.headers.get("Authorization")
+
+        if authorization_header is None:
+            return jsonify({"message": "Token is missing"}), 401
+
+        if authorization_header:
+            token_data = token_process(authorization_header)
+
+            if token_data[1] == 401 or token_data[1] == 403:
+                return (token_data[0].get_json()), token_data[1]
+
+        user_email = token_data[0]["email"]
+        conversation_id = request.args.get("conversation-id")
+        chat_id = request.args.get("chat-id")
+        if not conversation_id or not chat_id:
+            return jsonify({"error": "conversation-id and chat-id are required"}), 400
+
+        docs = _read_chat(user_email, conversation_id, chat_id)
+        chat = (docs or {}).get("chat")
+        if not chat:
+            return jsonify({"error": "Chat not found for given chatId"}), 404
+
+        _resolve_chunks([chat])
+        chat.pop("chunk_refs", None)
+        chat.pop("chunk_format", None)
+        chat["relevantChunks"] = chat.get("relevant_chunks") or []
+        chat["relevantChunkCount"] = len(chat["relevantChunks"])
+        if "underlying_model" in chat:
+            chat["underlyingModel"] = chat.get("underlying_model")
+        return make_response(jsonify(chat), 200)
+
+
 @app.route("/conversation/authorize", methods=["PATCH"])
 def authorize_conversation_answer():
     """Store an agent-authorized final answer for a conversation and (optionally) close it.
@@ -2866,8 +3375,7 @@ def authorize_conversation_answer():
                 return jsonify({"error": "status must be 'active' or 'inactive'"}), 400
 
             user_email = token_data[0]["email"]
-            qna_collection_user = f"chats_{user_email}"
-            qna_collection = db[qna_collection_user]
+            qna_collection = _chats_collection(user_email)
 
             now_ts = datetime.utcnow()
             now_iso = now_ts.isoformat() + "Z"
@@ -2949,8 +3457,7 @@ def update_conversation_status():
                 return jsonify({"error": "status must be 'active' or 'inactive'"}), 400
 
             user_email = token_data[0]["email"]
-            qna_collection_user = f"chats_{user_email}"
-            qna_collection = db[qna_collection_user]
+            qna_collection = _chats_collection(user_email)
 
             updated = qna_collection.find_one_and_update(
                 {"_id": ObjectId(conversation_id)},
@@ -2975,6 +3482,27 @@ def update_conversation_status():
         return jsonify({"error": str(e)}), 500
 
 
+SIDEBAR_PAGE_SIZE = int(os.getenv("SIDEBAR_PAGE_SIZE", "50"))
+SIDEBAR_MAX_PAGE_SIZE = 200
+
+
+def _encode_sidebar_cursor(doc):
+    raw = json.dumps([doc["updated_at"].isoformat(), str(doc["_id"])])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_sidebar_cursor(cursor):
+    """`before` cursor -> (updated_at, ObjectId) of the last row on the previous page, or None."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        updated_at, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(updated_at), ObjectId(doc_id)
+    except Exception:
+        return None
+
+
 @app.route("/sidebar", methods=["GET"])
 def sidebar_history():
     with tracer.start_span('api/sidebar'):
@@ -2994,56 +3522,62 @@ def sidebar_history():
         mode_param = mode_param.strip() if isinstance(mode_param, str) else None
         mode_param = mode_param if mode_param in ("Search", "Infer", "Calls") else None
 
-        qna_collection_user = f"chats_{user_email}"
-        qna_collection = db[qna_collection_user]
+        try:
+            limit = int(request.args.get("limit", SIDEBAR_PAGE_SIZE))
+        except (TypeError, ValueError):
+            return jsonify({"error": "limit must be an integer"}), 400
+        limit = max(1, min(limit, SIDEBAR_MAX_PAGE_SIZE))
+        before = _decode_sidebar_cursor(request.args.get("before"))
+        if request.args.get("before") and before is None:
+            return jsonify({"error": "invalid before cursor"}), 400
+
+        qna_collection = _chats_collection(user_email, listing=True)
+        index_manager.backfill_sidebar_fields(qna_collection)
 
-        # projection means setting the key name to 1, i.e we want all ids and names from given collection
         # Exclude transcript status-only documents from showing up in the sidebar.
-        # Also include conversation_mode (and a lightweight fallback to chats.gpt_model for older docs).
+        query = {"doc_type": {"$ne": "transcript_status"}}
+        if mode_param:
+            query["conversation_mode"] = mode_param
+        if before:
+            before_ts, before_id = before
+            query["$or"] = [
+                {"updated_at": {"$lt": before_ts}},
+                {"updated_at": before_ts, "_id": {"$lt": before_id}},
+            ]
+
+        # Newest first; (conversation_mode, updated_at, _id) index serves both filter and sort.
+        # Fetch one extra row to know whether there is a next page.
         result = qna_collection.find(
-            {"doc_type": {"$ne": "transcript_status"}},
+            query,
             {
                 "_id": 1,
                 "conversation_name": 1,
                 "conversation_mode": 1,
-                "chats.gpt_model": 1,
                 "status": 1,
                 "updated_at": 1,
                 "transcript_id": 1,
             },
-        )
+        ).sort([("updated_at", -1), ("_id", -1)]).limit(limit + 1)
+        docs = list(result)
 
         output_json = []
-        for doc in result:
-            conv_mode = doc.get("conversation_mode")
-            if not conv_mode:
-                try:
-                    chats = doc.get("chats") or []
-                    conv_mode = chats[0].get("gpt_model") if chats else None
-                except Exception:
-                    conv_mode = None
-            conv_mode = conv_mode or "Search"
-
-            if mode_param and conv_mode != mode_param:
-                continue
-
+        for doc in docs[:limit]:
             output_json.append(
                 {
                     "conversationId": str(doc["_id"]),
                     "conversationName": doc.get("conversation_name", ""),
-                    "conversationMode": conv_mode,
+                    "conversationMode": doc.get("conversation_mode") or "Search",
                     "status": (doc.get("status") or "active"),
                     "updatedAt": (doc.get("updated_at").isoformat() + "Z") if doc.get("updated_at") else None,
                     "transcriptId": doc.get("transcript_id"),
                 }
             )
 
-        output_json = output_json[::-1]
-
-        if output_json:
-            return make_response(jsonify(output_json), 200)
-        else:
-            return make_response(jsonify([]), 200)
+        # Body stays a plain array for existing clients; the next-page cursor rides in a header.
+        response = make_response(jsonify(output_json), 200)
+        if len(docs) > limit:
+            response.headers["X-Next-Cursor"] = _encode_sidebar_cursor(docs[limit - 1])
+        return response
 
 
 @app.route("/delete", methods=["DELETE"])
@@ -3062,8 +3596,7 @@ def delete_conversation():
 
         user_email = token_data[0]["email"]
 
-        qna_collection_user = f"chats_{user_email}"
-        qna_collection = db[qna_collection_user]
+        qna_collection = _chats_collection(user_email)
         conversation_id = request.args.get("conversation-id")
 
         qna_collection.delete_one({"_id": ObjectId(conversation_id)})
@@ -3092,8 +3625,7 @@ def edit_name():
         conversation_id = request.args.get("conversation-id")
 
         try:
-            qna_collection_user = f"chats_{user_email}"
-            qna_collection = db[qna_collection_user]
+            qna_collection = _chats_collection(user_email)
 
             qna_collection.update_one(
                 {"_id": ObjectId(conversation_id)},
@@ -3128,14 +3660,13 @@ def referred_clauses():
                 "[CHUNKS] /referred-clauses: fetching conversation_id="
                 f"{conversation_id}, chat_id={chat_id}"
             )
-            docs = read_qna(email_id=user_email, conversation_id=conversation_id)
-
-            chat_ans = docs["chats"]
-            chat_obj = None
-            for candidate in chat_ans:
-                if candidate.get("chat_id") == chat_id:
-                    chat_obj = candidate
-                    break
+            # Only the requested chat is read, not the whole conversation.
+            docs = _read_chat(user_email, conversation_id, chat_id)
+            if not docs:
+                return jsonify({"error": "Conversation not found"}), 404
+            chat_obj = docs.get("chat")
+            if chat_obj:
+                _resolve_chunks([chat_obj])
 
             if not chat_obj:
                 print(
@@ -3186,6 +3717,8 @@ def list_transcripts():
     - search (str, optional): Search term to filter transcripts by file name (case-insensitive partial match)
                              Searches through ALL files from GCS bucket
     - q (str, optional): Alias for 'search' parameter
+                         Also matches transcript contents once indexed (ranked; "quoted phrases" must match exactly)
+    - contractType, planType, state (str, optional): Facet filters on extracted transcript metadata
     """
     try:
         with tracer.start_span('api/transcripts'):
@@ -3209,6 +3742,7 @@ def list_transcripts():
             offset_param = request.args.get("offset", "0")
             search_param = request.args.get("search") or request.args.get("q")  # Support both 'search' and 'q' parameters
             status_param = request.args.get("status")  # optional: active|inactive
+            facet_params = {f: request.args.get(f) for f in FACET_FIELDS if request.args.get(f)}
             print(f"DEBUG API: Raw params - limit_param='{limit_param}', offset_param='{offset_param}', search_param='{search_param}'")
             
             try:
@@ -3233,14 +3767,13 @@ def list_transcripts():
             
             # List transcript files from GCP with pagination and search (only reads content for paginated subset)
             print(f"DEBUG API: Calling list_transcript_files_gcp(limit={limit}, offset={offset}, search={search_param}), gcs_fs={gcs_fs is not None}")
-            paginated_transcripts, total_count = list_transcript_files_gcp(limit=limit, offset=offset, search=search_param)
+            paginated_transcripts, total_count = list_transcript_files_gcp(limit=limit, offset=offset, search=search_param, facets=facet_params)
             print(f"DEBUG API: Found {len(paginated_transcripts)} transcripts (showing {offset} to {offset + len(paginated_transcripts)} of {total_count} total)")
 
             # Attach status (stored in MongoDB) to each transcript returned from GCP.
             # We keep status docs in the same per-user collection as chat history, but with doc_type='transcript_status'.
             try:
-                qna_collection_user = f"chats_{user_email}"
-                qna_collection = db[qna_collection_user]
+                qna_collection = _chats_collection(user_email, listing=True)
 
                 transcript_ids = []
                 for t in paginated_transcripts:
@@ -3266,6 +3799,12 @@ def list_transcripts():
             except Exception as e:
                 print(f"Warning: unable to attach transcript status from MongoDB: {e}")
             
+            # Facet counts over the whole match set (not just this page), from the search index
+            facet_counts = None
+            if TRANSCRIPT_SEARCH_INDEX_ENABLED and len(transcript_search_index) > 0:
+                matched = transcript_search_index.search(search_param, _canonical_transcript_facets(facet_params))
+                facet_counts = transcript_search_index.facet_counts([name for name, _ in matched])
+            
             return jsonify({
                 "transcripts": paginated_transcripts,
                 "totalCount": total_count,
@@ -3274,6 +3813,9 @@ def list_transcripts():
                 "hasMore": (offset + limit) < total_count,
                 "search": search_param if search_param else None,
                 "status": status_param if status_param else None,
+                "facets": facet_params or None,
+                "facetCounts": facet_counts,
+                "indexedCount": len(transcript_search_index),
             }), 200
             
     except Exception as e:
@@ -3525,6 +4067,103 @@ Transcript:
         return []
 
 
+def _transcript_dialogue_cache_id(transcript_file_name: str, version: str, method: str) -> str:
+    return f"{transcript_file_name}:{version}:{method}"
+
+
+def build_transcript_dialogue(transcript_file_name: str, use_llm: bool = False) -> tuple:
+    """
+    Segment a transcript into chat turns, persisting the result per (file, generation, method).
+
+    method is "llm" when LLM segmentation is forced, else "auto" (rule-based, with the gpt-4o-mini
+    fallback for single untagged blobs). The output for a given object generation never changes,
+    so later calls are served from `transcript_dialogues` without re-downloading or re-running the LLM.
+
+    Returns: (conversation, used_llm, file_metadata, cached)
+    """
+    method = "llm" if use_llm else "auto"
+
+    def _cached(entry):
+        version = (entry or {}).get("version")
+        if not version or not TRANSCRIPT_DIALOGUE_CACHE_ENABLED:
+            return None
+        try:
+            return transcript_dialogues_collection.find_one(
+                {"_id": _transcript_dialogue_cache_id(transcript_file_name, version, method)}
+            )
+        except Exception as e:
+            print(f"Warning: transcript dialogue cache lookup failed: {e}")
+            return None
+
+    def _file_metadata(entry):
+        return {
+            "fileName": transcript_file_name,
+            "fileSize": entry.get("size", 0),
+            "uploadDate": entry.get("uploadDate"),
+            "metadata": {},
+        }
+
+    # Fast path: generation known from the name -> path map, no GCS round trip at all
+    entry = transcript_store.lookup(transcript_file_name)
+    hit = _cached(entry)
+    if hit:
+        return hit.get("conversation") or [], bool(hit.get("used_llm")), _file_metadata(entry), True
+
+    # Fetch file (served from the local content cache when possible)
+    transcript_content, file_metadata = read_transcript_file_gcp(transcript_file_name)
+    entry = transcript_store.lookup(transcript_file_name, fresh_only=False) or {}
+    hit = _cached(entry)
+    if hit:
+        return hit.get("conversation") or [], bool(hit.get("used_llm")), file_metadata, True
+
+    # Parse JSON if possible (for structured diarization)
+    transcript_data = None
+    transcript_text = transcript_content
+    try:
+        transcript_data = json.loads(transcript_content)
+        # Prefer text extraction from JSON for downstream parsing
+        extracted = _extract_text_from_transcript_json(transcript_data)
+        if extracted:
+            transcript_text = extracted
+    except Exception:
+        transcript_data = None
+
+    used_llm = False
+    llm_missed = False
+    conversation = transcript_to_chat_turns(transcript_text, transcript_data=transcript_data)
+
+    # If it's still essentially a single blob, optionally use LLM to segment
+    if use_llm or (len(conversation) <= 1 and len(transcript_text or "") > 600):
+        llm_turns = _llm_segment_transcript_to_chat_turns(transcript_text)
+        if llm_turns:
+            conversation = llm_turns
+            used_llm = True
+        else:
+            # Failed / empty LLM run (e.g. a timeout): serve the rule-based turns but don't pin them
+            # for this generation, so the next request tries the LLM again
+            llm_missed = True
+
+    version = entry.get("version")
+    if version and TRANSCRIPT_DIALOGUE_CACHE_ENABLED and not llm_missed:
+        try:
+            transcript_dialogues_collection.replace_one(
+                {"_id": _transcript_dialogue_cache_id(transcript_file_name, version, method)},
+                {
+                    "transcript_file_name": transcript_file_name,
+                    "generation": version,
+                    "method": method,
+                    "conversation": conversation,
+                    "used_llm": used_llm,
+                    "created_at": datetime.utcnow(),
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            print(f"Warning: failed to persist transcript dialogue for {transcript_file_name}: {e}")
+
+    return conversation, used_llm, file_metadata, False
+
+
 @app.route("/transcripts/dialogue", methods=["POST"])
 def transcript_dialogue():
     """
@@ -3543,7 +4182,8 @@ def transcript_dialogue():
         "transcriptMetadata": {...},
         "conversation": [{"role":"CSR"|"Customer"|"Unknown","text":"..."}],
         "totalTurns": 12,
-        "usedLLM": false
+        "usedLLM": false,
+        "cached": true         // served from the persisted segmentation for this file generation
       }
     """
     try:
@@ -3567,30 +4207,7 @@ def transcript_dialogue():
             if not gcs_fs:
                 return jsonify({"error": "GCP Storage not configured or unavailable"}), 500
 
-            # Fetch file
-            transcript_content, file_metadata = read_transcript_file_gcp(transcript_file_name)
-
-            # Parse JSON if possible (for structured diarization)
-            transcript_data = None
-            transcript_text = transcript_content
-            try:
-                transcript_data = json.loads(transcript_content)
-                # Prefer text extraction from JSON for downstream parsing
-                extracted = _extract_text_from_transcript_json(transcript_data)
-                if extracted:
-                    transcript_text = extracted
-            except Exception:
-                transcript_data = None
-
-            used_llm = False
-            conversation = transcript_to_chat_turns(transcript_text, transcript_data=transcript_data)
-
-            # If it's still essentially a single blob, optionally use LLM to segment
-            if use_llm or (len(conversation) <= 1 and len(transcript_text or "") > 600):
-                llm_turns = _llm_segment_transcript_to_chat_turns(transcript_text)
-                if llm_turns:
-                    conversation = llm_turns
-                    used_llm = True
+            conversation, used_llm, file_metadata, cached = build_transcript_dialogue(transcript_file_name, use_llm=use_llm)
 
             transcript_id = transcript_file_name.replace(".json", "").replace(".txt", "")
 
@@ -3602,6 +4219,7 @@ def transcript_dialogue():
                     "conversation": conversation,
                     "totalTurns": len(conversation),
                     "usedLLM": used_llm,
+                    "cached": cached,
                 }
             ), 200
     except FileNotFoundError:
@@ -3651,8 +4269,7 @@ def update_transcript_status():
 
             transcript_id = transcript_file_name.replace(".json", "").replace(".txt", "")
 
-            qna_collection_user = f"chats_{user_email}"
-            qna_collection = db[qna_collection_user]
+            qna_collection = _chats_collection(user_email)
 
             now_ts = datetime.utcnow()
             doc = qna_collection.find_one_and_update(
@@ -3718,8 +4335,7 @@ def list_transcript_conversations():
 
             transcript_id = transcript_file_name.replace(".json", "").replace(".txt", "")
 
-            qna_collection_user = f"chats_{user_email}"
-            qna_collection = db[qna_collection_user]
+            qna_collection = _chats_collection(user_email)
 
             cursor = qna_collection.find(
                 {"doc_type": "transcript_conversation", "transcript_id": transcript_id},
@@ -3970,6 +4586,75 @@ Policy chunks (verbatim):
         }
 
 
+TRANSCRIPT_STREAM_PUSH_EVERY = int(os.getenv("TRANSCRIPT_STREAM_PUSH_EVERY", "3"))
+TRANSCRIPT_STREAM_PUSH_MS = int(os.getenv("TRANSCRIPT_STREAM_PUSH_MS", "5000"))
+
+
+class _TranscriptChatBatcher:
+    """
+    Incremental persistence for /transcripts/process/stream: answered chats are buffered and
+    written as one $push $each every `every_n` chats or `every_ms` milliseconds, instead of one
+    update per answer rewriting the (growing) conversation document each time. The time bound is
+    enforced by a timer armed with the first buffered chat, so a slow next answer doesn't hold
+    earlier ones back.
+    """
+
+    def __init__(self, collection, conv_doc_id, every_n=TRANSCRIPT_STREAM_PUSH_EVERY, every_ms=TRANSCRIPT_STREAM_PUSH_MS):
+        self.collection = for_update(collection, {"_id": conv_doc_id})
+        self.conv_doc_id = conv_doc_id
+        self.every_n = max(1, every_n)
+        self.every_s = max(0, every_ms) / 1000.0
+        self.buffer = []
+        self.last_flush = time()
+        self.writes = 0
+        self._lock = threading.RLock()
+        self._timer = None
+
+    def add(self, chat):
+        with self._lock:
+            self.buffer.append(chat)
+            if len(self.buffer) >= self.every_n or (time() - self.last_flush) >= self.every_s:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(max(0.0, self.last_flush + self.every_s - time()), self._flush_due)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_due(self):
+        try:
+            with self._lock:
+                self._timer = None
+                if self.buffer:
+                    self.flush()
+        except Exception as e:
+            print(f"Warning: timed flush of transcript chats failed: {e}")
+
+    def flush(self, chats=None, set_fields=None):
+        """Write buffered chats (plus `chats`) and `set_fields` (queued together, one bulk write)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending = self.buffer + list(chats or [])
+            self.buffer = []
+            self.last_flush = time()
+            if not pending and not set_fields:
+                return
+            now = datetime.utcnow()
+            if pending:
+                # Guarded on chat_id: a batch the write-behind queue replays after a transient error
+                # (applied, but unacknowledged) pushes nothing the second time
+                _persist(self.collection, UpdateOne(
+                    {"_id": self.conv_doc_id, "chats.chat_id": {"$nin": [c["chat_id"] for c in pending]}},
+                    {"$push": {"chats": {"$each": pending}}, "$set": {"updated_at": now}},
+                ))
+                self.writes += 1
+            if set_fields:
+                # Separate op, so finalization never depends on the push guard; same write-behind batch
+                _persist(self.collection, UpdateOne({"_id": self.conv_doc_id}, {"$set": {"updated_at": now, **set_fields}}))
+                self.writes += 1
+
+
 @app.route("/transcripts/process/stream", methods=["POST"])
 def process_transcript_stream():
     """
@@ -4005,6 +4690,7 @@ def process_transcript_stream():
         conv_doc_id = None
         conv_name = None
         transcript_status = "active"
+        chat_batcher = None
 
         try:
             # Authorization
@@ -4063,8 +4749,7 @@ def process_transcript_stream():
             )
 
             # Mongo handles (same collection as /transcripts/process)
-            qna_collection_user = f"chats_{user_email}"
-            qna_collection = db[qna_collection_user]
+            qna_collection = _chats_collection(user_email)
 
             # Cache fast-path: if exists and not force, stream cached answers immediately
             existing_conv = None
@@ -4075,7 +4760,7 @@ def process_transcript_stream():
                 )
 
             if existing_conv and not force_reprocess and not new_conversation:
-                cached = existing_conv.get("response_payload") or {}
+                cached = _cached_response_payload(existing_conv)
                 conv_doc_id = existing_conv.get("_id")
                 yield _sse(
                     "status",
@@ -4165,21 +4850,17 @@ def process_transcript_stream():
                 yield _sse("error", {"error": "GCP Storage not configured or unavailable"})
                 return
 
+            # Questions already extracted at ingestion time for this object generation?
+            # Then only retrieval + answering is left to do here.
+            artifacts = _load_transcript_artifacts(transcript_file_name) if extract_questions else None
+
             yield _sse("status", {"stage": "transcript_loading"})
-            transcript_content, file_metadata = read_transcript_file_gcp(transcript_file_name)
-            transcript_text = transcript_content
-            try:
-                transcript_data = json.loads(transcript_content)
-                if isinstance(transcript_data, dict):
-                    transcript_text = transcript_data.get(
-                        "text",
-                        transcript_data.get(
-                            "transcript",
-                            transcript_data.get("content", str(transcript_data)),
-                        ),
-                    )
-            except Exception:
-                transcript_text = transcript_content
+            if artifacts:
+                file_metadata = artifacts.get("file_metadata") or {"fileName": transcript_file_name}
+                transcript_text = ""
+            else:
+                transcript_content, file_metadata = read_transcript_file_gcp(transcript_file_name)
+                transcript_text = _transcript_text_for_extraction(transcript_content)
 
             yield _sse(
                 "status",
@@ -4196,7 +4877,10 @@ def process_transcript_stream():
             # Extract questions
             extraction_warning = None
             questions = []
-            if extract_questions:
+            if extract_questions and artifacts:
+                questions = [dict(q) for q in (artifacts.get("questions") or [])]
+                extraction_warning = artifacts.get("extraction_warning")
+            elif extract_questions:
                 yield _sse("status", {"stage": "extracting_questions"})
                 llm_extract = ChatOpenAI(temperature=0.0, model="gpt-4o")
                 questions = extract_relevant_customer_questions(transcript_text, llm_extract)
@@ -4224,6 +4908,7 @@ def process_transcript_stream():
                     "stage": "questions_ready",
                     "totalQuestions": len(questions),
                     "warning": extraction_warning,
+                    "precomputed": bool(artifacts),
                 },
             )
 
@@ -4268,6 +4953,8 @@ def process_transcript_stream():
             confidences = []
             total_latency = 0.0
             now_ts = datetime.utcnow()
+            # Answers are persisted in small batches (so /history can show progress while streaming)
+            chat_batcher = _TranscriptChatBatcher(qna_collection, conv_doc_id)
 
             # Process each question and stream immediately
             for idx, question_obj in enumerate(questions):
@@ -4317,30 +5004,24 @@ def process_transcript_stream():
 
                 results.append(result)
 
-                # Persist incremental chat to Mongo (so /history can show progress if needed)
+                # Persist incremental chat to Mongo (batched; so /history can show progress)
                 try:
-                    chunks = result.get("relevantChunks") or []
-                    relevant_docs_text = "\n\n---\n\n".join([str(c) for c in chunks if str(c).strip()])
-                    qna_collection.update_one(
-                        {"_id": conv_doc_id},
-                        {
-                            "$push": {
-                                "chats": {
-                                    "chat_id": question_id,
-                                    "entered_query": question_text,
-                                    "response": result.get("answer", ""),
-                                    "relevant_chunks": chunks,
-                                    "relevant_docs": relevant_docs_text,
-                                    "gpt_model": "Calls",
-                                    "underlying_model": gpt_model,
-                                    "chat_timestamp": now_ts,
-                                    "latency": result.get("latency", 0.0),
-                                    "confidence": result.get("confidence", 0.0),
-                                }
-                            },
-                            "$set": {"updated_at": datetime.utcnow()},
-                        },
+                    chunk_fields = _text_chunk_fields(
+                        selected_collection_name,
+                        result.get("relevantChunks") or [],
+                        result.get("relevantChunksDetail"),
                     )
+                    chat_batcher.add({
+                        "chat_id": question_id,
+                        "entered_query": question_text,
+                        "response": result.get("answer", ""),
+                        **chunk_fields,
+                        "gpt_model": "Calls",
+                        "underlying_model": gpt_model,
+                        "chat_timestamp": now_ts,
+                        "latency": result.get("latency", 0.0),
+                        "confidence": result.get("confidence", 0.0),
+                    })
                 except Exception as e:
                     print(f"Warning: failed to persist incremental transcript chat: {e}")
 
@@ -4462,44 +5143,40 @@ def process_transcript_stream():
             except Exception as e:
                 print(f"Warning: failed to generate/stream claimDecision: {e}")
 
-            # Store final answer as last chat entry and finalize conversation doc
+            # Store final answer as last chat entry and finalize conversation doc,
+            # folded into the last batch of answered chats (one write)
             try:
-                qna_collection.update_one(
-                    {"_id": conv_doc_id},
-                    {
-                        "$push": {
-                            "chats": {
-                                "chat_id": "final_answer",
-                                "entered_query": "Final Answer for transcript",
-                                "response": final_summary_text,
-                                "relevant_chunks": [],
-                                "relevant_docs": "",
-                                "gpt_model": "Calls",
-                                "underlying_model": gpt_model,
-                                "chat_timestamp": datetime.utcnow(),
-                                "latency": 0.0,
-                                "confidence": 0.0,
-                            }
+                chat_batcher.flush(
+                    chats=[{
+                        "chat_id": "final_answer",
+                        "entered_query": "Final Answer for transcript",
+                        "response": final_summary_text,
+                        "relevant_chunks": [],
+                        "relevant_docs": "",
+                        "gpt_model": "Calls",
+                        "underlying_model": gpt_model,
+                        "chat_timestamp": datetime.utcnow(),
+                        "latency": 0.0,
+                        "confidence": 0.0,
+                    }],
+                    set_fields={
+                        "processing": False,
+                        "final_summary": final_summary_text,
+                        "claim_decision": claim_decision if 'claim_decision' in locals() else None,
+                        "summary": {
+                            "totalQuestions": len(questions),
+                            "processedQuestions": len([r for r in results if "error" not in r]),
+                            "averageConfidence": round(avg_confidence, 2),
+                            "totalLatency": round(total_latency, 2),
                         },
-                        "$set": {
-                            "processing": False,
-                            "updated_at": datetime.utcnow(),
-                            "final_summary": final_summary_text,
-                            "claim_decision": claim_decision if 'claim_decision' in locals() else None,
-                            "summary": {
-                                "totalQuestions": len(questions),
-                                "processedQuestions": len([r for r in results if "error" not in r]),
-                                "averageConfidence": round(avg_confidence, 2),
-                                "totalLatency": round(total_latency, 2),
-                            },
-                            "transcript_metadata": {
-                                "fileName": file_metadata.get("fileName"),
-                                "uploadDate": file_metadata.get("uploadDate"),
-                                "fileSize": file_metadata.get("fileSize"),
-                            },
+                        "transcript_metadata": {
+                            "fileName": file_metadata.get("fileName"),
+                            "uploadDate": file_metadata.get("uploadDate"),
+                            "fileSize": file_metadata.get("fileSize"),
                         },
                     },
                 )
+                print(f"[TRANSCRIPT_STREAM] persisted {len(results)} answer(s) in {chat_batcher.writes} write(s)")
             except Exception as e:
                 print(f"Warning: failed to finalize transcript conversation doc (stream): {e}")
 
@@ -4515,7 +5192,17 @@ def process_transcript_stream():
             )
             return
 
+        except GeneratorExit:
+            # Client went away mid-stream: keep the answers we already have.
+            if chat_batcher is not None:
+                chat_batcher.flush()
+            raise
         except Exception as e:
+            if chat_batcher is not None:
+                try:
+                    chat_batcher.flush()
+                except Exception as flush_error:
+                    print(f"Warning: failed to persist buffered transcript chats: {flush_error}")
             import traceback
             error_trace = traceback.format_exc()
             print(f"Error in /transcripts/process/stream endpoint: {str(e)}")
@@ -4532,7 +5219,415 @@ def process_transcript_stream():
     return Response(generate(), headers=headers)
 
 
-@app.route("/transcripts/process", methods=["POST"])
+_transcript_clients_cache = {}
+_transcript_clients_lock = threading.Lock()
+
+
+def milvus_collection_name(contract_type: str, selected_plan: str, selected_state: str):
+    """Milvus collection for a contract type / plan / state (same mapping as /start)."""
+    milvus_state = normalize_state_for_milvus(selected_state)
+    contract_type_norm = normalize_contract_type(contract_type)
+    selected_plan_norm = normalize_plan_for_milvus(contract_type_norm, selected_plan)
+    collection_mapping = {
+        "RE": {
+            "ShieldEssential": f"{milvus_state}_RE_ShieldEssential",
+            "ShieldPlus": f"{milvus_state}_RE_ShieldPlus",
+            "default": f"{milvus_state}_RE_ShieldComplete",
+        },
+        "DTC": {
+            "ShieldSilver": f"{milvus_state}_DTC_ShieldSilver",
+            "ShieldGold": f"{milvus_state}_DTC_ShieldGold",
+            "default": f"{milvus_state}_DTC_ShieldPlatinum",
+        },
+    }
+    return collection_mapping.get(contract_type_norm, {}).get(
+        selected_plan_norm, collection_mapping.get(contract_type_norm, {}).get("default")
+    )
+
+
+def get_transcript_clients(contract_type: str, selected_plan: str, selected_state: str, gpt_model: str, max_retries: int = None) -> Dict:
+    """
+    Milvus vector store, retriever and LLMs for one (collection, gptModel) pair, built once and reused.
+    The batch processor shares these warm clients across workers instead of reconnecting per transcript.
+    Raises ValueError for an unknown gptModel.
+    """
+    selected_collection_name = milvus_collection_name(contract_type, selected_plan, selected_state)
+    if gpt_model not in ("Search", "Infer"):
+        raise ValueError(f"Invalid gpt_model: {gpt_model}. Must be 'Search' or 'Infer'")
+
+    key = (selected_collection_name, gpt_model)
+    with _transcript_clients_lock:
+        clients = _transcript_clients_cache.get(key)
+        if clients:
+            return clients
+
+        llm_kwargs = {"temperature": 0.0}
+        if max_retries is not None:
+            llm_kwargs["max_retries"] = max_retries
+        vector_db = Milvus(
+            embed,
+            collection_name=selected_collection_name,
+            connection_args={"host": MILVUS_HOST, "port": "19530"},
+        )
+        if gpt_model == "Search":
+            llm2 = ChatOpenAI(model="ft:gpt-3.5-turbo-0613:mindstix::8YYD56aA", **llm_kwargs)
+        else:
+            llm2 = ChatOpenAI(model="gpt-4o", **llm_kwargs)
+        clients = {
+            "collectionName": selected_collection_name,
+            "vectorDb": vector_db,
+            "retriever": vector_db.as_retriever(search_kwargs={"k": MILVUS_RETRIEVER_K}),
+            "llm": ChatOpenAI(model="gpt-4o", **llm_kwargs),
+            "llm2": llm2,
+        }
+        _transcript_clients_cache[key] = clients
+        print(f"[MILVUS] warm clients ready collection={selected_collection_name!r} gptModel={gpt_model}")
+        return clients
+
+
+def answer_and_store_transcript(
+    qna_collection,
+    questions: List[Dict],
+    transcript_id: str,
+    transcript_file_name: str,
+    file_metadata: Dict,
+    contract_type: str,
+    selected_plan: str,
+    selected_state: str,
+    gpt_model: str,
+    vector_db,
+    llm,
+    llm2,
+    retriever,
+    conv_doc_id=None,
+    conv_name: str = None,
+    transcript_status: str = "active",
+    extraction_warning: str = None,
+    callback_handler=None,
+    parent_span=None,
+) -> Dict:
+    """
+    Shared tail of /transcripts/process, /internal/transcripts/process and the offline batch
+    processor: answer every extracted question, build the claim decision + final summary,
+    persist the transcript conversation (chats + response_payload) and return the response.
+    """
+    callback_handler = callback_handler or handler
+
+    # Process each question
+    results = []
+    total_latency = 0
+    confidences = []
+    
+    with tracer.start_span('process-questions', child_of=parent_span):
+        for question_obj in questions:
+            question_text = question_obj.get("question", "")
+            question_id = question_obj.get("questionId", f"q{len(results) + 1}")
+            
+            result = process_single_transcript_question(
+                question_text, contract_type, selected_plan, 
+                selected_state, gpt_model, vector_db, llm, llm2, 
+                retriever, callback_handler,
+                transcript_context=question_obj.get("context", ""),
+            )
+            
+            result["questionId"] = question_id
+            result["question"] = question_text
+            result["context"] = question_obj.get("context", "")
+            result["questionType"] = question_obj.get("questionType", "general")
+            result["userIntent"] = question_obj.get("userIntent", "")  # Include user intent if available
+
+            # Enforce API contract: relevantChunks must be a non-empty list[str]
+            rc = result.get("relevantChunks") or []
+            if isinstance(rc, list):
+                rc = [str(x) for x in rc if str(x).strip()]
+            else:
+                rc = []
+            if not rc:
+                rc = ["(No supporting excerpts found)"]
+            if MILVUS_MAX_RETURN_CHUNKS is not None:
+                rc = rc[:MILVUS_MAX_RETURN_CHUNKS]
+            result["relevantChunks"] = rc
+
+            rc = result.get("relevantChunks", [])
+            print(
+                "[CHUNKS] /transcripts/process: per-question result "
+                f"questionId={question_id}, relevantChunks_count={len(rc)}"
+            )
+            # Log the actual relevantChunks we are about to include in the response
+            try:
+                def _chunk_preview(c):
+                    # relevantChunks is list[str] (new contract) but support legacy dict chunks too
+                    if isinstance(c, dict):
+                        return {
+                            "content_preview": (c.get("content", "") or "")[:200].replace(chr(10), " "),
+                            "score": c.get("score"),
+                        }
+                    return {
+                        "content_preview": (str(c) or "")[:200].replace(chr(10), " "),
+                        "score": None,
+                    }
+
+                print(
+                    "[CHUNKS] /transcripts/process: per-question relevantChunks_detail="
+                    f"{[_chunk_preview(c) for c in rc]}"
+                )
+            except Exception as e:
+                print(f"[CHUNKS] /transcripts/process: unable to log chunk detail: {e}")
+            
+            if "error" not in result:
+                confidences.append(result.get("confidence", 0.0))
+                total_latency += result.get("latency", 0.0)
+            
+            results.append(result)
+    
+    # Calculate summary
+    avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    
+    response = {
+        "transcriptId": transcript_id,
+        "transcriptMetadata": {
+            "fileName": file_metadata["fileName"],
+            "uploadDate": file_metadata["uploadDate"],
+            "fileSize": file_metadata["fileSize"]
+        },
+        "questions": results,
+        "summary": {
+            "totalQuestions": len(questions),
+            "processedQuestions": len([r for r in results if "error" not in r]),
+            "averageConfidence": round(avg_confidence, 2),
+            "totalLatency": round(total_latency, 2)
+        }
+    }
+    if extraction_warning:
+        response["warning"] = extraction_warning
+
+    # Claim decision (Approved/Rejected/Cannot determine), grounded only in retrieved policy chunks
+    try:
+        all_chunks = []
+        for r in results or []:
+            rc = r.get("relevantChunks") or []
+            if isinstance(rc, list):
+                all_chunks.extend([str(x) for x in rc if str(x).strip()])
+        # de-duplicate while preserving order
+        seen = set()
+        deduped = []
+        for c in all_chunks:
+            if c in seen:
+                continue
+            seen.add(c)
+            deduped.append(c)
+        claims_context = []
+        for r in results or []:
+            if not isinstance(r, dict):
+                continue
+            claims_context.append(
+                {
+                    "claimId": (r.get("questionId") or ""),
+                    "customerClaim": (r.get("question") or ""),
+                    "situation": (r.get("context") or ""),
+                }
+            )
+        claim_decision = generate_claim_decision_from_chunks(deduped, claims_context=claims_context)
+        response["claimDecision"] = claim_decision
+    except Exception as e:
+        print(f"Warning: unable to generate claimDecision: {e}")
+
+    # Build a final answer: combined summary of answers across ALL extracted questions.
+    # We intentionally include every Q/A we produced (even if confidence is low),
+    # and only skip items that have no question text at all.
+    final_summary_text = ""
+    try:
+        with tracer.start_span('final-summary', child_of=parent_span):
+            llm_summary = ChatOpenAI(temperature=0.0, model="gpt-4o")
+            qa_lines = []
+            for r in results or []:
+                if not r:
+                    continue
+                q = (r.get("question") or "").strip()
+                if not q:
+                    continue
+                ctx = (r.get("context") or "").strip()
+                a = (r.get("answer") or "").strip()
+                # If answer is missing but question exists, keep a placeholder so the final summary
+                # still reflects ALL extracted questions.
+                if not a:
+                    a = "(No answer was generated for this question.)"
+                if ctx:
+                    qa_lines.append(f"Q: {q}\nSituation: {ctx}\nA: {a}")
+                else:
+                    qa_lines.append(f"Q: {q}\nA: {a}")
+
+            qa_blob = "\n\n".join(qa_lines)
+            if qa_blob.strip():
+                summary_prompt = PromptTemplate(
+                    input_variables=["qa_blob"],
+                    template=(
+                        "You are writing the FINAL ANSWER for a claims transcript.\n"
+                        "IMPORTANT: Do NOT present the final answer as a list of each Q&A.\n"
+                        "Instead, synthesize ALL Q&A into an APPLIANCE/ITEM-BASED final answer.\n"
+                        "\n"
+                        "Task:\n"
+                        "- Identify the distinct appliance(s)/item(s)/system(s) mentioned across the Q&A.\n"
+                        "- Group/merge related questions into the correct item section (do not repeat the questions).\n"
+                        "- If the transcript includes multiple items with separate claims, show them as separate sections.\n"
+                        "\n"
+                        "For EACH item section, include in JSON FORMAT:\n"
+                        "- ITEM : <1,2,3...>\n"
+                        "- ITEM: <name> (add 1-line details if available: location/part/symptom)\n"
+                        "- TYPE: Appliance | System | Fixture | Other (infer from wording; if unclear use Other)\n"
+                        "- DECISION: APPROVED | REJECTED | PARTIAL | NEED_HUMAN_ASSISTANCE\n"
+                        "- AMOUNTS (only if mentioned in Q&A):\n"
+                        "  1. Customer quoted/asked: $...\n"
+                        "  2. Company can provide: $... (coverage amount/limit/service fee/deductible as stated in Q&A)\n"
+                        "- Situation: what happened / what customer is claiming (from Situation lines)\n"
+                        "- What's covered (numeric list, if any)\n"
+                        "- What's not covered / limitations (numeric list, if any)\n"
+                        "- Why (1–2 short sentences grounded in the Q&A outcomes; no policy speculation)\n"
+                        "- Next steps (specific actions the customer should take)\n"
+                        "\n"
+                        "CRITICAL DECISION RULES:\n"
+                        "- The DECISION field is MANDATORY and MUST NEVER be left empty for any item.\n"
+                        "- If it is confirmed that there is NO coverage for a particular item, the DECISION MUST be REJECTED.\n"
+                        "- If outcomes are mixed for the same item, use PARTIAL and clearly break down covered vs not covered.\n"
+                        "- If coverage cannot be determined, use NEED_HUMAN_ASSISTANCE.\n"
+                        "- Be concise, decisive, and avoid hypothetical/if-then language.\n"
+                        "- End with a short overall next step (1–2 bullets) if multiple items exist.\n\n"
+                        "{qa_blob}\n"
+                    ),
+                )
+                summary_chain = summary_prompt | llm_summary | StrOutputParser()
+                final_summary_text = summary_chain.invoke({"qa_blob": qa_blob}).strip()
+    except Exception as e:
+        print(f"Warning: failed to generate final transcript summary: {e}")
+
+    # Ensure Final Answer is always present when we have questions (even if summarization failed).
+    if (not final_summary_text.strip()) and (results and len(results) > 0):
+        final_summary_text = "\n".join(
+            [
+                f"- {((r.get('answer') or '').strip() or '(No answer was generated for this question.)')}"
+                for r in results
+                if r and (r.get("question") or "").strip()
+            ]
+        ).strip()
+
+    response["finalSummary"] = final_summary_text
+    response["finalAnswer"] = {
+        "question": "Final Answer for transcript",
+        "answer": final_summary_text,
+    }
+
+    total_chunks = sum(len(r.get("relevantChunks", [])) for r in results)
+    print(
+        "[CHUNKS] /transcripts/process: DONE "
+        f"fileName={file_metadata['fileName']}, "
+        f"questions={len(results)}, total_chunks={total_chunks}, "
+        f"avg_confidence={round(avg_confidence, 2)}, total_latency={round(total_latency, 2)}"
+    )
+
+    # Persist transcript Q&A and chunks in MongoDB (per user) in the existing chat collection
+    transcript_chats = []
+    now_ts = datetime.utcnow()
+    collection_name = getattr(vector_db, "collection_name", None)
+    for res in results:
+        # chunks are list[str] in API contract; stored as chunk_refs (or inline relevant_chunks +
+        # a relevant_docs text blob for legacy /referred-clauses when the chunk store is off)
+        transcript_chats.append({
+            "chat_id": res.get("questionId"),
+            "entered_query": res.get("question", ""),
+            "response": res.get("answer", ""),
+            **_text_chunk_fields(collection_name, res.get("relevantChunks"), res.get("relevantChunksDetail")),
+            # Conversation is a Calls mode conversation in UI; keep underlying model separately.
+            "gpt_model": "Calls",
+            "underlying_model": gpt_model,
+            "chat_timestamp": now_ts,
+            "latency": res.get("latency", 0.0),
+            "confidence": res.get("confidence", 0.0),
+        })
+
+    # Store final answer as a final chat entry in MongoDB, using a fixed question label
+    transcript_chats.append({
+        "chat_id": "final_answer",
+        "entered_query": "Final Answer for transcript",
+        "response": final_summary_text,
+        "relevant_chunks": [],
+        "relevant_docs": "",
+        "gpt_model": "Calls",
+        "underlying_model": gpt_model,
+        "chat_timestamp": now_ts,
+        "latency": 0.0,
+        "confidence": 0.0,
+    })
+
+    # Also include it in the response questions list so the UI can render it as the last Q/A.
+    response["questions"] = (response.get("questions") or []) + [{
+        "questionId": "final_answer",
+        "question": "Final Answer for transcript",
+        "answer": final_summary_text,
+        "relevantChunks": [],
+        "confidence": 0.0,
+        "latency": 0.0,
+    }]
+
+    transcript_doc = {
+        "doc_type": "transcript_conversation",
+        "conversation_mode": "Calls",
+        "underlying_model": gpt_model,
+        "conversation_name": conv_name or transcript_file_name,
+        "transcript_id": transcript_id,
+        "transcript_metadata": response["transcriptMetadata"],
+        "contract_type": contract_type,
+        "selected_plan": selected_plan,
+        "selected_state": selected_state,
+        "query_time": now_ts,
+        "updated_at": now_ts,
+        "status": transcript_status,
+        "processing": False,
+        "summary": response.get("summary"),
+        "final_summary": final_summary_text,
+        "claim_decision": response.get("claimDecision"),
+        "chats": transcript_chats,
+    }
+
+    # Update the conversation document created earlier (so sidebar shows it during processing).
+    if conv_doc_id is None:
+        inserted = qna_collection.insert_one(transcript_doc)
+        conv_doc_id = inserted.inserted_id
+    else:
+        qna_collection.update_one(
+            {"_id": conv_doc_id},
+            {"$set": transcript_doc},
+        )
+
+    updated_conv = qna_collection.find_one({"_id": conv_doc_id}) or {}
+
+    response["conversationId"] = str(conv_doc_id)
+    response["status"] = transcript_status
+    response["conversationName"] = updated_conv.get("conversation_name") or transcript_doc["conversation_name"]
+    # Persist full response payload for fast future reads (chunk bodies are re-filled from chats on read)
+    response_payload = response
+    if CHUNK_STORE_ENABLED:
+        response_payload = dict(response)
+        response_payload["questions"] = [
+            {k: v for k, v in q.items() if k not in ("relevantChunks", "relevantChunksDetail")}
+            if isinstance(q, dict) and q.get("questionId") != "final_answer"
+            else q
+            for q in (response.get("questions") or [])
+        ]
+    qna_collection.update_one(
+        {"_id": conv_doc_id},
+        {"$set": {"response_payload": response_payload}},
+    )
+
+    print(
+        "[CHUNKS] /transcripts/process: stored transcript processing result "
+        f"transcript_id={transcript_id}, conversation_id={response['conversationId']}, "
+        f"questions={len(results)}, total_chunks={total_chunks}"
+    )
+
+    return response
+
+
+@app.route("/transcripts/process", methods=["POST"])
 def process_transcript():
     """Process transcript: fetch from GCP, extract questions, and get answers"""
     try:
@@ -4585,8 +5680,7 @@ def process_transcript():
             transcript_id = transcript_file_name.replace(".json", "").replace(".txt", "")
 
             # Use the existing per-user chat collection (same as Search/Infer) for transcript conversations.
-            qna_collection_user = f"chats_{user_email}"
-            qna_collection = db[qna_collection_user]
+            qna_collection = _chats_collection(user_email)
 
             # If we have already processed this transcript for this user, return the cached conversation.
             existing_conv = None
@@ -4604,6 +5698,7 @@ def process_transcript():
                 # it may contain placeholder chunk content like "[]". In that case, reprocess.
                 try:
                     existing_chats = existing_conv.get("chats") or []
+                    _resolve_chunks(existing_chats)
                     has_placeholder_chunks = False
                     for c in existing_chats:
                         if c.get("chat_id") == "final_answer":
@@ -4635,7 +5730,7 @@ def process_transcript():
                     existing_conv = None
 
             if existing_conv and not force_reprocess and not new_conversation:
-                cached = existing_conv.get("response_payload") or {}
+                cached = _cached_response_payload(existing_conv)
                 # Ensure required fields exist in cached payload
                 cached["conversationId"] = str(existing_conv.get("_id"))
                 cached.setdefault("transcriptId", existing_conv.get("transcript_id"))
@@ -4840,322 +5935,336 @@ def process_transcript():
                 else:
                     return jsonify({"error": f"Invalid gpt_model: {gpt_model}. Must be 'Search' or 'Infer'"}), 400
             
-            # Process each question
-            results = []
-            total_latency = 0
-            confidences = []
-            
-            with tracer.start_span('process-questions', child_of=parent0):
-                for question_obj in questions:
-                    question_text = question_obj.get("question", "")
-                    question_id = question_obj.get("questionId", f"q{len(results) + 1}")
-                    
-                    result = process_single_transcript_question(
-                        question_text, contract_type, selected_plan, 
-                        selected_state, gpt_model, vector_db1, llm, llm2, 
-                        retriever, handler,
-                        transcript_context=question_obj.get("context", ""),
-                    )
-                    
-                    result["questionId"] = question_id
-                    result["question"] = question_text
-                    result["context"] = question_obj.get("context", "")
-                    result["questionType"] = question_obj.get("questionType", "general")
-                    result["userIntent"] = question_obj.get("userIntent", "")  # Include user intent if available
-
-                    # Enforce API contract: relevantChunks must be a non-empty list[str]
-                    rc = result.get("relevantChunks") or []
-                    if isinstance(rc, list):
-                        rc = [str(x) for x in rc if str(x).strip()]
-                    else:
-                        rc = []
-                    if not rc:
-                        rc = ["(No supporting excerpts found)"]
-                    if MILVUS_MAX_RETURN_CHUNKS is not None:
-                        rc = rc[:MILVUS_MAX_RETURN_CHUNKS]
-                    result["relevantChunks"] = rc
-
-                    rc = result.get("relevantChunks", [])
-                    print(
-                        "[CHUNKS] /transcripts/process: per-question result "
-                        f"questionId={question_id}, relevantChunks_count={len(rc)}"
-                    )
-                    # Log the actual relevantChunks we are about to include in the response
-                    try:
-                        def _chunk_preview(c):
-                            # relevantChunks is list[str] (new contract) but support legacy dict chunks too
-                            if isinstance(c, dict):
-                                return {
-                                    "content_preview": (c.get("content", "") or "")[:200].replace(chr(10), " "),
-                                    "score": c.get("score"),
-                                }
-                            return {
-                                "content_preview": (str(c) or "")[:200].replace(chr(10), " "),
-                                "score": None,
-                            }
+            response = answer_and_store_transcript(
+                qna_collection,
+                questions,
+                transcript_id=transcript_id,
+                transcript_file_name=transcript_file_name,
+                file_metadata=file_metadata,
+                contract_type=contract_type,
+                selected_plan=selected_plan,
+                selected_state=selected_state,
+                gpt_model=gpt_model,
+                vector_db=vector_db1,
+                llm=llm,
+                llm2=llm2,
+                retriever=retriever,
+                conv_doc_id=conv_doc_id,
+                conv_name=conv_name,
+                transcript_status=transcript_status,
+                extraction_warning=extraction_warning,
+                callback_handler=handler,
+                parent_span=parent0,
+            )
 
-                        print(
-                            "[CHUNKS] /transcripts/process: per-question relevantChunks_detail="
-                            f"{[_chunk_preview(c) for c in rc]}"
-                        )
-                    except Exception as e:
-                        print(f"[CHUNKS] /transcripts/process: unable to log chunk detail: {e}")
-                    
-                    if "error" not in result:
-                        confidences.append(result.get("confidence", 0.0))
-                        total_latency += result.get("latency", 0.0)
-                    
-                    results.append(result)
-            
-            # Calculate summary
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+            return jsonify(response), 200
             
-            response = {
-                "transcriptId": transcript_id,
-                "transcriptMetadata": {
-                    "fileName": file_metadata["fileName"],
-                    "uploadDate": file_metadata["uploadDate"],
-                    "fileSize": file_metadata["fileSize"]
-                },
-                "questions": results,
-                "summary": {
-                    "totalQuestions": len(questions),
-                    "processedQuestions": len([r for r in results if "error" not in r]),
-                    "averageConfidence": round(avg_confidence, 2),
-                    "totalLatency": round(total_latency, 2)
-                }
-            }
-            if extraction_warning:
-                response["warning"] = extraction_warning
+    except Exception as e:
+        import traceback
+        error_trace = traceback.format_exc()
+        print(f"Error in /transcripts/process endpoint: {str(e)}")
+        print(f"Traceback: {error_trace}")
+        return jsonify({
+            "error": "An error occurred while processing transcript", 
+            "details": str(e)
+        }), 500
 
-            # Claim decision (Approved/Rejected/Cannot determine), grounded only in retrieved policy chunks
-            try:
-                all_chunks = []
-                for r in results or []:
-                    rc = r.get("relevantChunks") or []
-                    if isinstance(rc, list):
-                        all_chunks.extend([str(x) for x in rc if str(x).strip()])
-                # de-duplicate while preserving order
-                seen = set()
-                deduped = []
-                for c in all_chunks:
-                    if c in seen:
-                        continue
-                    seen.add(c)
-                    deduped.append(c)
-                claims_context = []
-                for r in results or []:
-                    if not isinstance(r, dict):
-                        continue
-                    claims_context.append(
-                        {
-                            "claimId": (r.get("questionId") or ""),
-                            "customerClaim": (r.get("question") or ""),
-                            "situation": (r.get("context") or ""),
-                        }
-                    )
-                claim_decision = generate_claim_decision_from_chunks(deduped, claims_context=claims_context)
-                response["claimDecision"] = claim_decision
-            except Exception as e:
-                print(f"Warning: unable to generate claimDecision: {e}")
 
-            # Build a final answer: combined summary of answers across ALL extracted questions.
-            # We intentionally include every Q/A we produced (even if confidence is low),
-            # and only skip items that have no question text at all.
-            final_summary_text = ""
-            try:
-                with tracer.start_span('final-summary', child_of=parent0):
-                    llm_summary = ChatOpenAI(temperature=0.0, model="gpt-4o")
-                    qa_lines = []
-                    for r in results or []:
-                        if not r:
-                            continue
-                        q = (r.get("question") or "").strip()
-                        if not q:
-                            continue
-                        ctx = (r.get("context") or "").strip()
-                        a = (r.get("answer") or "").strip()
-                        # If answer is missing but question exists, keep a placeholder so the final summary
-                        # still reflects ALL extracted questions.
-                        if not a:
-                            a = "(No answer was generated for this question.)"
-                        if ctx:
-                            qa_lines.append(f"Q: {q}\nSituation: {ctx}\nA: {a}")
-                        else:
-                            qa_lines.append(f"Q: {q}\nA: {a}")
-
-                    qa_blob = "\n\n".join(qa_lines)
-                    if qa_blob.strip():
-                        summary_prompt = PromptTemplate(
-                            input_variables=["qa_blob"],
-                            template=(
-                                "You are writing the FINAL ANSWER for a claims transcript.\n"
-                                "IMPORTANT: Do NOT present the final answer as a list of each Q&A.\n"
-                                "Instead, synthesize ALL Q&A into an APPLIANCE/ITEM-BASED final answer.\n"
-                                "\n"
-                                "Task:\n"
-                                "- Identify the distinct appliance(s)/item(s)/system(s) mentioned across the Q&A.\n"
-                                "- Group/merge related questions into the correct item section (do not repeat the questions).\n"
-                                "- If the transcript includes multiple items with separate claims, show them as separate sections.\n"
-                                "\n"
-                                "For EACH item section, include in JSON FORMAT:\n"
-                                "- ITEM : <1,2,3...>\n"
-                                "- ITEM: <name> (add 1-line details if available: location/part/symptom)\n"
-                                "- TYPE: Appliance | System | Fixture | Other (infer from wording; if unclear use Other)\n"
-                                "- DECISION: APPROVED | REJECTED | PARTIAL | NEED_HUMAN_ASSISTANCE\n"
-                                "- AMOUNTS (only if mentioned in Q&A):\n"
-                                "  1. Customer quoted/asked: $...\n"
-                                "  2. Company can provide: $... (coverage amount/limit/service fee/deductible as stated in Q&A)\n"
-                                "- Situation: what happened / what customer is claiming (from Situation lines)\n"
-                                "- What's covered (numeric list, if any)\n"
-                                "- What's not covered / limitations (numeric list, if any)\n"
-                                "- Why (1–2 short sentences grounded in the Q&A outcomes; no policy speculation)\n"
-                                "- Next steps (specific actions the customer should take)\n"
-                                "\n"
-                                "CRITICAL DECISION RULES:\n"
-                                "- The DECISION field is MANDATORY and MUST NEVER be left empty for any item.\n"
-                                "- If it is confirmed that there is NO coverage for a particular item, the DECISION MUST be REJECTED.\n"
-                                "- If outcomes are mixed for the same item, use PARTIAL and clearly break down covered vs not covered.\n"
-                                "- If coverage cannot be determined, use NEED_HUMAN_ASSISTANCE.\n"
-                                "- Be concise, decisive, and avoid hypothetical/if-then language.\n"
-                                "- End with a short overall next step (1–2 bullets) if multiple items exist.\n\n"
-                                "{qa_blob}\n"
-                            ),
-                        )
-                        summary_chain = summary_prompt | llm_summary | StrOutputParser()
-                        final_summary_text = summary_chain.invoke({"qa_blob": qa_blob}).strip()
-            except Exception as e:
-                print(f"Warning: failed to generate final transcript summary: {e}")
+# ==================== TRANSCRIPT INGESTION ====================
 
-            # Ensure Final Answer is always present when we have questions (even if summarization failed).
-            if (not final_summary_text.strip()) and (results and len(results) > 0):
-                final_summary_text = "\n".join(
-                    [
-                        f"- {((r.get('answer') or '').strip() or '(No answer was generated for this question.)')}"
-                        for r in results
-                        if r and (r.get("question") or "").strip()
-                    ]
-                ).strip()
+_transcript_ingest_queue = queue.Queue(maxsize=TRANSCRIPT_INGEST_QUEUE_MAX)
+_transcript_ingest_thread = None
+_transcript_ingest_lock = threading.Lock()
 
-            response["finalSummary"] = final_summary_text
-            response["finalAnswer"] = {
-                "question": "Final Answer for transcript",
-                "answer": final_summary_text,
-            }
 
-            total_chunks = sum(len(r.get("relevantChunks", [])) for r in results)
-            print(
-                "[CHUNKS] /transcripts/process: DONE "
-                f"fileName={file_metadata['fileName']}, "
-                f"questions={len(results)}, total_chunks={total_chunks}, "
-                f"avg_confidence={round(avg_confidence, 2)}, total_latency={round(total_latency, 2)}"
+def _transcript_text_for_extraction(transcript_content: str) -> str:
+    """Plain text used for question extraction (same shape handling as the processing endpoints)."""
+    transcript_text = transcript_content
+    try:
+        transcript_data = json.loads(transcript_content)
+        if isinstance(transcript_data, dict):
+            transcript_text = transcript_data.get(
+                "text",
+                transcript_data.get(
+                    "transcript",
+                    transcript_data.get("content", str(transcript_data)),
+                ),
             )
+    except Exception:
+        transcript_text = transcript_content
+    return transcript_text
 
-            # Persist transcript Q&A and chunks in MongoDB (per user) in the existing chat collection
-            transcript_chats = []
-            now_ts = datetime.utcnow()
-            for res in results:
-                # chunks are list[str] in API contract; keep a text blob for legacy /referred-clauses
-                chunks = res.get("relevantChunks", []) or []
-                relevant_docs_text = "\n\n---\n\n".join([str(c) for c in chunks if str(c).strip()])
-                transcript_chats.append({
-                    "chat_id": res.get("questionId"),
-                    "entered_query": res.get("question", ""),
-                    "response": res.get("answer", ""),
-                    # For UI: keep chunks as JSON
-                    "relevant_chunks": chunks,
-                    # For existing /referred-clauses UI: keep a text version too
-                    "relevant_docs": relevant_docs_text,
-                    # Conversation is a Calls mode conversation in UI; keep underlying model separately.
-                    "gpt_model": "Calls",
-                    "underlying_model": gpt_model,
-                    "chat_timestamp": now_ts,
-                    "latency": res.get("latency", 0.0),
-                    "confidence": res.get("confidence", 0.0),
-                })
 
-            # Store final answer as a final chat entry in MongoDB, using a fixed question label
-            transcript_chats.append({
-                "chat_id": "final_answer",
-                "entered_query": "Final Answer for transcript",
-                "response": final_summary_text,
-                "relevant_chunks": [],
-                "relevant_docs": "",
-                "gpt_model": "Calls",
-                "underlying_model": gpt_model,
-                "chat_timestamp": now_ts,
-                "latency": 0.0,
-                "confidence": 0.0,
-            })
+def _transcript_artifacts_id(transcript_file_name: str, version: str) -> str:
+    return f"{transcript_file_name}:{version}"
 
-            # Also include it in the response questions list so the UI can render it as the last Q/A.
-            response["questions"] = (response.get("questions") or []) + [{
-                "questionId": "final_answer",
-                "question": "Final Answer for transcript",
-                "answer": final_summary_text,
-                "relevantChunks": [],
-                "confidence": 0.0,
-                "latency": 0.0,
-            }]
 
-            transcript_doc = {
-                "doc_type": "transcript_conversation",
-                "conversation_mode": "Calls",
-                "underlying_model": gpt_model,
-                "conversation_name": conv_name or transcript_file_name,
-                "transcript_id": transcript_id,
-                "transcript_metadata": response["transcriptMetadata"],
-                "contract_type": contract_type,
-                "selected_plan": selected_plan,
-                "selected_state": selected_state,
-                "query_time": now_ts,
-                "updated_at": now_ts,
-                "status": transcript_status,
-                "processing": False,
-                "summary": response.get("summary"),
-                "final_summary": final_summary_text,
-                "claim_decision": response.get("claimDecision"),
-                "chats": transcript_chats,
-            }
+def _load_transcript_artifacts(transcript_file_name: str):
+    """Precomputed artifacts for the current generation of a transcript (None if not ready)."""
+    if not TRANSCRIPT_ARTIFACTS_ENABLED:
+        return None
+    try:
+        entry = transcript_store.stat(transcript_file_name)
+        if not entry.get("version"):
+            return None
+        doc = transcript_artifacts_collection.find_one(
+            {"_id": _transcript_artifacts_id(transcript_file_name, entry["version"]), "status": "ready"}
+        )
+        if doc and doc.get("questions"):
+            return doc
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Warning: unable to load transcript artifacts for {transcript_file_name}: {e}")
+    return None
 
-            # Update the conversation document created earlier (so sidebar shows it during processing).
-            if conv_doc_id is None:
-                inserted = qna_collection.insert_one(transcript_doc)
-                conv_doc_id = inserted.inserted_id
-            else:
-                qna_collection.update_one(
-                    {"_id": conv_doc_id},
-                    {"$set": transcript_doc},
-                )
 
-            updated_conv = qna_collection.find_one({"_id": conv_doc_id}) or {}
+def precompute_transcript_artifacts(transcript_file_name: str) -> Dict:
+    """
+    Everything a CSR click would otherwise trigger lazily, for one object generation:
+    catalog + metadata (search index), dialogue segmentation and question extraction.
+    Idempotent per generation, so Pub/Sub redeliveries are cheap.
+    """
+    transcript_content, entry = transcript_store.read_text(transcript_file_name)
+    version = entry.get("version")
+    if not version:
+        return {}
+    doc_id = _transcript_artifacts_id(transcript_file_name, version)
+    existing = transcript_artifacts_collection.find_one({"_id": doc_id, "status": {"$in": ["ready", "no_questions"]}})
+    if existing:
+        return existing
+
+    # Catalog + metadata extraction + search index
+    transcript_metadata = extract_transcript_metadata(transcript_content, transcript_file_name)
+    _index_transcript_file({
+        "fileName": transcript_file_name,
+        "filePath": entry.get("path"),
+        "timeCreated": entry.get("uploadDate"),
+        "version": version,
+    }, transcript_metadata)
+
+    # Dialogue segmentation (persisted per generation by build_transcript_dialogue)
+    conversation, used_llm, _, _ = build_transcript_dialogue(transcript_file_name)
+
+    # Question extraction (same extractors as /transcripts/process/stream)
+    transcript_text = _transcript_text_for_extraction(transcript_content)
+    llm_extract = ChatOpenAI(temperature=0.0, model="gpt-4o")
+    questions = extract_relevant_customer_questions(transcript_text, llm_extract)
+    if not questions:
+        questions = extract_questions_with_agent(transcript_text, llm_extract)
+
+    doc = {
+        "transcript_file_name": transcript_file_name,
+        "transcript_id": transcript_file_name.replace(".json", "").replace(".txt", ""),
+        "generation": version,
+        "status": "ready" if questions else "no_questions",
+        "file_metadata": {
+            "fileName": transcript_file_name,
+            "fileSize": entry.get("size", 0),
+            "uploadDate": entry.get("uploadDate"),
+            "metadata": {},
+        },
+        "transcript_metadata": transcript_metadata,
+        "questions": questions or [],
+        "dialogue_turns": len(conversation),
+        "dialogue_used_llm": used_llm,
+        "created_at": datetime.utcnow(),
+    }
+    transcript_artifacts_collection.replace_one({"_id": doc_id}, doc, upsert=True)
+    return doc
 
-            response["conversationId"] = str(conv_doc_id)
-            response["status"] = transcript_status
-            response["conversationName"] = updated_conv.get("conversation_name") or transcript_doc["conversation_name"]
-            # Persist full response payload for fast future reads
-            qna_collection.update_one(
-                {"_id": conv_doc_id},
-                {"$set": {"response_payload": response}},
-            )
 
+def _transcript_ingest_worker_loop():
+    while True:
+        job = _transcript_ingest_queue.get()
+        try:
+            started = time()
+            doc = precompute_transcript_artifacts(job["fileName"])
             print(
-                "[CHUNKS] /transcripts/process: stored transcript processing result "
-                f"transcript_id={transcript_id}, conversation_id={response['conversationId']}, "
-                f"questions={len(results)}, total_chunks={total_chunks}"
+                f"[TRANSCRIPT_INGEST] ✓ {job['fileName']} gen={job.get('generation')} "
+                f"questions={len((doc or {}).get('questions') or [])} in {round(time() - started, 2)}s"
+            )
+        except FileNotFoundError:
+            print(f"[TRANSCRIPT_INGEST] {job.get('fileName')} no longer exists; skipped")
+        except Exception as e:
+            import traceback
+            print(f"[TRANSCRIPT_INGEST] ❌ {job.get('fileName')}: {e}")
+            traceback.print_exc()
+        finally:
+            _transcript_ingest_queue.task_done()
+
+
+def _ensure_transcript_ingest_worker():
+    global _transcript_ingest_thread
+    with _transcript_ingest_lock:
+        if _transcript_ingest_thread is None or not _transcript_ingest_thread.is_alive():
+            _transcript_ingest_thread = threading.Thread(
+                target=_transcript_ingest_worker_loop, name="transcript-ingest", daemon=True
             )
+            _transcript_ingest_thread.start()
 
-            return jsonify(response), 200
-            
+
+def _parse_gcs_notification(body: Dict) -> Dict:
+    """
+    Normalize a GCS Pub/Sub push body into {eventType, bucket, objectId, generation, resource}.
+    Attributes carry the routing fields; `data` is the base64 JSON object resource.
+    """
+    message = (body or {}).get("message") or {}
+    attributes = message.get("attributes") or {}
+    resource = {}
+    raw = message.get("data")
+    if raw:
+        try:
+            resource = json.loads(base64.b64decode(raw).decode("utf-8"))
+        except Exception as e:
+            print(f"Warning: unable to decode notification data: {e}")
+            resource = {}
+    return {
+        "eventType": attributes.get("eventType") or "",
+        "bucket": attributes.get("bucketId") or resource.get("bucket") or "",
+        "objectId": attributes.get("objectId") or resource.get("name") or "",
+        "generation": attributes.get("objectGeneration") or resource.get("generation"),
+        "overwrittenBy": attributes.get("overwrittenByGeneration"),
+        "messageId": message.get("messageId") or message.get("message_id"),
+        "resource": resource,
+    }
+
+
+@app.route("/internal/transcripts/ingest", methods=["POST"])
+def ingest_transcript_notification():
+    """
+    Bucket object-change receiver (GCS notification -> Pub/Sub push subscription).
+
+    Body (Pub/Sub push):
+      {
+        "message": {
+          "attributes": {"eventType": "OBJECT_FINALIZE", "bucketId": "...", "objectId": "transcripts/x.json",
+                         "objectGeneration": "1700000000000000"},
+          "data": "<base64 JSON object resource>",
+          "messageId": "..."
+        },
+        "subscription": "projects/.../subscriptions/..."
+      }
+
+    Auth: X-Internal-Auth header, or ?token= on the push endpoint URL (INTERNAL_PROCESS_SECRET).
+    New/updated objects are queued for catalog, metadata, dialogue and question precompute;
+    deletes drop the object from the catalog and search index. Events we ignore are still acked (2xx)
+    so Pub/Sub does not redeliver them.
+    """
+    try:
+        with tracer.start_span('api/internal/transcripts/ingest'):
+            expected = os.getenv("INTERNAL_PROCESS_SECRET")
+            got = request.headers.get("X-Internal-Auth") or request.args.get("token")
+            if not expected or got != expected:
+                return jsonify({"error": "unauthorized"}), 401
+
+            event = _parse_gcs_notification(request.get_json(silent=True) or {})
+            object_id = event["objectId"]
+            file_name = object_id.split("/")[-1]
+
+            if event["bucket"] and event["bucket"] != GCP_BUCKET_NAME:
+                return jsonify({"ignored": True, "reason": "other bucket"}), 200
+            if not file_name or object_id.endswith("/") or not (file_name.endswith(".json") or file_name.endswith(".txt")):
+                return jsonify({"ignored": True, "reason": "not a transcript"}), 200
+
+            if event["eventType"] in ("OBJECT_DELETE", "OBJECT_ARCHIVE"):
+                # An overwrite also sends DELETE for the old generation; the FINALIZE handles that case.
+                if not event["overwrittenBy"]:
+                    transcript_store.forget(file_name)
+                    transcript_search_index.remove(file_name)
+                return jsonify({"ignored": False, "action": "removed", "fileName": file_name}), 200
+
+            if event["eventType"] not in ("OBJECT_FINALIZE", "OBJECT_METADATA_UPDATE", ""):
+                return jsonify({"ignored": True, "reason": f"event {event['eventType']}"}), 200
+
+            # Catalog update: the notification carries the object resource, so the name map is current
+            resource = dict(event["resource"] or {})
+            if event["generation"] and not resource.get("generation"):
+                resource["generation"] = event["generation"]
+            if resource:
+                transcript_store.remember(file_name, f"{GCP_BUCKET_NAME}/{object_id}", resource)
+
+            job = {"fileName": file_name, "generation": event["generation"], "eventType": event["eventType"]}
+            try:
+                _transcript_ingest_queue.put_nowait(job)
+            except queue.Full:
+                # Nack: Pub/Sub will redeliver with backoff
+                return jsonify({"error": "ingest queue full"}), 503
+            _ensure_transcript_ingest_worker()
+
+            return jsonify({
+                "queued": True,
+                "fileName": file_name,
+                "generation": event["generation"],
+                "queueDepth": _transcript_ingest_queue.qsize(),
+            }), 202
     except Exception as e:
         import traceback
-        error_trace = traceback.format_exc()
-        print(f"Error in /transcripts/process endpoint: {str(e)}")
-        print(f"Traceback: {error_trace}")
-        return jsonify({
-            "error": "An error occurred while processing transcript", 
-            "details": str(e)
-        }), 500
+        print(f"Error in /internal/transcripts/ingest endpoint: {str(e)}")
+        print(f"Traceback: {traceback.format_exc()}")
+        return jsonify({"error": "An error occurred while ingesting notification", "details": str(e)}), 500
+
+
+@app.route("/internal/db/index-report", methods=["GET"])
+def mongo_index_report():
+    """
+    Index usage ($indexStats) and recent slow collection scans (profiler) for FrontDoorDB,
+    plus per-operation client latency (dataAccess) and write-behind queue stats.
+
+    Query Parameters:
+    - collections (str, optional): comma-separated collection names (default: all)
+    - slowMs (int, optional): COLLSCAN threshold in ms (default: MONGO_SLOW_QUERY_MS)
+    - ensure (bool, optional): re-run startup index provisioning first
+    """
+    try:
+        with tracer.start_span('api/internal/db/index-report'):
+            expected = os.getenv("INTERNAL_PROCESS_SECRET")
+            got = request.headers.get("X-Internal-Auth")
+            if not expected or got != expected:
+                return jsonify({"error": "unauthorized"}), 401
+
+            provisioning = None
+            if (request.args.get("ensure") or "").lower() in ("1", "true", "yes"):
+                provisioning = index_manager.ensure_startup(
+                    db,
+                    shared=[
+                        (users_collection, USERS_INDEXES),
+                        (conversation_store.conversations, CONVERSATIONS_INDEXES),
+                        (conversation_store.feedback, FEEDBACK_INDEXES),
+                        (call_transcripts.buckets, bucket_indexes()),
+                        (call_transcripts.compact, compact_indexes()),
+                        *_copilot_sessions.index_specs(),
+                    ],
+                )
+
+            names = [n.strip() for n in (request.args.get("collections") or "").split(",") if n.strip()] or None
+            try:
+                slow_ms = int(request.args.get("slowMs")) if request.args.get("slowMs") else MONGO_SLOW_QUERY_MS
+            except ValueError:
+                slow_ms = MONGO_SLOW_QUERY_MS
+
+            report = index_manager.report(db, collection_names=names, slow_ms=slow_ms)
+            report["writeBehind"] = write_behind.stats() if write_behind is not None else None
+            report["dataAccess"] = data_access.stats()
+            report["shared"] = {
+                f"{c.database.name}.{c.name}": index_manager.index_usage(c)
+                for c in (
+                    transcripts_collection,
+                    users_collection,
+                    conversation_store.conversations,
+                    conversation_store.feedback,
+                    call_transcripts.buckets,
+                    call_transcripts.compact,
+                )
+            }
+            if provisioning:
+                report["provisioning"] = provisioning
+            return make_response(json.dumps(report, default=str), 200, {"Content-Type": "application/json"})
+    except Exception as e:
+        import traceback
+        print(f"Error in /internal/db/index-report endpoint: {str(e)}")
+        print(f"Traceback: {traceback.format_exc()}")
+        return jsonify({"error": "An error occurred while building index report", "details": str(e)}), 500
 
 
 @app.route("/internal/transcripts/process", methods=["POST"])
@@ -5253,8 +6362,7 @@ def process_transcript_internal():
             selected_plan_norm = normalize_plan_for_milvus(contract_type_norm, selected_plan)
 
             # Use the existing per-user chat collection (same as Search/Infer) for transcript conversations.
-            qna_collection_user = f"chats_{user_email}"
-            qna_collection = db[qna_collection_user]
+            qna_collection = _chats_collection(user_email)
 
             # If we have already processed this transcript for this user, return the cached conversation.
             existing_conv = None
@@ -5271,6 +6379,7 @@ def process_transcript_internal():
                 # cache validation same as your original
                 try:
                     existing_chats = existing_conv.get("chats") or []
+                    _resolve_chunks(existing_chats)
                     has_placeholder_chunks = False
                     for c in existing_chats:
                         if c.get("chat_id") == "final_answer":
@@ -5300,7 +6409,7 @@ def process_transcript_internal():
                     existing_conv = None
 
             if existing_conv and not force_reprocess and not new_conversation:
-                cached = existing_conv.get("response_payload") or {}
+                cached = _cached_response_payload(existing_conv)
                 cached["conversationId"] = str(existing_conv.get("_id"))
                 cached.setdefault("transcriptId", existing_conv.get("transcript_id"))
                 cached.setdefault("transcriptMetadata", existing_conv.get("transcript_metadata"))
@@ -5519,309 +6628,26 @@ def process_transcript_internal():
                 else:
                     return jsonify({"error": f"Invalid gpt_model: {gpt_model}. Must be 'Search' or 'Infer'"}), 400
             
-            # Process each question
-            results = []
-            total_latency = 0
-            confidences = []
-            
-            with tracer.start_span('process-questions', child_of=parent0):
-                for question_obj in questions:
-                    question_text = question_obj.get("question", "")
-                    question_id = question_obj.get("questionId", f"q{len(results) + 1}")
-                    
-                    result = process_single_transcript_question(
-                        question_text, contract_type, selected_plan, 
-                        selected_state, gpt_model, vector_db1, llm, llm2, 
-                        retriever, handler,
-                        transcript_context=question_obj.get("context", ""),
-                    )
-                    
-                    result["questionId"] = question_id
-                    result["question"] = question_text
-                    result["context"] = question_obj.get("context", "")
-                    result["questionType"] = question_obj.get("questionType", "general")
-                    result["userIntent"] = question_obj.get("userIntent", "")  # Include user intent if available
-
-                    # Enforce API contract: relevantChunks must be a non-empty list[str]
-                    rc = result.get("relevantChunks") or []
-                    if isinstance(rc, list):
-                        rc = [str(x) for x in rc if str(x).strip()]
-                    else:
-                        rc = []
-                    if not rc:
-                        rc = ["(No supporting excerpts found)"]
-                    if MILVUS_MAX_RETURN_CHUNKS is not None:
-                        rc = rc[:MILVUS_MAX_RETURN_CHUNKS]
-                    result["relevantChunks"] = rc
-
-                    rc = result.get("relevantChunks", [])
-                    print(
-                        "[CHUNKS] /transcripts/process: per-question result "
-                        f"questionId={question_id}, relevantChunks_count={len(rc)}"
-                    )
-                    # Log the actual relevantChunks we are about to include in the response
-                    try:
-                        def _chunk_preview(c):
-                            # relevantChunks is list[str] (new contract) but support legacy dict chunks too
-                            if isinstance(c, dict):
-                                return {
-                                    "content_preview": (c.get("content", "") or "")[:200].replace(chr(10), " "),
-                                    "score": c.get("score"),
-                                }
-                            return {
-                                "content_preview": (str(c) or "")[:200].replace(chr(10), " "),
-                                "score": None,
-                            }
-
-                        print(
-                            "[CHUNKS] /transcripts/process: per-question relevantChunks_detail="
-                            f"{[_chunk_preview(c) for c in rc]}"
-                        )
-                    except Exception as e:
-                        print(f"[CHUNKS] /transcripts/process: unable to log chunk detail: {e}")
-                    
-                    if "error" not in result:
-                        confidences.append(result.get("confidence", 0.0))
-                        total_latency += result.get("latency", 0.0)
-                    
-                    results.append(result)
-            
-            # Calculate summary
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
-            
-            response = {
-                "transcriptId": transcript_id,
-                "transcriptMetadata": {
-                    "fileName": file_metadata["fileName"],
-                    "uploadDate": file_metadata["uploadDate"],
-                    "fileSize": file_metadata["fileSize"]
-                },
-                "questions": results,
-                "summary": {
-                    "totalQuestions": len(questions),
-                    "processedQuestions": len([r for r in results if "error" not in r]),
-                    "averageConfidence": round(avg_confidence, 2),
-                    "totalLatency": round(total_latency, 2)
-                }
-            }
-            if extraction_warning:
-                response["warning"] = extraction_warning
-
-            # Claim decision (Approved/Rejected/Cannot determine), grounded only in retrieved policy chunks
-            try:
-                all_chunks = []
-                for r in results or []:
-                    rc = r.get("relevantChunks") or []
-                    if isinstance(rc, list):
-                        all_chunks.extend([str(x) for x in rc if str(x).strip()])
-                # de-duplicate while preserving order
-                seen = set()
-                deduped = []
-                for c in all_chunks:
-                    if c in seen:
-                        continue
-                    seen.add(c)
-                    deduped.append(c)
-                claims_context = []
-                for r in results or []:
-                    if not isinstance(r, dict):
-                        continue
-                    claims_context.append(
-                        {
-                            "claimId": (r.get("questionId") or ""),
-                            "customerClaim": (r.get("question") or ""),
-                            "situation": (r.get("context") or ""),
-                        }
-                    )
-                claim_decision = generate_claim_decision_from_chunks(deduped, claims_context=claims_context)
-                response["claimDecision"] = claim_decision
-            except Exception as e:
-                print(f"Warning: unable to generate claimDecision: {e}")
-
-            # Build a final answer: combined summary of answers across ALL extracted questions.
-            # We intentionally include every Q/A we produced (even if confidence is low),
-            # and only skip items that have no question text at all.
-            final_summary_text = ""
-            try:
-                with tracer.start_span('final-summary', child_of=parent0):
-                    llm_summary = ChatOpenAI(temperature=0.0, model="gpt-4o")
-                    qa_lines = []
-                    for r in results or []:
-                        if not r:
-                            continue
-                        q = (r.get("question") or "").strip()
-                        if not q:
-                            continue
-                        ctx = (r.get("context") or "").strip()
-                        a = (r.get("answer") or "").strip()
-                        # If answer is missing but question exists, keep a placeholder so the final summary
-                        # still reflects ALL extracted questions.
-                        if not a:
-                            a = "(No answer was generated for this question.)"
-                        if ctx:
-                            qa_lines.append(f"Q: {q}\nSituation: {ctx}\nA: {a}")
-                        else:
-                            qa_lines.append(f"Q: {q}\nA: {a}")
-
-                    qa_blob = "\n\n".join(qa_lines)
-                    if qa_blob.strip():
-                        summary_prompt = PromptTemplate(
-                            input_variables=["qa_blob"],
-                            template=(
-                                "You are writing the FINAL ANSWER for a claims transcript.\n"
-                                "IMPORTANT: Do NOT present the final answer as a list of each Q&A.\n"
-                                "Instead, synthesize ALL Q&A into an APPLIANCE/ITEM-BASED final answer.\n"
-                                "\n"
-                                "Task:\n"
-                                "- Identify the distinct appliance(s)/item(s)/system(s) mentioned across the Q&A.\n"
-                                "- Group/merge related questions into the correct item section (do not repeat the questions).\n"
-                                "- If the transcript includes multiple items with separate claims, show them as separate sections.\n"
-                                "\n"
-                                "For EACH item section, include in JSON FORMAT:\n"
-                                "- ITEM : <1,2,3...>\n"
-                                "- ITEM: <name> (add 1-line details if available: location/part/symptom)\n"
-                                "- TYPE: Appliance | System | Fixture | Other (infer from wording; if unclear use Other)\n"
-                                "- DECISION: APPROVED | REJECTED | PARTIAL | NEED_HUMAN_ASSISTANCE\n"
-                                "- AMOUNTS (only if mentioned in Q&A):\n"
-                                "  1. Customer quoted/asked: $...\n"
-                                "  2. Company can provide: $... (coverage amount/limit/service fee/deductible as stated in Q&A)\n"
-                                "- Situation: what happened / what customer is claiming (from Situation lines)\n"
-                                "- What's covered (numeric list, if any)\n"
-                                "- What's not covered / limitations (numeric list, if any)\n"
-                                "- Why (1–2 short sentences grounded in the Q&A outcomes; no policy speculation)\n"
-                                "- Next steps (specific actions the customer should take)\n"
-                                "\n"
-                                "CRITICAL DECISION RULES:\n"
-                                "- The DECISION field is MANDATORY and MUST NEVER be left empty for any item.\n"
-                                "- If it is confirmed that there is NO coverage for a particular item, the DECISION MUST be REJECTED.\n"
-                                "- If outcomes are mixed for the same item, use PARTIAL and clearly break down covered vs not covered.\n"
-                                "- If coverage cannot be determined, use NEED_HUMAN_ASSISTANCE.\n"
-                                "- Be concise, decisive, and avoid hypothetical/if-then language.\n"
-                                "- End with a short overall next step (1–2 bullets) if multiple items exist.\n\n"
-                                "{qa_blob}\n"
-                            ),
-                        )
-                        summary_chain = summary_prompt | llm_summary | StrOutputParser()
-                        final_summary_text = summary_chain.invoke({"qa_blob": qa_blob}).strip()
-            except Exception as e:
-                print(f"Warning: failed to generate final transcript summary: {e}")
-
-            # Ensure Final Answer is always present when we have questions (even if summarization failed).
-            if (not final_summary_text.strip()) and (results and len(results) > 0):
-                final_summary_text = "\n".join(
-                    [
-                        f"- {((r.get('answer') or '').strip() or '(No answer was generated for this question.)')}"
-                        for r in results
-                        if r and (r.get("question") or "").strip()
-                    ]
-                ).strip()
-
-            response["finalSummary"] = final_summary_text
-            response["finalAnswer"] = {
-                "question": "Final Answer for transcript",
-                "answer": final_summary_text,
-            }
-
-            total_chunks = sum(len(r.get("relevantChunks", [])) for r in results)
-            print(
-                "[CHUNKS] /transcripts/process: DONE "
-                f"fileName={file_metadata['fileName']}, "
-                f"questions={len(results)}, total_chunks={total_chunks}, "
-                f"avg_confidence={round(avg_confidence, 2)}, total_latency={round(total_latency, 2)}"
-            )
-
-            # Persist transcript Q&A and chunks in MongoDB (per user) in the existing chat collection
-            transcript_chats = []
-            now_ts = datetime.utcnow()
-            for res in results:
-                # chunks are list[str] in API contract; keep a text blob for legacy /referred-clauses
-                chunks = res.get("relevantChunks", []) or []
-                relevant_docs_text = "\n\n---\n\n".join([str(c) for c in chunks if str(c).strip()])
-                transcript_chats.append({
-                    "chat_id": res.get("questionId"),
-                    "entered_query": res.get("question", ""),
-                    "response": res.get("answer", ""),
-                    # For UI: keep chunks as JSON
-                    "relevant_chunks": chunks,
-                    # For existing /referred-clauses UI: keep a text version too
-                    "relevant_docs": relevant_docs_text,
-                    # Conversation is a Calls mode conversation in UI; keep underlying model separately.
-                    "gpt_model": "Calls",
-                    "underlying_model": gpt_model,
-                    "chat_timestamp": now_ts,
-                    "latency": res.get("latency", 0.0),
-                    "confidence": res.get("confidence", 0.0),
-                })
-
-            # Store final answer as a final chat entry in MongoDB, using a fixed question label
-            transcript_chats.append({
-                "chat_id": "final_answer",
-                "entered_query": "Final Answer for transcript",
-                "response": final_summary_text,
-                "relevant_chunks": [],
-                "relevant_docs": "",
-                "gpt_model": "Calls",
-                "underlying_model": gpt_model,
-                "chat_timestamp": now_ts,
-                "latency": 0.0,
-                "confidence": 0.0,
-            })
-
-            # Also include it in the response questions list so the UI can render it as the last Q/A.
-            response["questions"] = (response.get("questions") or []) + [{
-                "questionId": "final_answer",
-                "question": "Final Answer for transcript",
-                "answer": final_summary_text,
-                "relevantChunks": [],
-                "confidence": 0.0,
-                "latency": 0.0,
-            }]
-
-            transcript_doc = {
-                "doc_type": "transcript_conversation",
-                "conversation_mode": "Calls",
-                "underlying_model": gpt_model,
-                "conversation_name": conv_name or transcript_file_name,
-                "transcript_id": transcript_id,
-                "transcript_metadata": response["transcriptMetadata"],
-                "contract_type": contract_type,
-                "selected_plan": selected_plan,
-                "selected_state": selected_state,
-                "query_time": now_ts,
-                "updated_at": now_ts,
-                "status": transcript_status,
-                "processing": False,
-                "summary": response.get("summary"),
-                "final_summary": final_summary_text,
-                "claim_decision": response.get("claimDecision"),
-                "chats": transcript_chats,
-            }
-
-            # Update the conversation document created earlier (so sidebar shows it during processing).
-            if conv_doc_id is None:
-                inserted = qna_collection.insert_one(transcript_doc)
-                conv_doc_id = inserted.inserted_id
-            else:
-                qna_collection.update_one(
-                    {"_id": conv_doc_id},
-                    {"$set": transcript_doc},
-                )
-
-            updated_conv = qna_collection.find_one({"_id": conv_doc_id}) or {}
-
-            response["conversationId"] = str(conv_doc_id)
-            response["status"] = transcript_status
-            response["conversationName"] = updated_conv.get("conversation_name") or transcript_doc["conversation_name"]
-            # Persist full response payload for fast future reads
-            qna_collection.update_one(
-                {"_id": conv_doc_id},
-                {"$set": {"response_payload": response}},
-            )
-
-            print(
-                "[CHUNKS] /transcripts/process: stored transcript processing result "
-                f"transcript_id={transcript_id}, conversation_id={response['conversationId']}, "
-                f"questions={len(results)}, total_chunks={total_chunks}"
+            response = answer_and_store_transcript(
+                qna_collection,
+                questions,
+                transcript_id=transcript_id,
+                transcript_file_name=transcript_file_name,
+                file_metadata=file_metadata,
+                contract_type=contract_type,
+                selected_plan=selected_plan,
+                selected_state=selected_state,
+                gpt_model=gpt_model,
+                vector_db=vector_db1,
+                llm=llm,
+                llm2=llm2,
+                retriever=retriever,
+                conv_doc_id=conv_doc_id,
+                conv_name=conv_name,
+                transcript_status=transcript_status,
+                extraction_warning=extraction_warning,
+                callback_handler=handler,
+                parent_span=parent0,
             )
 
             return jsonify(response), 200
@@ -5836,36 +6662,25 @@ def process_transcript_internal():
             "details": str(e)
         }), 500
 
-@app.route("/webhook", methods=["POST"])
-def transcript_event():
-    # simple shared-secret auth
-    # auth = request.headers.get("authorization", "")
-    # if auth != f"Bearer {os.getenv('FLASK_AUTH_TOKEN')}":
-    #     return {"error": "unauthorized"}, 401
+def _transcript_event_key(data: Dict) -> str:
+    """Deterministic key for an Amazon Connect transcript event (the old five-field dedup tuple)."""
+    raw = json.dumps(
+        [
+            data.get("sessionId"),
+            data.get("speaker"),
+            data.get("text"),
+            data.get("beginOffsetMillis"),
+            data.get("endOffsetMillis"),
+        ],
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
-    data = request.get_json()
-    if not data:
-        return jsonify({"error": "invalid payload"}), 400
-    
-    session_id = data.get("sessionId")
-    if not session_id:
-        return jsonify({"error": "sessionId is required"}), 400
 
-    # Deduplication: Check if this exact transcript already exists
-    dedup_query = {
-        "sessionId": data.get("sessionId"),
-        "speaker": data.get("speaker"),
-        "text": data.get("text"),
-        "beginOffsetMillis": data.get("beginOffsetMillis"),
-        "endOffsetMillis": data.get("endOffsetMillis"),
-    }
-    
-    existing = transcripts_collection.find_one(dedup_query)
-    if existing:
-        # Already received this transcript, skip logging and storing
-        return jsonify({"ok": True, "duplicate": True}), 200
-
-    transcript_doc = {
+def _transcript_event_doc(data: Dict) -> Dict:
+    return {
+        "event_key": _transcript_event_key(data),
         "sessionId": data["sessionId"],
         "contactId": data.get("contactId"),
         "speaker": data.get("speaker"),
@@ -5876,24 +6691,87 @@ def transcript_event():
         "createdAt": data.get("createdAt")
     }
 
-    transcripts_collection.insert_one(transcript_doc)
 
-    # broadcast to UI via websocket
+def _store_transcript_events(docs: List[Dict]) -> List[bool]:
+    """
+    Append transcript events to their session's time bucket; returns a per-event "is new" flag.
+    A re-delivered event (same event_key) is detected by the bucket upsert itself, no find_one first,
+    and without relying on a secondary unique index (those are provisioned asynchronously, or not at all).
+    """
+    return call_transcripts.append(docs)
+
+
+def _create_room_emitter() -> RoomEmitter:
+    """Live-call events go to the call's room only (+ opted-in supervisors); partials are debounced."""
+    def room_emit(event, data, room):
+        return socketio.emit(event, data, room=room)
+
+    if _async_mode == "eventlet":
+        return RoomEmitter(room_emit, start_worker=socketio.start_background_task, sleep=socketio.sleep)
+    return RoomEmitter(room_emit)
+
+
+room_emitter = _create_room_emitter()
+
+
+def _emit_copilot_suggestion(session_id: str, copilot_result: Optional[Dict]) -> None:
+    if copilot_result:
+        print("🟢 COPILOT SUGGESTION:", json.dumps(copilot_result, indent=2, default=str))
+        # Emit suggestion to the call's UI
+        room_emitter.send("suggestion_update", session_id, copilot_result)
+
+
+def _create_copilot_dispatcher() -> Optional[CopilotDispatcher]:
+    """
+    Background copilot workers (COPILOT_WORKERS=0 keeps the old inline processing).
+    eventlet: workers are Socket.IO background tasks waiting on an eventlet queue and the blocking
+    copilot call runs in eventlet's OS thread pool, so emits stay on green threads (interim answer
+    cards are handed back through the dispatcher's pump).
+    """
+    if not LIVE_COPILOT_AVAILABLE or not COPILOT_WORKERS:
+        return None
+    if _async_mode == "eventlet":
+        from eventlet import tpool
+
+        return CopilotDispatcher(
+            handle_transcript_event,
+            _emit_copilot_suggestion,
+            coalesce=note_transcript_event,
+            on_interim=_emit_copilot_suggestion,
+            start_worker=socketio.start_background_task,
+            make_queue=socketio.server.eio.create_queue,
+            run_blocking=tpool.execute,
+            sleep=socketio.sleep,
+        )
+    return CopilotDispatcher(
+        handle_transcript_event,
+        _emit_copilot_suggestion,
+        coalesce=note_transcript_event,
+        on_interim=_emit_copilot_suggestion,
+    )
+
+
+copilot_dispatcher = _create_copilot_dispatcher()
+
+
+def _publish_transcript_event(data: Dict) -> None:
+    session_id = data["sessionId"]
+
+    # send to the call's UI via websocket (partials debounced per utterance)
     # 🔥 LOG TRANSCRIPT EVENT
     print("🔴 TRANSCRIPT RECEIVED:", json.dumps(data, indent=2))
-    socketio.emit("transcript_update", data)
-    socketio.emit("transcript_update", data, room=data["sessionId"])
+    room_emitter.send_transcript(data)
 
     # ========== LIVE COPILOT: Real-time AI suggestions ==========
     # Process through Live Copilot if:
     # 1. Module is available
     # 2. Feature flag is enabled
     # 3. Session has copilot enabled (via copilot_enable from UI)
-    # 4. Transcript is complete (not partial)
+    # 4. Transcript is complete (not partial); partials only feed speculation (COPILOT_SPECULATE=1)
     if (
         LIVE_COPILOT_AVAILABLE
         and _flag_enabled("ENABLE_LIVE_COPILOT", "0")
-        and not data.get("isPartial", True)
+        and (not data.get("isPartial", True) or COPILOT_SPECULATE)
     ):
         try:
             # Build copilot payload with session context
@@ -5913,22 +6791,188 @@ def transcript_event():
                 "contractType": data.get("contractType"),
                 "plan": data.get("plan"),
             }
-            
-            # Call Live Copilot to process transcript
-            copilot_result = handle_transcript_event(copilot_payload)
-            
-            if copilot_result:
-                print("🟢 COPILOT SUGGESTION:", json.dumps(copilot_result, indent=2, default=str))
-                # Emit suggestion to UI
-                socketio.emit("suggestion_update", copilot_result)
-                socketio.emit("suggestion_update", copilot_result, room=session_id)
+
+            if data.get("isPartial", True):
+                # Non-blocking: may start pre-processing once the partial stops changing
+                observe_partial(copilot_payload)
+            elif copilot_dispatcher is not None:
+                # Acknowledge the webhook now; a worker runs the copilot and emits suggestion_update
+                copilot_dispatcher.submit(session_id, copilot_payload)
+            else:
+                _emit_copilot_suggestion(
+                    session_id,
+                    handle_transcript_event(
+                        copilot_payload, publish=lambda update: _emit_copilot_suggestion(session_id, update)
+                    ),
+                )
         except Exception as e:
             print(f"⚠️ Copilot processing error (non-blocking): {e}")
             import traceback
             traceback.print_exc()
     # =============================================================
 
-    return jsonify({"ok": True}), 200
+
+@app.route("/webhook", methods=["POST"])
+def transcript_event():
+    """
+    Amazon Connect transcript events.
+    Body is one event, or a JSON array of events for bursts (stored with one unordered bulk_write).
+    Events are $push-upserted into per-session time buckets; duplicates (same
+    sessionId/speaker/text/offsets) are detected by event_key within the bucket.
+    """
+    # simple shared-secret auth
+    # auth = request.headers.get("authorization", "")
+    # if auth != f"Bearer {os.getenv('FLASK_AUTH_TOKEN')}":
+    #     return {"error": "unauthorized"}, 401
+
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "invalid payload"}), 400
+
+    events = data if isinstance(data, list) else [data]
+    for event in events:
+        if not isinstance(event, dict) or not event.get("sessionId"):
+            return jsonify({"error": "sessionId is required"}), 400
+
+    is_new = _store_transcript_events([_transcript_event_doc(e) for e in events])
+
+    for event, new in zip(events, is_new):
+        if new:
+            _publish_transcript_event(event)
+
+    if not isinstance(data, list):
+        if not is_new[0]:
+            # Already received this transcript, skip logging and storing
+            return jsonify({"ok": True, "duplicate": True}), 200
+        return jsonify({"ok": True}), 200
+
+    return jsonify({"ok": True, "received": len(events), "duplicates": is_new.count(False)}), 200
+
+
+@app.route("/calls/<session_id>/transcript", methods=["GET"])
+def call_transcript(session_id):
+    """Whole live call transcript: the compacted document (one fetch) or, while live, its buckets merged."""
+    with tracer.start_span('api/calls/transcript'):
+        authorization_header = request.headers.get("Authorization")
+
+        if authorization_header is None:
+            return jsonify({"message": "Token is missing"}), 401
+
+        if authorization_header:
+            token_data = token_process(authorization_header)
+
+            if token_data[1] == 401 or token_data[1] == 403:
+                return (token_data[0].get_json()), token_data[1]
+
+        doc = call_transcripts.read_call(session_id)
+        if not doc:
+            return jsonify({"error": "No transcript found for session"}), 404
+        utterances = [
+            {k: v for k, v in u.items() if k != "event_key"} for u in doc.get("utterances") or []
+        ]
+        return make_response(
+            json.dumps(
+                {
+                    "sessionId": session_id,
+                    "contactId": doc.get("contactId"),
+                    "closed": doc.get("closed", False),
+                    "utterances": utterances,
+                    "utteranceCount": len(utterances),
+                    "durationMillis": doc.get("durationMillis"),
+                    "startedAt": doc.get("started_at"),
+                    "endedAt": doc.get("ended_at"),
+                },
+                default=str,
+            ),
+            200,
+            {"Content-Type": "application/json"},
+        )
+
+
+@app.route("/internal/copilot/metrics", methods=["GET"])
+def copilot_metrics():
+    """
+    Live Copilot work queue: depth per session, in-flight, lag (webhook -> start) and processing time,
+    plus per-mode (multi / fused) LLM latency, shadow-comparison agreement, live session memory,
+    speculation hit rate / final->suggestion latency, the cross-session answer cache hit rate and how many
+    intents the local classifier served without the LLM.
+    """
+    expected = os.getenv("INTERNAL_PROCESS_SECRET")
+    got = request.headers.get("X-Internal-Auth")
+    if not expected or got != expected:
+        return jsonify({"error": "unauthorized"}), 401
+    extra = {
+        "reasoning": reasoning_stats() if LIVE_COPILOT_AVAILABLE else None,
+        "speculation": speculation_stats() if LIVE_COPILOT_AVAILABLE else None,
+        "answerCache": answer_cache_stats() if LIVE_COPILOT_AVAILABLE else None,
+        "intent": intent_stats() if LIVE_COPILOT_AVAILABLE else None,
+        "sessions": {
+            "enabled": _copilot_sessions.stats(),
+            "state": session_stats() if LIVE_COPILOT_AVAILABLE else None,
+        },
+    }
+    if copilot_dispatcher is None:
+        return jsonify({"enabled": False, "inline": LIVE_COPILOT_AVAILABLE, **extra}), 200
+    return jsonify({"enabled": True, **copilot_dispatcher.stats(), **extra}), 200
+
+
+@app.route("/internal/writes/health", methods=["GET"])
+def write_behind_health():
+    """
+    Write-behind health: pending / written / dropped ops and where dropped ops were dead-lettered.
+    status is "degraded" once any acknowledged write was dropped (replay it from the dead letter).
+    """
+    expected = os.getenv("INTERNAL_PROCESS_SECRET")
+    got = request.headers.get("X-Internal-Auth")
+    if not expected or got != expected:
+        return jsonify({"error": "unauthorized"}), 401
+    if write_behind is None:
+        return jsonify({"enabled": False, "status": "ok"}), 200
+    return jsonify({"enabled": True, **write_behind.health()}), 200
+
+
+@app.route("/internal/socket/metrics", methods=["GET"])
+def socket_metrics():
+    """Live-call Socket.IO delivery: sends per event, coalesced partials and per-room emit rate (last minute)."""
+    expected = os.getenv("INTERNAL_PROCESS_SECRET")
+    got = request.headers.get("X-Internal-Auth")
+    if not expected or got != expected:
+        return jsonify({"error": "unauthorized"}), 401
+    return jsonify(room_emitter.stats()), 200
+
+
+@app.route("/internal/calls/compact", methods=["POST"])
+def compact_call_transcripts():
+    """
+    Compact idle call sessions now (same job as the background compactor; for Cloud Scheduler).
+
+    Query Parameters:
+    - idleSec (int, optional): sessions idle at least this long (default: CALL_SESSION_IDLE_S)
+    - limit (int, optional): max sessions per run (default: 500)
+    """
+    try:
+        with tracer.start_span('api/internal/calls/compact'):
+            expected = os.getenv("INTERNAL_PROCESS_SECRET")
+            got = request.headers.get("X-Internal-Auth")
+            if not expected or got != expected:
+                return jsonify({"error": "unauthorized"}), 401
+
+            kwargs = {}
+            try:
+                if request.args.get("idleSec"):
+                    kwargs["idle_s"] = max(0, int(request.args["idleSec"]))
+                if request.args.get("limit"):
+                    kwargs["limit"] = max(1, int(request.args["limit"]))
+            except ValueError:
+                return jsonify({"error": "idleSec and limit must be integers"}), 400
+
+            result = call_transcripts.compact_closed_sessions(**kwargs)
+            return make_response(json.dumps(result, default=str), 200, {"Content-Type": "application/json"})
+    except Exception as e:
+        import traceback
+        print(f"Error in /internal/calls/compact endpoint: {str(e)}")
+        print(f"Traceback: {traceback.format_exc()}")
+        return jsonify({"error": "An error occurred while compacting call transcripts", "details": str(e)}), 500
 
 @socketio.on("connect")
 def on_connect(auth):
@@ -5988,36 +7032,63 @@ def on_copilot_enable(data):
     """Enable Live Copilot for a session when call connects."""
     session_id = data.get("sessionId")
     if session_id:
-        with _copilot_sessions_lock:
-            _copilot_enabled_sessions[session_id] = time() + _copilot_session_ttl_seconds()
-            _copilot_session_context[session_id] = {
+        _copilot_sessions.put(session_id, {
+            "expiresAt": time() + _copilot_session_ttl_seconds(),
+            "context": {
                 "contractType": data.get("contractType", ""),
                 "selectedPlan": data.get("selectedPlan", ""),
                 "selectedState": data.get("selectedState", ""),
-            }
+            },
+        })
         print(f"🟢 COPILOT ENABLED for session: {session_id}")
         # Emit status back to UI
-        socketio.emit("copilot_status", {
+        room_emitter.send("copilot_status", session_id, {
             "sessionId": session_id,
             "enabled": True
-        }, room=session_id)
+        })
 
 @socketio.on("copilot_disable")
 def on_copilot_disable(data):
     """Disable Live Copilot when call ends."""
     session_id = data.get("sessionId")
     if session_id:
-        with _copilot_sessions_lock:
-            _copilot_enabled_sessions.pop(session_id, None)
-            _copilot_session_context.pop(session_id, None)
+        _copilot_sessions.delete(session_id)
+        if LIVE_COPILOT_AVAILABLE:
+            end_session(session_id)
         print(f"🔴 COPILOT DISABLED for session: {session_id}")
         # Emit status back to UI
-        socketio.emit("copilot_status", {
+        room_emitter.send("copilot_status", session_id, {
             "sessionId": session_id,
             "enabled": False
-        }, room=session_id)
+        })
+
+@socketio.on("join_supervisor")
+def on_join_supervisor(data=None):
+    """Opt-in supervisor channel: every live call's transcript / suggestion updates (SOCKET_SUPERVISOR_EMAILS only)."""
+    user_email = (session.get("user_email") or "").lower()
+    if not user_email or user_email not in SOCKET_SUPERVISOR_EMAILS:
+        print(f"❌ join_supervisor refused for {user_email or 'anonymous socket'}")
+        return
+    join_room(room_emitter.supervisor_room)
+    room_emitter.add_supervisor(request.sid)
+    print(f"✅ Supervisor joined: {user_email}")
+
+@socketio.on("leave_supervisor")
+def on_leave_supervisor(data=None):
+    leave_room(room_emitter.supervisor_room)
+    room_emitter.remove_supervisor(request.sid)
+
+@socketio.on("disconnect")
+def on_disconnect(*args):
+    room_emitter.remove_supervisor(request.sid)
 
 if __name__ == "__main__":
+    call_transcripts.start_compactor()
+
+    if write_behind is not None:
+        # docker stop sends SIGTERM to this process (PID 1); exit normally so atexit flushes queued writes.
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
     # use_reloader=False to avoid Windows socket errors during reload
     port = int(os.getenv("PORT", "8001"))
     debug = str(os.getenv("FLASK_DEBUG", "0")).lower() in ("1", "true", "yes")
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Offline batch transcript processor.
+
+Runs the /transcripts/process pipeline (question extraction -> retrieval + answering ->
+claim decision -> final summary) over many transcripts without going through HTTP, and
+writes the same transcript_conversation documents (chats + response_payload) the
+endpoints read, so CSRs opening a processed transcript get the cached result.
+
+- Source: the whole transcript bucket (default) or a manifest (.jsonl / .json / .csv / .txt)
+- Bounded concurrency with shared warm clients (one Milvus store + LLM set per collection)
+- Checkpoint file (JSONL) so an interrupted run resumes where it stopped
+- Throughput report: transcripts/min and tokens/min
+- OpenAI rate limits: tokens-per-minute budget + client retries with backoff
+
+Examples:
+  python batch_process_transcripts.py --user-email csr@frontdoor.com --concurrency 4
+  python batch_process_transcripts.py --user-email csr@frontdoor.com --manifest backlog.csv --tpm 200000
+  python batch_process_transcripts.py --user-email csr@frontdoor.com --contract-type RE --plan ShieldPlus --state CA --limit 50
+
+Manifest rows need `transcriptFileName`; optional per-row `contractType`, `selectedPlan`,
+`selectedState`, `gptModel`, `userEmail` override the command-line defaults. When the plan
+context is not given anywhere it is taken from the transcript's own metadata.
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from time import time, sleep
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app  # noqa: E402  (initializes Mongo, GCS, embeddings exactly like the server)
+from langchain_openai import ChatOpenAI  # noqa: E402
+from langchain_community.callbacks import get_openai_callback  # noqa: E402
+
+try:
+    from openai import RateLimitError
+except ImportError:  # pragma: no cover - openai is a langchain-openai dependency
+    RateLimitError = None
+
+
+# -------------------------------------------------------------------
+# Rate limiting
+# -------------------------------------------------------------------
+class TokenRateLimiter:
+    """
+    Sliding one-minute token budget. Workers reserve an estimate before a transcript and
+    settle with the real usage afterwards, so the fleet stays under the OpenAI TPM limit.
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self._window = deque()  # [timestamp, tokens]
+        self._lock = threading.Lock()
+
+    def _used_locked(self, now: float) -> int:
+        while self._window and now - self._window[0][0] > 60:
+            self._window.popleft()
+        return sum(t for _, t in self._window)
+
+    def acquire(self, tokens: int) -> list:
+        if not self.tokens_per_minute:
+            return [time(), 0]
+        while True:
+            with self._lock:
+                now = time()
+                used = self._used_locked(now)
+                if used == 0 or used + tokens <= self.tokens_per_minute:
+                    entry = [now, tokens]
+                    self._window.append(entry)
+                    return entry
+                wait = 60 - (now - self._window[0][0]) if self._window else 1
+            sleep(max(0.5, min(wait, 5)))
+
+    def settle(self, entry: list, actual_tokens: int) -> None:
+        with self._lock:
+            entry[1] = actual_tokens
+
+
+# -------------------------------------------------------------------
+# Checkpointing + stats
+# -------------------------------------------------------------------
+class Checkpoint:
+    """Append-only JSONL of finished transcripts; `ok`/`cached`/`skipped` entries are not retried."""
+
+    FINAL = {"ok", "cached", "skipped"}
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except Exception:
+                        continue
+                    if rec.get("status") in self.FINAL:
+                        self.done.add(self._key(rec.get("transcriptFileName"), rec.get("userEmail")))
+
+    @staticmethod
+    def _key(file_name: str, user_email: str) -> str:
+        return f"{user_email}|{file_name}"
+
+    def is_done(self, file_name: str, user_email: str) -> bool:
+        return self._key(file_name, user_email) in self.done
+
+    def record(self, rec: Dict[str, Any]) -> None:
+        rec = dict(rec, at=datetime.utcnow().isoformat())
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(rec, default=str) + "\n")
+            if rec.get("status") in self.FINAL:
+                self.done.add(self._key(rec.get("transcriptFileName"), rec.get("userEmail")))
+
+
+class Stats:
+    def __init__(self, total: int):
+        self.total = total
+        self.started = time()
+        self.counts = {"ok": 0, "cached": 0, "skipped": 0, "failed": 0}
+        self.tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, status: str, tokens: int = 0) -> None:
+        with self._lock:
+            self.counts[status] = self.counts.get(status, 0) + 1
+            self.tokens += tokens or 0
+
+    def avg_tokens(self, default: int) -> int:
+        with self._lock:
+            return int(self.tokens / self.counts["ok"]) if self.counts["ok"] else default
+
+    def line(self) -> str:
+        with self._lock:
+            minutes = max((time() - self.started) / 60.0, 1e-6)
+            finished = sum(self.counts.values())
+            return (
+                f"{finished}/{self.total} | ok={self.counts['ok']} cached={self.counts['cached']} "
+                f"skipped={self.counts['skipped']} failed={self.counts['failed']} | "
+                f"{self.counts['ok'] / minutes:.2f} transcripts/min | {self.tokens / minutes:,.0f} tokens/min"
+            )
+
+
+# -------------------------------------------------------------------
+# Work items
+# -------------------------------------------------------------------
+def load_manifest(path: str) -> List[Dict[str, Any]]:
+    items = []
+    if path.endswith(".jsonl"):
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    items.append(json.loads(line))
+    elif path.endswith(".json"):
+        with open(path, "r") as f:
+            data = json.load(f)
+        items = data if isinstance(data, list) else data.get("transcripts", [])
+    elif path.endswith(".csv"):
+        with open(path, "r", newline="") as f:
+            items = [dict(row) for row in csv.DictReader(f)]
+    else:
+        with open(path, "r") as f:
+            items = [{"transcriptFileName": line.strip()} for line in f if line.strip()]
+
+    out = []
+    for it in items:
+        if isinstance(it, str):
+            it = {"transcriptFileName": it}
+        name = it.get("transcriptFileName") or it.get("fileName")
+        if name:
+            out.append(dict(it, transcriptFileName=name))
+    return out
+
+
+def list_bucket(limit: Optional[int]) -> List[Dict[str, Any]]:
+    # Listing also fills the transcript path map, metadata cache and search index.
+    files = app.list_transcript_files_gcp()
+    items = [
+        {
+            "transcriptFileName": f["fileName"],
+            "metadata": {"contractType": f.get("contractType"), "planType": f.get("planType"), "state": f.get("state")},
+        }
+        for f in files
+    ]
+    return items[:limit] if limit else items
+
+
+# -------------------------------------------------------------------
+# Processing
+# -------------------------------------------------------------------
+_extract_llm = None
+_extract_llm_lock = threading.Lock()
+
+
+def _get_extract_llm(max_retries: int):
+    global _extract_llm
+    with _extract_llm_lock:
+        if _extract_llm is None:
+            _extract_llm = ChatOpenAI(temperature=0.0, model="gpt-4o", max_retries=max_retries)
+        return _extract_llm
+
+
+def _extract_questions(transcript_file_name: str, transcript_text: str, max_retries: int):
+    artifacts = app._load_transcript_artifacts(transcript_file_name)
+    if artifacts:
+        return [dict(q) for q in artifacts.get("questions") or []], artifacts.get("extraction_warning")
+
+    llm_extract = _get_extract_llm(max_retries)
+    questions = app.extract_relevant_customer_questions(transcript_text, llm_extract)
+    if not questions:
+        questions = app.extract_questions_with_agent(transcript_text, llm_extract)
+    if questions:
+        return questions, None
+    return [{
+        "question": f"Is this issue covered: {transcript_text[:120]}",
+        "context": transcript_text[:400],
+        "questionType": "coverage",
+        "userIntent": "Customer wants to know if the described issue is covered",
+        "questionId": "q1",
+    }], "No questions could be extracted from transcript; inferring from context."
+
+
+def process_item(item: Dict[str, Any], args, limiter: TokenRateLimiter, stats: Stats) -> Dict[str, Any]:
+    name = item["transcriptFileName"]
+    user_email = item.get("userEmail") or args.user_email
+    gpt_model = item.get("gptModel") or args.gpt_model
+    transcript_id = name.replace(".json", "").replace(".txt", "")
+    rec = {"transcriptFileName": name, "userEmail": user_email}
+    qna_collection = app._chats_collection(user_email)
+
+    if not args.force:
+        existing = qna_collection.find_one(
+            {"doc_type": "transcript_conversation", "transcript_id": transcript_id, "response_payload": {"$exists": True}},
+            {"_id": 1},
+        )
+        if existing:
+            return dict(rec, status="cached", conversationId=str(existing["_id"]))
+
+    transcript_content, file_metadata = app.read_transcript_file_gcp(name)
+
+    # Plan context: manifest row > command line > transcript metadata
+    # Listings can carry a metadata dict with every value None (not extracted yet, e.g. large files)
+    meta = item.get("metadata") or {}
+    if not any(meta.values()):
+        meta = app.extract_transcript_metadata(transcript_content, name)
+    contract_type = item.get("contractType") or args.contract_type or meta.get("contractType")
+    selected_plan = item.get("selectedPlan") or args.plan or meta.get("planType")
+    selected_state = item.get("selectedState") or args.state or meta.get("state")
+    if not all([contract_type, selected_plan, selected_state]):
+        return dict(rec, status="skipped", reason="missing contractType/selectedPlan/selectedState")
+
+    clients = app.get_transcript_clients(contract_type, selected_plan, selected_state, gpt_model, max_retries=args.max_retries)
+
+    status_doc = qna_collection.find_one(
+        {"doc_type": "transcript_status", "transcript_id": transcript_id}, {"_id": 0, "status": 1}
+    )
+    transcript_status = (status_doc or {}).get("status") or "active"
+
+    reservation = limiter.acquire(stats.avg_tokens(args.token_estimate))
+    started = time()
+    tokens = 0
+    try:
+        with get_openai_callback() as cb:
+            questions, warning = _extract_questions(
+                name, app._transcript_text_for_extraction(transcript_content), args.max_retries
+            )
+            response = app.answer_and_store_transcript(
+                qna_collection,
+                questions,
+                transcript_id=transcript_id,
+                transcript_file_name=name,
+                file_metadata=file_metadata,
+                contract_type=contract_type,
+                selected_plan=selected_plan,
+                selected_state=selected_state,
+                gpt_model=gpt_model,
+                vector_db=clients["vectorDb"],
+                llm=clients["llm"],
+                llm2=clients["llm2"],
+                retriever=clients["retriever"],
+                conv_name=name,
+                transcript_status=transcript_status,
+                extraction_warning=warning,
+            )
+            tokens = cb.total_tokens
+    finally:
+        limiter.settle(reservation, tokens)
+
+    return dict(
+        rec,
+        status="ok",
+        conversationId=response.get("conversationId"),
+        collection=clients["collectionName"],
+        questions=len(questions),
+        tokens=tokens,
+        elapsedSec=round(time() - started, 2),
+    )
+
+
+def process_with_retries(item: Dict[str, Any], args, limiter: TokenRateLimiter, stats: Stats) -> Dict[str, Any]:
+    delay = 5.0
+    for attempt in range(1, args.retries + 2):
+        try:
+            return process_item(item, args, limiter, stats)
+        except Exception as e:
+            rate_limited = RateLimitError is not None and isinstance(e, RateLimitError)
+            if attempt > args.retries or not rate_limited:
+                return {
+                    "transcriptFileName": item["transcriptFileName"],
+                    "userEmail": item.get("userEmail") or args.user_email,
+                    "status": "failed",
+                    "error": f"{type(e).__name__}: {e}",
+                }
+            print(f"[BATCH] rate limited on {item['transcriptFileName']}; retry {attempt} in {delay:.0f}s")
+            sleep(delay)
+            delay = min(delay * 2, 120)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Batch-process transcripts into cached transcript conversations")
+    parser.add_argument("--user-email", required=True, help="Owner of the stored conversations (chats_<email>)")
+    parser.add_argument("--manifest", help="Manifest file (.jsonl/.json/.csv/.txt); default walks the bucket")
+    parser.add_argument("--contract-type", help="Default contractType (RE/DTC)")
+    parser.add_argument("--plan", help="Default selectedPlan")
+    parser.add_argument("--state", help="Default selectedState")
+    parser.add_argument("--gpt-model", default="Search", choices=["Search", "Infer"])
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_CONCURRENCY", "4")))
+    parser.add_argument("--limit", type=int, default=None, help="Process at most N transcripts")
+    parser.add_argument("--checkpoint", default="batch_checkpoint.jsonl")
+    parser.add_argument("--force", action="store_true", help="Reprocess even if a cached conversation exists")
+    parser.add_argument("--tpm", type=int, default=int(os.getenv("OPENAI_TPM_LIMIT", "150000")),
+                        help="OpenAI tokens-per-minute budget shared by all workers (0 = unlimited)")
+    parser.add_argument("--token-estimate", type=int, default=20000,
+                        help="Tokens reserved per transcript until real usage is known")
+    parser.add_argument("--max-retries", type=int, default=6, help="Per-request OpenAI client retries")
+    parser.add_argument("--retries", type=int, default=3, help="Per-transcript retries after rate-limit errors")
+    args = parser.parse_args()
+
+    items = load_manifest(args.manifest) if args.manifest else list_bucket(args.limit)
+    if args.manifest and args.limit:
+        items = items[: args.limit]
+
+    checkpoint = Checkpoint(args.checkpoint)
+    pending = [
+        it for it in items
+        if not checkpoint.is_done(it["transcriptFileName"], it.get("userEmail") or args.user_email)
+    ]
+    print(
+        f"[BATCH] {len(items)} transcript(s) listed, {len(items) - len(pending)} already in checkpoint, "
+        f"{len(pending)} to process | concurrency={args.concurrency} tpm={args.tpm or 'unlimited'}"
+    )
+    if not pending:
+        return 0
+
+    limiter = TokenRateLimiter(args.tpm)
+    stats = Stats(len(pending))
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+        futures = {pool.submit(process_with_retries, it, args, limiter, stats): it for it in pending}
+        try:
+            for fut in as_completed(futures):
+                rec = fut.result()
+                checkpoint.record(rec)
+                stats.add(rec["status"], rec.get("tokens", 0))
+                detail = rec.get("error") or rec.get("reason") or rec.get("conversationId") or ""
+                print(f"[BATCH] {rec['status']:<7} {rec['transcriptFileName']} {detail}")
+                print(f"[BATCH] {stats.line()}")
+        except KeyboardInterrupt:
+            print("[BATCH] interrupted; finished transcripts are checkpointed, rerun to resume")
+            for f in futures:
+                f.cancel()
+            return 130
+
+    print("=" * 60)
+    print(f"[BATCH] done: {stats.line()}")
+    return 0 if stats.counts.get("failed", 0) == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from time import time, sleep
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+
+# -------------------------------------------------------------------
+# Call transcript store (bucket pattern)
+#
+# /webhook used to insert one document per Amazon Connect event, partials included,
+# so call_transcripts grew without bound. Events now land in time buckets:
+#
+#   call_transcript_buckets   _id "<sessionId>:<bucket>", one per session per
+#                             CALL_TRANSCRIPT_BUCKET_MS of call time (beginOffsetMillis):
+#                               utterances: [final events (with event_key), in arrival order]
+#                               partials:   {speaker: latest partial}   (overwritten, never grows)
+#                             TTL on last_at (CALL_TRANSCRIPT_BUCKET_TTL_DAYS) as a safety net
+#   call_transcripts_compact  _id sessionId: the whole call as one ordered transcript, written by
+#                             compact_closed_sessions() once a session has been idle for
+#                             CALL_SESSION_IDLE_S; its buckets are then deleted.
+#                             Optional TTL on compacted_at (CALL_TRANSCRIPT_ARCHIVE_DAYS, 0 = keep)
+#
+# Ingest is one $push upsert per event (or one bulk_write per burst). A duplicate event
+# fails the {"utterances.event_key": {$ne: key}} filter, so its upsert collides on _id instead of
+# pushing twice. Dedup therefore rests on the built-in _id index only: it holds from the first
+# insert, before startup index provisioning has run and with MONGO_ENSURE_INDEXES=0.
+# Once a session is compacted its buckets are gone, so finals are first checked against the
+# compacted document's event keys: a redelivery after compaction is dropped, not re-bucketed.
+# Reading a closed call is a single document fetch.
+# -------------------------------------------------------------------
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        raw = (os.getenv(name) or "").strip()
+        if not raw:
+            return default
+        v = int(raw)
+        return v if v >= 0 else default
+    except Exception:
+        return default
+
+
+CALL_TRANSCRIPT_BUCKET_MS = _env_int("CALL_TRANSCRIPT_BUCKET_MS", 60000) or 60000
+CALL_TRANSCRIPT_BUCKET_TTL_DAYS = _env_int("CALL_TRANSCRIPT_BUCKET_TTL_DAYS", 30)
+CALL_TRANSCRIPT_ARCHIVE_DAYS = _env_int("CALL_TRANSCRIPT_ARCHIVE_DAYS", 0)
+CALL_SESSION_IDLE_S = _env_int("CALL_SESSION_IDLE_S", 900)
+CALL_TRANSCRIPT_COMPACT_INTERVAL_S = _env_int("CALL_TRANSCRIPT_COMPACT_INTERVAL_S", 300)
+
+BUCKETS_COLLECTION = "call_transcript_buckets"
+COMPACT_COLLECTION = "call_transcripts_compact"
+
+_FIELD_UNSAFE_RE = re.compile(r"[.$]")
+
+
+def bucket_indexes():
+    specs = [
+        ([("sessionId", ASCENDING), ("bucket", ASCENDING)], {"name": "session_bucket"}),
+        ([("last_at", ASCENDING)], {"name": "last_at"}),
+    ]
+    if CALL_TRANSCRIPT_BUCKET_TTL_DAYS:
+        specs[1] = (
+            [("last_at", ASCENDING)],
+            {"name": "last_at_ttl", "expireAfterSeconds": CALL_TRANSCRIPT_BUCKET_TTL_DAYS * 86400},
+        )
+    return specs
+
+
+def compact_indexes():
+    specs = [([("contactId", ASCENDING)], {"name": "contact"})]
+    if CALL_TRANSCRIPT_ARCHIVE_DAYS:
+        specs.append(
+            ([("compacted_at", ASCENDING)], {"name": "compacted_at_ttl", "expireAfterSeconds": CALL_TRANSCRIPT_ARCHIVE_DAYS * 86400})
+        )
+    else:
+        specs.append(([("compacted_at", DESCENDING)], {"name": "compacted_at"}))
+    return specs
+
+
+def _bucket_of(event: Dict[str, Any]) -> int:
+    try:
+        return max(0, int(event.get("beginOffsetMillis") or 0)) // CALL_TRANSCRIPT_BUCKET_MS
+    except (TypeError, ValueError):
+        return 0
+
+
+def _utterance(event: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "event_key": event["event_key"],
+        "speaker": event.get("speaker"),
+        "text": event.get("text"),
+        "beginOffsetMillis": event.get("beginOffsetMillis"),
+        "endOffsetMillis": event.get("endOffsetMillis"),
+        "createdAt": event.get("createdAt"),
+    }
+
+
+def _offset_key(u: Dict[str, Any]):
+    begin, end = u.get("beginOffsetMillis"), u.get("endOffsetMillis")
+    return (begin is None, begin or 0, end is None, end or 0)
+
+
+class CallTranscriptStore:
+    def __init__(self, db):
+        self.buckets = db[BUCKETS_COLLECTION]
+        self.compact = db[COMPACT_COLLECTION]
+        self._compact_lock = threading.Lock()
+        self.compacted_sessions = 0
+        self.last_compaction: Optional[Dict[str, Any]] = None
+
+    # ---------------------------------------------------------------
+    # ingest
+    # ---------------------------------------------------------------
+    def _op(self, event: Dict[str, Any], now: datetime) -> UpdateOne:
+        """Upsert for one event (with event_key); a duplicate makes the upsert collide on _id."""
+        session_id = event["sessionId"]
+        bucket = _bucket_of(event)
+        bucket_id = f"{session_id}:{bucket}"
+        on_insert = {"sessionId": session_id, "bucket": bucket, "first_at": now}
+        if event.get("isPartial", True):
+            speaker = _FIELD_UNSAFE_RE.sub("_", str(event.get("speaker") or "UNKNOWN"))
+            field = f"partials.{speaker}"
+            return UpdateOne(
+                {"_id": bucket_id, f"{field}.event_key": {"$ne": event["event_key"]}},
+                {
+                    "$set": {field: _utterance(event), "last_at": now, "contactId": event.get("contactId")},
+                    "$setOnInsert": on_insert,
+                },
+                upsert=True,
+            )
+        return UpdateOne(
+            {"_id": bucket_id, "utterances.event_key": {"$ne": event["event_key"]}},
+            {
+                "$push": {"utterances": _utterance(event)},
+                "$inc": {"count": 1},
+                "$set": {"last_at": now, "contactId": event.get("contactId")},
+                "$setOnInsert": on_insert,
+            },
+            upsert=True,
+        )
+
+    def _apply_one(self, event: Dict[str, Any], now: datetime) -> bool:
+        op = self._op(event, now)
+        for _ in range(2):
+            try:
+                self.buckets.bulk_write([op])
+                return True
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors") or []
+                if not errors or errors[0].get("code") != 11000:
+                    raise
+            # Collided on _id: either a real duplicate, or a concurrent first write to the same
+            # bucket (the bucket now exists, so retrying the upsert pushes normally).
+            if self._seen(event):
+                return False
+        return False
+
+    def _seen(self, event: Dict[str, Any]) -> bool:
+        bucket_id = f"{event['sessionId']}:{_bucket_of(event)}"
+        key = event["event_key"]
+        if event.get("isPartial", True):
+            speaker = _FIELD_UNSAFE_RE.sub("_", str(event.get("speaker") or "UNKNOWN"))
+            query = {"_id": bucket_id, f"partials.{speaker}.event_key": key}
+        else:
+            query = {"_id": bucket_id, "utterances.event_key": key}
+        return self.buckets.find_one(query, {"_id": 1}) is not None
+
+    def _compacted_keys(self, events: List[Dict[str, Any]]) -> set:
+        """event_keys of final events already folded into their session's compacted transcript."""
+        keys_by_session: Dict[str, List[str]] = {}
+        for e in events:
+            if not e.get("isPartial", True):
+                keys_by_session.setdefault(e["sessionId"], []).append(e["event_key"])
+        compacted = set()
+        for session_id, keys in keys_by_session.items():
+            doc = self.compact.find_one({"_id": session_id, "utterances.event_key": {"$in": keys}}, {"utterances.event_key": 1})
+            if doc:
+                compacted.update(u.get("event_key") for u in doc.get("utterances") or [])
+        return compacted
+
+    def append(self, events: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Store transcript events (each with event_key); returns a per-event "is new" flag.
+        Finals already in a compacted transcript are not new. Otherwise one event: one upsert.
+        Bursts: one unordered bulk_write; ops that collided are re-checked one by one
+        (a duplicate, or two events racing to create the same bucket).
+        """
+        now = datetime.utcnow()
+        compacted = self._compacted_keys(events)
+        is_new = [e.get("isPartial", True) or e["event_key"] not in compacted for e in events]
+        pending = [i for i, flag in enumerate(is_new) if flag]
+        if len(pending) == 1:
+            is_new[pending[0]] = self._apply_one(events[pending[0]], now)
+            return is_new
+        if not pending:
+            return is_new
+
+        try:
+            self.buckets.bulk_write([self._op(events[i], now) for i in pending], ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                if err.get("code") != 11000:
+                    raise
+                i = pending[err["index"]]
+                is_new[i] = self._apply_one(events[i], now)
+        return is_new
+
+    # ---------------------------------------------------------------
+    # reads
+    # ---------------------------------------------------------------
+    def read_call(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Whole call: the compacted document, or (still live) its buckets merged in offset order."""
+        doc = self.compact.find_one({"_id": session_id})
+        if doc:
+            doc["closed"] = True
+            return doc
+        buckets = list(self.buckets.find({"sessionId": session_id}).sort("bucket", ASCENDING))
+        if not buckets:
+            return None
+        return {**self._merge(session_id, buckets), "closed": False}
+
+    @staticmethod
+    def _merge(session_id: str, buckets: List[Dict[str, Any]]) -> Dict[str, Any]:
+        seen = set()
+        utterances = []
+        for b in buckets:
+            for u in b.get("utterances") or []:
+                if u.get("event_key") in seen:
+                    continue
+                seen.add(u.get("event_key"))
+                utterances.append(u)
+        utterances.sort(key=_offset_key)
+        ends = [u.get("endOffsetMillis") for u in utterances if isinstance(u.get("endOffsetMillis"), (int, float))]
+        return {
+            "_id": session_id,
+            "sessionId": session_id,
+            "contactId": next((b.get("contactId") for b in buckets if b.get("contactId")), None),
+            "utterances": utterances,
+            "utteranceCount": len(utterances),
+            "durationMillis": max(ends) if ends else None,
+            "started_at": min((b.get("first_at") for b in buckets if b.get("first_at")), default=None),
+            "ended_at": max((b.get("last_at") for b in buckets if b.get("last_at")), default=None),
+        }
+
+    # ---------------------------------------------------------------
+    # compaction
+    # ---------------------------------------------------------------
+    def compact_closed_sessions(self, idle_s: int = CALL_SESSION_IDLE_S, limit: int = 500) -> Dict[str, Any]:
+        """
+        Turn sessions idle for `idle_s` into one ordered transcript document and drop their buckets.
+        Buckets are deleted by _id and only if not written after they were read, so an event that
+        arrives mid-compaction keeps its bucket (compacted again on a later run and merged in).
+        """
+        if not self._compact_lock.acquire(blocking=False):
+            return {"skipped": "compaction already running"}
+        started = time()
+        compacted, raced, errors = 0, 0, 0
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=idle_s)
+            candidates = self.buckets.aggregate([
+                {"$group": {"_id": "$sessionId", "last_at": {"$max": "$last_at"}}},
+                {"$match": {"last_at": {"$lt": cutoff}}},
+                {"$limit": limit},
+            ])
+            for row in candidates:
+                session_id = row["_id"]
+                try:
+                    buckets = list(self.buckets.find({"sessionId": session_id}).sort("bucket", ASCENDING))
+                    if not buckets:
+                        continue
+                    previous = self.compact.find_one({"_id": session_id})
+                    if previous:
+                        # Late events after an earlier compaction: merge them into the transcript
+                        buckets.insert(0, {
+                            "utterances": previous.get("utterances") or [],
+                            "contactId": previous.get("contactId"),
+                            "first_at": previous.get("started_at"),
+                            "last_at": previous.get("ended_at"),
+                        })
+                    merged = self._merge(session_id, buckets)
+                    merged["compacted_at"] = datetime.utcnow()
+                    self.compact.replace_one({"_id": session_id}, merged, upsert=True)
+                    for b in buckets:
+                        if b.get("_id") is None:
+                            continue
+                        deleted = self.buckets.delete_one({"_id": b["_id"], "last_at": b.get("last_at")}).deleted_count
+                        raced += 0 if deleted else 1
+                    compacted += 1
+                except PyMongoError as e:
+                    errors += 1
+                    print(f"Warning: call transcript compaction failed for {session_id}: {e}")
+        finally:
+            self._compact_lock.release()
+        self.compacted_sessions += compacted
+        self.last_compaction = {
+            "compacted": compacted,
+            "raced": raced,
+            "errors": errors,
+            "elapsedSec": round(time() - started, 2),
+            "at": datetime.utcnow(),
+        }
+        if compacted or errors:
+            print(f"[CALL_TRANSCRIPTS] compacted {compacted} session(s), {raced} bucket(s) kept (late writes), {errors} error(s)")
+        return self.last_compaction
+
+    def start_compactor(self, interval_s: int = CALL_TRANSCRIPT_COMPACT_INTERVAL_S) -> None:
+        """Background compaction every `interval_s` seconds (0 disables; use /internal/calls/compact)."""
+        if not interval_s:
+            return
+
+        def _loop():
+            while True:
+                sleep(interval_s)
+                try:
+                    self.compact_closed_sessions()
+                except Exception as e:
+                    print(f"Warning: call transcript compactor error: {e}")
+
+        threading.Thread(target=_loop, name="call-transcript-compactor", daemon=True).start()
@@ -0,0 +1,225 @@
+import ast
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+
+# -------------------------------------------------------------------
+# Content-addressed chunk store
+#
+# Chats used to embed every retrieved contract chunk twice (relevant_docs as a
+# stringified list of LangChain Documents, relevant_chunks as list[str]), so the
+# same clauses were copied into thousands of chats. Chunks now live once in a
+# shared collection keyed by sha256(collection name + content); chats keep only
+#   chunk_refs:   [{"id": <chunk id>, "score": <float|None>, "group": <int>}]
+#   chunk_format: "text"      -> relevant_chunks = [content], relevant_docs = joined text
+#                 "documents" -> relevant_docs = "Referred Documents: [Document(...)]" per group
+# and resolve_chats() rebuilds the legacy fields on read with one batched lookup.
+# -------------------------------------------------------------------
+
+CHUNK_CACHE_SIZE = int(os.getenv("CHUNK_CACHE_SIZE", "5000"))
+TEXT_CHUNK_SEPARATOR = "\n\n---\n\n"
+REFERRED_DOCUMENTS_PREFIX = "Referred Documents: "
+
+
+def chunk_count(chat: Dict[str, Any]) -> int:
+    """Number of chunks a chat would resolve to in relevant_chunks (0 for "documents" chats)."""
+    rc = chat.get("relevant_chunks")
+    if isinstance(rc, list):
+        return len(rc)
+    if chat.get("chunk_format") == "text":
+        return len(chat.get("chunk_refs") or [])
+    return 0
+
+
+def parse_referred_documents(text: str) -> Optional[List[List[Dict[str, Any]]]]:
+    """
+    Parse a legacy relevant_docs string ("Referred Documents: [Document(page_content=..., metadata=...)]",
+    possibly repeated for Infer) into groups of {"content", "metadata"}. Returns None if it doesn't parse.
+    """
+    if not isinstance(text, str):
+        return None
+    parts = text.split(REFERRED_DOCUMENTS_PREFIX)
+    if parts[0].strip():
+        return None
+    groups = []
+    for part in parts[1:]:
+        try:
+            tree = ast.parse(part.strip(), mode="eval")
+        except SyntaxError:
+            return None
+        if not isinstance(tree.body, ast.List):
+            return None
+        group = []
+        for node in tree.body.elts:
+            if not (isinstance(node, ast.Call) and getattr(node.func, "id", None) == "Document"):
+                return None
+            kwargs = {kw.arg: kw.value for kw in node.keywords}
+            try:
+                content = ast.literal_eval(kwargs["page_content"])
+                metadata = ast.literal_eval(kwargs["metadata"]) if "metadata" in kwargs else {}
+            except (KeyError, ValueError):
+                return None
+            group.append({"content": content, "metadata": metadata})
+        groups.append(group)
+    return groups
+
+
+def format_referred_documents(group: List[Dict[str, Any]]) -> str:
+    """Same string relevant_docs() produces: "Referred Documents: " + str(list of Documents)."""
+    from langchain_core.documents import Document
+
+    docs = [Document(page_content=c.get("content", ""), metadata=c.get("metadata") or {}) for c in group]
+    return REFERRED_DOCUMENTS_PREFIX + str(docs)
+
+
+class ChunkStore:
+    def __init__(self, collection, cache_size: int = CHUNK_CACHE_SIZE):
+        self.collection = collection
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def chunk_id(collection_name: Optional[str], content: str) -> str:
+        return hashlib.sha256(f"{collection_name or ''}\n{content}".encode("utf-8")).hexdigest()
+
+    # ---------------------------------------------------------------
+    # cache
+    # ---------------------------------------------------------------
+    def _cache_get(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            chunk = self._cache.get(chunk_id)
+            if chunk is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(chunk_id)
+            self.hits += 1
+            return chunk
+
+    def _cache_put(self, chunk_id: str, chunk: Dict[str, Any]) -> None:
+        with self._lock:
+            self._cache[chunk_id] = chunk
+            self._cache.move_to_end(chunk_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # ---------------------------------------------------------------
+    # writes
+    # ---------------------------------------------------------------
+    def put_many(self, collection_name: Optional[str], chunks: Iterable[Any]) -> List[str]:
+        """
+        Store chunks (str or {"content", "metadata"}) and return their ids in order.
+        Chunks already seen by this process are not written again; others are upserted
+        with $setOnInsert in one unordered bulk_write.
+        """
+        ids = []
+        pending: Dict[str, Dict[str, Any]] = {}
+        for chunk in chunks:
+            if isinstance(chunk, dict):
+                content = str(chunk.get("content") or "")
+                metadata = chunk.get("metadata") or {}
+            else:
+                content, metadata = str(chunk), {}
+            chunk_id = self.chunk_id(collection_name, content)
+            ids.append(chunk_id)
+            if chunk_id in pending:
+                continue
+            with self._lock:
+                known = chunk_id in self._cache
+            if not known:
+                pending[chunk_id] = {"content": content, "metadata": metadata}
+
+        if pending:
+            now = datetime.utcnow()
+            ops = [
+                UpdateOne(
+                    {"_id": chunk_id},
+                    {
+                        "$setOnInsert": {
+                            "collection_name": collection_name,
+                            "content": chunk["content"],
+                            "metadata": chunk["metadata"],
+                            "created_at": now,
+                        }
+                    },
+                    upsert=True,
+                )
+                for chunk_id, chunk in pending.items()
+            ]
+            try:
+                self.collection.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                # Concurrent upserts of the same chunk race on _id; the chunk exists either way.
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    raise
+            for chunk_id, chunk in pending.items():
+                self._cache_put(chunk_id, chunk)
+        return ids
+
+    def refs(
+        self,
+        collection_name: Optional[str],
+        chunks: List[Any],
+        scores: Optional[List[Optional[float]]] = None,
+        group: int = 0,
+    ) -> List[Dict[str, Any]]:
+        ids = self.put_many(collection_name, chunks)
+        return [
+            {"id": chunk_id, "score": (scores[i] if scores and i < len(scores) else None), "group": group}
+            for i, chunk_id in enumerate(ids)
+        ]
+
+    # ---------------------------------------------------------------
+    # reads
+    # ---------------------------------------------------------------
+    def get_many(self, ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """id -> {"content", "metadata"}; cache first, then one $in query for the rest."""
+        out: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for chunk_id in ids:
+            if chunk_id in out:
+                continue
+            chunk = self._cache_get(chunk_id)
+            if chunk is None:
+                missing.append(chunk_id)
+            else:
+                out[chunk_id] = chunk
+        if missing:
+            for doc in self.collection.find({"_id": {"$in": list(set(missing))}}, {"content": 1, "metadata": 1}):
+                chunk = {"content": doc.get("content", ""), "metadata": doc.get("metadata") or {}}
+                self._cache_put(doc["_id"], chunk)
+                out[doc["_id"]] = chunk
+        return out
+
+    def resolve_chats(self, chats: Optional[List[Dict[str, Any]]]) -> None:
+        """Fill relevant_chunks / relevant_docs in place for chats stored with chunk_refs."""
+        chats = [c for c in (chats or []) if isinstance(c, dict) and c.get("chunk_refs")]
+        if not chats:
+            return
+        chunks = self.get_many(ref["id"] for chat in chats for ref in chat["chunk_refs"])
+        for chat in chats:
+            groups: "OrderedDict[int, List[Dict[str, Any]]]" = OrderedDict()
+            for ref in chat["chunk_refs"]:
+                chunk = chunks.get(ref["id"])
+                if chunk is None:
+                    continue
+                groups.setdefault(ref.get("group", 0), []).append(chunk)
+            if chat.get("chunk_format") == "documents":
+                chat["relevant_docs"] = "".join(format_referred_documents(g) for g in groups.values())
+            else:
+                contents = [c["content"] for g in groups.values() for c in g]
+                chat["relevant_chunks"] = contents
+                chat["relevant_docs"] = TEXT_CHUNK_SEPARATOR.join(c for c in contents if c.strip())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"cached": len(self._cache), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,320 @@
+import copy
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+
+
+# -------------------------------------------------------------------
+# Conversation store
+#
+# Conversations and feedback used to live in one collection per user (chats_<email>,
+# feedbacks_<email>): thousands of namespaces, each with its own indexes and files,
+# and no way to index or query across users. They now live in two shared collections,
+# `conversations` and `feedback`, keyed by user_email, behind the same per-user handles
+# the app already uses:
+#
+#   CONVERSATIONS_STORE=per_user   legacy chats_<email> / feedbacks_<email> only
+#   CONVERSATIONS_STORE=dual       (default, while migrate_conversations.py runs)
+#                                  new documents go to the shared collections; point reads,
+#                                  updates and deletes fall back to the legacy collection
+#                                  when the shared one has no match; listings merge both
+#   CONVERSATIONS_STORE=unified    shared collections only (after migration)
+#
+# UserScopedCollection adds user_email to every filter, pipeline and inserted document,
+# so callers keep writing per-user queries. Documents keep their _id when migrated.
+# -------------------------------------------------------------------
+
+CONVERSATIONS_STORE = (os.getenv("CONVERSATIONS_STORE", "dual") or "dual").strip().lower()
+CONVERSATIONS_COLLECTION = "conversations"
+FEEDBACK_COLLECTION = "feedback"
+LEGACY_CHATS_PREFIX = "chats_"
+LEGACY_FEEDBACKS_PREFIX = "feedbacks_"
+
+STORE_MODES = ("per_user", "dual", "unified")
+
+
+class UserScopedCollection:
+    """One user's slice of a shared collection (pymongo Collection subset used by the app)."""
+
+    def __init__(self, collection, user_email: str):
+        self.collection = collection
+        self.user_email = user_email
+        self.database = collection.database
+        # Per-user name: write-behind barriers and read-after-write routing stay per user
+        self.name = f"{collection.name}[{user_email}]"
+        self.parts = (self,)
+
+    def _scoped(self, filter: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {**(filter or {}), "user_email": self.user_email}
+
+    def stamp(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        doc["user_email"] = self.user_email
+        return doc
+
+    def with_options(self, **kwargs) -> "UserScopedCollection":
+        return UserScopedCollection(self.collection.with_options(**kwargs), self.user_email)
+
+    # reads
+    def find(self, filter=None, *args, **kwargs):
+        return self.collection.find(self._scoped(filter), *args, **kwargs)
+
+    def find_one(self, filter=None, *args, **kwargs):
+        return self.collection.find_one(self._scoped(filter), *args, **kwargs)
+
+    def count_documents(self, filter, **kwargs) -> int:
+        return self.collection.count_documents(self._scoped(filter), **kwargs)
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs):
+        return self.collection.aggregate([{"$match": {"user_email": self.user_email}}] + list(pipeline), **kwargs)
+
+    # writes
+    def insert_one(self, doc, **kwargs):
+        return self.collection.insert_one(self.stamp(doc), **kwargs)
+
+    def update_one(self, filter, update, upsert=False, **kwargs):
+        return self.collection.update_one(self._scoped(filter), update, upsert=upsert, **kwargs)
+
+    def update_many(self, filter, update, **kwargs):
+        return self.collection.update_many(self._scoped(filter), update, **kwargs)
+
+    def find_one_and_update(self, filter, update, **kwargs):
+        return self.collection.find_one_and_update(self._scoped(filter), update, **kwargs)
+
+    def delete_one(self, filter, **kwargs):
+        return self.collection.delete_one(self._scoped(filter), **kwargs)
+
+    def delete_many(self, filter, **kwargs):
+        return self.collection.delete_many(self._scoped(filter), **kwargs)
+
+    def bulk_write(self, requests, **kwargs):
+        # Queued ops filter by _id only (see for_insert / for_update): scope them here too, or an
+        # _id from another user's conversation would be written in the shared collection
+        return self.collection.bulk_write([self._scoped_op(op) for op in requests], **kwargs)
+
+    def _scoped_op(self, op):
+        scoped = copy.copy(op)
+        if isinstance(getattr(op, "_filter", None), dict):
+            scoped._filter = self._scoped(op._filter)
+        elif isinstance(getattr(op, "_doc", None), dict):  # InsertOne
+            scoped._doc = self.stamp(dict(op._doc))
+        return scoped
+
+
+_BSON_RANK = ((type(None), 0), (bool, 7), ((int, float), 1), (str, 2), (dict, 3), (list, 4), (bytes, 5), (ObjectId, 6), (datetime, 8))
+
+
+def _sort_value(doc: Dict[str, Any], path: str) -> Tuple[int, Any]:
+    value: Any = doc
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    for types, rank in _BSON_RANK:
+        if isinstance(value, types):
+            return (rank, value)
+    return (9, str(value))
+
+
+class MergedCursor:
+    """find() over shared + legacy collections: sort / skip / limit applied after merging (dedup on _id)."""
+
+    def __init__(self, cursors):
+        self._cursors = cursors
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=None) -> "MergedCursor":
+        self._sort = list(key_or_list) if isinstance(key_or_list, list) else [(key_or_list, direction or 1)]
+        for cursor in self._cursors:
+            cursor.sort(self._sort)
+        return self
+
+    def skip(self, n: int) -> "MergedCursor":
+        self._skip = n
+        return self
+
+    def limit(self, n: int) -> "MergedCursor":
+        self._limit = n
+        return self
+
+    def __iter__(self):
+        docs, seen = [], set()
+        for cursor in self._cursors:
+            if self._limit:
+                cursor.limit(self._skip + self._limit)
+            for doc in cursor:
+                if doc.get("_id") is not None and doc["_id"] in seen:
+                    continue
+                seen.add(doc.get("_id"))
+                docs.append(doc)
+        for field, direction in reversed(self._sort):
+            docs.sort(key=lambda d: _sort_value(d, field), reverse=direction == -1)
+        end = self._skip + self._limit if self._limit else None
+        return iter(docs[self._skip:end])
+
+
+class DualReadCollection:
+    """Shared collection first, legacy chats_<email> / feedbacks_<email> as fallback."""
+
+    def __init__(self, unified: UserScopedCollection, legacy):
+        self.unified = unified
+        self.legacy = legacy
+        self.database = unified.database
+        self.name = unified.name
+        self.parts = (unified, legacy)
+
+    def with_options(self, **kwargs) -> "DualReadCollection":
+        return DualReadCollection(self.unified.with_options(**kwargs), self.legacy.with_options(**kwargs))
+
+    def stamp(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        return self.unified.stamp(doc)
+
+    def owner(self, filter: Dict[str, Any]):
+        """Collection holding the document matched by `filter` (shared one if neither or both do)."""
+        if self.unified.find_one(filter, {"_id": 1}) is not None:
+            return self.unified
+        if self.legacy.find_one(filter, {"_id": 1}) is not None:
+            return self.legacy
+        return self.unified
+
+    # reads
+    def find(self, filter=None, *args, **kwargs) -> MergedCursor:
+        return MergedCursor([self.unified.find(filter, *args, **kwargs), self.legacy.find(filter, *args, **kwargs)])
+
+    def find_one(self, filter=None, *args, **kwargs):
+        doc = self.unified.find_one(filter, *args, **kwargs)
+        return doc if doc is not None else self.legacy.find_one(filter, *args, **kwargs)
+
+    def count_documents(self, filter, **kwargs) -> int:
+        return self.unified.count_documents(filter, **kwargs) + self.legacy.count_documents(filter, **kwargs)
+
+    def aggregate(self, pipeline, **kwargs):
+        # Used for by-_id pipelines (history, single chat): at most one side matches
+        return list(self.unified.aggregate(pipeline, **kwargs)) + list(self.legacy.aggregate(pipeline, **kwargs))
+
+    # writes
+    def insert_one(self, doc, **kwargs):
+        return self.unified.insert_one(doc, **kwargs)
+
+    def update_one(self, filter, update, upsert=False, **kwargs):
+        return self.owner(filter).update_one(filter, update, upsert=upsert, **kwargs)
+
+    def update_many(self, filter, update, **kwargs):
+        self.legacy.update_many(filter, update, **kwargs)
+        return self.unified.update_many(filter, update, **kwargs)
+
+    def find_one_and_update(self, filter, update, **kwargs):
+        return self.owner(filter).find_one_and_update(filter, update, **kwargs)
+
+    def delete_one(self, filter, **kwargs):
+        result = self.unified.delete_one(filter, **kwargs)
+        return result if result.deleted_count else self.legacy.delete_one(filter, **kwargs)
+
+    def delete_many(self, filter, **kwargs):
+        self.legacy.delete_many(filter, **kwargs)
+        return self.unified.delete_many(filter, **kwargs)
+
+    def bulk_write(self, requests, **kwargs):
+        """
+        Ops are routed when they are written, not when they were queued: migrate_conversations.py may
+        have moved the document in between. By-_id ops for documents still only on the legacy side go
+        there one at a time (and to the shared collection if the document moved meanwhile); the rest
+        go to the shared collection in order. A failure is reported at its index in `requests`.
+        """
+        requests = list(requests)
+        legacy_ids = self._legacy_only_ids(requests)
+        result = None
+        start = 0
+        while start < len(requests):
+            if _op_id(requests[start]) in legacy_ids:
+                try:
+                    result = self.legacy.bulk_write([requests[start]], **kwargs)
+                    if not result.matched_count and not result.upserted_count:
+                        result = self.unified.bulk_write([requests[start]], **kwargs)
+                except BulkWriteError as e:
+                    raise _shifted(e, start)
+                start += 1
+                continue
+            end = start
+            while end < len(requests) and _op_id(requests[end]) not in legacy_ids:
+                end += 1
+            try:
+                result = self.unified.bulk_write(requests[start:end], **kwargs)
+            except BulkWriteError as e:
+                raise _shifted(e, start)
+            start = end
+        return result
+
+    def _legacy_only_ids(self, requests) -> set:
+        ids = [i for i in (_op_id(op) for op in requests) if i is not None]
+        if not ids:
+            return set()
+        in_unified = {d["_id"] for d in self.unified.find({"_id": {"$in": ids}}, {"_id": 1})}
+        rest = [i for i in ids if i not in in_unified]
+        if not rest:
+            return set()
+        return {d["_id"] for d in self.legacy.find({"_id": {"$in": rest}}, {"_id": 1})}
+
+
+def _op_id(op) -> Any:
+    """_id targeted by a queued UpdateOne / ReplaceOne / DeleteOne (None for inserts and other filters)."""
+    filter = getattr(op, "_filter", None)
+    return filter.get("_id") if isinstance(filter, dict) else None
+
+
+def _shifted(error: BulkWriteError, offset: int) -> BulkWriteError:
+    details = dict(error.details)
+    details["writeErrors"] = [{**err, "index": err.get("index", 0) + offset} for err in details.get("writeErrors") or []]
+    return BulkWriteError(details)
+
+
+def for_insert(handle, doc: Dict[str, Any]):
+    """(collection, doc) for a queued InsertOne: new documents always go to the shared collection."""
+    if isinstance(handle, DualReadCollection):
+        return handle.unified, handle.stamp(doc)
+    if isinstance(handle, UserScopedCollection):
+        return handle, handle.stamp(doc)
+    return handle, doc
+
+
+def for_update(handle, filter: Dict[str, Any]):
+    """
+    Collection a queued UpdateOne on `filter` (by _id) is sent to. A dual handle is returned as is:
+    its bulk_write picks the owning collection at flush time, after any migration in between.
+    """
+    if isinstance(handle, DualReadCollection) and "_id" not in filter:
+        return handle.owner(filter)
+    return handle
+
+
+class ConversationStore:
+    """Per-user chats / feedback handles for the configured CONVERSATIONS_STORE mode."""
+
+    def __init__(self, db, index_manager, mode: str = CONVERSATIONS_STORE):
+        if mode not in STORE_MODES:
+            print(f"Warning: unknown CONVERSATIONS_STORE={mode!r}; using dual")
+            mode = "dual"
+        self.db = db
+        self.mode = mode
+        self.index_manager = index_manager
+        self.conversations = db[CONVERSATIONS_COLLECTION]
+        self.feedback = db[FEEDBACK_COLLECTION]
+
+    def chats(self, user_email: str):
+        if self.mode == "per_user":
+            return self.index_manager.chats(self.db, user_email)
+        unified = UserScopedCollection(self.conversations, user_email)
+        if self.mode == "unified":
+            return unified
+        # Legacy side is only read / updated, never created (indexes were ensured at startup)
+        return DualReadCollection(unified, self.db[f"{LEGACY_CHATS_PREFIX}{user_email}"])
+
+    def feedbacks(self, user_email: str):
+        if self.mode == "per_user":
+            return self.index_manager.feedbacks(self.db, user_email)
+        unified = UserScopedCollection(self.feedback, user_email)
+        if self.mode == "unified":
+            return unified
+        return DualReadCollection(unified, self.db[f"{LEGACY_FEEDBACKS_PREFIX}{user_email}"])
@@ -0,0 +1,264 @@
+import os
+import queue
+import threading
+from collections import deque
+from time import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+# -------------------------------------------------------------------
+# Live Copilot dispatcher
+#
+# /webhook used to run live_copilot.handle_transcript_event inline (intent LLM,
+# question extraction, Infer agent runs, suggestion LLM), so Amazon Connect's delivery
+# waited on our LLM latency. The webhook now only submit()s the event:
+#
+#   - one queue per session and at most one copilot run per session at a time (the copilot
+#     keeps per-session state); different sessions run in parallel
+#   - COPILOT_WORKERS workers take ready sessions from a shared queue and re-queue the session
+#     if more events arrived meanwhile (round-robin across sessions)
+#   - latest wins (when a `coalesce` callback is given): a run takes the session's whole backlog,
+#     folds the older events into session state with coalesce() and runs the copilot once on the
+#     newest; the run gets superseded(), true once newer events are waiting, so it can stop
+#     before its next LLM stage instead of emitting for a stale turn
+#   - interim results (when `on_interim` is given): the run gets publish(result) and can push
+#     partial cards (e.g. each RAG answer as it lands) before its final result. Interim results
+#     are queued and delivered on a worker, never from the blocking call's thread; all of a run's
+#     interim results go out before its final result
+#   - per-session backlog is capped (COPILOT_SESSION_QUEUE_MAX); the oldest event is dropped
+#   - stats(): queue depth, in-flight, lag (received -> started), processing time, coalesced /
+#     superseded runs, interim results
+#
+# How workers are started, what queue they wait on and how the blocking copilot call is run
+# are injected, so app.py can use Socket.IO background tasks + eventlet's OS thread pool
+# (emits stay on green threads) or plain threads in threading mode. With `sleep` given (eventlet),
+# a pump worker delivers interim results every COPILOT_INTERIM_POLL_MS while runs are blocked.
+# -------------------------------------------------------------------
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        raw = (os.getenv(name) or "").strip()
+        if not raw:
+            return default
+        v = int(raw)
+        return v if v >= 0 else default
+    except Exception:
+        return default
+
+
+COPILOT_WORKERS = _env_int("COPILOT_WORKERS", 4)
+COPILOT_SESSION_QUEUE_MAX = _env_int("COPILOT_SESSION_QUEUE_MAX", 50) or 50
+COPILOT_METRICS_SAMPLES = 500
+COPILOT_INTERIM_POLL_MS = _env_int("COPILOT_INTERIM_POLL_MS", 50) or 50
+
+
+def _start_thread(fn: Callable[[], None]) -> None:
+    threading.Thread(target=fn, name="copilot-worker", daemon=True).start()
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _summary(samples: Deque[float]) -> Dict[str, float]:
+    values = list(samples)
+    return {
+        "avgMs": round(sum(values) / len(values), 1) if values else 0.0,
+        "p95Ms": round(_percentile(values, 0.95), 1),
+        "maxMs": round(max(values), 1) if values else 0.0,
+    }
+
+
+class CopilotDispatcher:
+    def __init__(
+        self,
+        handler: Callable[..., Optional[Dict[str, Any]]],
+        on_result: Callable[[str, Dict[str, Any]], None],
+        coalesce: Optional[Callable[[Dict[str, Any]], None]] = None,
+        on_interim: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        workers: int = COPILOT_WORKERS,
+        session_queue_max: int = COPILOT_SESSION_QUEUE_MAX,
+        start_worker: Callable[[Callable[[], None]], Any] = _start_thread,
+        make_queue: Callable[[], Any] = queue.Queue,
+        run_blocking: Callable[..., Any] = lambda fn, *args, **kwargs: fn(*args, **kwargs),
+        sleep: Optional[Callable[[float], Any]] = None,
+    ):
+        self.handler = handler
+        self.on_result = on_result
+        self.coalesce = coalesce
+        self.on_interim = on_interim
+        self.workers = workers
+        self.session_queue_max = session_queue_max
+        self._start_worker = start_worker
+        self._run_blocking = run_blocking
+        self._sleep = sleep
+        self._outbox: Deque[Tuple[str, Dict[str, Any]]] = deque()  # interim results awaiting delivery
+        self._ready = make_queue()
+        self._sessions: Dict[str, Deque[Tuple[float, Dict[str, Any]]]] = {}
+        self._scheduled = set()
+        self._lock = threading.Lock()
+        self._started = False
+        self.in_flight = 0
+        self.processed = 0
+        self.emitted = 0
+        self.dropped = 0
+        self.errors = 0
+        self.coalesced = 0
+        self.superseded = 0
+        self.interim = 0
+        self._lag_ms: Deque[float] = deque(maxlen=COPILOT_METRICS_SAMPLES)
+        self._run_ms: Deque[float] = deque(maxlen=COPILOT_METRICS_SAMPLES)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started or not self.workers:
+                return
+            self._started = True
+        for _ in range(self.workers):
+            self._start_worker(self._worker)
+        if self.on_interim is not None and self._sleep is not None:
+            self._start_worker(self._pump)
+        print(f"[COPILOT_DISPATCH] {self.workers} worker(s), per-session backlog {self.session_queue_max}")
+
+    def submit(self, session_id: str, payload: Dict[str, Any]) -> bool:
+        """Queue an event for its session; returns immediately. False if it displaced an older event."""
+        self.start()
+        kept = True
+        with self._lock:
+            pending = self._sessions.setdefault(session_id, deque())
+            if len(pending) >= self.session_queue_max:
+                pending.popleft()
+                self.dropped += 1
+                kept = False
+            pending.append((time(), payload))
+            schedule = session_id not in self._scheduled
+            if schedule:
+                self._scheduled.add(session_id)
+        if schedule:
+            self._ready.put(session_id)
+        return kept
+
+    def _publisher(self, session_id: str) -> Callable[[Dict[str, Any]], None]:
+        def publish(result: Dict[str, Any]) -> None:
+            if self._sleep is None:
+                self._deliver(session_id, result)  # threading mode: safe to emit from the run's thread
+            else:
+                self._outbox.append((session_id, result))
+
+        return publish
+
+    def _deliver(self, session_id: str, result: Dict[str, Any]) -> None:
+        try:
+            self.on_interim(session_id, result)
+            self.interim += 1
+        except Exception as e:
+            print(f"⚠️ Copilot interim emit error (non-blocking): {e}")
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                session_id, result = self._outbox.popleft()
+            except IndexError:
+                return
+            self._deliver(session_id, result)
+
+    def _pump(self) -> None:
+        while True:
+            self._drain()
+            self._sleep(COPILOT_INTERIM_POLL_MS / 1000.0)
+
+    def _worker(self) -> None:
+        while True:
+            session_id = self._ready.get()
+            with self._lock:
+                pending = self._sessions.get(session_id)
+                if not pending:
+                    self._scheduled.discard(session_id)
+                    self._sessions.pop(session_id, None)
+                    continue
+                if self.coalesce is not None:
+                    batch = list(pending)
+                    pending.clear()
+                else:
+                    batch = [pending.popleft()]
+                self.in_flight += 1
+            started = time()
+            self._lag_ms.append((started - batch[0][0]) * 1000.0)
+            payload = batch[-1][1]
+            extra = {"publish": self._publisher(session_id)} if self.on_interim is not None else {}
+            try:
+                if self.coalesce is not None:
+                    if len(batch) > 1:
+                        # May hit a shared state backend (network, lease waits): off the worker thread,
+                        # and a failure on an older turn never costs the newest its run
+                        self._run_blocking(self._coalesce_all, [earlier for _, earlier in batch[:-1]])
+                    self.coalesced += len(batch) - 1
+                    observed = []
+
+                    def superseded(sid=session_id, observed=observed) -> bool:
+                        with self._lock:
+                            waiting = bool(self._sessions.get(sid))
+                        if waiting and not observed:
+                            observed.append(True)
+                            self.superseded += 1
+                        return waiting
+
+                    result = self._run_blocking(self.handler, payload, superseded, **extra)
+                else:
+                    result = self._run_blocking(self.handler, payload, **extra)
+                self._drain()
+                if result:
+                    self.on_result(session_id, result)
+                    self.emitted += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Copilot processing error (non-blocking): {e}")
+            finally:
+                self._run_ms.append((time() - started) * 1000.0)
+                with self._lock:
+                    self.in_flight -= 1
+                    self.processed += 1
+                    if self._sessions.get(session_id):
+                        requeue = True
+                    else:
+                        requeue = False
+                        self._scheduled.discard(session_id)
+                        self._sessions.pop(session_id, None)
+                if requeue:
+                    # Back of the line: other sessions get a turn between this session's events
+                    self._ready.put(session_id)
+
+    def _coalesce_all(self, payloads: List[Dict[str, Any]]) -> None:
+        for earlier in payloads:
+            try:
+                self.coalesce(earlier)
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Copilot coalesce error (non-blocking, newest turn still runs): {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            depth = {sid: len(q) for sid, q in self._sessions.items() if q}
+            oldest = min((q[0][0] for q in self._sessions.values() if q), default=None)
+            in_flight = self.in_flight
+        return {
+            "workers": self.workers,
+            "queueDepth": sum(depth.values()),
+            "sessionsQueued": len(depth),
+            "deepestSessions": sorted(depth.items(), key=lambda kv: kv[1], reverse=True)[:10],
+            "oldestQueuedMs": round((time() - oldest) * 1000.0, 1) if oldest else 0.0,
+            "inFlight": in_flight,
+            "processed": self.processed,
+            "emitted": self.emitted,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "coalesced": self.coalesced,
+            "superseded": self.superseded,
+            "interim": self.interim,
+            "lag": _summary(self._lag_ms),
+            "processing": _summary(self._run_ms),
+        }
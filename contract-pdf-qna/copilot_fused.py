@@ -0,0 +1,112 @@
+from typing import Any, Dict, List, Optional
+
+
+# -------------------------------------------------------------------
+# Fused Live Copilot reasoning (COPILOT_REASONING_MODE=fused): output schema and turn decisions
+#
+# live_copilot._call_fused_llm asks for intent + entities + questions + diagnostics + cards in one
+# structured-output call. This module holds the parts that don't need the LLM stack:
+#
+#   - FUSED_SCHEMA and parse_fused_output(): a reply that is not a dict, has an unknown intent or
+#     wrongly typed fields is treated as missing (None), and the turn falls back to the multi-call
+#     stages
+#   - fused_call_allowed(): the fused call writes cards, so it only runs when the cooldown would let
+#     a suggestion out; otherwise the turn takes the intent-only path (questions / RAG still run)
+#   - needs_second_call(): the fused cards are served as-is unless RAG answers arrived (they need
+#     phrasing, and the fused call never saw them) or the caller was verified after the call
+# -------------------------------------------------------------------
+
+FUSED_INTENTS = ["CUSTOMER_IDENTIFICATION", "INQUIRY", "PROBLEM", "CLAIM_STATUS", "COMPLAINT", "SMALL_TALK", "OTHER"]
+FUSED_ENTITIES = ("phone", "appliance", "symptom", "money_amount", "timeline", "claimId", "question")
+
+FUSED_SCHEMA: Dict[str, Any] = {
+    "title": "copilot_turn",
+    "description": "Intent, entities, new customer questions, diagnostics and CSR suggestion cards for one call turn",
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string", "enum": FUSED_INTENTS},
+        "confidence": {"type": "number"},
+        "entities": {
+            "type": "object",
+            "properties": {k: {"type": "string"} for k in FUSED_ENTITIES},
+            "required": list(FUSED_ENTITIES),
+            "additionalProperties": False,
+        },
+        "requiresVerification": {"type": "boolean"},
+        "evidenceQuote": {"type": "string"},
+        "questions": {"type": "array", "items": {"type": "string"}},
+        "diagnostics": {
+            "type": "object",
+            "properties": {
+                "steps": {"type": "array", "items": {"type": "string"}},
+                "questions": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["steps", "questions"],
+            "additionalProperties": False,
+        },
+        "cards": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "csrScript": {"type": "string"},
+                    "evidence": {"type": "string"},
+                    "priority": {"type": "string", "enum": ["high", "medium", "low"]},
+                },
+                "required": ["title", "csrScript", "evidence", "priority"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": [
+        "intent", "confidence", "entities", "requiresVerification", "evidenceQuote", "questions", "diagnostics", "cards",
+    ],
+    "additionalProperties": False,
+}
+
+
+def _s(x: Any) -> str:
+    return "" if x is None else str(x).strip()
+
+
+def _list(value: Any) -> Optional[List[Any]]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else None
+
+
+def parse_fused_output(obj: Any) -> Optional[Dict[str, Any]]:
+    """Normalized fused reply, or None when it is unusable and the turn should fall back to multi-call."""
+    if not isinstance(obj, dict) or _s(obj.get("intent")) not in FUSED_INTENTS:
+        return None
+    questions, cards = _list(obj.get("questions")), _list(obj.get("cards"))
+    entities, diagnostics = obj.get("entities") or {}, obj.get("diagnostics") or {}
+    if questions is None or cards is None or not isinstance(entities, dict) or not isinstance(diagnostics, dict):
+        return None
+    try:
+        confidence = float(obj.get("confidence") or 0.0)
+    except (TypeError, ValueError):
+        return None
+    return {
+        **obj,
+        "intent": _s(obj.get("intent")),
+        "confidence": confidence,
+        "questions": [_s(q) for q in questions if _s(q)][:3],
+        "cards": [c for c in cards if isinstance(c, dict) and _s(c.get("csrScript"))][:3],
+        "entities": entities,
+        "diagnostics": {
+            "steps": [_s(x) for x in _list(diagnostics.get("steps")) or [] if _s(x)],
+            "questions": [_s(x) for x in _list(diagnostics.get("questions")) or [] if _s(x)],
+        },
+    }
+
+
+def fused_call_allowed(cooldown_ok: bool, important_change: bool) -> bool:
+    """Run the fused call only when its cards could be emitted (the cooldown check in _run_copilot)."""
+    return cooldown_ok or important_change
+
+
+def needs_second_call(fused: Optional[Dict[str, Any]], new_answers: List[Any], cards_stale: bool) -> bool:
+    """True when the suggestion LLM has to write the cards (no usable fused cards for this turn)."""
+    return fused is None or not fused["cards"] or bool(new_answers) or cards_stale
@@ -0,0 +1,281 @@
+import os
+import re
+import threading
+from collections import deque
+from time import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+# -------------------------------------------------------------------
+# Local Live Copilot intent classifier (nearest centroid, LLM escalation)
+#
+# Picking one of seven intents used to cost a gpt-4o call per utterance. Like closest.classify_topic,
+# the utterance is embedded with closest.model (the same sentence-transformers instance, not a second
+# copy) and compared with per-intent centroids of exemplar utterances, all intents at once (one
+# matrix product):
+#
+#   - top cosine >= COPILOT_INTENT_THRESHOLD and a lead of COPILOT_INTENT_MARGIN over the runner-up:
+#     served locally (a few ms on CPU), in the same shape as _call_intent_llm's JSON but with empty
+#     entities
+#   - otherwise, and always for CUSTOMER_IDENTIFICATION, classify() returns None and the caller asks
+#     the LLM. So do CSR turns (the exemplars are customer phrasing; the LLM reads the whole
+#     transcript) and turns whose entities matter: digits / spelled-out numbers / money or claim
+#     words (entities.phone, claimId, money_amount) or, per the caller, a question whose
+#     entities.question is the fallback when question extraction comes back empty
+#   - the model loads on a background thread; until it is ready everything escalates
+#
+# eval_intent_classifier.py measures accuracy / coverage per threshold on labelled utterances.
+# -------------------------------------------------------------------
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        raw = (os.getenv(name) or "").strip()
+        return float(raw) if raw else default
+    except Exception:
+        return default
+
+
+COPILOT_INTENT_CLASSIFIER = "llm" if (os.getenv("COPILOT_INTENT_CLASSIFIER") or "").strip().lower() == "llm" else "local"
+COPILOT_INTENT_THRESHOLD = _env_float("COPILOT_INTENT_THRESHOLD", 0.55)
+COPILOT_INTENT_MARGIN = _env_float("COPILOT_INTENT_MARGIN", 0.05)
+
+INTENTS = ["CUSTOMER_IDENTIFICATION", "INQUIRY", "PROBLEM", "CLAIM_STATUS", "COMPLAINT", "SMALL_TALK", "OTHER"]
+ESCALATE_INTENTS = {"CUSTOMER_IDENTIFICATION"}
+# INQUIRY needs verification only for plan-specific coverage confirmation, which the LLM judges
+VERIFY_INTENTS = {"CLAIM_STATUS"}
+
+INTENT_EXEMPLARS: Dict[str, List[str]] = {
+    "CUSTOMER_IDENTIFICATION": [
+        "my phone number is five five five one two three four",
+        "the number on the account is my cell",
+        "can I get the phone number on the account",
+        "it's under my name, the account is in my husband's name",
+        "can you verify the account holder for me",
+        "let me give you my number",
+    ],
+    "INQUIRY": [
+        "is the water heater leak covered under my plan",
+        "does my plan cover the garage door opener",
+        "what is the coverage limit for the roof",
+        "is there a limit on how much you pay for the HVAC",
+        "what does my plan exclude",
+        "how much is the service fee for a visit",
+        "am I covered for mold damage",
+        "what's included in the platinum plan",
+    ],
+    "PROBLEM": [
+        "my air conditioner stopped working",
+        "the dishwasher is leaking all over the floor",
+        "the furnace is making a loud banging noise",
+        "my refrigerator isn't cooling anymore",
+        "there's water coming from under the water heater",
+        "the toilet keeps running and won't stop",
+        "the oven won't turn on",
+    ],
+    "CLAIM_STATUS": [
+        "I'm calling to check on my claim",
+        "when is the technician coming out",
+        "what's the status of my service request",
+        "has my claim been approved yet",
+        "I was told someone would call me to schedule the repair",
+        "can you give me an update on my work order",
+    ],
+    "COMPLAINT": [
+        "this is ridiculous, I've been waiting two weeks",
+        "I want to cancel my contract",
+        "I want to speak to a supervisor",
+        "nobody ever calls me back, this is unacceptable",
+        "I'm very frustrated with your service",
+        "the technician never showed up and I took the day off",
+    ],
+    "SMALL_TALK": [
+        "hi, how are you doing today",
+        "thank you so much for your help",
+        "okay, sounds good",
+        "have a great day",
+        "no problem, take your time",
+        "yes, I can hear you",
+    ],
+    "OTHER": [
+        "can you hold on one second",
+        "sorry, what did you say",
+        "let me grab a pen",
+        "I'm driving right now",
+        "hold on, my dog is barking",
+    ],
+}
+
+
+_NUMBER_WORDS = r"(?:zero|oh|one|two|three|four|five|six|seven|eight|nine)"
+_ENTITY_HINT = re.compile(
+    rf"\d|\b(?:dollars?|bucks|claim|ticket|reference)\b|(?:\b{_NUMBER_WORDS}\b\W+){{2}}\b{_NUMBER_WORDS}\b",
+    re.IGNORECASE,
+)
+
+
+def mentions_entities(text: str) -> bool:
+    """True when the utterance carries a phone number, amount or claim reference only the LLM extracts."""
+    return bool(_ENTITY_HINT.search(str(text or "")))
+
+
+def _closest_encoder() -> Callable[[List[str]], Any]:
+    from closest import model  # loaded once per process, shared with classify_topic
+
+    return lambda texts: model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+
+
+def _summary(samples: Deque[float]) -> Dict[str, float]:
+    values = sorted(samples)
+    if not values:
+        return {"count": 0, "avgMs": 0.0, "p95Ms": 0.0}
+    return {
+        "count": len(values),
+        "avgMs": round(sum(values) / len(values), 2),
+        "p95Ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 2),
+    }
+
+
+class LocalIntentClassifier:
+    def __init__(
+        self,
+        encode: Optional[Callable[[List[str]], Any]] = None,
+        exemplars: Optional[Dict[str, List[str]]] = None,
+        threshold: float = COPILOT_INTENT_THRESHOLD,
+        margin: float = COPILOT_INTENT_MARGIN,
+    ):
+        self.threshold = threshold
+        self.margin = margin
+        self.exemplars = exemplars or INTENT_EXEMPLARS
+        self._encode = encode
+        self._labels: List[str] = []
+        self._centroids: Any = None  # (intents, dim), unit rows
+        self._ready = threading.Event()
+        self._loading = False
+        self._lock = threading.Lock()
+        self.load_error = ""
+        self.local = 0
+        self.escalated: Dict[str, int] = {
+            "lowConfidence": 0, "lowMargin": 0, "intent": 0, "speaker": 0, "entities": 0, "unavailable": 0,
+        }
+        self._local_ms: Deque[float] = deque(maxlen=500)
+
+    def warm(self, background: bool = True) -> None:
+        """Load the model and build the centroids (once); on a daemon thread unless background=False."""
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+        if background:
+            threading.Thread(target=self._load, name="copilot-intent-load", daemon=True).start()
+        else:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            import numpy as np
+
+            started = time()
+            if self._encode is None:
+                self._encode = _closest_encoder()
+            labels = [i for i in INTENTS if self.exemplars.get(i)] + [
+                i for i in self.exemplars if i not in INTENTS and self.exemplars[i]
+            ]
+            rows = []
+            for label in labels:
+                vectors = np.asarray(self._encode(self.exemplars[label]), dtype=np.float32)
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-9)
+                centroid = vectors.mean(axis=0)
+                rows.append(centroid / (np.linalg.norm(centroid) or 1.0))
+            self._labels, self._centroids = labels, np.stack(rows)
+            self._ready.set()
+            print(
+                f"[COPILOT_INTENT] local classifier ready: {len(labels)} intents, "
+                f"{(time() - started) * 1000:.0f}ms"
+            )
+        except Exception as e:
+            self.load_error = str(e)
+            print(f"[COPILOT_INTENT] local classifier unavailable, every intent goes to the LLM: {e}")
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def scores(self, text: str) -> List[Tuple[str, float]]:
+        """Cosine similarity to every intent centroid, best first."""
+        import numpy as np
+
+        vector = np.asarray(self._encode([text]), dtype=np.float32)[0]
+        vector /= np.linalg.norm(vector) or 1.0
+        sims = self._centroids @ vector
+        order = np.argsort(-sims)
+        return [(self._labels[i], float(sims[i])) for i in order]
+
+    def decide(self, ranked: List[Tuple[str, float]]) -> Tuple[Optional[str], str]:
+        """(intent, "") when it can be served locally, else (None, escalation reason)."""
+        intent, top = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        if top < self.threshold:
+            return None, "lowConfidence"
+        if intent in ESCALATE_INTENTS:
+            return None, "intent"
+        if top - runner_up < self.margin:
+            return None, "lowMargin"
+        return intent, ""
+
+    def classify(self, text: str, speaker: str = "customer", needs_entities: bool = False) -> Optional[Dict[str, Any]]:
+        """Intent object shaped like _call_intent_llm's, or None when the LLM should decide."""
+        if str(speaker or "").lower() != "customer":
+            self.escalated["speaker"] += 1
+            return None
+        if needs_entities or mentions_entities(text):
+            self.escalated["entities"] += 1
+            return None
+        if not self.ready or not str(text or "").strip():
+            self.escalated["unavailable"] += 1
+            return None
+        started = time()
+        try:
+            ranked = self.scores(text)
+        except Exception as e:
+            self.escalated["unavailable"] += 1
+            print(f"[COPILOT_INTENT] local scoring failed, escalating: {e}")
+            return None
+        intent, reason = self.decide(ranked)
+        self._local_ms.append((time() - started) * 1000.0)
+        if intent is None:
+            self.escalated[reason] += 1
+            return None
+        self.local += 1
+        return {
+            "intent": intent,
+            "confidence": round(ranked[0][1], 3),
+            "entities": {
+                "phone": "",
+                "appliance": "",
+                "symptom": "",
+                "money_amount": "",
+                "timeline": "",
+                "claimId": "",
+                "question": "",
+            },
+            "requiresVerification": intent in VERIFY_INTENTS,
+            "evidenceQuote": str(text)[:200],
+            "source": "local",
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        escalated = sum(self.escalated.values())
+        total = self.local + escalated
+        return {
+            "classifier": "local",
+            "ready": self.ready,
+            "model": "closest.model",
+            "loadError": self.load_error or None,
+            "threshold": self.threshold,
+            "margin": self.margin,
+            "local": self.local,
+            "escalated": dict(self.escalated),
+            "localRate": round(self.local / total, 3) if total else None,
+            "scoring": _summary(self._local_ms),
+        }
@@ -0,0 +1,515 @@
+import copy
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from time import sleep, time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# -------------------------------------------------------------------
+# Bounded in-process session store (Live Copilot)
+#
+# live_copilot's per-call state and app.py's copilot_enable registry used to be plain dicts
+# that only shrank on an explicit copilot_disable, so calls that just ended (tab closed,
+# CCP dropped) stayed in memory for the life of the process.
+#
+#   - idle TTL: a session not touched for idle_s is evicted (swept lazily on access / stats)
+#   - LRU cap: at most max_sessions; creating one more evicts the least recently used
+#   - stats(): live sessions, approximate bytes (sizeof callback), eviction counters
+#
+# Shared session state (COPILOT_STATE_BACKEND=memory|redis|mongo)
+#
+# With several worker processes behind a load balancer, copilot_enable and a call's webhooks can
+# land on different workers. The backends below hold session state outside the process:
+#
+#   - get(sid) -> (value, version); put(sid, value, version) is compare-and-set on the version
+#     (SessionConflict if someone else wrote first); update(sid, fn) retries on conflict
+#   - lock(sid): per-session lease lock (one copilot run per call across all workers)
+#   - memory: this process only (single worker); redis: any Redis-protocol server (REDIS_URL);
+#     mongo: FrontDoorDB.copilot_session_state / copilot_session_locks with TTL indexes
+# -------------------------------------------------------------------
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        raw = (os.getenv(name) or "").strip()
+        if not raw:
+            return default
+        v = int(raw)
+        return v if v > 0 else default
+    except Exception:
+        return default
+
+
+COPILOT_STATE_IDLE_S = _env_int("COPILOT_STATE_IDLE_S", 900)
+COPILOT_MAX_SESSIONS = _env_int("COPILOT_MAX_SESSIONS", 2000)
+COPILOT_STATE_BACKEND = (os.getenv("COPILOT_STATE_BACKEND") or "memory").strip().lower()
+COPILOT_STATE_LOCK_LEASE_S = _env_int("COPILOT_STATE_LOCK_LEASE_S", 120)
+COPILOT_STATE_LOCK_WAIT_S = _env_int("COPILOT_STATE_LOCK_WAIT_S", 30)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+def json_size(value: Any) -> int:
+    """Approximate retained size: length of the JSON encoding (good enough to spot growth)."""
+    try:
+        return len(json.dumps(value, default=str))
+    except Exception:
+        return 0
+
+
+class BoundedSessionStore:
+    def __init__(
+        self,
+        name: str,
+        idle_s: int = COPILOT_STATE_IDLE_S,
+        max_sessions: int = COPILOT_MAX_SESSIONS,
+        sizeof: Callable[[Any], int] = json_size,
+        clock: Callable[[], float] = time,
+    ):
+        self.name = name
+        self.idle_s = idle_s
+        self.max_sessions = max_sessions
+        self._sizeof = sizeof
+        self._clock = clock
+        self._items: "OrderedDict[str, Any]" = OrderedDict()  # LRU first
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = clock()
+        self._sweep_every = max(1.0, min(idle_s / 4.0, 60.0))
+        self.created = 0
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+        self.removed = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id, touch=False) is not None
+
+    def _touch(self, session_id: str, now: float) -> None:
+        self._items.move_to_end(session_id)
+        self._touched[session_id] = now
+
+    def _expired(self, session_id: str, now: float) -> bool:
+        return now - self._touched.get(session_id, now) >= self.idle_s
+
+    def _drop(self, session_id: str) -> None:
+        self._items.pop(session_id, None)
+        self._touched.pop(session_id, None)
+
+    def _sweep_locked(self, now: float) -> int:
+        self._last_sweep = now
+        evicted = 0
+        # LRU order == idle order: stop at the first session still within its TTL
+        for session_id in list(self._items):
+            if not self._expired(session_id, now):
+                break
+            self._drop(session_id)
+            evicted += 1
+        self.evicted_idle += evicted
+        return evicted
+
+    def _maybe_sweep(self, now: float) -> None:
+        if now - self._last_sweep >= self._sweep_every:
+            self._sweep_locked(now)
+
+    def get(self, session_id: str, touch: bool = True) -> Optional[Any]:
+        now = self._clock()
+        with self._lock:
+            self._maybe_sweep(now)
+            if session_id not in self._items:
+                return None
+            if self._expired(session_id, now):
+                self._drop(session_id)
+                self.evicted_idle += 1
+                return None
+            if touch:
+                self._touch(session_id, now)
+            return self._items[session_id]
+
+    def get_or_create(self, session_id: str, factory: Callable[[], Any]) -> Any:
+        existing = self.get(session_id)
+        if existing is not None:
+            return existing
+        now = self._clock()
+        with self._lock:
+            if session_id in self._items:  # created by another thread meanwhile
+                self._touch(session_id, now)
+                return self._items[session_id]
+            value = factory()
+            self._put_locked(session_id, value, now)
+            self.created += 1
+            return value
+
+    def put(self, session_id: str, value: Any) -> None:
+        now = self._clock()
+        with self._lock:
+            self._maybe_sweep(now)
+            self._put_locked(session_id, value, now)
+
+    def _put_locked(self, session_id: str, value: Any, now: float) -> None:
+        self._items[session_id] = value
+        self._touch(session_id, now)
+        while len(self._items) > self.max_sessions:
+            lru = next(iter(self._items))
+            self._drop(lru)
+            self.evicted_lru += 1
+            print(f"[COPILOT_SESSIONS] {self.name}: evicted least recently used session {lru} (cap {self.max_sessions})")
+
+    def pop(self, session_id: str) -> Optional[Any]:
+        with self._lock:
+            value = self._items.get(session_id)
+            if value is not None:
+                self._drop(session_id)
+                self.removed += 1
+            return value
+
+    def sweep(self) -> int:
+        with self._lock:
+            return self._sweep_locked(self._clock())
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        with self._lock:
+            self._sweep_locked(now)
+            items = list(self._items.items())
+            oldest = min(self._touched.values(), default=None)
+        sizes = sorted(((self._sizeof(v), sid) for sid, v in items), reverse=True)
+        return {
+            "name": self.name,
+            "live": len(items),
+            "maxSessions": self.max_sessions,
+            "idleS": self.idle_s,
+            "bytes": sum(size for size, _ in sizes),
+            "largest": [{"sessionId": sid, "bytes": size} for size, sid in sizes[:5]],
+            "oldestIdleS": round(now - oldest, 1) if oldest is not None else 0.0,
+            "created": self.created,
+            "evictedIdle": self.evicted_idle,
+            "evictedLru": self.evicted_lru,
+            "removed": self.removed,
+        }
+
+
+class SessionConflict(Exception):
+    """put() lost an optimistic-concurrency race: the stored version moved on since get()."""
+
+
+class SessionLockTimeout(Exception):
+    """lock() could not acquire the session within its wait time."""
+
+
+class SessionBackend:
+    """Session state keyed by session id within one namespace; values are JSON-able dicts."""
+
+    kind = "base"
+    shared = True  # visible to other worker processes
+
+    def __init__(self, namespace: str, ttl_s: int):
+        self.namespace = namespace
+        self.ttl_s = ttl_s
+        self.conflicts = 0
+        self.lock_waits = 0
+        self.lock_timeouts = 0
+
+    def get(self, session_id: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        raise NotImplementedError
+
+    def put(self, session_id: str, value: Dict[str, Any], version: Optional[int] = None) -> int:
+        """Store `value`; with `version` (0 = must not exist) only if still current. Returns the new version."""
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def _try_lock(self, session_id: str, token: str, lease_s: int) -> bool:
+        raise NotImplementedError
+
+    def _unlock(self, session_id: str, token: str) -> None:
+        raise NotImplementedError
+
+    def update(self, session_id: str, fn: Callable[[Optional[Dict[str, Any]]], Dict[str, Any]], retries: int = 5) -> Dict[str, Any]:
+        """Read-modify-write with compare-and-set; `fn` may run more than once."""
+        for attempt in range(retries + 1):
+            value, version = self.get(session_id)
+            new_value = fn(value)
+            try:
+                self.put(session_id, new_value, version)
+                return new_value
+            except SessionConflict:
+                self.conflicts += 1
+                if attempt == retries:
+                    raise
+        raise SessionConflict(session_id)
+
+    @contextmanager
+    def lock(
+        self, session_id: str, wait_s: float = COPILOT_STATE_LOCK_WAIT_S, lease_s: int = COPILOT_STATE_LOCK_LEASE_S
+    ) -> Iterator[None]:
+        token = uuid.uuid4().hex
+        deadline = time() + wait_s
+        delay = 0.01
+        waited = False
+        while not self._try_lock(session_id, token, lease_s):
+            waited = True
+            if time() >= deadline:
+                self.lock_timeouts += 1
+                raise SessionLockTimeout(f"{self.namespace}:{session_id}")
+            sleep(delay)
+            delay = min(delay * 2, 0.2)
+        if waited:
+            self.lock_waits += 1
+        try:
+            yield
+        finally:
+            self._unlock(session_id, token)
+
+    def index_specs(self) -> List[Tuple[Any, List[Tuple[List[Tuple[str, int]], Dict[str, Any]]]]]:
+        return []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.kind,
+            "namespace": self.namespace,
+            "ttlS": self.ttl_s,
+            "conflicts": self.conflicts,
+            "lockWaits": self.lock_waits,
+            "lockTimeouts": self.lock_timeouts,
+        }
+
+
+class MemorySessionBackend(SessionBackend):
+    kind = "memory"
+    shared = False
+
+    _STRIPES = 64
+
+    def __init__(self, namespace: str, ttl_s: int, max_sessions: int = COPILOT_MAX_SESSIONS, clock: Callable[[], float] = time):
+        super().__init__(namespace, ttl_s)
+        self.store = BoundedSessionStore(
+            namespace, idle_s=ttl_s, max_sessions=max_sessions, sizeof=lambda entry: json_size(entry[0]), clock=clock
+        )
+        self._write_lock = threading.Lock()
+        # Striped locks: bounded memory however many sessions come and go
+        self._stripes = [threading.Lock() for _ in range(self._STRIPES)]
+        self._held: Dict[str, str] = {}
+
+    def get(self, session_id: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        entry = self.store.get(session_id)
+        if entry is None:
+            return None, 0
+        return copy.deepcopy(entry[0]), entry[1]
+
+    def put(self, session_id: str, value: Dict[str, Any], version: Optional[int] = None) -> int:
+        with self._write_lock:
+            entry = self.store.get(session_id, touch=False)
+            current = entry[1] if entry is not None else 0
+            if version is not None and version != current:
+                raise SessionConflict(f"{self.namespace}:{session_id} is at version {current}, not {version}")
+            self.store.put(session_id, (copy.deepcopy(value), current + 1))
+            return current + 1
+
+    def delete(self, session_id: str) -> None:
+        self.store.pop(session_id)
+
+    def _try_lock(self, session_id: str, token: str, lease_s: int) -> bool:
+        # Leases only matter across processes; in-process holders always release
+        if not self._stripes[hash(session_id) % self._STRIPES].acquire(blocking=False):
+            return False
+        self._held[token] = session_id
+        return True
+
+    def _unlock(self, session_id: str, token: str) -> None:
+        if self._held.pop(token, None) is not None:
+            self._stripes[hash(session_id) % self._STRIPES].release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), **self.store.stats()}
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Value and version are stored together as one JSON string (key expires after ttl_s of no writes);
+    compare-and-set uses WATCH/MULTI, locks are SET NX PX with a token checked on release.
+    """
+
+    kind = "redis"
+
+    def __init__(self, namespace: str, ttl_s: int, client: Any = None, prefix: str = "copilot"):
+        super().__init__(namespace, ttl_s)
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("COPILOT_STATE_BACKEND=redis requires the 'redis' package") from e
+            client = redis.Redis.from_url(REDIS_URL)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}:{self.namespace}:{session_id}"
+
+    def _lock_key(self, session_id: str) -> str:
+        return f"{self.prefix}:lock:{self.namespace}:{session_id}"
+
+    @staticmethod
+    def _decode(raw: Any) -> Tuple[Optional[Dict[str, Any]], int]:
+        if raw is None:
+            return None, 0
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        obj = json.loads(raw)
+        return obj.get("value"), int(obj.get("version") or 0)
+
+    def get(self, session_id: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        return self._decode(self.client.get(self._key(session_id)))
+
+    def put(self, session_id: str, value: Dict[str, Any], version: Optional[int] = None) -> int:
+        key = self._key(session_id)
+        while True:
+            with self.client.pipeline() as pipe:
+                try:
+                    pipe.watch(key)
+                    _, current = self._decode(pipe.get(key))
+                    if version is not None and version != current:
+                        raise SessionConflict(f"{key} is at version {current}, not {version}")
+                    pipe.multi()
+                    pipe.set(key, json.dumps({"value": value, "version": current + 1}, default=str), px=self.ttl_s * 1000)
+                    pipe.execute()
+                    return current + 1
+                except _redis_watch_error():
+                    if version is not None:
+                        raise SessionConflict(f"{key} changed during write")
+                    # unconditional put: retry on the new version
+
+    def delete(self, session_id: str) -> None:
+        self.client.delete(self._key(session_id))
+
+    def _try_lock(self, session_id: str, token: str, lease_s: int) -> bool:
+        return bool(self.client.set(self._lock_key(session_id), token, nx=True, px=lease_s * 1000))
+
+    def _unlock(self, session_id: str, token: str) -> None:
+        key = self._lock_key(session_id)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                held = pipe.get(key)
+                if isinstance(held, bytes):
+                    held = held.decode("utf-8")
+                if held != token:
+                    return  # lease expired and someone else holds it now
+                pipe.multi()
+                pipe.delete(key)
+                pipe.execute()
+            except _redis_watch_error():
+                pass
+
+
+def _redis_watch_error():
+    try:
+        from redis.exceptions import WatchError
+        return WatchError
+    except ImportError:
+        return _StandInWatchError
+
+
+class _StandInWatchError(Exception):
+    """WatchError for Redis-protocol stand-ins when the redis package is not installed."""
+
+
+class MongoSessionBackend(SessionBackend):
+    """
+    One document per session (value as JSON text, version, expires_at); locks are lease documents.
+    JSON text because state keys (e.g. normalized question text) may contain '.' or '$'.
+    """
+
+    kind = "mongo"
+
+    def __init__(self, namespace: str, ttl_s: int, db: Any = None):
+        super().__init__(namespace, ttl_s)
+        if db is None:
+            from data_access import get_data_access
+            db = get_data_access().front_door
+        self.state = db["copilot_session_state"]
+        self.locks = db["copilot_session_locks"]
+
+    def _id(self, session_id: str) -> str:
+        return f"{self.namespace}:{session_id}"
+
+    def _expires(self) -> Any:
+        from datetime import datetime, timedelta
+        return datetime.utcnow() + timedelta(seconds=self.ttl_s)
+
+    def get(self, session_id: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        from datetime import datetime
+        doc = self.state.find_one({"_id": self._id(session_id)})
+        if not doc:
+            return None, 0
+        if doc.get("expires_at") and doc["expires_at"] <= datetime.utcnow():
+            return None, int(doc.get("version") or 0)  # expired, not yet removed by the TTL monitor
+        return json.loads(doc["value"]) if doc.get("value") else None, int(doc.get("version") or 0)
+
+    def put(self, session_id: str, value: Dict[str, Any], version: Optional[int] = None) -> int:
+        from pymongo import ReturnDocument
+        from pymongo.errors import DuplicateKeyError
+
+        query: Dict[str, Any] = {"_id": self._id(session_id)}
+        if version is not None:
+            query["version"] = version if version else {"$in": [0, None]}
+        try:
+            doc = self.state.find_one_and_update(
+                query,
+                {
+                    "$set": {"value": json.dumps(value, default=str), "ns": self.namespace, "expires_at": self._expires()},
+                    "$inc": {"version": 1},
+                },
+                upsert=version in (None, 0),
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            doc = None  # create-only put raced another create
+        if doc is None:
+            raise SessionConflict(f"{self._id(session_id)} moved past version {version}")
+        return int(doc["version"])
+
+    def delete(self, session_id: str) -> None:
+        self.state.delete_one({"_id": self._id(session_id)})
+
+    def _try_lock(self, session_id: str, token: str, lease_s: int) -> bool:
+        from datetime import datetime, timedelta
+        from pymongo.errors import DuplicateKeyError
+
+        now = datetime.utcnow()
+        try:
+            # Matches a free (missing) or expired lease; a live lease makes the upsert hit the unique _id
+            self.locks.update_one(
+                {"_id": self._id(session_id), "expires_at": {"$lte": now}},
+                {"$set": {"token": token, "expires_at": now + timedelta(seconds=lease_s)}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def _unlock(self, session_id: str, token: str) -> None:
+        self.locks.delete_one({"_id": self._id(session_id), "token": token})
+
+    def index_specs(self):
+        from pymongo import ASCENDING
+
+        ttl = [([("expires_at", ASCENDING)], {"name": "expires_at_ttl", "expireAfterSeconds": 0})]
+        return [(self.state, ttl), (self.locks, ttl)]
+
+
+def open_session_backend(namespace: str, ttl_s: int) -> SessionBackend:
+    """Backend for COPILOT_STATE_BACKEND (unknown values fall back to memory)."""
+    if COPILOT_STATE_BACKEND == "redis":
+        return RedisSessionBackend(namespace, ttl_s)
+    if COPILOT_STATE_BACKEND == "mongo":
+        return MongoSessionBackend(namespace, ttl_s)
+    if COPILOT_STATE_BACKEND != "memory":
+        print(f"[COPILOT_SESSIONS] unknown COPILOT_STATE_BACKEND={COPILOT_STATE_BACKEND!r}; using memory")
+    return MemorySessionBackend(namespace, ttl_s)
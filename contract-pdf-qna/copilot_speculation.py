@@ -0,0 +1,264 @@
+import difflib
+import heapq
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+# -------------------------------------------------------------------
+# Speculative Live Copilot pre-processing on partial transcripts (COPILOT_SPECULATE=1)
+#
+# Final utterances only arrive once the customer stops talking, seconds after the words were
+# first transcribed. The speculator watches partials instead:
+#
+#   - a partial whose text has not changed for COPILOT_SPECULATE_STABLE_MS (and passes
+#     should_speculate, e.g. looks like a question) starts speculate(payload) on a small pool:
+#     phone lookup, intent, question extraction, RAG prefetch (see live_copilot._speculate)
+#   - when the final arrives, take(final) returns that work if the texts match closely
+#     (difflib ratio >= COPILOT_SPECULATE_MATCH on normalized text); otherwise it is discarded
+#   - stats(): started / hits / misses / unused, and final->result latency with and without a hit
+#
+# Process-local: with several workers a final may land elsewhere and just miss.
+# -------------------------------------------------------------------
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        raw = (os.getenv(name) or "").strip()
+        if not raw:
+            return default
+        v = int(raw)
+        return v if v > 0 else default
+    except Exception:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        raw = (os.getenv(name) or "").strip()
+        return float(raw) if raw else default
+    except Exception:
+        return default
+
+
+COPILOT_SPECULATE = (os.getenv("COPILOT_SPECULATE") or "").strip().lower() in ("1", "true", "yes", "y", "on")
+COPILOT_SPECULATE_STABLE_MS = _env_int("COPILOT_SPECULATE_STABLE_MS", 400)
+COPILOT_SPECULATE_MATCH = _env_float("COPILOT_SPECULATE_MATCH", 0.9)
+COPILOT_SPECULATE_WORKERS = _env_int("COPILOT_SPECULATE_WORKERS", 4)
+COPILOT_SPECULATE_MAX_PER_UTTERANCE = 2
+COPILOT_SPECULATE_MAX_UTTERANCES = 5000
+COPILOT_SPECULATE_FORGET_S = 120  # utterances with no final after this long are dropped
+COPILOT_SPECULATE_WAIT_S = 30.0  # a final waits this long for its in-flight speculation
+
+
+def _norm(text: str) -> str:
+    return re.sub(r"[^a-z0-9 ]+", "", re.sub(r"\s+", " ", str(text or "").lower())).strip()
+
+
+def text_match(a: str, b: str) -> float:
+    """Similarity of two transcripts in [0, 1] (normalized edit-distance ratio)."""
+    na, nb = _norm(a), _norm(b)
+    if not na or not nb:
+        return 0.0
+    if na == nb:
+        return 1.0
+    return difflib.SequenceMatcher(None, na, nb, autojunk=False).ratio()
+
+
+class _Utterance:
+    __slots__ = ("payload", "text", "changed_at", "seq", "started", "future", "spec_text")
+
+    def __init__(self, payload: Dict[str, Any], now: float):
+        self.payload = payload
+        self.text = str(payload.get("text") or "")
+        self.changed_at = now
+        self.seq = 0
+        self.started = 0
+        self.future: Optional[Future] = None
+        self.spec_text = ""
+
+
+def _summary(samples: Deque[float]) -> Dict[str, float]:
+    values = sorted(samples)
+    if not values:
+        return {"count": 0, "avgMs": 0.0, "p95Ms": 0.0}
+    return {
+        "count": len(values),
+        "avgMs": round(sum(values) / len(values), 1),
+        "p95Ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 1),
+    }
+
+
+class Speculator:
+    def __init__(
+        self,
+        speculate: Callable[[Dict[str, Any]], Dict[str, Any]],
+        should_speculate: Callable[[Dict[str, Any]], bool],
+        stable_ms: int = COPILOT_SPECULATE_STABLE_MS,
+        match_ratio: float = COPILOT_SPECULATE_MATCH,
+        workers: int = COPILOT_SPECULATE_WORKERS,
+    ):
+        self.speculate = speculate
+        self.should_speculate = should_speculate
+        self.stable_s = stable_ms / 1000.0
+        self.match_ratio = match_ratio
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="copilot-speculate")
+        self._utterances: Dict[Tuple[str, str, str], _Utterance] = {}
+        self._due: List[Tuple[float, Tuple[str, str, str], int]] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.unused = 0
+        self.errors = 0
+        self._latency: Dict[str, Deque[float]] = {"hit": deque(maxlen=500), "none": deque(maxlen=500)}
+
+    @staticmethod
+    def _key(payload: Dict[str, Any]) -> Tuple[str, str, str]:
+        return (
+            str(payload.get("sessionId") or ""),
+            str(payload.get("speaker") or "").lower(),
+            str(payload.get("beginOffsetMillis") or ""),
+        )
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._scheduler, name="copilot-speculator", daemon=True)
+            self._thread.start()
+
+    def observe(self, payload: Dict[str, Any]) -> None:
+        """A partial transcript event (non-blocking: schedules a stability check)."""
+        key = self._key(payload)
+        if not key[0] or not payload.get("text"):
+            return
+        now = time()
+        with self._cond:
+            self._start()
+            utt = self._utterances.get(key)
+            if utt is None:
+                if len(self._utterances) >= COPILOT_SPECULATE_MAX_UTTERANCES:
+                    return
+                utt = _Utterance(payload, now)
+                self._utterances[key] = utt
+            elif utt.text != str(payload.get("text") or ""):
+                utt.payload, utt.text, utt.changed_at = payload, str(payload.get("text") or ""), now
+                utt.seq += 1
+            else:
+                return  # same text again: the pending check still stands
+            heapq.heappush(self._due, (now + self.stable_s, key, utt.seq))
+            self._cond.notify()
+
+    def _scheduler(self) -> None:
+        while True:
+            with self._cond:
+                while not self._due or self._due[0][0] > time():
+                    self._cond.wait(timeout=(self._due[0][0] - time()) if self._due else 5.0)
+                    self._forget_stale()
+                _, key, seq = heapq.heappop(self._due)
+                utt = self._utterances.get(key)
+                if (
+                    utt is None
+                    or utt.seq != seq
+                    or utt.started >= COPILOT_SPECULATE_MAX_PER_UTTERANCE
+                    or (utt.future is not None and utt.spec_text == utt.text)
+                ):
+                    continue
+                payload = utt.payload
+            try:
+                if not self.should_speculate(payload):
+                    continue
+            except Exception:
+                continue
+            with self._cond:
+                if self._utterances.get(key) is not utt or utt.seq != seq:
+                    continue
+                if utt.future is not None and not utt.future.done():
+                    utt.future.cancel()  # superseded before it started; a running one just finishes
+                utt.started += 1
+                utt.spec_text = utt.text
+                utt.future = self._pool.submit(self._run, payload)
+                self.started += 1
+
+    def _run(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            return self.speculate(payload)
+        except Exception as e:
+            self.errors += 1
+            print(f"[COPILOT_SPECULATE] speculation failed (ignored): {e}")
+            return None
+
+    def _forget_stale(self) -> None:
+        cutoff = time() - COPILOT_SPECULATE_FORGET_S
+        for key in [k for k, u in self._utterances.items() if u.changed_at < cutoff]:
+            if self._utterances.pop(key).future is not None:
+                self.unused += 1
+
+    def _find(self, payload: Dict[str, Any]) -> Optional[_Utterance]:
+        key = self._key(payload)
+        utt = self._utterances.pop(key, None)
+        if utt is None:
+            # Offsets may differ between partials and the final: take this speaker's latest utterance
+            same = [k for k in self._utterances if k[0] == key[0] and k[1] == key[1]]
+            if same:
+                utt = self._utterances.pop(max(same, key=lambda k: self._utterances[k].changed_at))
+        return utt
+
+    def take(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Speculative result for this final utterance if its text matches; None otherwise."""
+        with self._cond:
+            utt = self._find(payload)
+        if utt is None or utt.future is None:
+            return None
+        ratio = text_match(utt.spec_text, str(payload.get("text") or ""))
+        if ratio < self.match_ratio:
+            utt.future.cancel()
+            self.misses += 1
+            print(f"[COPILOT_SPECULATE] discarded: final differs from speculated text (match={ratio:.2f})")
+            return None
+        try:
+            result = utt.future.result(timeout=COPILOT_SPECULATE_WAIT_S)
+        except Exception:
+            result = None
+        if not result:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {**result, "match": round(ratio, 3)}
+
+    def drop(self, payload: Dict[str, Any]) -> None:
+        """A final that will not get its own run (coalesced): its speculation goes unused."""
+        with self._cond:
+            utt = self._find(payload)
+        if utt is not None and utt.future is not None:
+            utt.future.cancel()
+            self.unused += 1
+
+    def forget_session(self, session_id: str) -> None:
+        with self._cond:
+            for key in [k for k in self._utterances if k[0] == session_id]:
+                if self._utterances.pop(key).future is not None:
+                    self.unused += 1
+
+    def record(self, hit: bool, final_to_result_ms: float) -> None:
+        self._latency["hit" if hit else "none"].append(final_to_result_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            tracked = len(self._utterances)
+        return {
+            "enabled": True,
+            "stableMs": int(self.stable_s * 1000),
+            "matchRatio": self.match_ratio,
+            "tracked": tracked,
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "unused": self.unused,
+            "errors": self.errors,
+            "finalToResult": {"withHit": _summary(self._latency["hit"]), "without": _summary(self._latency["none"])},
+        }
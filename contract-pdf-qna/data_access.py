@@ -0,0 +1,262 @@
+import os
+import re
+import threading
+from collections import deque
+from time import time
+from typing import Any, Dict, List, Optional, Union
+
+from pymongo import MongoClient, monitoring
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
+
+
+# -------------------------------------------------------------------
+# Data access
+#
+# One configured MongoClient per process, shared by app.py and live_copilot.py
+# (previously each built its own unsized client, and fetch_user_by_mobile reached
+# into mongo_client["AHS"] directly):
+#   - pool sizing, connect / server-selection / socket / wait-queue timeouts, wire compression
+#   - read routing: listing reads (history, sidebar, transcript lists) use
+#     MONGO_LISTING_READ_PREFERENCE (secondaryPreferred by default); everything else stays
+#     on the primary. A collection written by this process in the last
+#     MONGO_READ_AFTER_WRITE_S seconds is read from the primary so users see their own writes.
+#   - per-operation latency (count / errors / avg / p95 / max) from a pymongo CommandListener,
+#     keyed by db.collection.command with per-user collections folded (chats_* / feedbacks_*)
+# -------------------------------------------------------------------
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        raw = (os.getenv(name) or "").strip()
+        if not raw:
+            return default
+        v = int(raw)
+        return v if v >= 0 else default
+    except Exception:
+        return default
+
+
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
+FRONT_DOOR_DB_NAME = "FrontDoorDB"
+USERS_DB_NAME = "AHS"
+
+MONGO_MAX_POOL_SIZE = _env_int("MONGO_MAX_POOL_SIZE", 100)
+MONGO_MIN_POOL_SIZE = _env_int("MONGO_MIN_POOL_SIZE", 0)
+MONGO_MAX_IDLE_TIME_MS = _env_int("MONGO_MAX_IDLE_TIME_MS", 300000)
+MONGO_CONNECT_TIMEOUT_MS = _env_int("MONGO_CONNECT_TIMEOUT_MS", 5000)
+MONGO_SERVER_SELECTION_TIMEOUT_MS = _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000)
+MONGO_SOCKET_TIMEOUT_MS = _env_int("MONGO_SOCKET_TIMEOUT_MS", 60000)
+MONGO_WAIT_QUEUE_TIMEOUT_MS = _env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000)
+# zlib is always available; zstd / snappy need the zstandard / python-snappy packages
+MONGO_COMPRESSORS = (os.getenv("MONGO_COMPRESSORS", "zlib") or "").strip()
+MONGO_LISTING_READ_PREFERENCE = (os.getenv("MONGO_LISTING_READ_PREFERENCE", "secondaryPreferred") or "").strip()
+# Server minimum is 90s; 0 disables the staleness bound
+MONGO_MAX_STALENESS_S = _env_int("MONGO_MAX_STALENESS_S", 90)
+MONGO_READ_AFTER_WRITE_S = _env_int("MONGO_READ_AFTER_WRITE_S", 5)
+MONGO_METRICS_SAMPLES = _env_int("MONGO_METRICS_SAMPLES", 500) or 500
+
+_PER_USER_COLLECTION_RE = re.compile(r"^(chats|feedbacks)_.+$")
+
+
+def _metric_collection(name: Optional[str]) -> str:
+    if not name:
+        return "-"
+    return _PER_USER_COLLECTION_RE.sub(r"\1_*", name)
+
+
+class OperationMetrics(monitoring.CommandListener):
+    """Latency per db.collection.command, fed by pymongo command monitoring."""
+
+    def __init__(self, samples: int = MONGO_METRICS_SAMPLES):
+        self.samples = samples
+        self._inflight: Dict[Any, str] = {}
+        self._ops: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event) -> str:
+        command = event.command or {}
+        name = event.command_name
+        target = command.get("collection") if name == "getMore" else command.get(name)
+        collection = target if isinstance(target, str) else None
+        return f"{event.database_name}.{_metric_collection(collection)}.{name}"
+
+    def started(self, event) -> None:
+        key = self._key(event)
+        with self._lock:
+            self._inflight[(event.connection_id, event.request_id)] = key
+
+    def _finish(self, event, failed: bool) -> None:
+        with self._lock:
+            key = self._inflight.pop((event.connection_id, event.request_id), None)
+            if key is None:
+                return
+            ms = event.duration_micros / 1000.0
+            op = self._ops.get(key)
+            if op is None:
+                op = self._ops[key] = {"count": 0, "errors": 0, "totalMs": 0.0, "maxMs": 0.0, "recent": deque(maxlen=self.samples)}
+            op["count"] += 1
+            op["errors"] += 1 if failed else 0
+            op["totalMs"] += ms
+            op["maxMs"] = max(op["maxMs"], ms)
+            op["recent"].append(ms)
+
+    def succeeded(self, event) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event) -> None:
+        self._finish(event, failed=True)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = []
+            for key, op in self._ops.items():
+                recent = sorted(op["recent"])
+                p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+                rows.append({
+                    "op": key,
+                    "count": op["count"],
+                    "errors": op["errors"],
+                    "avgMs": round(op["totalMs"] / op["count"], 2) if op["count"] else 0.0,
+                    "p95Ms": round(p95, 2),
+                    "maxMs": round(op["maxMs"], 2),
+                })
+        rows.sort(key=lambda r: r["avgMs"] * r["count"], reverse=True)
+        return rows
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ops.clear()
+
+
+class DataAccess:
+    def __init__(self, uri: Optional[str] = MONGO_URI, **client_options):
+        self.uri = uri
+        self.client_options = client_options
+        self.metrics = OperationMetrics()
+        self._client: Optional[MongoClient] = None
+        self._lock = threading.Lock()
+        self._recent_writes: Dict[str, float] = {}
+        self.listing_read_preference = self._listing_read_preference()
+
+    @staticmethod
+    def _listing_read_preference():
+        try:
+            mode = read_pref_mode_from_name(MONGO_LISTING_READ_PREFERENCE)
+            staleness = MONGO_MAX_STALENESS_S if MONGO_MAX_STALENESS_S and mode else -1
+            return make_read_preference(mode, None, staleness)
+        except Exception as e:
+            print(f"Warning: invalid MONGO_LISTING_READ_PREFERENCE={MONGO_LISTING_READ_PREFERENCE!r} ({e}); using primary")
+            return make_read_preference(0, None)
+
+    # ---------------------------------------------------------------
+    # client / handles
+    # ---------------------------------------------------------------
+    @property
+    def client(self) -> MongoClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    options = {
+                        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+                        "minPoolSize": MONGO_MIN_POOL_SIZE,
+                        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS or None,
+                        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+                        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS or None,
+                        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+                        "retryWrites": True,
+                        "retryReads": True,
+                        "unicode_decode_error_handler": "ignore",
+                        "event_listeners": [self.metrics],
+                    }
+                    if MONGO_COMPRESSORS:
+                        options["compressors"] = MONGO_COMPRESSORS
+                    options.update(self.client_options)
+                    self._client = MongoClient(self.uri, **options)
+                    print(
+                        f"[DATA_ACCESS] Mongo client: pool {MONGO_MIN_POOL_SIZE}-{MONGO_MAX_POOL_SIZE}, "
+                        f"compressors={MONGO_COMPRESSORS or 'none'}, listing reads={MONGO_LISTING_READ_PREFERENCE}"
+                    )
+        return self._client
+
+    def database(self, name: str):
+        return self.client[name]
+
+    @property
+    def front_door(self):
+        return self.client[FRONT_DOOR_DB_NAME]
+
+    @property
+    def transcripts_db(self):
+        return self.client[MONGO_DB_NAME]
+
+    @property
+    def users(self):
+        return self.client[USERS_DB_NAME]["Users"]
+
+    # ---------------------------------------------------------------
+    # read routing
+    # ---------------------------------------------------------------
+    @staticmethod
+    def _key(collection) -> str:
+        return f"{collection.database.name}.{collection.name}"
+
+    def note_write(self, collection) -> None:
+        """Mark `collection` as just written, so listing reads stay on the primary for a few seconds."""
+        self._recent_writes[self._key(collection)] = time()
+
+    def reader(self, collection):
+        """`collection` routed for listing reads (secondaries allowed unless recently written here)."""
+        written_at = self._recent_writes.get(self._key(collection))
+        if written_at is not None:
+            if time() - written_at < MONGO_READ_AFTER_WRITE_S:
+                return collection
+            self._recent_writes.pop(self._key(collection), None)
+        return collection.with_options(read_preference=self.listing_read_preference)
+
+    # ---------------------------------------------------------------
+    # shared lookups
+    # ---------------------------------------------------------------
+    def find_user_by_mobile(self, mobiles: Union[str, List[str]]) -> Optional[Dict[str, Any]]:
+        """AHS.Users by mobile; with several candidates the first one (in order) that matches wins."""
+        candidates = [mobiles] if isinstance(mobiles, str) else [m for m in mobiles if m]
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return self.users.find_one({"mobile": candidates[0]})
+        found = {doc.get("mobile"): doc for doc in self.users.find({"mobile": {"$in": candidates}})}
+        for mobile in candidates:
+            if mobile in found:
+                return found[mobile]
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        pool = {
+            "maxPoolSize": MONGO_MAX_POOL_SIZE,
+            "minPoolSize": MONGO_MIN_POOL_SIZE,
+            "compressors": MONGO_COMPRESSORS or None,
+            "listingReadPreference": MONGO_LISTING_READ_PREFERENCE,
+        }
+        return {"client": pool, "operations": self.metrics.snapshot()}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+_data_access: Optional[DataAccess] = None
+_data_access_lock = threading.Lock()
+
+
+def get_data_access() -> DataAccess:
+    """Process-wide DataAccess (one client, one pool)."""
+    global _data_access
+    if _data_access is None:
+        with _data_access_lock:
+            if _data_access is None:
+                _data_access = DataAccess()
+    return _data_access
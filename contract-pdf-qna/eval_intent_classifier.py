@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Offline calibration for the local Live Copilot intent classifier (copilot_intent.py).
+
+Scores labelled utterances against the intent centroids once, then sweeps the confidence
+threshold and reports, per threshold:
+
+- coverage: share of utterances served locally (the rest escalate to the intent LLM)
+- local accuracy: how often a locally served intent matches the label
+- overall accuracy: local answers + escalations (assumed correct: the labels come from the LLM
+  or from a reviewer)
+
+and recommends the lowest threshold whose local accuracy reaches --target, i.e. the most
+LLM calls saved at that accuracy. Also prints per-utterance scoring latency (p50 / p95).
+
+Examples:
+  python eval_intent_classifier.py --data utterances.jsonl
+  python eval_intent_classifier.py --data utterances.csv --label-with-llm --write-labels labelled.jsonl
+  python eval_intent_classifier.py --data labelled.jsonl --margin 0.03 --target 0.97
+
+Rows need `text`; `intent` is the label. With --label-with-llm, rows without an intent are
+labelled by the production intent LLM (live_copilot._call_intent_llm, needs OPENAI_API_KEY).
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+from collections import Counter
+from time import time
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from copilot_intent import COPILOT_INTENT_MARGIN, LocalIntentClassifier  # noqa: E402
+
+
+def load_rows(path: str) -> List[Dict[str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        elif path.endswith(".json"):
+            rows = json.load(f)
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    return [
+        {"text": str(r.get("text") or "").strip(), "intent": str(r.get("intent") or "").strip().upper()}
+        for r in rows
+        if str(r.get("text") or "").strip()
+    ]
+
+
+def label_with_llm(rows: List[Dict[str, str]]) -> int:
+    from live_copilot import _call_intent_llm
+
+    labelled = 0
+    for r in rows:
+        if r["intent"]:
+            continue
+        r["intent"] = str(_call_intent_llm(r["text"]).get("intent") or "OTHER").upper()
+        labelled += 1
+    return labelled
+
+
+def _pct(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+
+def sweep(
+    clf: LocalIntentClassifier, scored: List[Tuple[str, List[Tuple[str, float]]]], thresholds: List[float]
+) -> List[Dict[str, Any]]:
+    report = []
+    for threshold in thresholds:
+        clf.threshold = threshold
+        served = correct = 0
+        confusions: Counter = Counter()
+        for label, ranked in scored:
+            intent, _ = clf.decide(ranked)
+            if intent is None:
+                continue
+            served += 1
+            if intent == label:
+                correct += 1
+            else:
+                confusions[f"{label}->{intent}"] += 1
+        total = len(scored)
+        report.append({
+            "threshold": round(threshold, 2),
+            "coverage": served / total if total else 0.0,
+            "localAccuracy": correct / served if served else None,
+            "overallAccuracy": (correct + total - served) / total if total else 0.0,
+            "topConfusions": confusions.most_common(3),
+        })
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Calibrate the local Live Copilot intent classifier threshold")
+    parser.add_argument("--data", required=True, help="Labelled utterances (.jsonl / .json / .csv with text, intent)")
+    parser.add_argument("--label-with-llm", action="store_true", help="Label rows without an intent using the intent LLM")
+    parser.add_argument("--write-labels", help="Write the (LLM-)labelled rows to this .jsonl for reuse")
+    parser.add_argument("--margin", type=float, default=COPILOT_INTENT_MARGIN, help="Required lead over the runner-up")
+    parser.add_argument("--target", type=float, default=0.95, help="Local accuracy the threshold must reach")
+    parser.add_argument("--min-threshold", type=float, default=0.30)
+    parser.add_argument("--max-threshold", type=float, default=0.90)
+    parser.add_argument("--step", type=float, default=0.05)
+    args = parser.parse_args()
+
+    rows = load_rows(args.data)
+    if args.label_with_llm:
+        print(f"Labelled {label_with_llm(rows)} row(s) with the intent LLM")
+    if args.write_labels:
+        with open(args.write_labels, "w", encoding="utf-8") as f:
+            for r in rows:
+                f.write(json.dumps(r) + "\n")
+    rows = [r for r in rows if r["intent"]]
+    if not rows:
+        print("No labelled utterances (add an `intent` column or use --label-with-llm)")
+        return 1
+
+    clf = LocalIntentClassifier(margin=args.margin)
+    clf.warm(background=False)
+    if not clf.ready:
+        print(f"Classifier failed to load: {clf.load_error}")
+        return 1
+
+    scored, latency_ms = [], []
+    for r in rows:
+        started = time()
+        ranked = clf.scores(r["text"])
+        latency_ms.append((time() - started) * 1000.0)
+        scored.append((r["intent"], ranked))
+
+    print(f"{len(rows)} utterances: {dict(Counter(r['intent'] for r in rows))}")
+    print(f"Scoring latency: p50={_pct(latency_ms, 0.5):.2f}ms p95={_pct(latency_ms, 0.95):.2f}ms (margin={args.margin})")
+    print(f"{'threshold':>9}  {'coverage':>8}  {'localAcc':>8}  {'overall':>8}  top confusions")
+
+    thresholds, t = [], args.min_threshold
+    while t <= args.max_threshold + 1e-9:
+        thresholds.append(t)
+        t += args.step
+    report = sweep(clf, scored, thresholds)
+    for row in report:
+        local = f"{row['localAccuracy']:.3f}" if row["localAccuracy"] is not None else "-"
+        print(
+            f"{row['threshold']:>9.2f}  {row['coverage']:>8.3f}  {local:>8}  {row['overallAccuracy']:>8.3f}  "
+            f"{', '.join(f'{k} x{n}' for k, n in row['topConfusions'])}"
+        )
+
+    ok = [row for row in report if row["localAccuracy"] is not None and row["localAccuracy"] >= args.target]
+    if not ok:
+        print(f"\nNo threshold reaches local accuracy {args.target}; keep COPILOT_INTENT_CLASSIFIER=llm or add exemplars")
+        return 0
+    best = ok[0]
+    print(
+        f"\nRecommended: COPILOT_INTENT_THRESHOLD={best['threshold']:.2f} COPILOT_INTENT_MARGIN={args.margin} "
+        f"(serves {best['coverage']:.0%} locally at {best['localAccuracy']:.1%} accuracy)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
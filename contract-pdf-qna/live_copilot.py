@@ -2,11 +2,29 @@ import os
 import re
 import json
 import hashlib
-from dataclasses import dataclass, field
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, fields
 from time import time
-from typing import Any, Dict, List, Optional
-
-from pymongo import MongoClient
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from answer_cache import COPILOT_ANSWER_CACHE_SHARED, COPILOT_ANSWER_CACHE_TTL_S, AnswerCache
+from copilot_fused import FUSED_SCHEMA, fused_call_allowed, needs_second_call, parse_fused_output
+from copilot_intent import COPILOT_INTENT_CLASSIFIER, LocalIntentClassifier
+from copilot_sessions import (
+    COPILOT_STATE_BACKEND,
+    COPILOT_STATE_IDLE_S,
+    BoundedSessionStore,
+    SessionConflict,
+    SessionLockTimeout,
+    json_size,
+    open_session_backend,
+)
+from copilot_speculation import COPILOT_SPECULATE, Speculator
+from data_access import get_data_access
 
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_community.vectorstores import Milvus
@@ -72,6 +90,10 @@ Return payload shape (consumed by LiveTranscript UI):
 # -----------------------
 
 
+def _s_env(name: str) -> str:
+    return (os.getenv(name) or "").strip().lower()
+
+
 def _env_int(name: str, default: int) -> int:
     try:
         raw = (os.getenv(name) or "").strip()
@@ -93,6 +115,20 @@ MONGO_URI = os.getenv("MONGO_URI")
 
 MODEL_INTENT = os.getenv("COPILOT_MODEL_INTENT", "gpt-4o")
 MODEL_SUGGEST = os.getenv("COPILOT_MODEL_SUGGEST", "gpt-4o")
+MODEL_FUSED = os.getenv("COPILOT_MODEL_FUSED", MODEL_SUGGEST)
+
+# multi: intent -> question extraction -> diagnostics -> suggestion (up to 4 sequential LLM calls)
+# fused: one structured-output call for all four; a second (suggestion) call only when RAG answers arrive
+COPILOT_REASONING_MODE = "fused" if _s_env("COPILOT_REASONING_MODE") == "fused" else "multi"
+# Pending questions answered per cycle, concurrently (each answer is pushed as an interim card)
+COPILOT_RAG_PER_CYCLE = _env_int("COPILOT_RAG_PER_CYCLE", 2)
+COPILOT_RAG_WORKERS = _env_int("COPILOT_RAG_WORKERS", 8)
+COPILOT_INTERIM_ANSWER_CHARS = 600
+# Answered-question memory per call: only dedupe keys + a trimmed answer are kept
+COPILOT_ANSWERED_MAX = _env_int("COPILOT_ANSWERED_MAX", 50)
+COPILOT_ANSWERED_MAX_CHARS = _env_int("COPILOT_ANSWERED_MAX_CHARS", 1000)
+# % of runs that also execute the other mode in the background, only to log a side-by-side comparison
+COPILOT_REASONING_SHADOW_PCT = min(_env_int("COPILOT_REASONING_SHADOW_PCT", 0), 100)
 
 
 def _now_epoch() -> int:
@@ -118,7 +154,7 @@ def _fingerprint(obj: Any) -> str:
 # -----------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class _SessionState:
     session_id: str
     last_suggested_at: float = 0.0
@@ -134,21 +170,93 @@ class _SessionState:
 
     # Question state: queue questions even before verification so they don't get skipped
     pending_questions: List[Dict[str, Any]] = field(default_factory=list)  # [{k,q,ts}]
-    answered: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # k -> {"answer":..., "citedChunks":[...], "ts":...}
+    answered: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # k -> {"answer": trimmed, "source":..., "ts":...}
 
     # Emission stability / dedupe
     last_emit_fingerprint: str = ""
 
+    # Latest-wins coalescing: turns folded into the next run (note_transcript_event) and work
+    # from a superseded run (answers, important change) that the follow-up run must still surface
+    coalesced_phones: List[str] = field(default_factory=list)
+    coalesced_question: bool = False
+    carry_answers: List[Dict[str, Any]] = field(default_factory=list)
+    carry_important: bool = False
+
+    # At most one copilot run per session mutates this state at a time
+    run_lock: threading.Lock = field(default_factory=threading.Lock)
+
 
-_sessions: Dict[str, _SessionState] = {}
+def _state_size(st: _SessionState) -> int:
+    return json_size({f.name: getattr(st, f.name) for f in fields(st) if f.name != "run_lock"})
+
+
+# Idle calls (no copilot_disable) are reclaimed after COPILOT_STATE_IDLE_S; at most COPILOT_MAX_SESSIONS
+_sessions = BoundedSessionStore("copilot_state", sizeof=_state_size)
+# COPILOT_STATE_BACKEND=redis|mongo: state lives outside the process, so any worker can run any call
+_shared_state = open_session_backend("copilot_state", COPILOT_STATE_IDLE_S) if COPILOT_STATE_BACKEND != "memory" else None
 
 
 def _get_state(session_id: str) -> _SessionState:
-    st = _sessions.get(session_id)
-    if st is None:
-        st = _SessionState(session_id=session_id)
-        _sessions[session_id] = st
-    return st
+    return _sessions.get_or_create(session_id, lambda: _SessionState(session_id=session_id))
+
+
+def _state_to_doc(st: _SessionState) -> Dict[str, Any]:
+    return {f.name: getattr(st, f.name) for f in fields(st) if f.name != "run_lock"}
+
+
+def _state_from_doc(session_id: str, doc: Optional[Dict[str, Any]]) -> _SessionState:
+    known = {f.name for f in fields(_SessionState)} - {"run_lock", "session_id"}
+    return _SessionState(session_id=session_id, **{k: v for k, v in (doc or {}).items() if k in known})
+
+
+@contextmanager
+def _session(session_id: str) -> Iterator[_SessionState]:
+    """
+    This call's state, held exclusively for one run. In memory: the state object under its run_lock.
+    Shared backend: a per-session lease across workers, load, and a compare-and-set save on exit
+    (a lost race keeps the other worker's newer state).
+    """
+    if _shared_state is None:
+        st = _get_state(session_id)
+        with st.run_lock:
+            yield st
+        return
+    with _shared_state.lock(session_id):
+        doc, version = _shared_state.get(session_id)
+        st = _state_from_doc(session_id, doc)
+        try:
+            yield st
+        finally:
+            try:
+                _shared_state.put(session_id, _state_to_doc(st), version)
+            except SessionConflict as e:
+                _shared_state.conflicts += 1
+                print(f"[COPILOT_STATE] not saved, {e} (lease expired mid-run; keeping the newer state)")
+
+
+def _remember_answer(st: _SessionState, k: str, res: Dict[str, Any]) -> None:
+    """Keep what later turns need (dedupe key, trimmed answer), not the full RAG payload / cited chunks."""
+    st.answered.pop(k, None)
+    st.answered[k] = {
+        "ts": time(),
+        "answer": _s((res or {}).get("answer"))[:COPILOT_ANSWERED_MAX_CHARS],
+        "source": (res or {}).get("source", ""),
+    }
+    while len(st.answered) > COPILOT_ANSWERED_MAX:
+        st.answered.pop(next(iter(st.answered)))
+
+
+def end_session(session_id: str) -> None:
+    """Drop a call's copilot state (copilot_disable); idle calls are reclaimed by the store's TTL."""
+    _sessions.pop(session_id)
+    if _shared_state is not None:
+        _shared_state.delete(session_id)
+    if _speculator is not None:
+        _speculator.forget_session(session_id)
+
+
+def session_stats() -> Dict[str, Any]:
+    return _shared_state.stats() if _shared_state is not None else _sessions.stats()
 
 
 def _cooldown_ok(st: _SessionState) -> bool:
@@ -370,7 +478,6 @@ def _queue_questions(st: _SessionState, questions: List[str]) -> bool:
 
 
 _PHONE_RE = re.compile(r"(?:(?:\+?1\s*)?)\(?\s*(\d{3})\s*\)?[\s.-]?(\d{3})[\s.-]?(\d{4})")
-_mongo_client: Optional[MongoClient] = None
 
 
 def _extract_phone_candidates(text: str) -> List[str]:
@@ -401,24 +508,13 @@ def _extract_phone_candidates(text: str) -> List[str]:
     return deduped[:4]
 
 
-def _get_mongo_client() -> MongoClient:
-    global _mongo_client
-    if _mongo_client is None:
-        _mongo_client = MongoClient(MONGO_URI, unicode_decode_error_handler="ignore")
-    return _mongo_client
-
-
 def _lookup_user_by_phone(phone_candidates: List[str]) -> Optional[Dict[str, Any]]:
     if not MONGO_URI:
         return None
     if not phone_candidates:
         return None
-    users = _get_mongo_client()["AHS"]["Users"]
-    for p in phone_candidates:
-        doc = users.find_one({"mobile": p})
-        if doc:
-            return doc
-    return users.find_one({"mobile": {"$in": phone_candidates}})
+    # Shared pooled client (data_access.py); one $in query, first candidate in order wins
+    return get_data_access().find_user_by_mobile(phone_candidates)
 
 
 def _normalize_customer_doc(doc: Dict[str, Any], phone: str) -> Dict[str, Any]:
@@ -518,6 +614,26 @@ def _milvus_collection(contract_type: str, selected_plan: str, selected_state: s
     return mapping.get(ct, {}).get(pl, mapping.get(ct, {}).get("default"))
 
 
+# Shared across sessions: bounds concurrent Infer agent runs process-wide
+_rag_pool = ThreadPoolExecutor(max_workers=COPILOT_RAG_WORKERS, thread_name_prefix="copilot-rag")
+
+
+def _embed_question(question: str) -> List[float]:
+    return _get_embed().embed_query(question)
+
+
+# Answers reused across calls on the same collection; with COPILOT_ANSWER_CACHE_SHARED=1 (and a redis / mongo
+# COPILOT_STATE_BACKEND) other workers see them too
+_answer_cache = AnswerCache(
+    embed=_embed_question,
+    shared=(
+        open_session_backend("answer_cache", COPILOT_ANSWER_CACHE_TTL_S)
+        if COPILOT_ANSWER_CACHE_SHARED and COPILOT_STATE_BACKEND != "memory" and COPILOT_ANSWER_CACHE_TTL_S
+        else None
+    ),
+)
+
+
 _embed: Optional[OpenAIEmbeddings] = None
 _milvus_cache: Dict[str, Milvus] = {}
 
@@ -609,6 +725,37 @@ def _call_intent_llm(transcript: str) -> Dict[str, Any]:
     }
 
 
+# COPILOT_INTENT_CLASSIFIER=local (default): nearest-centroid embedding classifier first, the LLM only
+# when it is unsure; =llm: every utterance goes to _call_intent_llm
+_intent_classifier = LocalIntentClassifier() if COPILOT_INTENT_CLASSIFIER == "local" else None
+if _intent_classifier is not None:
+    _intent_classifier.warm()
+
+
+def _classify_intent(
+    usage: Optional[Dict[str, Any]], text: str, transcript: str, speaker: str, needs_entities: bool = False
+) -> Dict[str, Any]:
+    """Intent for the latest utterance: local classifier for a confident customer turn, else the intent LLM
+    on the transcript. needs_entities: the caller reads entities (e.g. entities.question), which only the LLM fills."""
+    local = (
+        _intent_classifier.classify(text, speaker=speaker, needs_entities=needs_entities)
+        if _intent_classifier is not None
+        else None
+    )
+    if local is not None:
+        if usage is not None:
+            usage["intentSource"] = "local"
+        return local
+    if usage is None:
+        return _call_intent_llm(transcript)
+    usage["intentSource"] = "llm"
+    return _timed_llm(usage, _call_intent_llm, transcript)
+
+
+def intent_stats() -> Dict[str, Any]:
+    return _intent_classifier.stats() if _intent_classifier is not None else {"classifier": "llm"}
+
+
 # -----------------------
 # Verified RAG (Milvus) + generic tool results
 # -----------------------
@@ -665,6 +812,29 @@ def _simple_rag_answer(question: str, customer: Dict[str, Any]) -> Dict[str, Any
 
 
 def _rag_answer(question: str, customer: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    RAG answer through the cross-session answer cache: the same question on the same Milvus collection
+    (plan / state) is answered once and reused by every call until it expires. A cached answer keeps
+    its provenance in `source` ("cache:INFER") plus a `cache` block (match kind, score, age).
+    """
+    collection = _milvus_collection(customer.get("contractType"), customer.get("plan"), customer.get("state"))
+    return _answer_cache.get_or_compute(
+        collection or "", question, lambda: _rag_answer_uncached(question, customer), cacheable=_cacheable_answer
+    )
+
+
+def _cacheable_answer(res: Dict[str, Any]) -> bool:
+    # Errors and "couldn't find anything" fallbacks are retried next time rather than pinned for the TTL
+    return bool(res) and not res.get("error") and bool(_s(res.get("answer"))) and (
+        res.get("source") == "INFER" or bool(res.get("citedChunks"))
+    )
+
+
+def answer_cache_stats() -> Dict[str, Any]:
+    return _answer_cache.stats()
+
+
+def _rag_answer_uncached(question: str, customer: Dict[str, Any]) -> Dict[str, Any]:
     """
     Main RAG function - uses INFER wrapper if available, otherwise falls back to simple RAG.
     
@@ -858,32 +1028,406 @@ def _call_suggest_llm(
 
 
 # -----------------------
-# Public entrypoint
+# Fused reasoning (COPILOT_REASONING_MODE=fused)
 # -----------------------
 
 
-def handle_transcript_event(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+_fused_prompt = ChatPromptTemplate.from_template(
+    """
+You are a real-time copilot helping a CSR during a live home warranty insurance call. In one pass:
+
+1. Classify the customer's latest intent:
+- If you see a phone number, intent MUST be CUSTOMER_IDENTIFICATION with confidence >= 0.9 and entities.phone filled.
+- CLAIM_STATUS: asks about an existing claim status/ETA/scheduling. COMPLAINT: frustration, threats to cancel, escalation.
+- INQUIRY: coverage/plan/policy/terms questions. PROBLEM: a malfunction/issue report. SMALL_TALK: greetings/thanks/off-topic.
+- requiresVerification is true for CLAIM_STATUS and for plan-specific coverage confirmation.
+- evidenceQuote is a verbatim quote from the customer.
+
+2. questions: {questions_rule}
+
+3. diagnostics: only for PROBLEM, generic troubleshooting steps and clarifying questions (no coverage promises); otherwise empty lists.
+
+4. cards: 1-3 suggestions the CSR can say directly to the customer.
+- Use customer_context + session_state as ground truth; do NOT invent coverage details (answers to pending questions arrive separately).
+- If plan context (contractType/plan/state) is missing, suggest confirming it before making commitments.
+- If customer_context shows "verified": true, do NOT ask for phone verification.
+- Ask for the customer's phone number only if session_state.verification.askForPhoneAllowed is true and verification is needed.
+- Do NOT re-answer questions already addressed; reference the prior answer and suggest the next step.
+- Tone: calm, reassuring, professional, 1-2 sentences; direct about coverage decisions; include specifics when available.
+
+customer_context: {customer_context}
+session_state: {session_state}
+
+Conversation context (most recent last):
+{transcript}
+"""
+)
+
+
+_FUSED_QUESTIONS_RULE = (
+    "customer-intent questions (coverage, limits, exclusions, service steps/timeline/costs) from the latest customer turns; "
+    "infer a likely question if a problem was described without asking; each specific (appliance/system + issue); max 3."
+)
+
+
+def _call_fused_llm(
+    *,
+    transcript: str,
+    customer_context: Dict[str, Any],
+    session_state: Dict[str, Any],
+    extract_questions: bool,
+) -> Optional[Dict[str, Any]]:
+    """One structured-output call replacing intent + question extraction + diagnostics + suggestion. None on failure."""
+    llm = ChatOpenAI(temperature=0.0, model=MODEL_FUSED).with_structured_output(
+        FUSED_SCHEMA, method="json_schema", strict=True
+    )
+    chain = _fused_prompt | llm
+    try:
+        obj = chain.invoke(
+            {
+                "questions_rule": _FUSED_QUESTIONS_RULE if extract_questions else "return an empty list.",
+                "customer_context": json.dumps(customer_context or {}, default=str),
+                "session_state": json.dumps(session_state or {}, default=str),
+                "transcript": transcript,
+            }
+        )
+    except Exception as e:
+        print(f"[LIVE_COPILOT] fused reasoning call failed, falling back to multi-call for this turn: {e}")
+        return None
+    parsed = parse_fused_output(obj)
+    if parsed is None:
+        print(f"[LIVE_COPILOT] fused reasoning returned an unusable reply, falling back to multi-call for this turn: {str(obj)[:200]}")
+    return parsed
+
+
+# -----------------------
+# Reasoning latency / quality (side-by-side)
+# -----------------------
+
+
+_reasoning_lock = threading.Lock()
+_reasoning_runs: Dict[str, deque] = {"multi": deque(maxlen=500), "fused": deque(maxlen=500)}
+_reasoning_compare: deque = deque(maxlen=500)
+
+
+def _timed_llm(usage: Dict[str, Any], fn: Callable[..., Any], *args, **kwargs) -> Any:
+    started = time()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        usage["calls"] += 1
+        usage["llmMs"] += (time() - started) * 1000.0
+
+
+def _question_overlap(a: List[str], b: List[str]) -> float:
+    sa, sb = {_norm_text(x) for x in a if _s(x)}, {_norm_text(x) for x in b if _s(x)}
+    if not sa and not sb:
+        return 1.0
+    return round(len(sa & sb) / len(sa | sb), 2)
+
+
+def _record_reasoning(session_id: str, usage: Dict[str, Any], total_ms: float, emitted: bool) -> None:
+    sample = {"ms": total_ms, "llmMs": usage["llmMs"], "ragMs": usage["ragMs"], "calls": usage["calls"]}
+    with _reasoning_lock:
+        _reasoning_runs[usage["mode"]].append(sample)
+    if _speculator is not None:
+        _speculator.record(usage.get("speculation") == "hit", total_ms)
+    print(
+        f"[COPILOT_REASONING] mode={usage['mode']} session={session_id} calls={usage['calls']} "
+        f"llmMs={usage['llmMs']:.0f} ragMs={usage['ragMs']:.0f} totalMs={total_ms:.0f} "
+        f"intent={usage.get('intent', '')}/{usage.get('intentSource', '-')} questions={len(usage.get('questions') or [])} "
+        f"cards={usage.get('cards', 0)} speculation={usage.get('speculation', 'off')} emitted={emitted}"
+    )
+
+
+def _shadow_other_mode(
+    session_id: str,
+    served: Dict[str, Any],
+    *,
+    transcript: str,
+    customer_context: Dict[str, Any],
+    tool_result: Dict[str, Any],
+    session_state: Dict[str, Any],
+    extract_questions: bool,
+) -> None:
+    """Run the mode we did NOT serve on the same snapshot (no session state changes) and log both side by side."""
+    other: Dict[str, Any] = {"mode": "multi" if served["mode"] == "fused" else "fused", "calls": 0, "llmMs": 0.0}
+    try:
+        if other["mode"] == "fused":
+            fused = _timed_llm(
+                other, _call_fused_llm, transcript=transcript, customer_context=customer_context,
+                session_state=session_state, extract_questions=extract_questions,
+            ) or {}
+            other.update(intent=_s(fused.get("intent")), questions=fused.get("questions") or [], cards=len(fused.get("cards") or []))
+        else:
+            intent_obj = _timed_llm(other, _call_intent_llm, transcript)
+            questions = _timed_llm(other, _extract_questions_llm, transcript) if extract_questions else []
+            shadow_tools = dict(tool_result)
+            if _s(intent_obj.get("intent")) == "PROBLEM":
+                shadow_tools["diagnostics"] = _timed_llm(other, _diagnostics_steps, transcript)
+            cards = _timed_llm(
+                other, _call_suggest_llm, intent=_s(intent_obj.get("intent")),
+                customer_verified=bool(customer_context.get("verified")), customer_context=customer_context,
+                tool_result=shadow_tools, transcript=transcript, evidence="",
+            )
+            other.update(intent=_s(intent_obj.get("intent")), questions=questions, cards=len(cards))
+    except Exception as e:
+        print(f"[COPILOT_COMPARE] shadow {other['mode']} run failed for {session_id}: {e}")
+        return
+    row = {
+        "served": served["mode"],
+        "servedMs": served["llmMs"],
+        "shadowMs": other["llmMs"],
+        "intentMatch": served.get("intent") == other.get("intent"),
+        "questionOverlap": _question_overlap(served.get("questions") or [], other.get("questions") or []),
+    }
+    with _reasoning_lock:
+        _reasoning_compare.append(row)
+    print(
+        f"[COPILOT_COMPARE] session={session_id} {served['mode']}: {served['calls']} call(s) {served['llmMs']:.0f}ms "
+        f"intent={served.get('intent')} cards={served.get('cards', 0)} | {other['mode']}: {other['calls']} call(s) "
+        f"{other['llmMs']:.0f}ms intent={other.get('intent')} cards={other.get('cards', 0)} | "
+        f"intentMatch={row['intentMatch']} questionOverlap={row['questionOverlap']}"
+    )
+
+
+def reasoning_stats() -> Dict[str, Any]:
+    """Per-mode LLM latency / call counts and shadow agreement, for /internal/copilot/metrics."""
+    def summarize(samples: List[Dict[str, float]], key: str) -> Dict[str, float]:
+        values = sorted(x[key] for x in samples)
+        if not values:
+            return {"avgMs": 0.0, "p95Ms": 0.0}
+        return {
+            "avgMs": round(sum(values) / len(values), 1),
+            "p95Ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 1),
+        }
+
+    with _reasoning_lock:
+        runs = {mode: list(samples) for mode, samples in _reasoning_runs.items()}
+        compare = list(_reasoning_compare)
+    out: Dict[str, Any] = {"mode": COPILOT_REASONING_MODE, "shadowPct": COPILOT_REASONING_SHADOW_PCT}
+    for mode, samples in runs.items():
+        out[mode] = {
+            "runs": len(samples),
+            "avgCalls": round(sum(x["calls"] for x in samples) / len(samples), 2) if samples else 0.0,
+            "llm": summarize(samples, "llmMs"),
+            "total": summarize(samples, "ms"),
+        }
+    out["compare"] = {
+        "samples": len(compare),
+        "intentAgreement": round(sum(1 for x in compare if x["intentMatch"]) / len(compare), 3) if compare else None,
+        "avgQuestionOverlap": round(sum(x["questionOverlap"] for x in compare) / len(compare), 3) if compare else None,
+    }
+    return out
+
+
+def _interim_answer_update(
+    session_id: str, intent: str, customer_ctx: Dict[str, Any], question: str, res: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """suggestion_update for one RAG answer, sent before the consolidated cards (marked interim)."""
+    answer = _s((res or {}).get("answer"))
+    if not answer or (res or {}).get("error"):
+        return None
+    if len(answer) > COPILOT_INTERIM_ANSWER_CHARS:
+        answer = answer[:COPILOT_INTERIM_ANSWER_CHARS].rsplit(" ", 1)[0] + "…"
+    return {
+        "sessionId": session_id,
+        "intent": intent,
+        "confidence": float((res or {}).get("confidence") or 0.0),
+        "customer": customer_ctx,
+        "cards": [{"title": "Answer", "csrScript": answer, "evidence": question, "priority": "high"}],
+        "interim": True,
+        "question": question,
+        "createdAt": str(_now_epoch()),
+    }
+
+
+# -----------------------
+# Speculation on stable partials (COPILOT_SPECULATE=1, see copilot_speculation.py)
+# -----------------------
+
+
+def _peek_state(session_id: str) -> Optional[_SessionState]:
+    """Read-only view of a call's state for speculation (no lock; may be one turn behind)."""
+    if _shared_state is not None:
+        doc, _ = _shared_state.get(session_id)
+        return _state_from_doc(session_id, doc) if doc else None
+    return _sessions.get(session_id, touch=False)
+
+
+def _should_speculate(payload: Dict[str, Any]) -> bool:
+    text = _s(payload.get("text"))
+    if _extract_phone_candidates(text):
+        return True
+    return _s(payload.get("speaker")).lower() == "customer" and _should_extract_questions(text)
+
+
+def _speculate(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The slow, state-free first half of a run over a partial: phone lookup, intent (multi mode),
+    question extraction and RAG prefetch (futures on _rag_pool). Never writes session state.
+    """
     session_id = _s(payload.get("sessionId"))
     speaker = _s(payload.get("speaker")).lower()
     text = _s(payload.get("text"))
-    is_partial = bool(payload.get("isPartial", True))
+    base = _peek_state(session_id) or _SessionState(session_id=session_id)
+
+    # Scratch copy: what the state would look like once this utterance is final
+    scratch = _SessionState(
+        session_id=session_id,
+        buffer=list(base.buffer),
+        customer=base.customer,
+        contract_type=base.contract_type,
+        selected_plan=base.selected_plan,
+        selected_state=base.selected_state,
+    )
+    _update_session_context_from_payload(scratch, payload)
+    _append_buffer(scratch, speaker=speaker, text=text)
+    transcript = _buffer_text(scratch)
+    out: Dict[str, Any] = {"text": text}
+
+    phones = _extract_phone_candidates(text)
+    if phones and not scratch.customer:
+        doc = _lookup_user_by_phone(phones)
+        out["phones"], out["phoneDoc"] = phones, doc
+        if doc:
+            scratch.customer = _normalize_customer_doc(doc, phones[0])
+
+    verification_ask = speaker == "csr" and _looks_like_verification_request(text)
+    wants_questions = speaker == "customer" and _should_extract_questions(text)
+    if COPILOT_REASONING_MODE == "multi" and not phones and not verification_ask:
+        out["intent"] = _classify_intent(None, text, transcript, speaker, needs_entities=wants_questions)
+
+    if wants_questions:
+        questions = _extract_questions_llm(transcript)
+        out["questions"] = questions
+        ctx = _effective_customer_context(scratch)
+        if ctx.get("contractType") and ctx.get("plan") and ctx.get("state"):
+            out["rag"] = {
+                _norm_text(q): _rag_pool.submit(_rag_answer, q, ctx)
+                for q in questions[:COPILOT_RAG_PER_CYCLE]
+                if _norm_text(q) and _norm_text(q) not in base.answered
+            }
+    print(
+        f"[COPILOT_SPECULATE] {session_id}: intent={'yes' if out.get('intent') else 'no'} "
+        f"questions={len(out.get('questions') or [])} prefetch={len(out.get('rag') or {})} for partial '{text[:60]}'"
+    )
+    return out
+
+
+_speculator = Speculator(_speculate, _should_speculate) if COPILOT_SPECULATE else None
+
+
+def observe_partial(payload: Dict[str, Any]) -> None:
+    """Partial transcript event (from the webhook): non-blocking, may start speculation."""
+    if _speculator is not None:
+        _speculator.observe(payload)
+
 
-    if not session_id or not text:
+def speculation_stats() -> Dict[str, Any]:
+    return _speculator.stats() if _speculator is not None else {"enabled": False}
+
+
+# -----------------------
+# Public entrypoint
+# -----------------------
+
+
+def note_transcript_event(payload: Dict[str, Any]) -> None:
+    """
+    Fold a final utterance into session state without a copilot run (it was superseded by a newer
+    turn before its run started). The next run sees it in the buffer, plus any phone number or
+    customer question it carried.
+    """
+    session_id = _s(payload.get("sessionId"))
+    speaker = _s(payload.get("speaker")).lower()
+    text = _s(payload.get("text"))
+    if not session_id or not text or bool(payload.get("isPartial", True)):
+        return
+    if _speculator is not None:
+        _speculator.drop(payload)
+    with _session(session_id) as st:
+        _update_session_context_from_payload(st, payload)
+        _append_buffer(st, speaker=speaker, text=text)
+        for phone in _extract_phone_candidates(text):
+            if phone not in st.coalesced_phones:
+                st.coalesced_phones.append(phone)
+        if speaker == "customer" and _should_extract_questions(text):
+            st.coalesced_question = True
+
+
+def handle_transcript_event(
+    payload: Dict[str, Any],
+    superseded: Optional[Callable[[], bool]] = None,
+    publish: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    One copilot run for a final utterance. `superseded()` (from the dispatcher) reports that newer
+    turns for this session are waiting: the run then stops before its next LLM stage and returns
+    None, leaving queued questions / new answers for the follow-up run over the newest state.
+    `publish(update)` receives an interim suggestion_update per RAG answer as soon as it lands;
+    the returned result carries the consolidated cards.
+    """
+    session_id = _s(payload.get("sessionId"))
+    if not session_id or not _s(payload.get("text")) or bool(payload.get("isPartial", True)):
         return None
-    if is_partial:
+    usage: Dict[str, Any] = {"mode": COPILOT_REASONING_MODE, "calls": 0, "llmMs": 0.0, "ragMs": 0.0}
+    started = time()
+    result = None
+    # Work already done on this utterance's partials (waits for it if still running)
+    spec = _speculator.take(payload) if _speculator is not None else None
+    if _speculator is not None:
+        usage["speculation"] = "hit" if spec else "none"
+    try:
+        with _session(session_id) as st:
+            try:
+                result = _run_copilot(st, payload, superseded or (lambda: False), usage, publish, spec)
+            finally:
+                _record_reasoning(session_id, usage, (time() - started) * 1000.0, result is not None)
+    except SessionLockTimeout as e:
+        print(f"[COPILOT_STATE] {e} is still held by another worker; skipping this turn")
         return None
+    return result
+
+
+def _run_copilot(
+    st: _SessionState,
+    payload: Dict[str, Any],
+    superseded: Callable[[], bool],
+    usage: Dict[str, Any],
+    publish: Optional[Callable[[Dict[str, Any]], None]] = None,
+    spec: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    session_id = st.session_id
+    fused_mode = usage["mode"] == "fused"
+    speaker = _s(payload.get("speaker")).lower()
+    text = _s(payload.get("text"))
 
-    st = _get_state(session_id)
     _update_session_context_from_payload(st, payload)
     # Keep full conversation context (CSR + customer)
     _append_buffer(st, speaker=speaker, text=text)
 
     transcript = _buffer_text(st)
 
-    important_change = False
+    # Pick up what superseded runs / coalesced turns left behind
+    important_change = st.carry_important
+    carried_answers, st.carry_answers = st.carry_answers, []
+    coalesced_phones, st.coalesced_phones = st.coalesced_phones, []
+    coalesced_question, st.coalesced_question = st.coalesced_question, False
+    st.carry_important = False
+
+    def _supersede(answers: List[Dict[str, Any]]) -> None:
+        # Answers already on screen as interim cards are not carried into the follow-up run
+        unsent = [a for a in answers if not a.get("interim")]
+        st.carry_answers = carried_answers + unsent
+        st.carry_important = important_change or bool(unsent)
+        print(f"[LIVE_COPILOT] run for {session_id} superseded by a newer turn; output deferred")
+
+    # entities.question is the fallback when question extraction comes back empty
+    should_extract = (speaker == "customer" and _should_extract_questions(text)) or coalesced_question
 
     # Fast-path: phone detection
-    phone_candidates = _extract_phone_candidates(text)
+    phone_candidates = _extract_phone_candidates(text) or coalesced_phones
     intent_obj: Dict[str, Any]
     if speaker == "csr" and _looks_like_verification_request(text):
         intent_obj = {
@@ -909,35 +1453,80 @@ def handle_transcript_event(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]
             "requiresVerification": True,
             "evidenceQuote": text[:200],
         }
+    elif fused_mode:
+        intent_obj = {}  # filled by the fused call below, once the customer lookup is done
+    elif spec and spec.get("intent") and not (should_extract and spec["intent"].get("source") == "local"):
+        intent_obj = spec["intent"]  # classified while the customer was still talking
     else:
-        # Only call intent LLM when we are likely to emit (cooldown or meaningful change)
-        intent_obj = _call_intent_llm(transcript)
+        intent_obj = _classify_intent(usage, text, transcript, speaker, needs_entities=should_extract)
+
+    spec = spec or {}
+    fused: Optional[Dict[str, Any]] = None
+    fused_snapshot: Dict[str, Any] = {}
+
+    def _lookup_customer(candidates: List[str]) -> bool:
+        if "phoneDoc" in spec and spec.get("phones") == candidates:
+            doc = spec["phoneDoc"]  # looked up from the partial
+        else:
+            doc = _lookup_user_by_phone([c for c in candidates if c])
+        if not doc:
+            return False
+        st.customer = _normalize_customer_doc(doc, candidates[0])
+        # Also capture plan context from verified doc (if present)
+        try:
+            st.contract_type = st.contract_type or _s(st.customer.get("contractType"))
+            st.selected_plan = st.selected_plan or _s(st.customer.get("plan"))
+            st.selected_state = st.selected_state or _s(st.customer.get("state"))
+        except Exception:
+            pass
+        return True
+
+    # Auto-fetch user on phone mention
+    if phone_candidates and not st.customer and _lookup_customer(phone_candidates):
+        important_change = True
+
+    if fused_mode and not fused_call_allowed(_cooldown_ok(st), important_change):
+        # Cooldown would drop its cards: classify only, questions / RAG below still run
+        usage["mode"] = "multi"
+        if not intent_obj:
+            intent_obj = _classify_intent(usage, text, transcript, speaker, needs_entities=should_extract)
+    elif fused_mode:
+        # One structured call: intent + entities + questions + diagnostics + cards
+        fused_snapshot = {
+            "customer_context": _effective_customer_context(st),
+            "session_state": {
+                "pendingQuestions": [x.get("q") for x in st.pending_questions if _s(x.get("q"))],
+                "answeredCount": len(st.answered),
+                "verification": {
+                    "askForPhoneAllowed": st.verification_asks < COPILOT_MAX_VERIFICATION_ASKS,
+                },
+            },
+        }
+        fused = _timed_llm(
+            usage, _call_fused_llm, transcript=transcript, extract_questions=should_extract, **fused_snapshot
+        )
+        if fused is None:
+            usage["mode"] = "multi"  # this turn falls back to the multi-call stages
+            if not intent_obj:
+                intent_obj = _classify_intent(usage, text, transcript, speaker, needs_entities=should_extract)
+        elif not intent_obj:
+            intent_obj = fused
 
     intent = _s(intent_obj.get("intent")) or "OTHER"
     confidence = float(intent_obj.get("confidence") or 0.0)
     evidence = _s(intent_obj.get("evidenceQuote")) or text[:200]
     entities = intent_obj.get("entities") or {}
     phone_entity = _s(entities.get("phone"))
+    usage["intent"] = intent
 
     # Tool routing
     tool_result: Dict[str, Any] = {}
-    customer = st.customer
 
-    # Auto-fetch user on phone mention
-    if (phone_candidates or phone_entity) and not customer:
-        candidates = phone_candidates or [phone_entity]
-        doc = _lookup_user_by_phone([c for c in candidates if c])
-        if doc:
-            st.customer = _normalize_customer_doc(doc, candidates[0])
-            customer = st.customer
-            # Also capture plan context from verified doc (if present)
-            try:
-                st.contract_type = st.contract_type or _s(customer.get("contractType"))
-                st.selected_plan = st.selected_plan or _s(customer.get("plan"))
-                st.selected_state = st.selected_state or _s(customer.get("state"))
-            except Exception:
-                pass
-            important_change = True
+    # Phone heard only by the LLM (e.g. spelled out)
+    fused_cards_stale = False
+    if phone_entity and not phone_candidates and not st.customer and _lookup_customer([phone_entity]):
+        important_change = True
+        fused_cards_stale = True  # fused cards were written for an unverified caller
 
     customer_ctx = _effective_customer_context(st)
     verified = bool(customer_ctx.get("verified"))
@@ -946,11 +1535,16 @@ def handle_transcript_event(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]
     print(f"[LIVE_COPILOT_DEBUG] customer_ctx: contractType={customer_ctx.get('contractType')}, plan={customer_ctx.get('plan')}, state={customer_ctx.get('state')}")
 
     # Queue customer questions so they never get skipped by later verification steps.
-    should_extract = speaker == "customer" and _should_extract_questions(text)
     print(f"[LIVE_COPILOT_DEBUG] speaker={speaker}, _should_extract_questions={_should_extract_questions(text)}, should_extract={should_extract}")
     
     if should_extract:
-        extracted = _extract_questions_llm(transcript)
+        if fused is not None:
+            extracted = fused["questions"]
+        elif spec.get("questions") is not None:
+            extracted = spec["questions"]
+        else:
+            extracted = _timed_llm(usage, _extract_questions_llm, transcript)
+        usage["questions"] = extracted
         print(f"[LIVE_COPILOT_DEBUG] _extract_questions_llm returned: {extracted}")
         if not extracted:
             q1 = _s(entities.get("question"))
@@ -991,43 +1585,111 @@ def handle_transcript_event(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]
     can_rag = bool(customer_ctx.get("contractType") and customer_ctx.get("plan") and customer_ctx.get("state"))
     print(f"[LIVE_COPILOT_DEBUG] can_rag={can_rag}, pending_questions={len(st.pending_questions)}")
     
+    if superseded():
+        _supersede([])
+        return None
+
     if can_rag and st.pending_questions:
         print(f"[LIVE_COPILOT_DEBUG] 🚀 Starting RAG processing for {len(st.pending_questions)} questions")
         answered_now = []
-        for item in list(st.pending_questions)[:2]:
-            k = _s(item.get("k"))
-            q = _s(item.get("q"))
-            if not k or not q:
-                continue
-            if k in st.answered:
-                continue
+        batch = [
+            (_s(item.get("k")), _s(item.get("q")))
+            for item in list(st.pending_questions)[:COPILOT_RAG_PER_CYCLE]
+            if _s(item.get("k")) and _s(item.get("q")) and _s(item.get("k")) not in st.answered
+        ]
+        # Answer concurrently; each answer goes out as an interim card the moment it lands
+        rag_started = time()
+        futures = {}
+        for k, q in batch:
             print(f"[LIVE_COPILOT_DEBUG] 🔍 Calling _rag_answer for question: '{q[:80]}...'")
-            res = _rag_answer(q, customer_ctx)
-            print(f"[LIVE_COPILOT_DEBUG] 📝 RAG result: answer_len={len(res.get('answer', ''))}, source={res.get('source', 'unknown')}")
-            st.answered[k] = {"ts": time(), **(res or {})}
-            answered_now.append({"question": q, "result": res})
+            prefetched = (spec.get("rag") or {}).get(k)
+            futures[prefetched or _rag_pool.submit(_rag_answer, q, customer_ctx)] = (k, q)
+        for future in as_completed(futures):
+            k, q = futures[future]
+            try:
+                res = future.result()
+            except Exception as e:
+                print(f"[LIVE_COPILOT] RAG failed for '{q[:80]}': {e}")
+                continue
+            print(f"[LIVE_COPILOT_DEBUG] 📝 RAG result: answer_len={len(res.get('answer', ''))}, source={res.get('source', 'unknown')} after {(time() - rag_started):.1f}s")
+            _remember_answer(st, k, res)
+            update = _interim_answer_update(session_id, intent, customer_ctx, q, res) if publish else None
+            sent = False
+            if update:
+                try:
+                    publish(update)
+                    sent = True
+                except Exception as e:
+                    print(f"[LIVE_COPILOT] interim emit failed (non-blocking): {e}")
+            answered_now.append({"question": q, "result": res, "interim": sent})
+        usage["ragMs"] += (time() - rag_started) * 1000.0
         # Remove answered from pending
         if answered_now:
             st.pending_questions = [x for x in st.pending_questions if _s(x.get("k")) not in st.answered]
-            tool_result["newAnswers"] = answered_now
             important_change = True
+    else:
+        answered_now = []
+    if carried_answers:
+        important_change = True
+    tool_result["newAnswers"] = carried_answers + answered_now
+
+    if superseded():
+        _supersede(answered_now)
+        return None
 
     # Add generic tools for problem statements (doesn't depend on plan context)
     if intent == "PROBLEM":
-        tool_result["diagnostics"] = _diagnostics_steps(transcript)
+        if fused is not None:
+            tool_result["diagnostics"] = fused["diagnostics"]
+        else:
+            tool_result["diagnostics"] = _timed_llm(usage, _diagnostics_steps, transcript)
 
     # Cooldown: allow bypass on meaningful changes (phone verified, new questions queued, new answers generated)
     if not _cooldown_ok(st) and not important_change:
         return None
 
-    cards = _call_suggest_llm(
-        intent=intent,
-        customer_verified=verified,
-        customer_context=customer_ctx,
-        tool_result=tool_result,
-        transcript=transcript,
-        evidence=evidence,
-    )
+    if not needs_second_call(fused, tool_result["newAnswers"], fused_cards_stale):
+        cards = fused["cards"]
+        for c in cards:
+            if not c.get("evidence") and evidence:
+                c["evidence"] = evidence
+    else:
+        # Multi-call mode, or fused mode with RAG answers to phrase (the second call)
+        cards = _timed_llm(
+            usage,
+            _call_suggest_llm,
+            intent=intent,
+            customer_verified=verified,
+            customer_context=customer_ctx,
+            tool_result=tool_result,
+            transcript=transcript,
+            evidence=evidence,
+        )
+    usage["cards"] = len(cards)
+
+    if COPILOT_REASONING_SHADOW_PCT and random.uniform(0, 100) < COPILOT_REASONING_SHADOW_PCT:
+        threading.Thread(
+            target=_shadow_other_mode,
+            args=(session_id, dict(usage)),
+            kwargs={
+                "transcript": transcript,
+                "customer_context": fused_snapshot.get("customer_context") or customer_ctx,
+                "tool_result": {**tool_result, "newAnswers": []},
+                "session_state": fused_snapshot.get("session_state") or {
+                    "pendingQuestions": tool_result["pendingQuestions"],
+                    "answeredCount": tool_result["answeredCount"],
+                    "verification": {"askForPhoneAllowed": tool_result["verification"]["askForPhone"]},
+                },
+                "extract_questions": should_extract,
+            },
+            name="copilot-shadow",
+            daemon=True,
+        ).start()
+
+    if superseded():
+        # Cards describe a stale turn: drop them before they count as emitted
+        _supersede(answered_now)
+        return None
 
     # Basic dedupe: don't spam identical cards repeatedly unless something important changed.
     fp = _fingerprint({"intent": intent, "customer": customer_ctx, "cards": cards})
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Background migration: move chunk text embedded in chats into the shared chunk store.
+
+Older chats carry their retrieved chunks inline (relevant_chunks and/or a relevant_docs
+string of LangChain Document reprs). This job rewrites each conversation (chats_<email> and
+the shared conversations collection) so those chats store chunk_refs instead (see
+chunk_store.py); reads rebuild the same fields.
+
+- Safe to stop and re-run: migrated chats are skipped, and a conversation is only rewritten
+  if its chat count didn't change since it was read (concurrent $push wins, retried next run)
+- relevant_docs strings that don't round-trip exactly are left inline
+- response_payload question chunks are dropped (re-filled from chats on read)
+
+Examples:
+  python migrate_chunk_refs.py --dry-run
+  python migrate_chunk_refs.py --collection chats_csr@frontdoor.com --sleep-ms 20
+"""
+
+import os
+import sys
+import argparse
+from time import time, sleep
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bson  # noqa: E402
+import app  # noqa: E402  (initializes Mongo exactly like the server)
+from conversation_store import CONVERSATIONS_COLLECTION  # noqa: E402
+from chunk_store import REFERRED_DOCUMENTS_PREFIX, format_referred_documents, parse_referred_documents  # noqa: E402
+
+
+PENDING_QUERY = {
+    "chats": {
+        "$elemMatch": {
+            "chunk_refs": {"$exists": False},
+            "$or": [
+                {"relevant_chunks.0": {"$exists": True}},
+                {"relevant_docs": {"$regex": "^" + REFERRED_DOCUMENTS_PREFIX}},
+            ],
+        }
+    }
+}
+
+
+def migrate_chat(chat: Dict[str, Any], collection_name: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Return the chat rewritten with chunk_refs, or None to leave it as is."""
+    if not isinstance(chat, dict) or chat.get("chunk_refs"):
+        return None
+    rest = {k: v for k, v in chat.items() if k not in ("relevant_chunks", "relevant_docs")}
+
+    rc = chat.get("relevant_chunks")
+    if isinstance(rc, list) and rc:
+        items = []
+        for x in rc:
+            if isinstance(x, dict):
+                items.append({"content": str(x.get("content") or ""), "metadata": x.get("metadata") or {}})
+            else:
+                items.append({"content": str(x), "metadata": {}})
+        rest["chunk_refs"] = app.chunk_store.refs(collection_name, items)
+        rest["chunk_format"] = "text"
+        return rest
+
+    docs_text = chat.get("relevant_docs")
+    groups = parse_referred_documents(docs_text)
+    if not groups or not all(groups):
+        return None
+    if "".join(format_referred_documents(g) for g in groups) != docs_text:
+        return None
+    refs = []
+    for group_idx, group in enumerate(groups):
+        refs.extend(app.chunk_store.refs(collection_name, group, group=group_idx))
+    rest["chunk_refs"] = refs
+    rest["chunk_format"] = "documents"
+    return rest
+
+
+def migrate_collection(collection, dry_run: bool, sleep_ms: int, limit: Optional[int], totals: Dict[str, int]) -> None:
+    cursor = collection.find(
+        PENDING_QUERY,
+        {"chats": 1, "contract_type": 1, "selected_plan": 1, "selected_state": 1, "response_payload": 1},
+    )
+    for doc in cursor:
+        if limit is not None and totals["docs"] >= limit:
+            return
+        chats = doc.get("chats") or []
+        try:
+            collection_name = app.milvus_collection_name(
+                doc.get("contract_type"), doc.get("selected_plan"), doc.get("selected_state")
+            )
+        except Exception:
+            collection_name = None
+
+        if dry_run:
+            pending = sum(
+                1 for c in chats
+                if isinstance(c, dict) and not c.get("chunk_refs") and (c.get("relevant_chunks") or c.get("relevant_docs"))
+            )
+            if pending:
+                totals["docs"] += 1
+                totals["chats"] += pending
+            continue
+
+        new_chats = []
+        changed = 0
+        for chat in chats:
+            migrated = migrate_chat(chat, collection_name)
+            if migrated is not None:
+                changed += 1
+                new_chats.append(migrated)
+            else:
+                new_chats.append(chat)
+        if not changed:
+            continue
+
+        updates: Dict[str, Any] = {"chats": new_chats}
+        payload = doc.get("response_payload")
+        if isinstance(payload, dict) and payload.get("questions"):
+            payload = dict(payload)
+            payload["questions"] = [
+                {k: v for k, v in q.items() if k not in ("relevantChunks", "relevantChunksDetail")}
+                if isinstance(q, dict) and q.get("questionId") != "final_answer"
+                else q
+                for q in payload["questions"]
+            ]
+            updates["response_payload"] = payload
+
+        before = len(bson.encode(doc))
+        after = len(bson.encode({**doc, **updates}))
+        totals["docs"] += 1
+        totals["chats"] += changed
+        totals["bytesBefore"] += before
+        totals["bytesAfter"] += after
+
+        # Only rewrite if no chat was pushed since we read the document
+        result = collection.update_one({"_id": doc["_id"], "chats": {"$size": len(chats)}}, {"$set": updates})
+        if result.matched_count == 0:
+            totals["raced"] += 1
+        if sleep_ms:
+            sleep(sleep_ms / 1000.0)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Move inline chat chunks into the shared chunk store")
+    parser.add_argument("--collection", help="Only this chats_<email> (or conversations) collection")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--limit", type=int, default=None, help="Max conversations to migrate")
+    parser.add_argument("--sleep-ms", type=int, default=0, help="Pause between conversation writes")
+    args = parser.parse_args()
+
+    names = [args.collection] if args.collection else [
+        n for n in app.db.list_collection_names() if n.startswith("chats_") or n == CONVERSATIONS_COLLECTION
+    ]
+    totals = {"docs": 0, "chats": 0, "raced": 0, "bytesBefore": 0, "bytesAfter": 0}
+    started = time()
+    for name in sorted(names):
+        print(f"[CHUNK_MIGRATION] {name}")
+        migrate_collection(app.db[name], args.dry_run, args.sleep_ms, args.limit, totals)
+        if args.limit is not None and totals["docs"] >= args.limit:
+            break
+
+    elapsed = round(time() - started, 1)
+    if args.dry_run:
+        print(
+            f"[CHUNK_MIGRATION] dry run: {totals['chats']} candidate chat(s) "
+            f"in {totals['docs']} conversation(s) ({elapsed}s)"
+        )
+    else:
+        print(
+            f"[CHUNK_MIGRATION] migrated {totals['chats']} chat(s) in {totals['docs']} conversation(s) "
+            f"in {elapsed}s; size {totals['bytesBefore']} -> {totals['bytesAfter']} bytes; "
+            f"{totals['raced']} skipped (changed during migration, re-run)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
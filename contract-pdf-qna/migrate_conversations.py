@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Background migration: move chats_<email> / feedbacks_<email> into the shared
+`conversations` / `feedback` collections (see conversation_store.py).
+
+Run while the app is in CONVERSATIONS_STORE=dual; switch to unified once a run reports
+nothing left. Per batch, documents are copied (same _id, plus user_email), then removed
+from the legacy collection only if unchanged since they were read.
+
+- Safe to stop and re-run: copies are idempotent (existing _ids are skipped, or replaced
+  when the legacy copy has a newer updated_at)
+- A document updated on the legacy side mid-batch stays there and is picked up next run; the
+  copy written for it is removed again (matched on _id + the copied updated_at), so reads and
+  updates keep going to the newer legacy document
+- --drop-empty drops legacy collections that end up empty (removes the namespace)
+
+Examples:
+  python migrate_conversations.py --dry-run
+  python migrate_conversations.py --collection chats_csr@frontdoor.com --batch-size 100
+  python migrate_conversations.py --sleep-ms 50 --drop-empty
+"""
+
+import os
+import sys
+import argparse
+from time import time, sleep
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pymongo import DeleteOne, InsertOne, ReplaceOne  # noqa: E402
+from pymongo.errors import BulkWriteError  # noqa: E402
+
+import app  # noqa: E402  (initializes Mongo exactly like the server)
+from conversation_store import (  # noqa: E402
+    CONVERSATIONS_COLLECTION,
+    FEEDBACK_COLLECTION,
+    LEGACY_CHATS_PREFIX,
+    LEGACY_FEEDBACKS_PREFIX,
+)
+
+
+TARGETS = {
+    LEGACY_CHATS_PREFIX: CONVERSATIONS_COLLECTION,
+    LEGACY_FEEDBACKS_PREFIX: FEEDBACK_COLLECTION,
+}
+
+
+def _newer(legacy: Dict[str, Any], current: Dict[str, Any]) -> bool:
+    a, b = legacy.get("updated_at"), current.get("updated_at")
+    try:
+        return a is not None and (b is None or a > b)
+    except TypeError:
+        return False
+
+
+def migrate_batch(source, target, user_email: str, docs: List[Dict[str, Any]], totals: Dict[str, int]) -> None:
+    ids = [d["_id"] for d in docs]
+    existing = {d["_id"]: d for d in target.find({"_id": {"$in": ids}}, {"_id": 1, "updated_at": 1})}
+
+    ops = []
+    written = set()
+    for doc in docs:
+        copy = {**doc, "user_email": user_email}
+        if doc["_id"] not in existing:
+            ops.append(InsertOne(copy))
+            written.add(doc["_id"])
+        elif _newer(doc, existing[doc["_id"]]):
+            ops.append(ReplaceOne({"_id": doc["_id"]}, copy))
+            written.add(doc["_id"])
+    if ops:
+        try:
+            target.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            # 11000: inserted concurrently by the app (dual mode) or a parallel run; keep theirs
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+    totals["copied"] += len(ops)
+
+    # Remove from the legacy side only if the document is exactly what we copied
+    result = source.bulk_write([DeleteOne(doc) for doc in docs], ordered=False)
+    totals["moved"] += result.deleted_count
+    if result.deleted_count == len(docs):
+        return
+
+    # Changed since it was read: the shared copy is stale but would now shadow the legacy document
+    # (reads and updates prefer the shared collection), so take back the copy this batch wrote
+    raced = [d for d in source.find({"_id": {"$in": ids}}, {"_id": 1})]
+    totals["raced"] += len(raced)
+    stale = {doc["_id"]: doc.get("updated_at") for doc in docs}
+    undo = [
+        DeleteOne({"_id": d["_id"], "user_email": user_email, "updated_at": stale[d["_id"]]})
+        for d in raced
+        if d["_id"] in written
+    ]
+    if undo:
+        totals["undone"] += target.bulk_write(undo, ordered=False).deleted_count
+
+
+def migrate_collection(name: str, args, totals: Dict[str, int]) -> None:
+    prefix = next(p for p in TARGETS if name.startswith(p))
+    user_email = name[len(prefix):]
+    source = app.db[name]
+    target = app.db[TARGETS[prefix]]
+
+    if args.dry_run:
+        count = source.estimated_document_count()
+        totals["docs"] += count
+        print(f"[CONVERSATIONS_MIGRATION] {name} -> {target.name}: {count} doc(s)")
+        return
+
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        docs = list(source.find(query).sort("_id", 1).limit(args.batch_size))
+        if not docs:
+            break
+        last_id = docs[-1]["_id"]
+        migrate_batch(source, target, user_email, docs, totals)
+        totals["docs"] += len(docs)
+        if args.limit is not None and totals["docs"] >= args.limit:
+            return
+        if args.sleep_ms:
+            sleep(args.sleep_ms / 1000.0)
+
+    if args.drop_empty and source.count_documents({}) == 0:
+        source.drop()
+        totals["dropped"] += 1
+        print(f"[CONVERSATIONS_MIGRATION] dropped empty {name}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Move per-user chats_/feedbacks_ collections into shared collections")
+    parser.add_argument("--collection", help="Only this chats_<email> or feedbacks_<email> collection")
+    parser.add_argument("--batch-size", type=int, default=200, help="Documents per copy/delete batch")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would move without writing")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many documents")
+    parser.add_argument("--sleep-ms", type=int, default=0, help="Pause between batches")
+    parser.add_argument("--drop-empty", action="store_true", help="Drop legacy collections left empty")
+    args = parser.parse_args()
+
+    if app.conversation_store.mode == "per_user" and not args.dry_run:
+        print("[CONVERSATIONS_MIGRATION] CONVERSATIONS_STORE=per_user: the app would not read migrated documents; "
+              "set CONVERSATIONS_STORE=dual first")
+        return 1
+
+    names = [args.collection] if args.collection else [
+        n for n in app.db.list_collection_names() if n.startswith(tuple(TARGETS))
+    ]
+    if any(not n.startswith(tuple(TARGETS)) for n in names):
+        print(f"[CONVERSATIONS_MIGRATION] not a per-user collection: {args.collection}")
+        return 1
+
+    totals = {"docs": 0, "copied": 0, "moved": 0, "raced": 0, "undone": 0, "dropped": 0}
+    started = time()
+    for name in sorted(names):
+        migrate_collection(name, args, totals)
+        if args.limit is not None and totals["docs"] >= args.limit:
+            break
+
+    elapsed = round(time() - started, 1)
+    if args.dry_run:
+        print(f"[CONVERSATIONS_MIGRATION] dry run: {totals['docs']} doc(s) in {len(names)} collection(s) ({elapsed}s)")
+    else:
+        print(
+            f"[CONVERSATIONS_MIGRATION] moved {totals['moved']} of {totals['docs']} doc(s) "
+            f"({totals['copied']} written) in {elapsed}s; {totals['raced']} changed during migration (re-run, "
+            f"{totals['undone']} stale copies removed); "
+            f"{totals['dropped']} empty collection(s) dropped"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
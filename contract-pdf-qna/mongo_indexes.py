@@ -0,0 +1,268 @@
+import os
+import threading
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+
+
+# -------------------------------------------------------------------
+# Index manager
+#
+# Per-user collections (chats_<email>, feedbacks_<email>) are created implicitly
+# on first insert, so nothing ever created their indexes. IndexManager ensures the
+# compound indexes the app's queries need:
+#   - at startup, for every existing collection
+#   - lazily, the first time a per-user collection is touched in this process
+# and reports index usage ($indexStats) plus slow collection scans (profiler).
+# -------------------------------------------------------------------
+
+IndexSpec = Tuple[List[Tuple[str, int]], Dict[str, Any]]
+
+CHATS_INDEXES: List[IndexSpec] = [
+    # Transcript conversation / status lookups: doc_type + transcript_id, newest first
+    (
+        [("doc_type", ASCENDING), ("transcript_id", ASCENDING), ("updated_at", DESCENDING), ("query_time", DESCENDING)],
+        {"name": "doc_type_transcript_updated"},
+    ),
+    # Sidebar listing: newest conversations first, optionally filtered by mode
+    ([("updated_at", DESCENDING), ("_id", DESCENDING)], {"name": "updated_at_desc"}),
+    (
+        [("conversation_mode", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+        {"name": "mode_updated_at_desc"},
+    ),
+]
+
+FEEDBACKS_INDEXES: List[IndexSpec] = [
+    ([("conversation_id", ASCENDING), ("chat_id", ASCENDING)], {"name": "conversation_chat"}),
+]
+
+# Shared collections (conversation_store.py): same query shapes, prefixed with user_email
+CONVERSATIONS_INDEXES: List[IndexSpec] = [
+    (
+        [("user_email", ASCENDING), ("doc_type", ASCENDING), ("transcript_id", ASCENDING), ("updated_at", DESCENDING), ("query_time", DESCENDING)],
+        {"name": "user_doc_type_transcript_updated"},
+    ),
+    ([("user_email", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)], {"name": "user_updated_at_desc"}),
+    (
+        [("user_email", ASCENDING), ("conversation_mode", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+        {"name": "user_mode_updated_at_desc"},
+    ),
+    # Cross-user analytics by mode / recency
+    ([("conversation_mode", ASCENDING), ("updated_at", DESCENDING)], {"name": "mode_updated_at"}),
+]
+
+FEEDBACK_INDEXES: List[IndexSpec] = [
+    ([("user_email", ASCENDING), ("conversation_id", ASCENDING), ("chat_id", ASCENDING)], {"name": "user_conversation_chat"}),
+]
+
+USERS_INDEXES: List[IndexSpec] = [
+    ([("mobile", ASCENDING)], {"name": "mobile"}),
+]
+
+# collection-name prefix -> specs, for per-user collections discovered at startup
+PER_USER_PREFIXES: Dict[str, List[IndexSpec]] = {
+    "chats_": CHATS_INDEXES,
+    "feedbacks_": FEEDBACKS_INDEXES,
+}
+
+
+def _flag(name: str, default: str) -> bool:
+    return (os.getenv(name, default) or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+MONGO_ENSURE_INDEXES = _flag("MONGO_ENSURE_INDEXES", "1")
+MONGO_SLOW_QUERY_MS = int(os.getenv("MONGO_SLOW_QUERY_MS", "100") or 100)
+
+
+class IndexManager:
+    def __init__(self, enabled: bool = MONGO_ENSURE_INDEXES):
+        self.enabled = enabled
+        self._ensured = set()
+        self._backfilled = set()
+        self._lock = threading.Lock()
+        self.errors: Dict[str, str] = {}
+
+    def ensure(self, collection, specs: List[IndexSpec]) -> None:
+        """Create `specs` on `collection` once per process (create_index is a no-op if present)."""
+        if not self.enabled:
+            return
+        key = f"{collection.database.name}.{collection.name}"
+        if key in self._ensured:
+            return
+        with self._lock:
+            if key in self._ensured:
+                return
+            try:
+                for keys, options in specs:
+                    collection.create_index(keys, **options)
+                self.errors.pop(key, None)
+                self._ensured.add(key)
+            except PyMongoError as e:
+                # Don't fail the request; not marked ensured, so the next access retries.
+                self.errors[key] = str(e)
+                print(f"Warning: unable to ensure indexes on {key}: {e}")
+
+    # ---------------------------------------------------------------
+    # per-user collections (lazy)
+    # ---------------------------------------------------------------
+    def chats(self, db, user_email: str):
+        collection = db[f"chats_{user_email}"]
+        self.ensure(collection, CHATS_INDEXES)
+        return collection
+
+    def feedbacks(self, db, user_email: str):
+        collection = db[f"feedbacks_{user_email}"]
+        self.ensure(collection, FEEDBACKS_INDEXES)
+        return collection
+
+    def backfill_sidebar_fields(self, collection) -> None:
+        """
+        Store conversation_mode and updated_at on conversations written before the sidebar
+        filtered/sorted on them in Mongo. Runs once per collection per process; after the
+        first pass the filter matches nothing.
+        """
+        key = f"{collection.database.name}.{collection.name}"
+        if key in self._backfilled:
+            return
+        try:
+            result = collection.update_many(
+                {
+                    "doc_type": {"$ne": "transcript_status"},
+                    "$or": [{"conversation_mode": {"$exists": False}}, {"updated_at": {"$exists": False}}],
+                },
+                [
+                    {
+                        "$set": {
+                            "conversation_mode": {
+                                "$ifNull": [
+                                    "$conversation_mode",
+                                    {"$ifNull": [{"$arrayElemAt": ["$chats.gpt_model", 0]}, "Search"]},
+                                ]
+                            },
+                            "updated_at": {
+                                "$ifNull": ["$updated_at", {"$ifNull": ["$query_time", {"$toDate": "$_id"}]}]
+                            },
+                        }
+                    }
+                ],
+            )
+            if result.modified_count:
+                print(f"[MONGO_INDEXES] backfilled sidebar fields on {result.modified_count} doc(s) in {key}")
+            self._backfilled.add(key)
+        except PyMongoError as e:
+            # Not fatal: rows without the fields just don't show up until the next attempt.
+            print(f"Warning: sidebar backfill failed on {key}: {e}")
+
+    # ---------------------------------------------------------------
+    # startup
+    # ---------------------------------------------------------------
+    def ensure_startup(self, front_door_db, shared: Optional[List[Tuple[Any, List[IndexSpec]]]] = None) -> Dict[str, Any]:
+        """Ensure indexes for every existing per-user collection plus the given shared collections."""
+        started = time()
+        count = 0
+        try:
+            for name in front_door_db.list_collection_names():
+                for prefix, specs in PER_USER_PREFIXES.items():
+                    if name.startswith(prefix):
+                        self.ensure(front_door_db[name], specs)
+                        count += 1
+        except PyMongoError as e:
+            print(f"Warning: unable to list collections for index provisioning: {e}")
+        for collection, specs in shared or []:
+            self.ensure(collection, specs)
+            count += 1
+        elapsed = round(time() - started, 2)
+        print(f"[MONGO_INDEXES] ensured indexes on {count} collection(s) in {elapsed}s")
+        return {"collections": count, "elapsedSec": elapsed, "errors": dict(self.errors)}
+
+    def ensure_startup_async(self, front_door_db, shared=None) -> None:
+        if not self.enabled:
+            return
+        threading.Thread(
+            target=self.ensure_startup, args=(front_door_db, shared), name="mongo-index-provisioning", daemon=True
+        ).start()
+
+    # ---------------------------------------------------------------
+    # reporting
+    # ---------------------------------------------------------------
+    @staticmethod
+    def index_usage(collection) -> List[Dict[str, Any]]:
+        """$indexStats for one collection: ops served by each index since server start."""
+        usage = []
+        for row in collection.aggregate([{"$indexStats": {}}]):
+            accesses = row.get("accesses") or {}
+            usage.append({
+                "name": row.get("name"),
+                "key": dict(row.get("key") or {}),
+                "ops": int(accesses.get("ops", 0)),
+                "since": accesses.get("since"),
+            })
+        usage.sort(key=lambda x: x["ops"], reverse=True)
+        return usage
+
+    @staticmethod
+    def slow_collection_scans(db, slow_ms: int = MONGO_SLOW_QUERY_MS, limit: int = 50) -> Dict[str, Any]:
+        """
+        Recent COLLSCAN operations slower than `slow_ms`, read from the database profiler.
+        Requires profiling level >= 1 (see MONGO_PROFILE_SLOW_MS); otherwise reports it as disabled.
+        """
+        try:
+            level = db.command("profile", -1)
+        except OperationFailure as e:
+            return {"enabled": False, "error": str(e), "scans": []}
+        if not level.get("was"):
+            return {"enabled": False, "slowms": level.get("slowms"), "scans": []}
+        scans = []
+        cursor = db["system.profile"].find(
+            {"planSummary": {"$regex": "^COLLSCAN"}, "millis": {"$gte": slow_ms}},
+            {"ns": 1, "op": 1, "millis": 1, "docsExamined": 1, "nreturned": 1, "ts": 1, "command.filter": 1, "command.sort": 1},
+        ).sort("ts", DESCENDING).limit(limit)
+        for row in cursor:
+            command = row.get("command") or {}
+            scans.append({
+                "ns": row.get("ns"),
+                "op": row.get("op"),
+                "millis": row.get("millis"),
+                "docsExamined": row.get("docsExamined"),
+                "nreturned": row.get("nreturned"),
+                "filter": command.get("filter"),
+                "sort": command.get("sort"),
+                "ts": row.get("ts"),
+            })
+        return {"enabled": True, "slowms": slow_ms, "scans": scans}
+
+    def report(self, db, collection_names: Optional[List[str]] = None, slow_ms: int = MONGO_SLOW_QUERY_MS) -> Dict[str, Any]:
+        names = collection_names
+        if names is None:
+            names = [n for n in db.list_collection_names() if not n.startswith("system.")]
+        collections = {}
+        unused = []
+        for name in sorted(names):
+            try:
+                usage = self.index_usage(db[name])
+            except PyMongoError as e:
+                collections[name] = {"error": str(e)}
+                continue
+            collections[name] = usage
+            unused.extend(f"{name}.{u['name']}" for u in usage if u["ops"] == 0 and u["name"] != "_id_")
+        return {
+            "database": db.name,
+            "collections": collections,
+            "unusedIndexes": unused,
+            "slowCollectionScans": self.slow_collection_scans(db, slow_ms=slow_ms),
+            "provisioningErrors": dict(self.errors),
+        }
+
+
+def enable_slow_query_profiler(db) -> None:
+    """Turn on profiling of slow ops (level 1) when MONGO_PROFILE_SLOW_MS is set; best effort."""
+    raw = (os.getenv("MONGO_PROFILE_SLOW_MS") or "").strip()
+    if not raw:
+        return
+    try:
+        db.command("profile", 1, slowms=int(raw))
+        print(f"[MONGO_INDEXES] profiler level 1 on {db.name} (slowms={raw})")
+    except (PyMongoError, ValueError) as e:
+        print(f"Warning: unable to enable Mongo profiler on {db.name}: {e}")
@@ -0,0 +1,216 @@
+import os
+import threading
+from collections import deque
+from time import sleep as _sleep
+from time import time
+from typing import Any, Callable, Deque, Dict, Iterable, Optional, Set, Tuple
+
+
+# -------------------------------------------------------------------
+# Room-scoped Socket.IO delivery for live calls
+#
+# transcript_update / suggestion_update used to be emitted twice per event: broadcast to every
+# connected client, then again to the session room, so each utterance cost O(connected agents)
+# sends and every agent received every call. RoomEmitter:
+#
+#   - sends only to the call's room (the UI joins it with join_session); supervisors opt in to
+#     SOCKET_SUPERVISOR_ROOM (join_supervisor, SOCKET_SUPERVISOR_EMAILS) and get a copy of every call
+#   - coalesces partial transcripts per utterance (session, speaker, beginOffsetMillis): the newest
+#     partial within SOCKET_PARTIAL_DEBOUNCE_MS is sent, older ones are dropped; a final replaces any
+#     partial still waiting and goes out at once
+#   - trims payloads to the fields the live-call UI reads
+#   - stats(): sends per event, coalesced partials, per-room emit rate over the last minute
+#
+# How the flush worker is started and how it sleeps are injected (Socket.IO background task +
+# socketio.sleep under eventlet, a thread otherwise), like copilot_dispatcher.
+# -------------------------------------------------------------------
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        raw = (os.getenv(name) or "").strip()
+        if not raw:
+            return default
+        v = int(raw)
+        return v if v >= 0 else default
+    except Exception:
+        return default
+
+
+SOCKET_PARTIAL_DEBOUNCE_MS = _env_int("SOCKET_PARTIAL_DEBOUNCE_MS", 150)  # 0 = send every partial
+SOCKET_SUPERVISOR_ROOM = os.getenv("SOCKET_SUPERVISOR_ROOM", "supervisors")
+SOCKET_SUPERVISOR_EMAILS = {
+    e.strip().lower() for e in (os.getenv("SOCKET_SUPERVISOR_EMAILS") or "").split(",") if e.strip()
+}
+SOCKET_RATE_WINDOW_S = 60
+SOCKET_RATE_SAMPLES = 2000  # per room
+
+TRANSCRIPT_FIELDS = ("sessionId", "speaker", "text", "isPartial", "beginOffsetMillis", "endOffsetMillis")
+SUGGESTION_FIELDS = ("sessionId", "intent", "customer", "cards", "interim", "question", "createdAt")
+CUSTOMER_FIELDS = ("verified", "name", "fullName", "phone", "contractType", "plan", "state", "selectedState")
+CARD_FIELDS = ("title", "heading", "csrScript", "text", "evidence", "priority", "userIntent")
+
+
+def _pick(obj: Any, keys: Iterable[str]) -> Any:
+    if not isinstance(obj, dict):
+        return obj
+    return {k: obj[k] for k in keys if k in obj}
+
+
+def trim_transcript(data: Dict[str, Any]) -> Dict[str, Any]:
+    return _pick(data, TRANSCRIPT_FIELDS)
+
+
+def trim_suggestion(data: Dict[str, Any]) -> Dict[str, Any]:
+    out = _pick(data, SUGGESTION_FIELDS)
+    if isinstance(out.get("customer"), dict):
+        out["customer"] = _pick(out["customer"], CUSTOMER_FIELDS)
+    if isinstance(out.get("cards"), list):
+        out["cards"] = [_pick(c, CARD_FIELDS) for c in out["cards"]]
+    return out
+
+
+_TRIMMERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "transcript_update": trim_transcript,
+    "suggestion_update": trim_suggestion,
+}
+
+
+def _start_thread(fn: Callable[[], None]) -> None:
+    threading.Thread(target=fn, name="socket-emitter", daemon=True).start()
+
+
+class RoomEmitter:
+    def __init__(
+        self,
+        emit: Callable[[str, Dict[str, Any], str], Any],
+        debounce_ms: int = SOCKET_PARTIAL_DEBOUNCE_MS,
+        supervisor_room: str = SOCKET_SUPERVISOR_ROOM,
+        start_worker: Callable[[Callable[[], None]], Any] = _start_thread,
+        sleep: Callable[[float], Any] = _sleep,
+    ):
+        self._emit = emit
+        self.debounce_s = debounce_ms / 1000.0
+        self.supervisor_room = supervisor_room
+        self._start_worker = start_worker
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str, str], Tuple[float, Dict[str, Any]]] = {}  # utterance -> (first seen, newest)
+        self._started = False
+        self._supervisors: Set[str] = set()
+        self._room_times: Dict[str, Deque[float]] = {}
+        self.sent: Dict[str, int] = {}
+        self.coalesced = 0
+        self.replaced_by_final = 0
+        self.errors = 0
+
+    # --- supervisors ---
+
+    def add_supervisor(self, sid: str) -> None:
+        with self._lock:
+            self._supervisors.add(sid)
+
+    def remove_supervisor(self, sid: str) -> None:
+        with self._lock:
+            self._supervisors.discard(sid)
+
+    # --- sending ---
+
+    def send(self, event: str, session_id: str, payload: Dict[str, Any]) -> None:
+        """Trimmed payload to the session room (+ the supervisor room when someone is watching)."""
+        data = _TRIMMERS.get(event, dict)(payload)
+        with self._lock:
+            rooms = [session_id, self.supervisor_room] if self._supervisors else [session_id]
+        for room in rooms:
+            try:
+                self._emit(event, data, room)
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Socket emit error (non-blocking): {event} -> {room}: {e}")
+                continue
+            self._count(event, room)
+
+    def _count(self, event: str, room: str) -> None:
+        now = time()
+        with self._lock:
+            self.sent[event] = self.sent.get(event, 0) + 1
+            times = self._room_times.get(room)
+            if times is None:
+                times = self._room_times[room] = deque(maxlen=SOCKET_RATE_SAMPLES)
+            times.append(now)
+
+    @staticmethod
+    def _utterance(data: Dict[str, Any]) -> Tuple[str, str, str]:
+        return (
+            str(data.get("sessionId") or ""),
+            str(data.get("speaker") or "").lower(),
+            str(data.get("beginOffsetMillis") or ""),
+        )
+
+    def send_transcript(self, data: Dict[str, Any]) -> None:
+        """transcript_update for the session: partials are debounced per utterance, finals go out immediately."""
+        session_id = str(data.get("sessionId") or "")
+        if not data.get("isPartial", True) or not self.debounce_s:
+            if not data.get("isPartial", True):
+                with self._lock:
+                    if self._pending.pop(self._utterance(data), None) is not None:
+                        self.replaced_by_final += 1
+            self.send("transcript_update", session_id, data)
+            return
+        self._start()
+        key = self._utterance(data)
+        with self._lock:
+            waiting = self._pending.get(key)
+            if waiting is not None:
+                self.coalesced += 1
+            self._pending[key] = (waiting[0] if waiting else time(), data)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self._start_worker(self._flusher)
+
+    def _flusher(self) -> None:
+        poll_s = max(0.01, self.debounce_s / 3)
+        while True:
+            self.flush_due()
+            self._sleep(poll_s)
+
+    def flush_due(self, now: Optional[float] = None) -> int:
+        """Send the newest partial of every utterance whose debounce window has closed."""
+        cutoff = (now if now is not None else time()) - self.debounce_s
+        with self._lock:
+            due = [k for k, (first, _) in self._pending.items() if first <= cutoff]
+            ready = [self._pending.pop(k)[1] for k in due]
+        for data in ready:
+            self.send("transcript_update", str(data.get("sessionId") or ""), data)
+        return len(ready)
+
+    # --- metrics ---
+
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        cutoff = time() - SOCKET_RATE_WINDOW_S
+        with self._lock:
+            for room in [r for r, t in self._room_times.items() if not t or t[-1] < cutoff]:
+                del self._room_times[room]
+            rates = {room: sum(1 for t in times if t >= cutoff) for room, times in self._room_times.items()}
+            pending = len(self._pending)
+            supervisors = len(self._supervisors)
+            sent = dict(self.sent)
+        busiest = sorted(rates.items(), key=lambda kv: kv[1], reverse=True)[:top]
+        return {
+            "debounceMs": int(self.debounce_s * 1000),
+            "supervisors": supervisors,
+            "sent": sent,
+            "pendingPartials": pending,
+            "coalescedPartials": self.coalesced,
+            "partialsReplacedByFinal": self.replaced_by_final,
+            "errors": self.errors,
+            "activeRooms": len(rates),
+            "emitsPerSec": round(sum(rates.values()) / SOCKET_RATE_WINDOW_S, 3),
+            "rooms": [
+                {"room": room, "emitsPerSec": round(n / SOCKET_RATE_WINDOW_S, 3), "lastMinute": n} for room, n in busiest
+            ],
+        }
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script for the Live Copilot cross-session answer cache (exact + similar matches, TTL,
+single flight, shared backend). Runs without LLMs or Milvus: compute() is a counting stub.
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+from time import sleep
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_cache import AnswerCache, normalize_question
+from copilot_sessions import MemorySessionBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _answer(calls, text="Yes, water heater leaks are covered.", **extra):
+    def compute():
+        calls.append(1)
+        return {"answer": text, "citedChunks": ["chunk"], "source": "INFER", **extra}
+    return compute
+
+
+def test_exact_hit_and_ttl():
+    print("Testing exact hits across sessions, provenance and TTL...")
+    clock = FakeClock()
+    cache = AnswerCache(ttl_s=60, max_entries=10, clock=clock)
+    calls = []
+    first = cache.get_or_compute("CA_RE_ShieldPlus", "Is the water heater leak covered?", _answer(calls))
+    again = cache.get_or_compute("CA_RE_ShieldPlus", "um, is the water heater leak covered", _answer(calls))
+    other_plan = cache.get_or_compute("CA_RE_ShieldEssential", "Is the water heater leak covered?", _answer(calls))
+    clock.now += 61
+    expired = cache.get_or_compute("CA_RE_ShieldPlus", "Is the water heater leak covered?", _answer(calls))
+    ok = (
+        len(calls) == 3
+        and first["source"] == "INFER"
+        and again["source"] == "cache:INFER"
+        and again["cache"]["match"] == "exact"
+        and other_plan["source"] == "INFER"
+        and expired["source"] == "INFER"
+        and normalize_question("Um, is it covered?") == normalize_question("is it covered")
+    )
+    print(f"  {'✓' if ok else '❌'} {len(calls)} computes for 4 asks; hit source={again['source']}; expired entry recomputed")
+    return ok
+
+
+def test_failures_not_cached():
+    print("Testing errors are not cached...")
+    cache = AnswerCache(ttl_s=60)
+    calls = []
+
+    def failing():
+        calls.append(1)
+        return {"error": "Milvus unavailable"}
+
+    cache.get_or_compute("CA_RE_ShieldPlus", "Is mold covered?", failing)
+    cache.get_or_compute("CA_RE_ShieldPlus", "Is mold covered?", failing)
+    ok = len(calls) == 2 and cache.stats()["entries"] == 0
+    print(f"  {'✓' if ok else '❌'} error answers recomputed ({len(calls)} computes), nothing stored")
+    return ok
+
+
+def test_single_flight():
+    print("Testing concurrent identical questions share one computation...")
+    cache = AnswerCache(ttl_s=60)
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        sleep(0.1)
+        return {"answer": "Covered up to $500.", "citedChunks": ["chunk"], "source": "INFER"}
+
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("TX_DTC_ShieldGold", "What is the roof limit?", slow)))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ok = len(calls) == 1 and len(results) == 5 and all(r["answer"] == "Covered up to $500." for r in results)
+    print(f"  {'✓' if ok else '❌'} 5 concurrent asks -> {len(calls)} computation, hits={cache.stats()['hits']}")
+    return ok
+
+
+def test_shared_between_workers():
+    print("Testing the shared backend serves answers to other workers...")
+    backend = MemorySessionBackend("answer_cache", 60)
+    worker_a, worker_b = AnswerCache(ttl_s=60, shared=backend), AnswerCache(ttl_s=60, shared=backend)
+    calls = []
+    worker_a.get_or_compute("CA_RE_ShieldPlus", "Is the garage door covered?", _answer(calls))
+    hit = worker_b.get_or_compute("CA_RE_ShieldPlus", "is the garage door covered", _answer(calls))
+    ok = len(calls) == 1 and hit["cache"]["match"] == "shared" and hit["source"] == "cache:INFER"
+    print(f"  {'✓' if ok else '❌'} second worker reused the first worker's answer ({hit['cache']['match']})")
+    return ok
+
+
+def test_similar_questions():
+    print("Testing embedding-neighbourhood hits...")
+    if importlib.util.find_spec("numpy") is None:
+        print("  ✓ skipped (numpy not installed)")
+        return True
+    vectors = {
+        "Is the water heater leak covered?": [1.0, 0.0, 0.1],
+        "Does my plan cover a leaking water heater?": [0.98, 0.02, 0.12],
+        "Is the roof covered?": [0.0, 1.0, 0.0],
+    }
+    cache = AnswerCache(ttl_s=60, similarity=0.95, embed=lambda q: vectors[q])
+    calls = []
+    cache.get_or_compute("CA_RE_ShieldPlus", "Is the water heater leak covered?", _answer(calls))
+    paraphrase = cache.get_or_compute("CA_RE_ShieldPlus", "Does my plan cover a leaking water heater?", _answer(calls))
+    unrelated = cache.get_or_compute("CA_RE_ShieldPlus", "Is the roof covered?", _answer(calls))
+    ok = len(calls) == 2 and paraphrase["cache"]["match"] == "similar" and "cache" not in unrelated
+    print(f"  {'✓' if ok else '❌'} paraphrase hit (score={paraphrase.get('cache', {}).get('score')}), unrelated question computed")
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_exact_hit_and_ttl(),
+        test_failures_not_cached(),
+        test_single_flight(),
+        test_shared_between_workers(),
+        test_similar_questions(),
+    ]
+    print("=" * 60)
+    print("✅ All answer cache tests passed" if all(results) else "❌ Some answer cache tests failed")
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for /webhook transcript dedup in the bucket store (call_transcript_store.py).
+Runs without Mongo: the fake bucket collection enforces only the _id unique index, i.e. the
+state before (or without, MONGO_ENSURE_INDEXES=0) index provisioning.
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo.errors import BulkWriteError
+from call_transcript_store import CallTranscriptStore
+
+
+def _get(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+
+def _set(doc, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+class FakeBuckets:
+    """Applies the store's upserts ($ne on event_key, $push/$inc/$set/$setOnInsert); unique on _id only."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def _matches(self, doc, flt):
+        for key, cond in flt.items():
+            if key == "_id":
+                continue
+            if key == "utterances.event_key":
+                keys = [u.get("event_key") for u in doc.get("utterances") or []]
+                if cond["$ne"] in keys:
+                    return False
+            elif _get(doc, key) == cond["$ne"]:
+                return False
+        return True
+
+    @staticmethod
+    def _apply(doc, update):
+        for path, value in (update.get("$set") or {}).items():
+            _set(doc, path, value)
+        for path, value in (update.get("$push") or {}).items():
+            doc.setdefault(path, []).append(value)
+        for path, value in (update.get("$inc") or {}).items():
+            doc[path] = doc.get(path, 0) + value
+
+    def bulk_write(self, ops, ordered=True):
+        errors = []
+        for i, op in enumerate(ops):
+            flt, update = op._filter, op._doc
+            doc = self.docs.get(flt["_id"])
+            if doc is not None and self._matches(doc, flt):
+                self._apply(doc, update)
+                continue
+            if doc is not None:  # the upsert tries to insert an existing _id
+                errors.append({"index": i, "code": 11000, "errmsg": "E11000 duplicate key error (_id)"})
+                if ordered:
+                    break
+                continue
+            doc = {"_id": flt["_id"], **(update.get("$setOnInsert") or {})}
+            self._apply(doc, update)
+            self.docs[doc["_id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    def find_one(self, query, projection=None):
+        doc = self.docs.get(query["_id"])
+        if doc is None:
+            return None
+        for key, value in query.items():
+            if key == "utterances.event_key":
+                keys = [u.get("event_key") for u in doc.get("utterances") or []]
+                wanted = value["$in"] if isinstance(value, dict) else [value]
+                if not any(k in keys for k in wanted):
+                    return None
+            elif key != "_id" and _get(doc, key) != value:
+                return None
+        return doc
+
+
+class _FakeDb:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeBuckets())
+
+
+def _utterances(store):
+    return [u["text"] for b in sorted(store.buckets.docs.values(), key=lambda b: b["bucket"]) for u in b.get("utterances") or []]
+
+
+def _event(key, text, begin, partial=False):
+    return {
+        "event_key": key, "sessionId": "call-1", "contactId": "call-1", "speaker": "CUSTOMER", "text": text,
+        "isPartial": partial, "beginOffsetMillis": begin, "endOffsetMillis": begin + 500, "createdAt": "2026-01-01",
+    }
+
+
+def _utterance_doc(key, text, begin):
+    return {"event_key": key, "speaker": "CUSTOMER", "text": text, "beginOffsetMillis": begin, "endOffsetMillis": begin + 500}
+
+
+def test_redelivery_detected_without_indexes():
+    print("Testing a re-delivered final is detected with only the _id index...")
+    store = CallTranscriptStore(_FakeDb())
+    first = store.append([_event("k1", "is my water heater covered", 1000)])
+    again = store.append([_event("k1", "is my water heater covered", 1000)])
+    stored = _utterances(store)
+    ok = first == [True] and again == [False] and stored == ["is my water heater covered"]
+    print(f"  {'✓' if ok else '❌'} first={first} redelivery={again} stored={stored}")
+    return ok
+
+
+def test_burst_with_duplicates():
+    print("Testing a burst with in-batch and earlier duplicates...")
+    store = CallTranscriptStore(_FakeDb())
+    store.append([_event("k1", "hello", 1000)])
+    flags = store.append([
+        _event("k1", "hello", 1000),
+        _event("k2", "my dishwasher is leaking", 2000),
+        _event("k2", "my dishwasher is leaking", 2000),
+        _event("k3", "my dish", 3000, partial=True),
+    ])
+    texts = _utterances(store)
+    ok = flags == [False, True, False, True] and texts == ["hello", "my dishwasher is leaking"]
+    print(f"  {'✓' if ok else '❌'} flags={flags} utterances={texts}")
+    return ok
+
+
+def test_redelivery_after_compaction():
+    print("Testing a final redelivered after its session was compacted is not re-bucketed...")
+    store = CallTranscriptStore(_FakeDb())
+    store.compact.docs["call-1"] = {
+        "_id": "call-1", "sessionId": "call-1",
+        "utterances": [_utterance_doc("k1", "is my water heater covered", 1000), _utterance_doc("k2", "thanks", 2000)],
+    }
+    single = store.append([_event("k1", "is my water heater covered", 1000)])
+    burst = store.append([_event("k2", "thanks", 2000), _event("k3", "one more thing", 70000)])
+    ok = single == [False] and burst == [False, True] and _utterances(store) == ["one more thing"]
+    print(f"  {'✓' if ok else '❌'} single={single} burst={burst} buckets={_utterances(store)}")
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_redelivery_detected_without_indexes(),
+        test_burst_with_duplicates(),
+        test_redelivery_after_compaction(),
+    ]
+    print("=" * 60)
+    print("✅ All call transcript store tests passed" if all(results) else "❌ Some call transcript store tests failed")
+    sys.exit(0 if all(results) else 1)
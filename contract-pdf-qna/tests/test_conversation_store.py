@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared conversations store (user scoping, dual-read fallback, merged listings)
+Runs without Mongo: uses a tiny in-memory collection supporting equality filters.
+"""
+
+import os
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateOne
+
+from conversation_store import DualReadCollection, UserScopedCollection, _sort_value, for_insert, for_update
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = list(docs)
+        self.limit_n = 0
+
+    def sort(self, spec):
+        for field, direction in reversed(spec):
+            self.docs.sort(key=lambda d: _sort_value(d, field), reverse=direction == -1)  # BSON order, like Mongo
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    def __iter__(self):
+        return iter(self.docs[: self.limit_n or None])
+
+
+class FakeCollection:
+    def __init__(self, name, docs=None):
+        self.name = name
+        self.database = SimpleNamespace(name="FrontDoorDB")
+        self.docs = list(docs or [])
+
+    def _match(self, filter):
+        def ok(value, cond):
+            return value in cond["$in"] if isinstance(cond, dict) and "$in" in cond else value == cond
+        return [d for d in self.docs if all(ok(d.get(k), v) for k, v in (filter or {}).items())]
+
+    def find(self, filter=None, *args, **kwargs):
+        return FakeCursor(self._match(filter))
+
+    def find_one(self, filter=None, *args, **kwargs):
+        found = self._match(filter)
+        return found[0] if found else None
+
+    def update_one(self, filter, update, upsert=False):
+        found = self._match(filter)
+        for doc in found[:1]:
+            doc.update(update.get("$set", {}))
+        return SimpleNamespace(matched_count=len(found[:1]))
+
+    def bulk_write(self, ops, **kwargs):
+        matched = sum(self.update_one(op._filter, op._doc).matched_count for op in ops)
+        return SimpleNamespace(matched_count=matched, upserted_count=0)
+
+
+def test_user_scoping():
+    print("Testing user_email scoping...")
+    shared = FakeCollection("conversations", [
+        {"_id": 1, "user_email": "a@x.com", "conversation_name": "mine"},
+        {"_id": 2, "user_email": "b@x.com", "conversation_name": "theirs"},
+    ])
+    view = UserScopedCollection(shared, "a@x.com")
+    names = [d["conversation_name"] for d in view.find({})]
+    target, doc = for_insert(view, {"_id": 3})
+    ok = names == ["mine"] and view.find_one({"_id": 2}) is None and doc["user_email"] == "a@x.com" and target is view
+    print(f"  {'✓' if ok else '❌'} reads see only this user's documents, inserts are stamped")
+    return ok
+
+
+def test_queued_update_stays_in_tenant():
+    print("Testing a queued update for another user's _id modifies nothing...")
+    shared = FakeCollection("conversations", [
+        {"_id": 1, "user_email": "a@x.com", "conversation_name": "mine"},
+        {"_id": 2, "user_email": "b@x.com", "conversation_name": "theirs"},
+    ])
+    legacy = FakeCollection("chats_a@x.com")
+    result = {}
+    for label, handle in (("unified", UserScopedCollection(shared, "a@x.com")),
+                          ("dual", DualReadCollection(UserScopedCollection(shared, "a@x.com"), legacy))):
+        target = for_update(handle, {"_id": 2})
+        result[label] = target.bulk_write([UpdateOne({"_id": 2}, {"$set": {"conversation_name": "hijacked"}})]).matched_count
+    ok = result == {"unified": 0, "dual": 0} and shared.docs[1]["conversation_name"] == "theirs"
+    print(f"  {'✓' if ok else '❌'} matched {result}; user B's conversation is {shared.docs[1]['conversation_name']!r}")
+    return ok
+
+
+def test_dual_read_fallback():
+    print("Testing dual-read fallback to the legacy collection...")
+    shared = FakeCollection("conversations", [{"_id": "new", "user_email": "a@x.com", "status": "active"}])
+    legacy = FakeCollection("chats_a@x.com", [{"_id": "old", "status": "active"}])
+    dual = DualReadCollection(UserScopedCollection(shared, "a@x.com"), legacy)
+    ok_read = dual.find_one({"_id": "old"})["_id"] == "old" and dual.find_one({"_id": "new"})["_id"] == "new"
+    dual.update_one({"_id": "old"}, {"$set": {"status": "inactive"}})
+    ok_update = legacy.docs[0]["status"] == "inactive" and shared.docs[0]["status"] == "active"
+    ok_route = for_update(dual, {"_id": "new", "chats.chat_id": {"$ne": "c1"}}) is dual  # routed at flush time
+    target, _ = for_insert(dual, {"_id": "another"})
+    ok = ok_read and ok_update and ok_route and target is dual.unified
+    print(f"  {'✓' if ok else '❌'} point reads/updates reach the legacy doc; new docs go to the shared collection")
+    return ok
+
+
+def test_queued_update_follows_migration():
+    print("Testing queued updates reach the document after it is migrated...")
+    shared = FakeCollection("conversations", [])
+    legacy = FakeCollection("chats_a@x.com", [{"_id": "c1", "status": "active"}])
+    dual = DualReadCollection(UserScopedCollection(shared, "a@x.com"), legacy)
+    target = for_update(dual, {"_id": "c1"})  # queued while c1 is still legacy-only
+    shared.docs.append({**legacy.docs.pop(), "user_email": "a@x.com"})  # migrated before the flush
+    target.bulk_write([UpdateOne({"_id": "c1"}, {"$set": {"status": "inactive"}})], ordered=True)
+    legacy.docs.append({"_id": "c2", "status": "active"})  # a document not migrated yet
+    target.bulk_write([UpdateOne({"_id": "c2"}, {"$set": {"status": "inactive"}})], ordered=True)
+    ok = shared.docs[0]["status"] == "inactive" and legacy.docs[0]["status"] == "inactive"
+    print(f"  {'✓' if ok else '❌'} the update landed on the migrated copy; legacy-only documents still get theirs")
+    return ok
+
+
+def test_merged_listing():
+    print("Testing merged sidebar listing...")
+    shared = FakeCollection("conversations", [
+        {"_id": 3, "user_email": "a@x.com", "updated_at": datetime(2024, 1, 3)},
+        {"_id": 1, "user_email": "a@x.com", "updated_at": datetime(2024, 1, 1)},
+    ])
+    legacy = FakeCollection("chats_a@x.com", [
+        {"_id": 2, "updated_at": datetime(2024, 1, 2)},
+        {"_id": 1, "updated_at": datetime(2024, 1, 1)},  # already copied: shared copy wins
+        {"_id": 0, "updated_at": None},
+    ])
+    dual = DualReadCollection(UserScopedCollection(shared, "a@x.com"), legacy)
+    ids = [d["_id"] for d in dual.find({}).sort([("updated_at", -1), ("_id", -1)]).limit(3)]
+    ok = ids == [3, 2, 1]
+    print(f"  {'✓' if ok else '❌'} newest first across both collections, deduplicated: {ids}")
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_user_scoping(),
+        test_queued_update_stays_in_tenant(),
+        test_dual_read_fallback(),
+        test_queued_update_follows_migration(),
+        test_merged_listing(),
+    ]
+    print("=" * 60)
+    print("✅ All conversation store tests passed" if all(results) else "❌ Some conversation store tests failed")
+    sys.exit(0 if all(results) else 1)
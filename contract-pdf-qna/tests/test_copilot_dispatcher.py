@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Test script for the Live Copilot dispatcher (per-session queues + worker pool + latest-wins coalescing + interim results)
+Runs without LLMs: the copilot handler is a stub that records calls.
+"""
+
+import os
+import sys
+import threading
+from time import sleep, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from copilot_dispatcher import CopilotDispatcher
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time() + timeout
+    while time() < deadline:
+        if predicate():
+            return True
+        sleep(0.01)
+    return False
+
+
+def test_session_order_and_parallelism():
+    print("Testing per-session order and cross-session parallelism...")
+    calls = []
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+    results = []
+
+    def handler(payload):
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        sleep(0.05)
+        with lock:
+            calls.append((payload["sessionId"], payload["n"]))
+            active["now"] -= 1
+        return {"n": payload["n"]}
+
+    dispatcher = CopilotDispatcher(handler, lambda sid, r: results.append((sid, r["n"])), workers=4)
+    started = time()
+    for n in range(3):
+        for sid in ("a", "b", "c"):
+            dispatcher.submit(sid, {"sessionId": sid, "n": n})
+    submit_ms = (time() - started) * 1000
+    done = _wait(lambda: len(results) == 9)
+    per_session = {sid: [n for s, n in calls if s == sid] for sid in ("a", "b", "c")}
+    ok = (
+        done
+        and submit_ms < 50
+        and all(order == [0, 1, 2] for order in per_session.values())
+        and active["max"] > 1
+    )
+    print(f"  {'✓' if ok else '❌'} submit took {submit_ms:.1f}ms; sessions ran in order with up to {active['max']} in parallel")
+    stats = dispatcher.stats()
+    ok_stats = stats["processed"] == 9 and stats["queueDepth"] == 0 and stats["lag"]["maxMs"] > 0
+    print(f"  {'✓' if ok_stats else '❌'} stats: processed={stats['processed']} depth={stats['queueDepth']} lag={stats['lag']}")
+    return ok and ok_stats
+
+
+def test_backlog_cap():
+    print("Testing per-session backlog cap...")
+    release = threading.Event()
+    seen = []
+
+    def handler(payload):
+        release.wait(5)
+        seen.append(payload["n"])
+        return None
+
+    dispatcher = CopilotDispatcher(handler, lambda sid, r: None, workers=1, session_queue_max=3)
+    for n in range(6):
+        dispatcher.submit("a", {"n": n})
+    _wait(lambda: dispatcher.stats()["inFlight"] == 1)
+    release.set()
+    done = _wait(lambda: dispatcher.stats()["processed"] == len(seen) and dispatcher.stats()["queueDepth"] == 0 and seen)
+    ok = done and seen[-1] == 5 and dispatcher.stats()["dropped"] > 0 and len(seen) < 6
+    print(f"  {'✓' if ok else '❌'} processed {seen}, dropped {dispatcher.stats()['dropped']} oldest event(s)")
+    return ok
+
+
+def test_latest_wins_coalescing():
+    print("Testing latest-wins coalescing of a burst...")
+    release = threading.Event()
+    runs, noted, stale = [], [], []
+
+    def handler(payload, superseded):
+        if payload["n"] == 0:
+            release.wait(5)
+            stale.append(superseded())  # events 1..4 arrived while this run was busy
+        runs.append(payload["n"])
+        return None
+
+    dispatcher = CopilotDispatcher(handler, lambda sid, r: None, coalesce=lambda p: noted.append(p["n"]), workers=1)
+    dispatcher.submit("a", {"n": 0})
+    _wait(lambda: dispatcher.stats()["inFlight"] == 1)
+    for n in range(1, 5):
+        dispatcher.submit("a", {"n": n})
+    release.set()
+    done = _wait(lambda: dispatcher.stats()["processed"] == 2 and dispatcher.stats()["queueDepth"] == 0)
+    stats = dispatcher.stats()
+    ok = done and runs == [0, 4] and noted == [1, 2, 3] and stale == [True] and stats["coalesced"] == 3 and stats["superseded"] == 1
+    print(f"  {'✓' if ok else '❌'} runs {runs}, folded {noted} into state, first run saw it was superseded")
+    return ok
+
+
+def test_coalesce_errors_and_blocking():
+    print("Testing coalescing runs via run_blocking and a failing older turn doesn't drop the newest...")
+    release = threading.Event()
+    runs, blocking = [], []
+
+    def handler(payload, superseded):
+        if payload["n"] == 0:
+            release.wait(5)
+        runs.append(payload["n"])
+        return None
+
+    def coalesce(payload):
+        if payload["n"] == 1:
+            raise TimeoutError("session lease busy")
+
+    def run_blocking(fn, *args, **kwargs):
+        blocking.append(getattr(fn, "__name__", ""))
+        return fn(*args, **kwargs)
+
+    dispatcher = CopilotDispatcher(handler, lambda sid, r: None, coalesce=coalesce, workers=1, run_blocking=run_blocking)
+    dispatcher.submit("a", {"n": 0})
+    _wait(lambda: dispatcher.stats()["inFlight"] == 1)
+    for n in range(1, 4):
+        dispatcher.submit("a", {"n": n})
+    release.set()
+    done = _wait(lambda: dispatcher.stats()["processed"] == 2)
+    ok = done and runs == [0, 3] and "_coalesce_all" in blocking and dispatcher.stats()["errors"] == 1
+    print(f"  {'✓' if ok else '❌'} runs {runs}; blocking calls {blocking}")
+    return ok
+
+
+def test_interim_results_before_final():
+    print("Testing interim results are delivered before the final result...")
+    emitted = []
+    emit_threads = set()
+
+    def handler(payload, publish):
+        publish({"answer": "fast"})
+        sleep(0.1)  # pump delivers the first answer while the run is still busy
+        publish({"answer": "slow"})
+        return {"final": True}
+
+    def emit(kind):
+        def on(sid, result):
+            emitted.append((kind, result.get("answer") or "final"))
+            emit_threads.add(threading.current_thread().name)
+        return on
+
+    dispatcher = CopilotDispatcher(
+        handler, emit("final"), on_interim=emit("interim"), workers=1,
+        start_worker=lambda fn: threading.Thread(target=fn, name="worker", daemon=True).start(), sleep=sleep,
+    )
+    dispatcher.submit("a", {"n": 0})
+    done = _wait(lambda: len(emitted) == 3)
+    ok = done and emitted == [("interim", "fast"), ("interim", "slow"), ("final", "final")] and emit_threads == {"worker"}
+    ok = ok and dispatcher.stats()["interim"] == 2
+    print(f"  {'✓' if ok else '❌'} delivered {emitted} on worker threads only")
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_session_order_and_parallelism(),
+        test_backlog_cap(),
+        test_latest_wins_coalescing(),
+        test_coalesce_errors_and_blocking(),
+        test_interim_results_before_final(),
+    ]
+    print("=" * 60)
+    print("✅ All copilot dispatcher tests passed" if all(results) else "❌ Some copilot dispatcher tests failed")
+    sys.exit(0 if all(results) else 1)
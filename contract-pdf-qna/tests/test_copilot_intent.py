@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for the local Live Copilot intent classifier (nearest centroid + LLM escalation).
+Runs without the sentence-transformers model: a bag-of-words encoder stands in for it.
+"""
+
+import os
+import re
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from copilot_intent import LocalIntentClassifier
+
+EXEMPLARS = {
+    "CUSTOMER_IDENTIFICATION": ["my phone number is", "the number on the account"],
+    "INQUIRY": ["is the water heater covered", "does my plan cover the roof", "what is the coverage limit"],
+    "PROBLEM": ["my air conditioner stopped working", "the dishwasher is leaking", "the oven won't turn on"],
+    "SMALL_TALK": ["thank you so much", "have a great day"],
+}
+
+
+def bag_of_words(texts):
+    vocab = sorted({w for group in EXEMPLARS.values() for t in group for w in re.findall(r"[a-z']+", t)})
+    index = {w: i for i, w in enumerate(vocab)}
+    out = np.zeros((len(texts), len(vocab) + 1), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for w in re.findall(r"[a-z']+", text.lower()):
+            out[row, index.get(w, len(vocab))] += 1.0
+    return out
+
+
+def _classifier(**kwargs):
+    clf = LocalIntentClassifier(encode=bag_of_words, exemplars=EXEMPLARS, **kwargs)
+    clf.warm(background=False)
+    return clf
+
+
+def test_confident_local_classification():
+    print("Testing confident utterances are classified locally...")
+    clf = _classifier(threshold=0.3, margin=0.05)
+    coverage = clf.classify("Is the water heater covered under my plan?")
+    problem = clf.classify("My air conditioner stopped working yesterday")
+    ok = (
+        clf.ready
+        and coverage is not None and coverage["intent"] == "INQUIRY" and not coverage["requiresVerification"]
+        and problem is not None and problem["intent"] == "PROBLEM" and not problem["requiresVerification"]
+        and clf.stats()["local"] == 2
+    )
+    print(f"  {'✓' if ok else '❌'} INQUIRY / PROBLEM served locally, scoring {clf.stats()['scoring']}")
+    return ok
+
+
+def test_escalation():
+    print("Testing low-confidence and phone utterances escalate to the LLM...")
+    clf = _classifier(threshold=0.3, margin=0.05)
+    unknown = clf.classify("Purple elephants sing loudly")
+    phone = clf.classify("My phone number is on the account")
+    strict = _classifier(threshold=0.99, margin=0.0).classify("Is the water heater covered under my plan?")
+    escalated = clf.stats()["escalated"]
+    ok = unknown is None and phone is None and strict is None and escalated["lowConfidence"] == 1 and escalated["intent"] == 1
+    print(f"  {'✓' if ok else '❌'} escalated: {escalated}")
+    return ok
+
+
+def test_csr_and_entity_turns_escalate():
+    print("Testing CSR turns and turns carrying entities go to the LLM...")
+    clf = _classifier(threshold=0.3, margin=0.05)
+    csr = clf.classify("Is the water heater covered under my plan?", speaker="csr")
+    digits = clf.classify("My air conditioner stopped working, claim 48213")
+    spelled = clf.classify("the dishwasher is leaking, call me at five five five one two")
+    question = clf.classify("Is the water heater covered under my plan?", needs_entities=True)
+    escalated = clf.stats()["escalated"]
+    ok = (
+        csr is None and digits is None and spelled is None and question is None
+        and escalated["speaker"] == 1 and escalated["entities"] == 3 and clf.stats()["local"] == 0
+    )
+    print(f"  {'✓' if ok else '❌'} escalated: {escalated}")
+    return ok
+
+
+def test_not_ready_escalates():
+    print("Testing everything escalates until the model is loaded...")
+    clf = LocalIntentClassifier(encode=bag_of_words, exemplars=EXEMPLARS)
+    ok = clf.classify("Is the water heater covered?") is None and clf.stats()["escalated"]["unavailable"] == 1
+    print(f"  {'✓' if ok else '❌'} unloaded classifier deferred to the LLM")
+    return ok
+
+
+if __name__ == "__main__":
+    if np is None:
+        print("numpy not installed - skipping copilot intent tests")
+        sys.exit(0)
+    results = [
+        test_confident_local_classification(),
+        test_escalation(),
+        test_csr_and_entity_turns_escalate(),
+        test_not_ready_escalates(),
+    ]
+    print("=" * 60)
+    print("✅ All copilot intent tests passed" if all(results) else "❌ Some copilot intent tests failed")
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Test script for Live Copilot session state: the bounded in-process store (idle TTL + LRU cap +
+size metrics) and the shared backends (compare-and-set, per-session locks).
+Runs without external services: fake clock, and a small Redis-protocol stand-in for the Redis backend.
+"""
+
+import os
+import sys
+import threading
+from time import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from copilot_sessions import (
+    BoundedSessionStore,
+    MemorySessionBackend,
+    RedisSessionBackend,
+    SessionConflict,
+    SessionLockTimeout,
+    _redis_watch_error,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_idle_ttl():
+    print("Testing idle TTL eviction...")
+    clock = FakeClock()
+    store = BoundedSessionStore("test", idle_s=60, max_sessions=10, clock=clock)
+    store.get_or_create("ended", dict)
+    store.get_or_create("active", dict)
+    clock.now += 45
+    store.get("active")  # still talking
+    clock.now += 30
+    ok = store.get("ended") is None and store.get("active") is not None and len(store) == 1
+    stats = store.stats()
+    ok = ok and stats["evictedIdle"] == 1 and stats["live"] == 1
+    print(f"  {'✓' if ok else '❌'} call that went quiet was reclaimed without copilot_disable; active call kept")
+    return ok
+
+
+def test_lru_cap():
+    print("Testing max-session LRU eviction...")
+    clock = FakeClock()
+    store = BoundedSessionStore("test", idle_s=3600, max_sessions=3, clock=clock)
+    for sid in ("a", "b", "c"):
+        store.get_or_create(sid, dict)
+        clock.now += 1
+    store.get("a")  # a is now most recently used
+    store.get_or_create("d", dict)
+    ok = "b" not in store and all(sid in store for sid in ("a", "c", "d")) and store.stats()["evictedLru"] == 1
+    print(f"  {'✓' if ok else '❌'} least recently used session evicted at the cap")
+    return ok
+
+
+def test_size_metrics():
+    print("Testing size metrics...")
+    store = BoundedSessionStore("test", idle_s=3600, max_sessions=10)
+    store.put("small", {"x": 1})
+    store.put("big", {"buffer": ["word " * 200]})
+    stats = store.stats()
+    ok = stats["bytes"] > 1000 and stats["largest"][0]["sessionId"] == "big"
+    store.pop("big")
+    ok = ok and store.stats()["live"] == 1 and store.stats()["removed"] == 1
+    print(f"  {'✓' if ok else '❌'} bytes={stats['bytes']} largest={stats['largest'][0]}")
+    return ok
+
+
+class StandInRedis:
+    """GET / SET NX PX / DEL / WATCH-MULTI-EXEC, enough for RedisSessionBackend."""
+
+    def __init__(self):
+        self.data = {}  # key -> (value, expires_at or None)
+        self.writes = {}  # key -> write counter (WATCH)
+        self.lock = threading.Lock()
+
+    def _live(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time():
+            self.data.pop(key, None)
+            return None
+        return value
+
+    def _write(self, key, value, px=None):
+        if value is None:
+            self.data.pop(key, None)
+        else:
+            self.data[key] = (value, time() + px / 1000.0 if px else None)
+        self.writes[key] = self.writes.get(key, 0) + 1
+
+    def get(self, key):
+        with self.lock:
+            return self._live(key)
+
+    def set(self, key, value, nx=False, px=None):
+        with self.lock:
+            if nx and self._live(key) is not None:
+                return None
+            self._write(key, value, px)
+            return True
+
+    def delete(self, key):
+        with self.lock:
+            self._write(key, None)
+
+    def pipeline(self):
+        return StandInPipeline(self)
+
+
+class StandInPipeline:
+    def __init__(self, server):
+        self.server = server
+        self.watched = {}
+        self.queued = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def watch(self, key):
+        self.watched[key] = self.server.writes.get(key, 0)
+
+    def get(self, key):
+        return self.server.get(key)
+
+    def multi(self):
+        self.queued = []
+
+    def set(self, key, value, px=None):
+        self.queued.append((key, value, px))
+
+    def delete(self, key):
+        self.queued.append((key, None, None))
+
+    def execute(self):
+        with self.server.lock:
+            if any(self.server.writes.get(k, 0) != v for k, v in self.watched.items()):
+                raise _redis_watch_error()("watched key changed")
+            for key, value, px in self.queued:
+                self.server._write(key, value, px)
+
+
+def test_memory_compare_and_set():
+    print("Testing compare-and-set on the memory backend...")
+    backend = MemorySessionBackend("enabled", ttl_s=60)
+    v1 = backend.put("call-1", {"n": 1}, version=0)
+    _, seen = backend.get("call-1")
+    backend.put("call-1", {"n": 2}, version=seen)
+    try:
+        backend.put("call-1", {"n": 99}, version=seen)  # stale writer
+        ok = False
+    except SessionConflict:
+        ok = True
+    value, version = backend.get("call-1")
+    ok = ok and v1 == 1 and version == 2 and value == {"n": 2}
+    print(f"  {'✓' if ok else '❌'} stale version rejected, value={value} version={version}")
+    return ok
+
+
+def test_redis_shared_across_workers():
+    print("Testing the Redis backend across two workers (stand-in server)...")
+    server = StandInRedis()
+    worker_a = RedisSessionBackend("enabled", ttl_s=60, client=server)
+    worker_b = RedisSessionBackend("enabled", ttl_s=60, client=server)
+    worker_a.put("call-1", {"expiresAt": 123, "context": {"plan": "ShieldPlus"}})
+    seen, _ = worker_b.get("call-1")
+    ok_visible = seen == {"expiresAt": 123, "context": {"plan": "ShieldPlus"}}
+
+    def bump(w):
+        for _ in range(50):
+            w.update("counter", lambda v: {"n": (v or {}).get("n", 0) + 1}, retries=100)
+
+    threads = [threading.Thread(target=bump, args=(w,)) for w in (worker_a, worker_b)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    value, version = worker_a.get("counter")
+    ok_cas = value == {"n": 100} and version == 100
+    print(f"  {'✓' if ok_visible else '❌'} copilot_enable on one worker is visible on the other")
+    print(f"  {'✓' if ok_cas else '❌'} 100 concurrent read-modify-writes, none lost ({worker_a.conflicts + worker_b.conflicts} conflicts retried)")
+    return ok_visible and ok_cas
+
+
+def test_redis_session_lock():
+    print("Testing per-session lease locks (stand-in server)...")
+    server = StandInRedis()
+    worker_a = RedisSessionBackend("state", ttl_s=60, client=server)
+    worker_b = RedisSessionBackend("state", ttl_s=60, client=server)
+    with worker_a.lock("call-1"):
+        try:
+            with worker_b.lock("call-1", wait_s=0.1):
+                blocked = False
+        except SessionLockTimeout:
+            blocked = True
+        with worker_b.lock("call-2", wait_s=0.1):
+            other_free = True
+    with worker_b.lock("call-1", wait_s=0.1):
+        reacquired = True
+    with worker_a.lock("call-3", lease_s=1):
+        server.data[worker_a._lock_key("call-3")] = (server.data[worker_a._lock_key("call-3")][0], time() - 1)  # lease ran out
+        with worker_b.lock("call-3", wait_s=0.1):
+            taken_over = True
+    ok = blocked and other_free and reacquired and taken_over
+    print(f"  {'✓' if ok else '❌'} one holder per call across workers; other calls unaffected; expired leases can be taken over")
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_idle_ttl(),
+        test_lru_cap(),
+        test_size_metrics(),
+        test_memory_compare_and_set(),
+        test_redis_shared_across_workers(),
+        test_redis_session_lock(),
+    ]
+    print("=" * 60)
+    print("✅ All copilot session store tests passed" if all(results) else "❌ Some copilot session store tests failed")
+    sys.exit(0 if all(results) else 1)
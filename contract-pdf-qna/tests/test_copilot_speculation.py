@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script for speculative Live Copilot pre-processing on stable partials
+Runs without LLMs: speculate() is a stub that records what it was asked to pre-process.
+"""
+
+import os
+import sys
+from time import sleep, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from copilot_speculation import Speculator, text_match
+
+
+def _partial(text, begin=1000, speaker="customer"):
+    return {"sessionId": "call-1", "speaker": speaker, "text": text, "isPartial": True, "beginOffsetMillis": begin}
+
+
+def _final(text, begin=1000, speaker="customer"):
+    return {**_partial(text, begin, speaker), "isPartial": False}
+
+
+def _wait(predicate, timeout=3.0):
+    deadline = time() + timeout
+    while time() < deadline:
+        if predicate():
+            return True
+        sleep(0.01)
+    return False
+
+
+def test_stable_partial_reused():
+    print("Testing a stable partial is pre-processed and reused by a matching final...")
+    seen = []
+
+    def speculate(payload):
+        seen.append(payload["text"])
+        sleep(0.05)
+        return {"questions": ["Is my water heater leak covered?"]}
+
+    spec = Speculator(speculate, lambda p: "?" in p["text"] or "cover" in p["text"], stable_ms=50, workers=2)
+    spec.observe(_partial("is my water"))
+    sleep(0.02)  # still changing: no speculation for this one
+    spec.observe(_partial("is my water heater leak covered"))
+    _wait(lambda: spec.started == 1)
+    started = time()
+    result = spec.take(_final("Is my water heater leak covered?"))
+    ok = (
+        seen == ["is my water heater leak covered"]
+        and result is not None
+        and result["questions"] == ["Is my water heater leak covered?"]
+        and spec.stats()["hits"] == 1
+    )
+    print(f"  {'✓' if ok else '❌'} speculated once on the stable text; final reused it after {(time() - started) * 1000:.0f}ms (match={result and result['match']})")
+    return ok
+
+
+def test_changed_final_discarded():
+    print("Testing a final that differs from the speculated text is discarded...")
+    spec = Speculator(lambda p: {"questions": ["Is the fridge covered?"]}, lambda p: True, stable_ms=30, workers=1)
+    spec.observe(_partial("is the fridge covered"))
+    _wait(lambda: spec.started == 1)
+    result = spec.take(_final("is the fridge covered or do I need to pay for the compressor replacement myself"))
+    stats = spec.stats()
+    ok = result is None and stats["misses"] == 1 and stats["hits"] == 0
+    print(f"  {'✓' if ok else '❌'} discarded (misses={stats['misses']})")
+    return ok
+
+
+def test_not_speculated_when_filtered():
+    print("Testing partials that fail should_speculate start nothing...")
+    spec = Speculator(lambda p: {"x": 1}, lambda p: "?" in p["text"], stable_ms=20, workers=1)
+    spec.observe(_partial("hello there how are you doing today"))
+    sleep(0.15)
+    ok = spec.started == 0 and spec.take(_final("hello there how are you doing today")) is None
+    ok = ok and text_match("Is it covered?", "is it covered") == 1.0 and text_match("yes", "") == 0.0
+    print(f"  {'✓' if ok else '❌'} small talk not speculated; text_match normalizes case/punctuation")
+    return ok
+
+
+if __name__ == "__main__":
+    results = [test_stable_partial_reused(), test_changed_final_discarded(), test_not_speculated_when_filtered()]
+    print("=" * 60)
+    print("✅ All copilot speculation tests passed" if all(results) else "❌ Some copilot speculation tests failed")
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for the data-access layer
+Runs without Mongo: feeds fake command events to the metrics listener and uses fake collections.
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_access import DataAccess, OperationMetrics
+
+
+class FakeCollection:
+    def __init__(self, name, docs=None, db_name="FrontDoorDB"):
+        self.name = name
+        self.database = SimpleNamespace(name=db_name)
+        self.docs = docs or []
+        self.read_preference = "primary"
+
+    def with_options(self, read_preference=None):
+        routed = FakeCollection(self.name, self.docs, self.database.name)
+        routed.read_preference = read_preference
+        return routed
+
+    def find_one(self, query):
+        return next((d for d in self.docs if d.get("mobile") == query.get("mobile")), None)
+
+    def find(self, query):
+        wanted = set(query["mobile"]["$in"])
+        return [d for d in self.docs if d.get("mobile") in wanted]
+
+
+class FakeDataAccess(DataAccess):
+    def __init__(self, users):
+        super().__init__(uri=None)
+        self._users = users
+
+    @property
+    def users(self):
+        return self._users
+
+
+def _event(request_id, command_name, command, duration_ms=0.0):
+    return SimpleNamespace(
+        connection_id=("localhost", 27017),
+        request_id=request_id,
+        database_name="FrontDoorDB",
+        command_name=command_name,
+        command=command,
+        duration_micros=int(duration_ms * 1000),
+    )
+
+
+def test_metrics_fold_per_user_collections():
+    print("Testing per-operation latency metrics...")
+    metrics = OperationMetrics()
+    for i, (name, ms) in enumerate([("chats_a@x.com", 10), ("chats_b@x.com", 30), ("chats_c@x.com", 20)]):
+        metrics.started(_event(i, "find", {"find": name}))
+        metrics.succeeded(_event(i, "find", {}, ms))
+    metrics.started(_event(9, "aggregate", {"aggregate": "feedbacks_a@x.com"}))
+    metrics.failed(_event(9, "aggregate", {}, 5))
+    rows = {r["op"]: r for r in metrics.snapshot()}
+    find = rows.get("FrontDoorDB.chats_*.find") or {}
+    agg = rows.get("FrontDoorDB.feedbacks_*.aggregate") or {}
+    ok = (
+        len(rows) == 2
+        and find.get("count") == 3 and find.get("avgMs") == 20.0 and find.get("maxMs") == 30.0
+        and agg.get("errors") == 1
+    )
+    print(f"  {'✓' if ok else '❌'} per-user collections folded, count/avg/max/errors recorded: {sorted(rows)}")
+    return ok
+
+
+def test_listing_reads_after_write():
+    print("Testing listing read routing...")
+    da = FakeDataAccess(users=None)
+    chats = FakeCollection("chats_a@x.com")
+    routed = da.reader(chats)
+    ok_secondary = routed.read_preference is da.listing_read_preference
+    da.note_write(chats)
+    ok_primary = da.reader(chats) is chats
+    ok = ok_secondary and ok_primary
+    print(f"  {'✓' if ok else '❌'} listing reads use {da.listing_read_preference}, primary right after a write")
+    return ok
+
+
+def test_user_lookup_candidate_order():
+    print("Testing user lookup by mobile...")
+    users = FakeCollection("Users", [{"mobile": "+15551234567", "name": "B"}, {"mobile": "5551234567", "name": "A"}], "AHS")
+    da = FakeDataAccess(users)
+    first = da.find_user_by_mobile(["5551234567", "+15551234567"])
+    single = da.find_user_by_mobile("+15551234567")
+    none = da.find_user_by_mobile(["0000000000"])
+    ok = first and first["name"] == "A" and single and single["name"] == "B" and none is None
+    print(f"  {'✓' if ok else '❌'} first matching candidate wins")
+    return bool(ok)
+
+
+if __name__ == "__main__":
+    results = [test_metrics_fold_per_user_collections(), test_listing_reads_after_write(), test_user_lookup_candidate_order()]
+    print("=" * 60)
+    print("✅ All data-access tests passed" if all(results) else "❌ Some data-access tests failed")
+    sys.exit(0 if all(results) else 1)
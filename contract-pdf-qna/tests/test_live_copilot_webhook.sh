@@ -3,6 +3,7 @@
 # This script sends sample transcripts to test the copilot integration
 
 BASE_URL="${1:-http://localhost:8001}"
+TOKEN="${2:-$TOKEN}"
 
 echo "=== Testing Live Copilot Webhook Integration ==="
 echo "Backend URL: $BASE_URL"
@@ -90,6 +91,38 @@ curl -X POST "$BASE_URL/webhook" \
   }'
 echo -e "\n"
 
+# Test 5: Redelivery of Test 4 (should return "duplicate": true)
+echo "🔁 Test 5: Duplicate delivery"
+curl -X POST "$BASE_URL/webhook" \
+  -H "Content-Type: application/json" \
+  -d '{
+    "sessionId": "test-session-001",
+    "contactId": "test-contact-001",
+    "speaker": "CUSTOMER",
+    "text": "What is the maximum coverage limit for HVAC repairs?",
+    "isPartial": false,
+    "beginOffsetMillis": 15000,
+    "endOffsetMillis": 20000
+  }'
+echo -e "\n"
+
+# Test 6: Burst of events in one request (second one repeats Test 4 -> 1 duplicate)
+echo "📦 Test 6: Burst batch"
+curl -X POST "$BASE_URL/webhook" \
+  -H "Content-Type: application/json" \
+  -d '[
+    {"sessionId": "test-session-001", "speaker": "AGENT", "text": "Let me check that for you.", "isPartial": true, "beginOffsetMillis": 20000, "endOffsetMillis": 21000},
+    {"sessionId": "test-session-001", "speaker": "CUSTOMER", "text": "What is the maximum coverage limit for HVAC repairs?", "isPartial": false, "beginOffsetMillis": 15000, "endOffsetMillis": 20000}
+  ]'
+echo -e "\n"
+
+# Test 7: Read the whole call back (live buckets merged in offset order; needs a JWT)
+if [ -n "$TOKEN" ]; then
+  echo "📜 Test 7: Whole call transcript"
+  curl -s "$BASE_URL/calls/test-session-001/transcript" -H "Authorization: Bearer $TOKEN"
+  echo -e "\n"
+fi
+
 echo "=== Tests Complete ==="
 echo ""
 echo "Check the backend logs for:"
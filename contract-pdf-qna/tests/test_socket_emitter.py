@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for room-scoped live-call Socket.IO delivery (session rooms, supervisor room,
+partial debouncing, payload trimming, per-room rates). Runs without Socket.IO: emits are recorded.
+"""
+
+import os
+import sys
+from time import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socket_emitter import RoomEmitter
+
+
+def _emitter(**kwargs):
+    sent = []
+    emitter = RoomEmitter(
+        lambda event, data, room: sent.append((event, room, data)),
+        start_worker=lambda fn: None,  # the test flushes by hand
+        **kwargs,
+    )
+    return emitter, sent
+
+
+def _partial(text, final=False, session="call-1"):
+    return {
+        "sessionId": session, "speaker": "CUSTOMER", "text": text, "isPartial": not final,
+        "beginOffsetMillis": 1200, "endOffsetMillis": 1900, "contactId": session, "createdAt": "2026-01-01",
+    }
+
+
+def test_room_only_and_supervisors():
+    print("Testing delivery goes to the session room (+ supervisors once one joins)...")
+    emitter, sent = _emitter(debounce_ms=0)
+    emitter.send_transcript(_partial("is my water heater covered", final=True))
+    emitter.add_supervisor("sid-1")
+    emitter.send("suggestion_update", "call-1", {"sessionId": "call-1", "cards": []})
+    emitter.remove_supervisor("sid-1")
+    emitter.send("suggestion_update", "call-1", {"sessionId": "call-1", "cards": []})
+    rooms = [room for _, room, _ in sent]
+    ok = rooms == ["call-1", "call-1", "supervisors", "call-1"]
+    print(f"  {'✓' if ok else '❌'} rooms: {rooms}")
+    return ok
+
+
+def test_partials_debounced():
+    print("Testing partials of one utterance are coalesced within the debounce window...")
+    emitter, sent = _emitter(debounce_ms=150)
+    for text in ("is my", "is my water", "is my water heater"):
+        emitter.send_transcript(_partial(text))
+    nothing_yet = emitter.flush_due(time()) == 0
+    flushed = emitter.flush_due(time() + 0.2)
+    ok = nothing_yet and flushed == 1 and [d["text"] for _, _, d in sent] == ["is my water heater"]
+    ok = ok and emitter.stats()["coalescedPartials"] == 2
+    print(f"  {'✓' if ok else '❌'} 3 partials -> sent {[d['text'] for _, _, d in sent]}")
+    return ok
+
+
+def test_final_replaces_pending_partial():
+    print("Testing a final replaces the partial still waiting...")
+    emitter, sent = _emitter(debounce_ms=150)
+    emitter.send_transcript(_partial("is my water"))
+    emitter.send_transcript(_partial("is my water heater covered", final=True))
+    emitter.flush_due(time() + 1)
+    ok = [(d["text"], d["isPartial"]) for _, _, d in sent] == [("is my water heater covered", False)]
+    ok = ok and emitter.stats()["partialsReplacedByFinal"] == 1
+    print(f"  {'✓' if ok else '❌'} sent {[(d['text'], d['isPartial']) for _, _, d in sent]}")
+    return ok
+
+
+def test_payload_trimming_and_rates():
+    print("Testing payloads are trimmed and per-room rates reported...")
+    emitter, sent = _emitter(debounce_ms=0)
+    emitter.send_transcript(_partial("hello", final=True))
+    emitter.send("suggestion_update", "call-1", {
+        "sessionId": "call-1", "intent": "INQUIRY", "confidence": 0.9,
+        "customer": {"name": "Pat", "plan": "ShieldPlus", "mongoId": "abc", "raw": {"x": 1}},
+        "cards": [{"title": "Answer", "csrScript": "Yes", "priority": "high", "debug": "..."}],
+    })
+    transcript, suggestion = sent[0][2], sent[1][2]
+    stats = emitter.stats()
+    ok = (
+        "contactId" not in transcript and "createdAt" not in transcript and transcript["text"] == "hello"
+        and "confidence" not in suggestion
+        and suggestion["customer"] == {"name": "Pat", "plan": "ShieldPlus"}
+        and suggestion["cards"] == [{"title": "Answer", "csrScript": "Yes", "priority": "high"}]
+        and stats["rooms"][0]["room"] == "call-1" and stats["rooms"][0]["lastMinute"] == 2
+    )
+    print(f"  {'✓' if ok else '❌'} trimmed suggestion {suggestion}; rooms {stats['rooms']}")
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_room_only_and_supervisors(),
+        test_partials_debounced(),
+        test_final_replaces_pending_partial(),
+        test_payload_trimming_and_rates(),
+    ]
+    print("=" * 60)
+    print("✅ All socket emitter tests passed" if all(results) else "❌ Some socket emitter tests failed")
+    sys.exit(0 if all(results) else 1)
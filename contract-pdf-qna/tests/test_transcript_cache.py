@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for the transcript object cache (name -> path map + on-disk LRU)
+Runs without GCP: uses a small in-memory filesystem that counts round trips.
+"""
+
+import io
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcript_cache import DiskLRUCache, TranscriptObjectCache
+
+
+class CountingFS:
+    """Minimal fsspec-like filesystem: open() exposes .details like gcsfs does."""
+
+    def __init__(self, objects):
+        self.objects = objects  # path -> (bytes, generation)
+        self.calls = 0
+
+    def open(self, path, mode="rb"):
+        self.calls += 1
+        if path not in self.objects:
+            raise FileNotFoundError(path)
+        data, gen = self.objects[path]
+        self.calls += 1  # content fetch
+        handle = io.BytesIO(data)
+        handle.details = {"name": path, "size": len(data), "generation": gen, "timeCreated": "2025-01-01T00:00:00Z"}
+        return handle
+
+    def info(self, path):
+        self.calls += 1
+        if path not in self.objects:
+            raise FileNotFoundError(path)
+        data, gen = self.objects[path]
+        return {"name": path, "size": len(data), "generation": gen}
+
+
+def test_disk_lru_eviction():
+    print("Testing DiskLRUCache eviction...")
+    with tempfile.TemporaryDirectory() as d:
+        cache = DiskLRUCache(d, max_bytes=10)
+        cache.put("a", b"12345")
+        cache.put("b", b"12345")
+        cache.get("a")  # a is now most recent
+        cache.put("c", b"12345")
+        ok = cache.get("b") is None and cache.get("a") == b"12345" and cache.get("c") == b"12345"
+        print(f"  {'✓' if ok else '❌'} least recently used entry evicted: {cache.stats()}")
+        return ok
+
+
+def test_repeated_reads_served_locally():
+    print("Testing repeated transcript reads...")
+    fs = CountingFS({"bucket/transcripts/call1.json": (b'{"text": "hello"}', "1")})
+    with tempfile.TemporaryDirectory() as d:
+        store = TranscriptObjectCache(fs, "bucket", cache_dir=d, max_bytes=1024)
+        store.remember("call1.json", "bucket/transcripts/call1.json", {"size": 17, "generation": "1"})
+
+        content, entry = store.read_text("call1.json")
+        first_calls = fs.calls
+        content2, entry2 = store.read_text("call1.json")
+
+        ok = (
+            content == content2 == '{"text": "hello"}'
+            and first_calls == 2
+            and fs.calls == first_calls
+            and entry2.get("cached") is True
+        )
+        print(f"  {'✓' if ok else '❌'} first read round trips={first_calls}, second read round trips={fs.calls - first_calls}")
+
+        # New generation in the listing -> content re-fetched
+        fs.objects["bucket/transcripts/call1.json"] = (b'{"text": "updated"}', "2")
+        store.remember("call1.json", "bucket/transcripts/call1.json", {"size": 19, "generation": "2"})
+        content3, _ = store.read_text("call1.json")
+        ok_gen = content3 == '{"text": "updated"}'
+        print(f"  {'✓' if ok_gen else '❌'} new generation re-fetched")
+
+        try:
+            store.read_text("missing.json")
+            ok_missing = False
+        except FileNotFoundError:
+            ok_missing = True
+        print(f"  {'✓' if ok_missing else '❌'} missing transcript raises FileNotFoundError")
+        return ok and ok_gen and ok_missing
+
+
+def test_stale_entry_revalidates_generation():
+    print("Testing a stale name-map entry revalidates the generation instead of re-downloading...")
+    path = "bucket/transcripts/call2.json"
+    fs = CountingFS({path: (b'{"text": "hi"}', "7")})
+    with tempfile.TemporaryDirectory() as d:
+        store = TranscriptObjectCache(fs, "bucket", cache_dir=d, max_bytes=1024, path_ttl_seconds=60)
+        store.read_text("call2.json")
+        store._paths["call2.json"]["seenAt"] -= 120  # past the TTL
+        before = fs.calls
+        content, entry = store.read_text("call2.json")
+        ok_same = content == '{"text": "hi"}' and entry.get("cached") is True and fs.calls - before == 1
+        print(f"  {'✓' if ok_same else '❌'} unchanged generation: {fs.calls - before} round trip (info), served from disk")
+
+        fs.objects[path] = (b'{"text": "new"}', "8")
+        store._paths["call2.json"]["seenAt"] -= 120
+        before = fs.calls
+        content, entry = store.read_text("call2.json")
+        ok_new = content == '{"text": "new"}' and entry.get("cached") is False and fs.calls - before == 3
+        print(f"  {'✓' if ok_new else '❌'} new generation: {fs.calls - before} round trips (info + download)")
+        return ok_same and ok_new
+
+
+if __name__ == "__main__":
+    results = [test_disk_lru_eviction(), test_repeated_reads_served_locally(), test_stale_entry_revalidates_generation()]
+    print("=" * 60)
+    print("✅ All transcript cache tests passed" if all(results) else "❌ Some transcript cache tests failed")
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,74 @@
+#!/bin/bash
+# Stand-in for a GCS -> Pub/Sub push subscription.
+# Posts object-change notifications (Pub/Sub push shape) to the ingestion endpoint.
+#
+# Usage: ./test_transcript_ingest.sh [BASE_URL] [OBJECT_ID]
+#   INTERNAL_PROCESS_SECRET must match the backend's value.
+
+BASE_URL="${1:-http://localhost:8001}"
+OBJECT_ID="${2:-transcripts/transcribe_1.txt}"
+BUCKET="${GCP_BUCKET_NAME:-ahs-demo-transcripts}"
+SECRET="${INTERNAL_PROCESS_SECRET:?set INTERNAL_PROCESS_SECRET}"
+GENERATION="$(date +%s)000000"
+NOW="$(date -u +%Y-%m-%dT%H:%M:%S.000Z)"
+
+echo "=== Testing transcript ingestion endpoint ==="
+echo "Backend URL: $BASE_URL"
+echo "Object: gs://$BUCKET/$OBJECT_ID (generation $GENERATION)"
+echo ""
+
+DATA=$(printf '{"kind":"storage#object","bucket":"%s","name":"%s","generation":"%s","timeCreated":"%s","updated":"%s","contentType":"text/plain"}' \
+  "$BUCKET" "$OBJECT_ID" "$GENERATION" "$NOW" "$NOW" | base64 | tr -d '\n')
+
+# Test 1: new object (OBJECT_FINALIZE) -> queued for precompute
+echo "📥 Test 1: OBJECT_FINALIZE"
+curl -s -X POST "$BASE_URL/internal/transcripts/ingest?token=$SECRET" \
+  -H "Content-Type: application/json" \
+  -d '{
+    "message": {
+      "attributes": {
+        "eventType": "OBJECT_FINALIZE",
+        "bucketId": "'"$BUCKET"'",
+        "objectId": "'"$OBJECT_ID"'",
+        "objectGeneration": "'"$GENERATION"'",
+        "payloadFormat": "JSON_API_V1"
+      },
+      "data": "'"$DATA"'",
+      "messageId": "stand-in-'"$GENERATION"'"
+    },
+    "subscription": "projects/local/subscriptions/transcripts-ingest"
+  }'
+echo -e "\n"
+
+# Test 2: redelivery of the same generation (should be cheap / idempotent)
+echo "🔁 Test 2: redelivery of the same notification"
+curl -s -X POST "$BASE_URL/internal/transcripts/ingest" \
+  -H "Content-Type: application/json" \
+  -H "X-Internal-Auth: $SECRET" \
+  -d '{
+    "message": {
+      "attributes": {
+        "eventType": "OBJECT_FINALIZE",
+        "bucketId": "'"$BUCKET"'",
+        "objectId": "'"$OBJECT_ID"'",
+        "objectGeneration": "'"$GENERATION"'"
+      },
+      "data": "'"$DATA"'"
+    }
+  }'
+echo -e "\n"
+
+# Test 3: non-transcript object is acked and ignored
+echo "🙈 Test 3: non-transcript object"
+curl -s -X POST "$BASE_URL/internal/transcripts/ingest?token=$SECRET" \
+  -H "Content-Type: application/json" \
+  -d '{"message": {"attributes": {"eventType": "OBJECT_FINALIZE", "bucketId": "'"$BUCKET"'", "objectId": "exports/report.csv"}}}'
+echo -e "\n"
+
+# Test 4: bad secret is rejected
+echo "🔒 Test 4: unauthorized"
+curl -s -o /dev/null -w "HTTP %{http_code}\n" -X POST "$BASE_URL/internal/transcripts/ingest?token=wrong" \
+  -H "Content-Type: application/json" -d '{}'
+
+echo ""
+echo "=== Done. Watch backend logs for [TRANSCRIPT_INGEST] lines ==="
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-process transcript search index (transcript_search.py): BM25 ranking,
+quoted phrases, facet filters / counts, and re-indexing when a transcript's generation changes.
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcript_search import TranscriptSearchIndex
+
+
+def _index():
+    index = TranscriptSearchIndex()
+    index.add(
+        "call_leak.txt",
+        "My dishwasher is leaking. It leaked again today and the leak is getting worse.",
+        {"contractType": "RE", "planType": "ShieldGold", "state": "TX"},
+        version="1",
+    )
+    index.add(
+        "call_billing.txt",
+        "I have a question about my bill. Also the water heater had a small leak last year but that was fixed, "
+        "and the technician replaced the valve and checked the pressure and the thermostat.",
+        {"contractType": "RE", "planType": "ShieldSilver", "state": "TX"},
+        version="1",
+    )
+    index.add(
+        "call_hvac.txt",
+        "The air conditioner stopped cooling and the compressor makes noise.",
+        {"contractType": "DTC", "planType": "ShieldGold", "state": "CA"},
+        version="1",
+    )
+    return index
+
+
+def test_bm25_ranking_order():
+    print("Testing BM25 ranks the denser match first and skips non-matching docs...")
+    index = _index()
+    ranked = [name for name, _ in index.search("leaking")]
+    both = [name for name, _ in index.search("dishwasher leak")]
+    phrase = [name for name, _ in index.search('"water heater"')]
+    ok = (
+        ranked == ["call_leak.txt", "call_billing.txt"]
+        and both[0] == "call_leak.txt"
+        and phrase == ["call_billing.txt"]
+    )
+    print(f"  {'✓' if ok else '❌'} leaking={ranked} dishwasher+leak={both} phrase={phrase}")
+    return ok
+
+
+def test_facet_filters_and_counts():
+    print("Testing facet filters and facet counts over a result set...")
+    index = _index()
+    tx = [name for name, _ in index.search("", {"state": "tx"})]
+    gold_leak = [name for name, _ in index.search("leak", {"planType": "Shield Gold"})]
+    counts = index.facet_counts(["call_leak.txt", "call_billing.txt", "call_hvac.txt", "missing.txt"])
+    ok = (
+        sorted(tx) == ["call_billing.txt", "call_leak.txt"]
+        and gold_leak == ["call_leak.txt"]
+        and counts == {
+            "contractType": {"RE": 2, "DTC": 1},
+            "planType": {"ShieldGold": 2, "ShieldSilver": 1},
+            "state": {"TX": 2, "CA": 1},
+        }
+    )
+    print(f"  {'✓' if ok else '❌'} state=tx {sorted(tx)}; gold+leak {gold_leak}; counts={counts}")
+    return ok
+
+
+def test_reindex_on_generation_change():
+    print("Testing needs_indexing / re-index on a new generation and retain() pruning...")
+    index = _index()
+    before = [index.needs_indexing("call_leak.txt", "1"), index.needs_indexing("call_leak.txt", "2"),
+              index.needs_indexing("new.txt", "1"), index.needs_indexing("call_leak.txt", None)]
+    index.add("call_leak.txt", "The refrigerator is not cooling.", {"contractType": "RE"}, version="2")
+    reindexed = (
+        index.indexed_version("call_leak.txt") == "2"
+        and not index.needs_indexing("call_leak.txt", "2")
+        and index.search("dishwasher") == []
+        and [name for name, _ in index.search("refrigerator")] == ["call_leak.txt"]
+        and index.metadata("call_leak.txt") == {"contractType": "RE", "planType": None, "state": None}
+    )
+    index.retain(["call_leak.txt", "call_hvac.txt"])
+    pruned = len(index) == 2 and index.search("bill") == [] and index.metadata("call_billing.txt") is None
+    ok = before == [False, True, True, False] and reindexed and pruned
+    print(f"  {'✓' if ok else '❌'} needs_indexing={before} reindexed={reindexed} pruned={pruned}")
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_bm25_ranking_order(),
+        test_facet_filters_and_counts(),
+        test_reindex_on_generation_change(),
+    ]
+    print("=" * 60)
+    print("✅ All transcript search tests passed" if all(results) else "❌ Some transcript search tests failed")
+    sys.exit(0 if all(results) else 1)
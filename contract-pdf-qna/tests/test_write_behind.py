@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test script for the write-behind persistence queue
+Runs without Mongo: uses a fake collection that records bulk_write batches.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import AutoReconnect, OperationFailure
+from write_behind import WriteBehindQueue, replay_safe
+
+
+class _FakeDatabase:
+    name = "FrontDoorDB"
+
+    def __init__(self, dead_letter=None):
+        self.dead_letter = dead_letter  # list, or None: the dead-letter insert fails
+
+    def __getitem__(self, name):
+        return _FakeDeadLetter(self.dead_letter)
+
+
+class _FakeDeadLetter:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def insert_one(self, doc):
+        if self.docs is None:
+            raise AutoReconnect("no primary")
+        self.docs.append(doc)
+
+
+class FakeCollection:
+    """Records bulk_write batches; can fail the first N calls with a transient error."""
+
+    def __init__(self, name, fail_times=0, delay=None, error=AutoReconnect, dead_letter=None):
+        self.name = name
+        self.database = _FakeDatabase(dead_letter)
+        self.batches = []
+        self.fail_times = fail_times
+        self.delay = delay
+        self.error = error
+
+    def bulk_write(self, ops, ordered=True):
+        if self.delay:
+            self.delay.wait(2)
+        if self.fail_times:
+            self.fail_times -= 1
+            raise self.error("primary stepped down" if self.error is AutoReconnect else "document failed validation")
+        self.batches.append(list(ops))
+
+
+def test_batches_and_order():
+    print("Testing batching and per-collection order...")
+    wb = WriteBehindQueue(batch_size=100, flush_ms=50)
+    chats = FakeCollection("chats_a@x.com")
+    for i in range(10):
+        wb.submit(chats, ("push", i))
+    ok_barrier = wb.barrier(chats, timeout=5)
+    written = [op[1] for batch in chats.batches for op in batch]
+    ok = ok_barrier and written == list(range(10)) and len(chats.batches) <= 2
+    print(f"  {'✓' if ok else '❌'} 10 ops written in {len(chats.batches)} batch(es), in order")
+    return ok
+
+
+def test_barrier_waits_for_pending():
+    print("Testing read-your-writes barrier...")
+    wb = WriteBehindQueue(batch_size=100, flush_ms=10)
+    release = threading.Event()
+    chats = FakeCollection("chats_b@x.com", delay=release)
+    other = FakeCollection("chats_c@x.com")
+    wb.submit(chats, ("insert", 1))
+    ok_other = wb.barrier(other, timeout=0.5)  # nothing pending there -> immediate
+    ok_timeout = not wb.barrier(chats, timeout=0.2)  # write still blocked
+    release.set()
+    ok_done = wb.barrier(chats, timeout=5) and len(chats.batches) == 1
+    ok = ok_other and ok_timeout and ok_done
+    print(f"  {'✓' if ok else '❌'} barrier only waits on the collection with queued writes")
+    return ok
+
+
+def test_on_written_after_flush():
+    print("Testing on_written fires once the queued write has landed, not at submit...")
+    release = threading.Event()
+    chats = FakeCollection("chats_e@x.com", delay=release)
+    noted = []
+    wb = WriteBehindQueue(batch_size=100, flush_ms=10, on_written=lambda c: noted.append((c.name, len(c.batches))))
+    wb.submit(chats, ("insert", 1))
+    ok_not_yet = not wb.barrier(chats, timeout=0.2) and noted == []
+    release.set()
+    ok_after = wb.barrier(chats, timeout=5) and noted == [("chats_e@x.com", 1)]
+    ok = ok_not_yet and ok_after
+    print(f"  {'✓' if ok else '❌'} noted {noted} after the flush, before the barrier returned")
+    return ok
+
+
+def test_transient_retry_and_close():
+    print("Testing transient retry and shutdown flush...")
+    wb = WriteBehindQueue(batch_size=100, flush_ms=10, max_retries=3)
+    feedbacks = FakeCollection("feedbacks_d@x.com", fail_times=2)
+    wb.submit(feedbacks, ("insert", "f1"))
+    wb.close(timeout=10)
+    ok_retry = len(feedbacks.batches) == 1 and wb.stats()["retries"] == 2 and wb.stats()["dropped"] == 0
+    print(f"  {'✓' if ok_retry else '❌'} written after {wb.stats()['retries']} retries, flushed on close")
+
+    wb.submit(feedbacks, ("insert", "f2"))  # after close: write-through
+    ok_through = len(feedbacks.batches) == 2 and wb.stats()["pending"] == 0
+    print(f"  {'✓' if ok_through else '❌'} writes after close go straight through")
+    return ok_retry and ok_through
+
+
+def test_dropped_writes_dead_lettered():
+    print("Testing dropped writes go to the dead letter and show up in health()...")
+    dead = []
+    chats = FakeCollection("chats_f@x.com", fail_times=1, error=OperationFailure, dead_letter=dead)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dead.jsonl")
+        wb = WriteBehindQueue(batch_size=100, flush_ms=10, dead_letter_file=path)
+        ok_healthy = wb.health()["status"] == "ok"
+        wb.submit(chats, ("push", 1))
+        wb.barrier(chats, timeout=5)
+        refused = FakeCollection("feedbacks_f@x.com", fail_times=1, error=OperationFailure, dead_letter=None)
+        wb.submit(refused, ("insert", "f1"))
+        wb.barrier(refused, timeout=5)
+        with open(path, encoding="utf-8") as f:
+            in_file = [json.loads(line) for line in f]
+    health = wb.health()
+    ok = (
+        ok_healthy and [d["collection"] for d in dead] == ["FrontDoorDB.chats_f@x.com"]
+        and [d["collection"] for d in in_file] == ["FrontDoorDB.feedbacks_f@x.com"]
+        and health["status"] == "degraded" and health["dropped"] == 2 and health["deadLettered"] == 2
+        and health["deadLetterErrors"] == 0
+    )
+    print(f"  {'✓' if ok else '❌'} status={health['status']} dropped={health['dropped']} collection={len(dead)} file={len(in_file)}")
+    return ok
+
+
+def test_transient_retry_only_replays_safe_ops():
+    print("Testing a transient error replays only ops that are safe to apply twice...")
+    guarded = UpdateOne({"_id": 1, "chats.chat_id": {"$nin": ["c1"]}}, {"$push": {"chats": {"$each": [{"chat_id": "c1"}]}}})
+    unguarded = UpdateOne({"_id": 1}, {"$push": {"chats": {"chat_id": "c2"}}})
+    counter = UpdateOne({"_id": 1}, {"$inc": {"count": 1}})
+    insert = InsertOne({"_id": 2})
+    dead = []
+    chats = FakeCollection("chats_g@x.com", fail_times=1, dead_letter=dead)
+    wb = WriteBehindQueue(batch_size=100, flush_ms=50, max_retries=3)
+    for op in (guarded, unguarded, counter, insert):
+        wb.submit(chats, op)
+    wb.barrier(chats, timeout=5)
+    replayed = [op for batch in chats.batches for op in batch]
+    ok = (
+        [replay_safe(op) for op in (guarded, unguarded, counter, insert)] == [True, False, False, True]
+        and replayed == [guarded, insert] and len(dead) == 2 and wb.stats()["dropped"] == 2
+    )
+    print(f"  {'✓' if ok else '❌'} replayed {len(replayed)} op(s), dead-lettered {len(dead)} non-idempotent op(s)")
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_batches_and_order(),
+        test_barrier_waits_for_pending(),
+        test_on_written_after_flush(),
+        test_transient_retry_and_close(),
+        test_dropped_writes_dead_lettered(),
+        test_transient_retry_only_replays_safe_ops(),
+    ]
+    print("=" * 60)
+    print("✅ All write-behind tests passed" if all(results) else "❌ Some write-behind tests failed")
+    sys.exit(0 if all(results) else 1)
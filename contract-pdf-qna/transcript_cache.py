@@ -0,0 +1,327 @@
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# -------------------------------------------------------------------
+# Transcript object cache
+#
+# Reads of a transcript used to cost up to four GCS round trips
+# (exists() on two candidate paths, open().read(), info()). This module keeps:
+#   - a name -> path/generation map, filled from bucket listings and reads
+#   - an on-disk content cache keyed by object generation (size-bounded LRU)
+# so a transcript that was already opened by any CSR is served locally.
+# -------------------------------------------------------------------
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        raw = (os.getenv(name) or "").strip()
+        if not raw:
+            return default
+        v = int(raw)
+        return v if v > 0 else default
+    except Exception:
+        return default
+
+
+TRANSCRIPT_CACHE_DIR = (os.getenv("TRANSCRIPT_CACHE_DIR") or "").strip() or os.path.join(
+    tempfile.gettempdir(), "transcript_cache"
+)
+TRANSCRIPT_CACHE_MAX_BYTES = _env_int("TRANSCRIPT_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+# How long a name -> path/generation entry is trusted before the object is re-opened.
+# Bucket listings (/transcripts) refresh entries for free, so this only bounds staleness
+# for objects overwritten in place between listings.
+TRANSCRIPT_PATH_MAP_TTL_SECONDS = _env_int("TRANSCRIPT_PATH_MAP_TTL_SECONDS", 300)
+
+
+def object_version(info: Dict[str, Any]) -> Optional[str]:
+    """
+    Stable version id for a GCS object: generation when available (gcsfs), else md5/etag,
+    else size+updated. Returns None when nothing usable is present.
+    """
+    if not isinstance(info, dict):
+        return None
+    for k in ("generation", "md5Hash", "etag"):
+        v = info.get(k)
+        if v:
+            return str(v)
+    size = info.get("size")
+    updated = info.get("updated") or info.get("timeCreated")
+    if size is not None and updated:
+        return f"{size}-{updated}"
+    return None
+
+
+def _iso(value: Any) -> Optional[str]:
+    if not value:
+        return None
+    if isinstance(value, str):
+        return value
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+class DiskLRUCache:
+    """
+    Byte-blob cache on local disk with a total size bound.
+    Recency is tracked in memory; on startup existing files are re-adopted by mtime.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._adopt_existing()
+        except Exception as e:
+            print(f"Warning: transcript cache dir unavailable ({self.directory}): {e}")
+
+    def _adopt_existing(self) -> None:
+        found = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                continue
+            p = os.path.join(self.directory, name)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            found.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self._total_bytes += size
+        self._evict_locked()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            # File removed underneath us (tmp cleaner, another process); forget it.
+            with self._lock:
+                size = self._entries.pop(key, None)
+                if size is not None:
+                    self._total_bytes -= size
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        tmp = self._path(f"{key}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            print(f"Warning: failed to write transcript cache entry {key}: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class TranscriptObjectCache:
+    """
+    Name-addressed access to transcript objects in one bucket.
+
+    read(name) costs:
+      - 0 GCS round trips when the name map entry is fresh and the generation is on disk
+      - 1 round trip (info()) when the entry is stale but that generation is still on disk
+      - 2 round trips otherwise (open() fetches object info, read() fetches content);
+        the info returned by open() is reused, so there is no separate exists()/info()
+    """
+
+    def __init__(
+        self,
+        fs: Any,
+        bucket: str,
+        prefixes: Optional[List[str]] = None,
+        cache_dir: str = TRANSCRIPT_CACHE_DIR,
+        max_bytes: int = TRANSCRIPT_CACHE_MAX_BYTES,
+        path_ttl_seconds: int = TRANSCRIPT_PATH_MAP_TTL_SECONDS,
+    ):
+        self.fs = fs
+        self.bucket = bucket
+        self.prefixes = prefixes if prefixes is not None else ["transcripts/", ""]
+        self.path_ttl_seconds = path_ttl_seconds
+        self.content = DiskLRUCache(cache_dir, max_bytes)
+        self._paths: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------------
+    # name -> path map
+    # ---------------------------------------------------------------
+    def remember(self, file_name: str, file_path: str, info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Record where `file_name` lives (called from bucket listings and reads)."""
+        info = info or {}
+        entry = {
+            "path": file_path,
+            "version": object_version(info),
+            "size": info.get("size", 0) or 0,
+            "uploadDate": _iso(info.get("timeCreated")),
+            "seenAt": time(),
+        }
+        with self._lock:
+            self._paths[file_name] = entry
+        return entry
+
+    def forget(self, file_name: str) -> None:
+        with self._lock:
+            self._paths.pop(file_name, None)
+
+    def lookup(self, file_name: str, fresh_only: bool = True) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._paths.get(file_name)
+        if not entry:
+            return None
+        if fresh_only and (time() - entry.get("seenAt", 0)) > self.path_ttl_seconds:
+            return None
+        return dict(entry)
+
+    def _candidate_paths(self, file_name: str) -> List[str]:
+        candidates = []
+        known = self.lookup(file_name, fresh_only=False)
+        if known and known.get("path"):
+            candidates.append(known["path"])
+        for prefix in self.prefixes:
+            p = f"{self.bucket}/{prefix}{file_name}"
+            if p not in candidates and f"gs://{p}" not in candidates:
+                candidates.append(p)
+        return candidates
+
+    @staticmethod
+    def _content_key(file_path: str, version: str) -> str:
+        return hashlib.sha256(f"{file_path}\n{version}".encode("utf-8")).hexdigest()
+
+    # ---------------------------------------------------------------
+    # reads
+    # ---------------------------------------------------------------
+    def read_bytes(self, file_name: str) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        Return (content_bytes, entry) where entry has path/version/size/uploadDate.
+        Raises FileNotFoundError when no candidate path exists.
+        """
+        entry = self.lookup(file_name)
+        if entry and entry.get("version"):
+            data = self.content.get(self._content_key(entry["path"], entry["version"]))
+            if data is not None:
+                entry["cached"] = True
+                return data, entry
+
+        if self.fs is None:
+            raise Exception("GCP Storage not available")
+
+        stale = self.lookup(file_name, fresh_only=False) if entry is None else None
+        if stale and stale.get("path"):
+            # Entry past its TTL: revalidate the generation instead of re-downloading the object
+            try:
+                info = self.fs.info(stale["path"])
+            except FileNotFoundError:
+                info = None
+            version = object_version(info) if info else None
+            data = self.content.get(self._content_key(stale["path"], version)) if version else None
+            if data is not None:
+                entry = dict(self.remember(file_name, stale["path"], info))
+                entry["cached"] = True
+                return data, entry
+
+        for path in self._candidate_paths(file_name):
+            try:
+                with self.fs.open(path, "rb") as f:
+                    data = f.read()
+                    info = getattr(f, "details", None) or {}
+            except FileNotFoundError:
+                continue
+            if not info:
+                # Non-gcsfs backends may not expose details on the handle.
+                info = self.fs.info(path)
+            entry = self.remember(file_name, path, info)
+            if entry.get("version"):
+                self.content.put(self._content_key(path, entry["version"]), data)
+            entry["cached"] = False
+            return data, dict(entry)
+
+        self.forget(file_name)
+        raise FileNotFoundError(f"Transcript file not found: {file_name}")
+
+    def stat(self, file_name: str) -> Dict[str, Any]:
+        """
+        Path/version/size for `file_name` without downloading content: served from the name map
+        when fresh, else one info() call per candidate path. Raises FileNotFoundError.
+        """
+        entry = self.lookup(file_name)
+        if entry and entry.get("version"):
+            return entry
+        if self.fs is None:
+            raise Exception("GCP Storage not available")
+        for path in self._candidate_paths(file_name):
+            try:
+                info = self.fs.info(path)
+            except FileNotFoundError:
+                continue
+            return dict(self.remember(file_name, path, info))
+        self.forget(file_name)
+        raise FileNotFoundError(f"Transcript file not found: {file_name}")
+
+    def read_text(self, file_name: str) -> Tuple[str, Dict[str, Any]]:
+        data, entry = self.read_bytes(file_name)
+        return data.decode("utf-8", errors="replace"), entry
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            known = len(self._paths)
+        out = self.content.stats()
+        out["knownPaths"] = known
+        return out
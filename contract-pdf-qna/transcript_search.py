@@ -0,0 +1,230 @@
+import re
+import math
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# -------------------------------------------------------------------
+# In-process full-text + facet index over transcripts
+#
+# Documents are added incrementally as transcripts are catalogued
+# (see list_transcript_files_gcp in app.py). Ranking is BM25 over the
+# transcript text and file name, with a boost for exact phrase matches;
+# contractType / planType / state are exact-match facets.
+# -------------------------------------------------------------------
+
+FACET_FIELDS = ("contractType", "planType", "state")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_PHRASE_RE = re.compile(r'"([^"]+)"')
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "had", "has",
+    "have", "he", "her", "his", "i", "if", "in", "into", "is", "it", "its", "me", "my",
+    "of", "on", "or", "our", "she", "so", "that", "the", "their", "them", "then", "there",
+    "they", "this", "to", "um", "uh", "was", "we", "were", "what", "when", "which", "who",
+    "will", "with", "you", "your",
+}
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+
+def _stem(token: str) -> str:
+    # Light suffix stripping so "leaking"/"leaks"/"leaked" all match "leak".
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(token) > len(suffix) + 3 and token.endswith(suffix):
+            return token[: -len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(t) for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+def _normalized_stream(text: str) -> str:
+    """Lowercased token stream (stopwords kept) used for phrase containment."""
+    return " ".join(_TOKEN_RE.findall((text or "").lower()))
+
+
+def _facet_key(value: Any) -> str:
+    return re.sub(r"[^a-z0-9]+", "", str(value or "").lower())
+
+
+class TranscriptSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)  # term -> {doc: tf}
+        self._docs: Dict[str, Dict[str, Any]] = {}  # doc -> {version, length, terms, stream, facets, metadata}
+        self._total_length = 0
+
+    # ---------------------------------------------------------------
+    # indexing
+    # ---------------------------------------------------------------
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._docs)
+
+    def indexed_version(self, file_name: str) -> Optional[str]:
+        with self._lock:
+            d = self._docs.get(file_name)
+            return d.get("version") if d else None
+
+    def needs_indexing(self, file_name: str, version: Optional[str]) -> bool:
+        with self._lock:
+            d = self._docs.get(file_name)
+        if d is None:
+            return True
+        return version is not None and d.get("version") != version
+
+    def metadata(self, file_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            d = self._docs.get(file_name)
+            return dict(d["metadata"]) if d else None
+
+    def add(self, file_name: str, text: str, metadata: Optional[Dict[str, Any]] = None, version: Optional[str] = None) -> None:
+        """Index (or re-index) one transcript. `metadata` carries the facet values."""
+        metadata = dict(metadata or {})
+        name_stem = file_name.rsplit(".", 1)[0]
+        terms = tokenize(text) + tokenize(name_stem.replace("_", " ").replace("-", " "))
+        tf: Dict[str, int] = defaultdict(int)
+        for t in terms:
+            tf[t] += 1
+
+        with self._lock:
+            self._remove_locked(file_name)
+            for term, count in tf.items():
+                self._postings[term][file_name] = count
+            self._docs[file_name] = {
+                "version": version,
+                "length": len(terms),
+                "terms": list(tf.keys()),
+                "stream": _normalized_stream(text),
+                "nameLower": file_name.lower(),
+                "facets": {f: _facet_key(metadata.get(f)) for f in FACET_FIELDS},
+                "metadata": {f: metadata.get(f) for f in FACET_FIELDS},
+            }
+            self._total_length += len(terms)
+
+    def remove(self, file_name: str) -> None:
+        with self._lock:
+            self._remove_locked(file_name)
+
+    def _remove_locked(self, file_name: str) -> None:
+        d = self._docs.pop(file_name, None)
+        if not d:
+            return
+        self._total_length -= d["length"]
+        for term in d["terms"]:
+            plist = self._postings.get(term)
+            if plist is not None:
+                plist.pop(file_name, None)
+                if not plist:
+                    del self._postings[term]
+
+    def retain(self, file_names) -> None:
+        """Drop documents that are no longer present in the bucket listing."""
+        keep = set(file_names)
+        with self._lock:
+            for name in [n for n in self._docs if n not in keep]:
+                self._remove_locked(name)
+
+    # ---------------------------------------------------------------
+    # querying
+    # ---------------------------------------------------------------
+    def _facet_match(self, doc: Dict[str, Any], facets: Dict[str, str]) -> bool:
+        for field, wanted in facets.items():
+            if doc["facets"].get(field) != wanted:
+                return False
+        return True
+
+    def search(self, query: Optional[str], facets: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """
+        Return [(file_name, score)] sorted by score desc.
+        - Quoted phrases in `query` must appear verbatim (case/punctuation-insensitive).
+        - Unquoted terms are ranked with BM25; docs matching more of the terms rank higher.
+        - `facets` values are exact matches on contractType / planType / state.
+        With no query, every doc passing the facets is returned with score 0.
+        """
+        facets = {f: _facet_key(v) for f, v in (facets or {}).items() if f in FACET_FIELDS and _facet_key(v)}
+        query = (query or "").strip()
+        phrases = [_normalized_stream(p) for p in _PHRASE_RE.findall(query)]
+        phrases = [p for p in phrases if p]
+        query_terms = list(dict.fromkeys(tokenize(_PHRASE_RE.sub(" ", query) + " " + " ".join(phrases))))
+        whole_query = _normalized_stream(query.replace('"', " "))
+        query_lower = query.replace('"', "").strip().lower()
+
+        with self._lock:
+            if not query_terms and not phrases and not query_lower:
+                return [(name, 0.0) for name, d in self._docs.items() if self._facet_match(d, facets)]
+
+            n_docs = len(self._docs) or 1
+            avg_len = (self._total_length / n_docs) or 1.0
+            scores: Dict[str, float] = defaultdict(float)
+            matched: Dict[str, int] = defaultdict(int)
+            for term in query_terms:
+                plist = self._postings.get(term)
+                if not plist:
+                    continue
+                idf = math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+                for name, tf in plist.items():
+                    dl = self._docs[name]["length"] or 1
+                    scores[name] += idf * (tf * (_K1 + 1)) / (tf + _K1 * (1 - _B + _B * dl / avg_len))
+                    matched[name] += 1
+
+            # Keep the old behaviour: a file-name substring hit always matches.
+            if query_lower:
+                for name, d in self._docs.items():
+                    if query_lower in d["nameLower"]:
+                        scores[name] += 5.0
+                        matched[name] = max(matched[name], len(query_terms))
+
+            results = []
+            for name, score in scores.items():
+                d = self._docs[name]
+                if not self._facet_match(d, facets):
+                    continue
+                if phrases and not all(p in d["stream"] for p in phrases):
+                    continue
+                if query_terms:
+                    score *= matched[name] / len(query_terms)
+                if len(query_terms) > 1 and whole_query and whole_query in d["stream"]:
+                    score *= 2.0
+                results.append((name, round(score, 4)))
+
+        results.sort(key=lambda x: x[1], reverse=True)
+        return results
+
+    def snippet(self, file_name: str, query: Optional[str], width: int = 160) -> Optional[str]:
+        """Short window of transcript text around the first query term hit."""
+        with self._lock:
+            d = self._docs.get(file_name)
+            stream = d["stream"] if d else ""
+        if not stream or not query:
+            return None
+        candidates = [_normalized_stream(p) for p in _PHRASE_RE.findall(query)]
+        candidates += _TOKEN_RE.findall(query.lower())
+        for c in candidates:
+            if not c or c in _STOPWORDS:
+                continue
+            pos = stream.find(c)
+            if pos >= 0:
+                start = max(0, pos - width // 2)
+                end = min(len(stream), pos + len(c) + width // 2)
+                return ("…" if start else "") + stream[start:end] + ("…" if end < len(stream) else "")
+        return None
+
+    def facet_counts(self, file_names: List[str]) -> Dict[str, Dict[str, int]]:
+        counts: Dict[str, Dict[str, int]] = {f: defaultdict(int) for f in FACET_FIELDS}
+        with self._lock:
+            for name in file_names:
+                d = self._docs.get(name)
+                if not d:
+                    continue
+                for f in FACET_FIELDS:
+                    v = d["metadata"].get(f)
+                    if v:
+                        counts[f][str(v)] += 1
+        return {f: dict(c) for f, c in counts.items()}
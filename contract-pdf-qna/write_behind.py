@@ -0,0 +1,344 @@
+import atexit
+import json
+import os
+import queue
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from time import time, sleep
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo.errors import (
+    AutoReconnect,
+    BulkWriteError,
+    ConnectionFailure,
+    ExecutionTimeout,
+    NetworkTimeout,
+    PyMongoError,
+    WTimeoutError,
+)
+
+
+# -------------------------------------------------------------------
+# Write-behind persistence
+#
+# Request handlers enqueue Mongo mutations (pymongo InsertOne / UpdateOne / ...) and
+# return; one flusher thread groups queued ops per collection and sends them as
+# ordered bulk_write batches, by size (WRITE_BEHIND_BATCH_SIZE) or age
+# (WRITE_BEHIND_FLUSH_MS).
+#
+#   - bounded: at most WRITE_BEHIND_MAX_PENDING queued ops; submit() blocks (backpressure)
+#   - per-collection order is preserved (one flusher, ordered bulk_write)
+#   - transient errors are retried with backoff, but only for ops that are safe to apply twice (the
+#     batch may have landed unacknowledged): inserts (duplicate key), $set / deletes / replaces, and
+#     $push guarded in the filter by $ne / $nin on the pushed items' ids (replay_safe). Other ops
+#     are not retried but dead-lettered; ops that keep failing are dropped from the queue.
+#     The client was already told the write succeeded, so each dropped op is saved to the
+#     WRITE_BEHIND_DEAD_LETTER_COLLECTION (same database) for replay, or appended to
+#     WRITE_BEHIND_DEAD_LETTER_FILE when Mongo refuses that too; health() / the
+#     /internal/writes/health endpoint report them
+#   - read-your-writes: barrier(collection) waits until that collection's queued ops are written;
+#     callers generate _ids client-side so ids can be returned before the insert lands.
+#     on_written(collection) runs after each flush of a collection, before barrier() waiters wake
+#     (app.py pins listing reads to the primary from there, not from enqueue time)
+#   - flush on shutdown via atexit (and SIGTERM, see app.py)
+# -------------------------------------------------------------------
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        raw = (os.getenv(name) or "").strip()
+        if not raw:
+            return default
+        v = int(raw)
+        return v if v > 0 else default
+    except Exception:
+        return default
+
+
+WRITE_BEHIND_MAX_PENDING = _env_int("WRITE_BEHIND_MAX_PENDING", 10000)
+WRITE_BEHIND_BATCH_SIZE = _env_int("WRITE_BEHIND_BATCH_SIZE", 500)
+WRITE_BEHIND_FLUSH_MS = _env_int("WRITE_BEHIND_FLUSH_MS", 50)
+WRITE_BEHIND_MAX_RETRIES = _env_int("WRITE_BEHIND_MAX_RETRIES", 5)
+WRITE_BEHIND_BARRIER_TIMEOUT_S = _env_int("WRITE_BEHIND_BARRIER_TIMEOUT_S", 10)
+WRITE_BEHIND_DEAD_LETTER_COLLECTION = (os.getenv("WRITE_BEHIND_DEAD_LETTER_COLLECTION", "write_behind_dead_letter") or "").strip()
+WRITE_BEHIND_DEAD_LETTER_FILE = (os.getenv("WRITE_BEHIND_DEAD_LETTER_FILE", "write_behind_dead_letter.jsonl") or "").strip()
+
+TRANSIENT_ERRORS = (AutoReconnect, ConnectionFailure, NetworkTimeout, ExecutionTimeout, WTimeoutError)
+
+
+def _collection_key(collection) -> str:
+    return f"{collection.database.name}.{collection.name}"
+
+
+def _dead_letter_doc(key: str, op: Any, error: Optional[str]) -> Dict[str, Any]:
+    """Enough of a pymongo write model (InsertOne / UpdateOne / ...) to replay it by hand."""
+    return {
+        "collection": key,
+        "op": type(op).__name__,
+        "filter": getattr(op, "_filter", None),
+        "doc": getattr(op, "_doc", None),
+        "upsert": getattr(op, "_upsert", None),
+        "repr": repr(op)[:500],
+        "error": error,
+        "failed_at": datetime.utcnow(),
+    }
+
+
+_NON_IDEMPOTENT_UPDATES = ("$inc", "$mul", "$pop")
+
+
+def replay_safe(op) -> bool:
+    """True when applying `op` a second time changes nothing (see the module comment)."""
+    filter, update = getattr(op, "_filter", None), getattr(op, "_doc", None)
+    if not isinstance(filter, dict) or update is None:
+        return True  # InsertOne (replay hits duplicate key), DeleteOne / DeleteMany
+    if not isinstance(update, dict):
+        return False  # aggregation-pipeline update
+    if any(name in update for name in _NON_IDEMPOTENT_UPDATES):
+        return False
+    for field in (update.get("$push") or {}):
+        guarded = any(
+            key.startswith(f"{field}.") and isinstance(cond, dict) and ("$ne" in cond or "$nin" in cond)
+            for key, cond in filter.items()
+        )
+        if not guarded:
+            return False
+    return True
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    has_label = getattr(error, "has_error_label", None)
+    return bool(has_label and has_label("RetryableWriteError"))
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_ms: int = WRITE_BEHIND_FLUSH_MS,
+        max_retries: int = WRITE_BEHIND_MAX_RETRIES,
+        on_written: Optional[Callable[[Any], None]] = None,
+        dead_letter_collection: str = WRITE_BEHIND_DEAD_LETTER_COLLECTION,
+        dead_letter_file: str = WRITE_BEHIND_DEAD_LETTER_FILE,
+    ):
+        self._on_written = on_written
+        self.dead_letter_collection = dead_letter_collection
+        self.dead_letter_file = dead_letter_file
+        self._dead_letter_lock = threading.Lock()
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000.0
+        self.max_retries = max_retries
+        self._queue: "queue.Queue[Tuple[Any, Any]]" = queue.Queue(maxsize=max_pending)
+        self._pending: Dict[str, int] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.dropped = 0
+        self.dead_lettered = 0
+        self.dead_letter_errors = 0
+        self.failures: "deque[Dict[str, Any]]" = deque(maxlen=100)
+
+    # ---------------------------------------------------------------
+    # producer side
+    # ---------------------------------------------------------------
+    def start(self) -> None:
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="mongo-write-behind", daemon=True)
+            self._thread.start()
+
+    def submit(self, collection, op) -> None:
+        """Queue one pymongo write model for `collection`; blocks while the queue is full."""
+        if self._closed:
+            # Shutting down: write through so nothing is lost.
+            try:
+                self._write(collection, [op])
+            finally:
+                self._notify_written(collection)
+            return
+        self.start()
+        key = _collection_key(collection)
+        with self._cond:
+            self._pending[key] = self._pending.get(key, 0) + 1
+        self._queue.put((collection, op))
+
+    def barrier(self, collection, timeout: float = WRITE_BEHIND_BARRIER_TIMEOUT_S) -> bool:
+        """Wait until every op queued so far for `collection` is written. Returns False on timeout."""
+        key = _collection_key(collection)
+        deadline = time() + timeout
+        with self._cond:
+            while self._pending.get(key):
+                remaining = deadline - time()
+                if remaining <= 0:
+                    print(f"Warning: write-behind barrier timed out on {key} ({self._pending.get(key)} pending)")
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def flush(self, timeout: float = WRITE_BEHIND_BARRIER_TIMEOUT_S) -> bool:
+        deadline = time() + timeout
+        with self._cond:
+            while any(self._pending.values()):
+                remaining = deadline - time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 30) -> None:
+        """Flush everything queued, then switch to write-through."""
+        if self._closed:
+            return
+        pending = self.stats()["pending"]
+        if pending:
+            print(f"[WRITE_BEHIND] flushing {pending} pending write(s) before shutdown")
+        if not self.flush(timeout):
+            print(f"Warning: write-behind shutdown flush timed out with {self.stats()['pending']} pending write(s)")
+        self._closed = True
+
+    # ---------------------------------------------------------------
+    # flusher
+    # ---------------------------------------------------------------
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batches: "OrderedDict[str, Tuple[Any, List[Any]]]" = OrderedDict()
+            count = 0
+            deadline = time() + self.flush_interval
+            while True:
+                collection, op = item
+                key = _collection_key(collection)
+                batches.setdefault(key, (collection, []))[1].append(op)
+                count += 1
+                if count >= self.batch_size:
+                    break
+                remaining = deadline - time()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            for key, (collection, ops) in batches.items():
+                try:
+                    self._write(collection, ops)
+                except Exception as e:
+                    # Never let the flusher die; _write already logged and recorded the failure.
+                    print(f"Warning: write-behind flush failed on {key}: {e}")
+                finally:
+                    self._notify_written(collection)
+                    with self._cond:
+                        self._pending[key] = max(0, self._pending.get(key, 0) - len(ops))
+                        if not self._pending[key]:
+                            self._pending.pop(key, None)
+                        self._cond.notify_all()
+
+    def _notify_written(self, collection) -> None:
+        if self._on_written is None:
+            return
+        try:
+            self._on_written(collection)
+        except Exception as e:
+            print(f"Warning: write-behind on_written callback failed (non-blocking): {e}")
+
+    def _write(self, collection, ops: List[Any]) -> None:
+        attempt = 0
+        while ops:
+            try:
+                collection.bulk_write(ops, ordered=True)
+                self.written += len(ops)
+                self.batches += 1
+                return
+            except BulkWriteError as e:
+                # Ordered batch stopped at the first failing op: everything before it was applied.
+                errors = e.details.get("writeErrors") or []
+                if not errors:
+                    raise
+                index = errors[0].get("index", 0)
+                self.written += index
+                if errors[0].get("code") != 11000:
+                    # Duplicate keys are replays of inserts that already landed; others are real failures.
+                    self._record_failure(collection, ops[index], errors[0].get("errmsg"))
+                ops = ops[index + 1:]
+                attempt = 0
+            except PyMongoError as e:
+                if not _is_transient(e) or attempt >= self.max_retries:
+                    for op in ops:
+                        self._record_failure(collection, op, str(e))
+                    return
+                # The batch may have landed before the error: only replay what can't be applied twice
+                for op in ops:
+                    if not replay_safe(op):
+                        self._record_failure(collection, op, f"not retried (not replay-safe) after: {e}")
+                ops = [op for op in ops if replay_safe(op)]
+                attempt += 1
+                self.retries += 1
+                sleep(min(5.0, 0.2 * (2 ** (attempt - 1))))
+
+    def _record_failure(self, collection, op: Any, error: Optional[str]) -> None:
+        key = _collection_key(collection)
+        self.dropped += 1
+        self.failures.append({"collection": key, "op": repr(op)[:500], "error": error, "at": time()})
+        print(f"Warning: write-behind dropped a write on {key}: {error}")
+        self._dead_letter(collection, _dead_letter_doc(key, op, error))
+
+    def _dead_letter(self, collection, doc: Dict[str, Any]) -> None:
+        """Keep a dropped op for replay: dead-letter collection first, local JSONL file if that fails."""
+        if self.dead_letter_collection:
+            try:
+                collection.database[self.dead_letter_collection].insert_one(dict(doc))
+                self.dead_lettered += 1
+                return
+            except Exception as e:
+                print(f"Warning: write-behind dead-letter insert failed, falling back to file: {e}")
+        if self.dead_letter_file:
+            try:
+                with self._dead_letter_lock, open(self.dead_letter_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(doc, default=str) + "\n")
+                self.dead_lettered += 1
+                return
+            except OSError as e:
+                print(f"Warning: write-behind dead-letter file write failed: {e}")
+        self.dead_letter_errors += 1
+        print(f"Warning: write-behind write LOST on {doc['collection']}: {doc['repr']}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = sum(self._pending.values())
+        return {
+            "pending": pending,
+            "written": self.written,
+            "batches": self.batches,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "deadLettered": self.dead_lettered,
+            "deadLetterErrors": self.dead_letter_errors,
+            "closed": self._closed,
+        }
+
+    def health(self) -> Dict[str, Any]:
+        """"ok" until a write is dropped; then "degraded" with where the dropped ops went."""
+        stats = self.stats()
+        last = self.failures[-1] if self.failures else None
+        return {
+            "status": "degraded" if stats["dropped"] else "ok",
+            **stats,
+            "deadLetter": {"collection": self.dead_letter_collection or None, "file": self.dead_letter_file or None},
+            "lastFailure": last,
+        }
+
+
+def create_write_behind(enabled: bool, on_written: Optional[Callable[[Any], None]] = None) -> Optional[WriteBehindQueue]:
+    """Process-wide queue (flushed at interpreter exit), or None when write-behind is disabled."""
+    if not enabled:
+        return None
+    wb = WriteBehindQueue(on_written=on_written)
+    atexit.register(wb.close)
+    return wb